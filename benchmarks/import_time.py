@@ -0,0 +1,109 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ["mridc", "mridc.collections.common", "mridc.launch", "mridc.cli"]
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def parse_import_time(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse the output of ``python -X importtime``.
+
+    Parameters
+    ----------
+    stderr : str
+        Standard error of the python process.
+
+    Returns
+    -------
+    Dict[str, Tuple[int, int]]
+        Self and cumulative import time, in microseconds, of every imported module.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is not None:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def measure_import(module: str, repeats: int = 5) -> Dict:
+    """
+    Measure the cost of importing a module, in fresh python processes.
+
+    Parameters
+    ----------
+    module : str
+        Module to import.
+    repeats : int
+        Number of processes to measure. Default is ``5``.
+
+    Returns
+    -------
+    Dict
+        Median wall time of the processes and cumulative import time of the module, in seconds, with the number of
+        imported modules and the modules with the largest cumulative import time.
+    """
+    wall_times: List[float] = []
+    import_times: List[float] = []
+    times: Dict[str, Tuple[int, int]] = {}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=False
+        )
+        wall_times.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            raise RuntimeError(f"Failed to import {module}:\n{process.stderr[-2000:]}")
+        times = parse_import_time(process.stderr)
+        import_times.append(times[module][1] / 1e6 if module in times else float("nan"))
+
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        "module": module,
+        "wall_time": statistics.median(wall_times),
+        "import_time": statistics.median(import_times),
+        "num_modules": len(times),
+        "slowest": {name: cumulative / 1e6 for name, (_, cumulative) in slowest[:15]},
+    }
+
+
+def main(args):
+    """Measure and print the import cost of the modules, optionally storing it as json."""
+    results = []
+    for module in args.modules:
+        result = measure_import(module, repeats=args.repeats)
+        results.append(result)
+        print(
+            f"{module:<40} wall {result['wall_time']:7.3f} s   import {result['import_time']:7.3f} s   "
+            f"{result['num_modules']:5d} modules"
+        )
+        if args.verbose:
+            for name, cumulative in result["slowest"].items():
+                print(f"    {name:<60} {cumulative:7.3f} s")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the import time of mridc modules, e.g. of the launcher that every (multirun) job pays."
+    )
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import.")
+    parser.add_argument("-n", "--repeats", type=int, default=5, help="Number of fresh processes per module.")
+    parser.add_argument("-o", "--output", type=str, default=None, help="Json file to store the results.")
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Print the modules with the largest cumulative import time."
+    )
+    main(parser.parse_args())
@@ -0,0 +1,371 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from mridc.collections.common.data import subsample
+from mridc.collections.common.parts import fft, utils
+from mridc.collections.common.parts.transforms import (
+    GeometricDecompositionCoilCompression,
+    NoisePreWhitening,
+    Normalizer,
+)
+from mridc.collections.reconstruction.data import subsample as reconstruction_subsample
+from mridc.collections.reconstruction.parts.transforms import MRIDataTransforms
+
+# Shapes of the synthetic data of every preset. "quick" takes a few minutes, "full" covers 1 to 32 coils, 320x320 to
+# 640x640 matrices and 1 to 4 echoes.
+PRESETS = {
+    "quick": {"coils": [1, 8], "matrix": [320], "echoes": [1]},
+    "full": {"coils": [1, 8, 16, 32], "matrix": [320, 640], "echoes": [1, 4]},
+}
+
+BENCHMARKS: Dict[str, Tuple[Callable, Sequence[str], Dict[str, Sequence]]] = {}
+
+
+def benchmark(name: str, axes: Sequence[str] = ("coils", "matrix", "echoes"), **params: Sequence):
+    """
+    Register a benchmark.
+
+    Parameters
+    ----------
+    name : str
+        Name of the benchmark.
+    axes : Sequence[str]
+        Shape axes of the presets the benchmark is parametrized by, out of ``coils``, ``matrix`` and ``echoes``.
+    **params : Sequence
+        Other parameters of the benchmark, and their values.
+
+    Returns
+    -------
+    Callable
+        Decorator of the setup function of the benchmark, which takes the parameters and returns the function to
+        time, without arguments.
+    """
+
+    def decorator(setup: Callable) -> Callable:
+        BENCHMARKS[name] = (setup, axes, params)
+        return setup
+
+    return decorator
+
+
+def synthetic_kspace(echoes: int, coils: int, matrix: int) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Synthetic multi-coil k-space and coil sensitivity maps, of an image of random smooth blobs seen by coils placed
+    around the field of view.
+
+    Parameters
+    ----------
+    echoes : int
+        Number of echoes.
+    coils : int
+        Number of coils.
+    matrix : int
+        Size of the square matrix.
+
+    Returns
+    -------
+    Tuple[torch.Tensor, torch.Tensor]
+        Complex k-space and sensitivity maps, of shape [echoes, coils, matrix, matrix].
+    """
+    generator = torch.Generator().manual_seed(0)
+    grid = torch.linspace(-1, 1, matrix)
+    x, y = torch.meshgrid(grid, grid, indexing="ij")
+
+    image = torch.zeros(echoes, matrix, matrix, dtype=torch.complex64)
+    for center_x, center_y, width in torch.rand(8, 3, generator=generator):
+        blob = torch.exp(-((x - (center_x - 0.5)) ** 2 + (y - (center_y - 0.5)) ** 2) / (0.05 + 0.2 * width))
+        image += blob * torch.exp(-torch.arange(1, echoes + 1) / 4.0).view(-1, 1, 1)
+    image = image * torch.exp(1j * np.pi * x * y)
+
+    angles = torch.arange(coils) * 2 * np.pi / coils
+    sensitivity_maps = torch.stack(
+        [torch.exp(-((x - 1.5 * np.cos(a)) ** 2 + (y - 1.5 * np.sin(a)) ** 2) / 2) * torch.exp(1j * a) for a in angles]
+    ).to(torch.complex64)
+    sensitivity_maps = sensitivity_maps / utils.rss_complex(torch.view_as_real(sensitivity_maps), dim=0).clamp(1e-6)
+
+    coil_images = image.unsqueeze(1) * sensitivity_maps.unsqueeze(0)
+    coil_images = coil_images + 1e-3 * torch.randn(coil_images.shape, dtype=torch.complex64, generator=generator)
+    kspace = torch.fft.fft2(coil_images)
+    return kspace, sensitivity_maps.unsqueeze(0).expand(echoes, -1, -1, -1).contiguous()
+
+
+@benchmark(
+    "mask_func",
+    axes=("matrix",),
+    mask_type=["random1d", "equispaced1d", "equispaced2d", "gaussian1d", "gaussian2d", "poisson2d"],
+    acceleration=[4, 10],
+)
+def mask_func(matrix: int, mask_type: str, acceleration: int) -> Callable:
+    """Create the mask of a slice, as the data loaders do, seeded by the file name."""
+    masker = subsample.create_masker(mask_type, [0.08 if acceleration == 4 else 0.04], [acceleration])
+    return lambda: masker((1, matrix, matrix, 2), seed=tuple(map(ord, "file1000000.h5")))
+
+
+@benchmark("fft2", centered=[False, True])
+def fft2(coils: int, matrix: int, echoes: int, centered: bool) -> Callable:
+    """2D FFT of multi-coil, multi-echo data, viewed as real."""
+    data = torch.view_as_real(synthetic_kspace(echoes, coils, matrix)[0])
+    return lambda: fft.fft2(data, centered=centered, normalization="backward", spatial_dims=[-2, -1])
+
+
+@benchmark("ifft2", centered=[False, True])
+def ifft2(coils: int, matrix: int, echoes: int, centered: bool) -> Callable:
+    """2D inverse FFT of multi-coil, multi-echo data, viewed as real."""
+    data = torch.view_as_real(synthetic_kspace(echoes, coils, matrix)[0])
+    return lambda: fft.ifft2(data, centered=centered, normalization="backward", spatial_dims=[-2, -1])
+
+
+@benchmark("coil_combination", method=["SENSE", "RSS"])
+def coil_combination(coils: int, matrix: int, echoes: int, method: str) -> Callable:
+    """Coil combination of multi-coil, multi-echo images."""
+    kspace, sensitivity_maps = synthetic_kspace(echoes, coils, matrix)
+    images = torch.view_as_real(torch.fft.ifft2(kspace))
+    sensitivity_maps = torch.view_as_real(sensitivity_maps)
+    return lambda: utils.coil_combination(images, sensitivity_maps, method=method, dim=1)
+
+
+@benchmark("noise_prewhitening", axes=("coils", "matrix"), find_patch_size=[False, True])
+def noise_prewhitening(coils: int, matrix: int, find_patch_size: bool) -> Callable:
+    """Noise pre-whitening of the k-space of a slice."""
+    data = torch.view_as_real(synthetic_kspace(1, coils, matrix)[0][0])
+    transform = NoisePreWhitening(find_patch_size=find_patch_size, patch_size=[10, 40, 10, 40])
+    return lambda: transform(data)
+
+
+@benchmark("gcc", axes=("coils", "matrix"))
+def gcc(coils: int, matrix: int) -> Callable:
+    """Geometric decomposition coil compression of the k-space of a slice, to half of the coils."""
+    data = torch.view_as_real(synthetic_kspace(1, coils, matrix)[0][0])
+    transform = GeometricDecompositionCoilCompression(
+        virtual_coils=max(coils // 2, 1), calib_lines=24, spatial_dims=[-2, -1]
+    )
+    return lambda: transform(data)
+
+
+@benchmark("normalizer", normalization_type=["max", "mean", "minmax"])
+def normalizer(coils: int, matrix: int, echoes: int, normalization_type: str) -> Callable:
+    """Normalization of multi-coil, multi-echo images."""
+    data = torch.fft.ifft2(synthetic_kspace(echoes, coils, matrix)[0])
+    transform = Normalizer(normalization_type=normalization_type)
+    return lambda: transform(data)
+
+
+@benchmark("mri_data_transforms", axes=("coils", "matrix"), coil_combination_method=["SENSE", "RSS"])
+def mri_data_transforms(coils: int, matrix: int, coil_combination_method: str) -> Callable:
+    """Preprocessing of a slice by the data loaders, with a 4x random 1D mask, as the model zoo configurations."""
+    kspace, sensitivity_maps = synthetic_kspace(1, coils, matrix)
+    kspace, sensitivity_maps = kspace[0].numpy(), sensitivity_maps[0].numpy()
+    transform = MRIDataTransforms(
+        coil_combination_method=coil_combination_method,
+        mask_func=[reconstruction_subsample.create_mask_for_mask_type("random1d", [0.08], [4])],
+        normalize_inputs=True,
+        fft_centered=False,
+        fft_normalization="backward",
+        max_norm=True,
+        spatial_dims=[-2, -1],
+        coil_dim=1,
+    )
+    return lambda: transform(kspace, sensitivity_maps, None, np.array([]), np.array([]), {}, "file1000000.h5", 0)
+
+
+def cases(preset: str, name_filter: Sequence[str] = ()) -> List[Tuple[str, Callable, Dict]]:
+    """
+    Parametrize the benchmarks with the shapes of a preset.
+
+    Parameters
+    ----------
+    preset : str
+        Name of the preset of shapes.
+    name_filter : Sequence[str]
+        Run only the cases whose name contains any of these strings. Default is all cases.
+
+    Returns
+    -------
+    List[Tuple[str, Callable, Dict]]
+        Name, setup function and parameters of every case.
+    """
+    all_cases = []
+    for name, (setup, axes, params) in BENCHMARKS.items():
+        grid = {axis: PRESETS[preset][axis] for axis in axes}
+        grid.update(params)
+        for values in itertools.product(*grid.values()):
+            case_params = dict(zip(grid.keys(), values))
+            case_name = f"{name}[{','.join(f'{k}={v}' for k, v in case_params.items())}]"
+            if not name_filter or any(f in case_name for f in name_filter):
+                all_cases.append((case_name, setup, case_params))
+    return all_cases
+
+
+def measure(fn: Callable, min_time: float = 1.0, min_repeats: int = 3, max_repeats: int = 100) -> Dict:
+    """
+    Time a function, after a warm-up call.
+
+    Parameters
+    ----------
+    fn : Callable
+        Function to time.
+    min_time : float
+        Time the function at least for this long, in seconds. Default is ``1.0``.
+    min_repeats : int
+        Minimum number of timed calls. Default is ``3``.
+    max_repeats : int
+        Maximum number of timed calls. Default is ``100``.
+
+    Returns
+    -------
+    Dict
+        Median, minimum, mean and standard deviation of the calls, in seconds, and the number of calls.
+    """
+    fn()
+    times: List[float] = []
+    start = time.perf_counter()
+    while len(times) < min_repeats or (time.perf_counter() - start < min_time and len(times) < max_repeats):
+        call_start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - call_start)
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeats": len(times),
+    }
+
+
+def run(args) -> Dict:
+    """Run the benchmarks, on the CPU, printing and optionally storing the timings as json."""
+    torch.set_num_threads(args.num_threads)
+    results = {}
+    for name, setup, params in cases(args.preset, args.filter):
+        timing = measure(setup(**params), min_time=args.min_time, min_repeats=args.min_repeats)
+        results[name] = {"params": params, **timing}
+        print(f"{name:<90} {timing['median'] * 1e3:10.3f} ms  ± {timing['stdev'] * 1e3:8.3f}", flush=True)
+
+    report = {
+        "meta": {
+            "preset": args.preset,
+            "num_threads": args.num_threads,
+            "python": sys.version.split()[0],
+            "torch": torch.__version__,
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "processor": platform.processor(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.1, statistic: str = "median") -> List[Dict]:
+    """
+    Compare two runs of the benchmarks.
+
+    Parameters
+    ----------
+    baseline : Dict
+        Results of the baseline run, as stored by ``run``.
+    current : Dict
+        Results of the current run, as stored by ``run``.
+    threshold : float
+        Relative slowdown, or speedup, of a case to flag, e.g. ``0.1`` for 10%. Default is ``0.1``.
+    statistic : str
+        Timing to compare, ``median`` or ``min``. Default is ``median``.
+
+    Returns
+    -------
+    List[Dict]
+        Name, baseline and current timings, ratio and status, one of ``slower``, ``faster``, ``same``, ``new`` or
+        ``missing``, of every case.
+    """
+    rows = []
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(name, {}).get(statistic)
+        after = current["results"].get(name, {}).get(statistic)
+        if before is None or after is None:
+            rows.append(
+                {
+                    "name": name,
+                    "baseline": before,
+                    "current": after,
+                    "ratio": None,
+                    "status": "new" if before is None else "missing",
+                }
+            )
+            continue
+        ratio = after / before
+        status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 / (1 + threshold) else "same"
+        rows.append({"name": name, "baseline": before, "current": after, "ratio": ratio, "status": status})
+    return rows
+
+
+def compare(args) -> int:
+    """Print the comparison of two runs, returning 1 if a case is slower than the threshold allows."""
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    with open(args.current, "r") as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, threshold=args.threshold, statistic=args.statistic)
+
+    print(f"{'case':<90} {'baseline':>12} {'current':>12} {'ratio':>7}  status")
+    for row in rows:
+        before = f"{row['baseline'] * 1e3:9.3f} ms" if row["baseline"] is not None else f"{'-':>12}"
+        after = f"{row['current'] * 1e3:9.3f} ms" if row["current"] is not None else f"{'-':>12}"
+        ratio = f"{row['ratio']:7.2f}" if row["ratio"] is not None else f"{'-':>7}"
+        print(f"{row['name']:<90} {before} {after} {ratio}  {row['status']}")
+
+    slower = [row["name"] for row in rows if row["status"] == "slower"]
+    if slower:
+        print(f"\n{len(slower)} cases are more than {args.threshold:.0%} slower than the baseline.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="CPU micro-benchmarks of the mask functions, FFTs, coil combination and MRI data transforms, on "
+        "synthetic data."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = subparsers.add_parser("run", help="Run the benchmarks, e.g. run --preset full -o results.json")
+    parser_run.add_argument("--preset", choices=sorted(PRESETS), default="quick", help="Shapes of the data.")
+    parser_run.add_argument(
+        "-k", "--filter", nargs="*", default=[], help="Run only the cases whose name contains any of these strings."
+    )
+    parser_run.add_argument("-o", "--output", type=str, default=None, help="Json file to store the results.")
+    parser_run.add_argument("--min-time", type=float, default=1.0, help="Minimum time to time every case, in s.")
+    parser_run.add_argument("--min-repeats", type=int, default=3, help="Minimum number of timed calls per case.")
+    parser_run.add_argument(
+        "--num-threads", type=int, default=1, help="Number of torch threads. Keep it fixed to compare runs."
+    )
+    parser_run.set_defaults(func=run)
+
+    parser_compare = subparsers.add_parser(
+        "compare", help="Compare two runs, flagging slowdowns, e.g. compare baseline.json results.json"
+    )
+    parser_compare.add_argument("baseline", type=str, help="Json file of the baseline run.")
+    parser_compare.add_argument("current", type=str, help="Json file of the current run.")
+    parser_compare.add_argument(
+        "-t", "--threshold", type=float, default=0.1, help="Relative slowdown to flag, e.g. 0.1 for 10%%."
+    )
+    parser_compare.add_argument("--statistic", choices=["median", "min"], default="median", help="Timing to compare.")
+    parser_compare.set_defaults(func=lambda args: sys.exit(compare(args)))
+
+    arguments = parser.parse_args()
+    arguments.func(arguments)
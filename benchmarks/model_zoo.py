@@ -0,0 +1,550 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import argparse
+import importlib
+import json
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import h5py
+import numpy as np
+import pytorch_lightning as pl
+import torch
+from omegaconf import DictConfig, OmegaConf
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CONFIGS = sorted(str(path) for path in REPO_ROOT.glob("projects/*/model_zoo/conf/*_train.yaml"))
+
+QUANTITATIVE_MAPS = ["B0", "S0", "R2star", "phi"]
+
+ISMRMRD_HEADER = """<?xml version="1.0" encoding="utf-8"?>
+<ismrmrdHeader xmlns="https://www.ismrm.org/ISMRMRD">
+  <encoding>
+    <encodedSpace><matrixSize><x>{x}</x><y>{y}</y><z>1</z></matrixSize></encodedSpace>
+    <reconSpace><matrixSize><x>{x}</x><y>{y}</y><z>1</z></matrixSize></reconSpace>
+    <encodingLimits><kspace_encoding_step_1><minimum>0</minimum><maximum>{y_max}</maximum><center>{y_center}</center>
+    </kspace_encoding_step_1></encodingLimits>
+  </encoding>
+</ismrmrdHeader>"""
+
+# first line of the message of an exception in a traceback, e.g. "ValueError: ..."
+EXCEPTION_LINE = re.compile(r"^[A-Za-z_][\w.]*(Error|Exception|Exit|Interrupt)\b")
+
+# paths of the configurations to external data, which the synthetic dataset replaces
+DATA_PATH_KEYS = [
+    "sense_path",
+    "coil_sensitivity_maps_path",
+    "mask_path",
+    "segmentations_path",
+    "initial_predictions_path",
+    "qmaps_cache_path",
+]
+
+
+def generate_dataset(
+    root: Path,
+    volumes: int = 2,
+    slices: int = 4,
+    coils: int = 8,
+    shape: Sequence[int] = (320, 320),
+    echoes: int = 1,
+    segmentation_classes: int = 0,
+    accelerations: Sequence[int] = (),
+    coils_last: bool = False,
+    per_slice: bool = False,
+) -> Path:
+    """
+    Generate a synthetic fastMRI-style dataset of multi-coil, optionally multi-echo, volumes, with the keys the data
+    loaders read: ``kspace``, ``sensitivity_map``, ``ismrmrd_header`` and, optionally, ``segmentation`` labels, and
+    the brain, head and sampling masks and the initial and target quantitative maps of the quantitative loaders.
+
+    Files are not regenerated if they exist, so that the dataset is shared by the configurations with the same
+    arguments.
+
+    Parameters
+    ----------
+    root : Path
+        Directory to store the dataset in.
+    volumes : int
+        Number of volumes, i.e. files. Default is ``2``.
+    slices : int
+        Number of slices per volume. Default is ``4``.
+    coils : int
+        Number of coils. Default is ``8``.
+    shape : Sequence[int]
+        Size of the slices. Default is ``(320, 320)``.
+    echoes : int
+        Number of echoes. If larger than 1, the k-space is stored as [slices, echoes, coils, x, y]. Default is ``1``.
+    segmentation_classes : int
+        Number of segmentation classes. If 0, no labels are stored. Default is ``0``.
+    accelerations : Sequence[int]
+        Accelerations of the stored sampling masks and initial quantitative maps. If empty, none are stored. Default
+        is ``()``.
+    coils_last : bool
+        Store the coils as the last dimension, as the quantitative datasets. Default is ``False``.
+    per_slice : bool
+        Store every slice in its own file, named ``<volume>_<slice>.h5``, without the slice dimension. Default is
+        ``False``.
+
+    Returns
+    -------
+    Path
+        Directory of the dataset.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    x, y = np.meshgrid(np.linspace(-1, 1, shape[0]), np.linspace(-1, 1, shape[1]), indexing="ij")
+    angles = np.arange(coils) * 2 * np.pi / coils
+    sensitivity_map = np.stack(
+        [np.exp(-((x - 1.5 * np.cos(a)) ** 2 + (y - 1.5 * np.sin(a)) ** 2) / 2) * np.exp(1j * a) for a in angles]
+    )
+    sensitivity_map /= np.sqrt(np.sum(np.abs(sensitivity_map) ** 2, 0, keepdims=True))
+    tes = np.linspace(3.0, 3.0 + 8.5 * (echoes - 1), echoes)[:, None, None] / 1e3
+
+    for volume in range(volumes):
+        fname = root / f"file_synthetic_{volume:03d}.h5"
+        if fname.exists() or (root / f"{fname.stem}_0.h5").exists():
+            continue
+        rng = np.random.default_rng(volume)
+
+        # smooth blobs of different proton density, relaxation rate and field offset, on a brain-like ellipse
+        head = (x / 0.9) ** 2 + (y / 0.75) ** 2 < 1
+        brain = (x / 0.75) ** 2 + (y / 0.6) ** 2 < 1
+        S0, R2star, B0 = np.zeros((3, slices, *shape))
+        for s in range(slices):
+            S0[s], R2star[s], B0[s] = 0.2 * head, 20.0 * head, 10.0 * x * y
+            for cx, cy, width, density, relaxation in rng.uniform(0, 1, (6, 5)):
+                blob = np.exp(-((x - 1.2 * (cx - 0.5)) ** 2 + (y - 1.2 * (cy - 0.5)) ** 2) / (0.01 + 0.05 * width))
+                S0[s] += density * blob * brain
+                R2star[s] += 60.0 * relaxation * blob * brain
+        phi = np.pi * rng.uniform(-0.1, 0.1) * np.ones_like(S0)
+        image = (
+            S0[:, None] * np.exp(-R2star[:, None] * tes) * np.exp(1j * (2 * np.pi * B0[:, None] * tes + phi[:, None]))
+        )
+
+        coil_images = image[:, :, None] * sensitivity_map[None, None]
+        coil_images += 1e-3 * (rng.standard_normal(coil_images.shape) + 1j * rng.standard_normal(coil_images.shape))
+        kspace = np.fft.fft2(coil_images, axes=(-2, -1)).astype(np.complex64)
+        if echoes == 1:
+            kspace = kspace[:, 0]
+        if coils_last:
+            kspace = np.moveaxis(kspace, -3, -1)
+
+        data = {
+            "kspace": kspace,
+            "sensitivity_map": np.repeat(
+                np.moveaxis(sensitivity_map, 0, -1)[None] if coils_last else sensitivity_map[None], slices, 0
+            ).astype(np.complex64),
+        }
+        if segmentation_classes > 0:
+            # one-hot labels of the quantiles of the intensity within the brain
+            bins = np.quantile(S0[:, brain], np.linspace(0, 1, segmentation_classes + 1)[1:-1])
+            labels = np.where(brain, np.digitize(S0, bins) + 1, 0) % segmentation_classes
+            data["segmentation"] = np.moveaxis(np.eye(segmentation_classes)[labels], -1, 1).astype(np.float32)
+        if accelerations:
+            data["mask_brain"] = np.repeat(brain[None], slices, 0).astype(np.float32)
+            data["mask_head"] = np.repeat(head[None], slices, 0).astype(np.float32)
+            for acceleration in accelerations:
+                data[f"mask_{acceleration}x"] = (rng.uniform(size=(slices, *shape)) < 1 / acceleration).astype(
+                    np.float32
+                )
+            for name, qmap in zip(QUANTITATIVE_MAPS, (B0, S0, R2star, phi)):
+                data[f"{name}_map_target"] = qmap.astype(np.float32)
+                for acceleration in accelerations:
+                    data[f"{name}_map_init_{acceleration}x"] = qmap.astype(np.float32)
+
+        header = ISMRMRD_HEADER.format(x=shape[0], y=shape[1], y_max=shape[1] - 1, y_center=shape[1] // 2)
+        files = {root / f"{fname.stem}_{s}.h5": s for s in range(slices)} if per_slice else {fname: slice(None)}
+        for path, index in files.items():
+            with h5py.File(path, "w") as hf:
+                for key, value in data.items():
+                    hf.create_dataset(key, data=value[index])
+                hf.create_dataset("ismrmrd_header", data=header)
+                hf.attrs["acquisition"] = "synthetic"
+                hf.attrs["max"] = float(np.abs(image[index]).max())
+    return root
+
+
+def dataset_arguments(cfg: DictConfig, args) -> Dict:
+    """
+    Arguments of the synthetic dataset of a configuration: the echoes of quantitative configurations, the
+    segmentation classes of segmentation configurations, the number of consecutive slices and the input size of the
+    models that need them, or else the ones of the command line.
+
+    Parameters
+    ----------
+    cfg : DictConfig
+        Configuration of the model.
+    args : argparse.Namespace
+        Command line arguments.
+
+    Returns
+    -------
+    Dict
+        Keyword arguments of ``generate_dataset``.
+    """
+    train_ds = cfg.model.get("train_ds", {})
+    quantitative = train_ds.get("TEs", None) is not None
+    segmentation = "segmentation_classes" in train_ds or "segmentation_classes" in cfg.model
+    segmentation_classes = train_ds.get("segmentation_classes", None) or cfg.model.get("segmentation_classes", None)
+    return {
+        "volumes": args.volumes,
+        "slices": max(args.slices, train_ds.get("consecutive_slices", 1)),
+        "coils": args.coils,
+        # models of fixed input size set it in the configuration
+        "shape": tuple(cfg.model.get("segmentation_module_img_size", None) or args.shape),
+        "echoes": len(train_ds.get("TEs")) if quantitative else args.echoes,
+        "segmentation_classes": (segmentation_classes or args.segmentation_classes) if segmentation else 0,
+        "accelerations": tuple(train_ds.get("mask_args", {}).get("accelerations", ())) if quantitative else (),
+        "coils_last": quantitative and train_ds.get("init_coil_dim", 1) in [3, 4, -1],
+        "per_slice": train_ds.get("data_saved_per_slice", False),
+    }
+
+
+def prepare_config(cfg: DictConfig, data_path: Path, args) -> DictConfig:
+    """
+    Point the data loaders of a configuration to the synthetic dataset, and run them, and the trainer, on the CPU.
+
+    Parameters
+    ----------
+    cfg : DictConfig
+        Configuration, as launched by ``mridc.launch``.
+    data_path : Path
+        Directory of the synthetic dataset.
+    args : argparse.Namespace
+        Command line arguments.
+
+    Returns
+    -------
+    DictConfig
+        Configuration to benchmark.
+    """
+    cfg = cfg.copy()
+    for name in ["train_ds", "validation_ds", "test_ds"]:
+        ds = cfg.model.get(name, None)
+        if ds is None:
+            continue
+        ds.data_path = str(data_path)
+        for key in DATA_PATH_KEYS:
+            if key in ds:
+                ds[key] = "None"
+        ds.batch_size = args.batch_size
+        ds.num_workers = args.num_workers
+        ds.shuffle = False
+        ds.pin_memory = False
+        ds.sample_rate = 1
+        ds.volume_sample_rate = None
+        ds.use_dataset_cache = False
+    cfg.model.log_images = False
+    cfg.trainer = {
+        "accelerator": "cpu",
+        "devices": 1,
+        "precision": 32,
+        "max_steps": args.warmup + args.steps,
+        "limit_val_batches": 0,
+        "num_sanity_val_steps": 0,
+        "logger": False,
+        "enable_checkpointing": False,
+        "enable_progress_bar": False,
+        "enable_model_summary": False,
+    }
+    return cfg
+
+
+class StepTimer(pl.Callback):
+    """Time the data loading, forward (including the loss), backward and optimizer step of every training step."""
+
+    def __init__(self):
+        super().__init__()
+        self.times: Dict[str, List[float]] = {"data": [], "forward": [], "backward": [], "optimizer": []}
+        self._last = time.perf_counter()
+
+    def _lap(self, name: Optional[str]):
+        now = time.perf_counter()
+        if name is not None:
+            self.times[name].append(now - self._last)
+        self._last = now
+
+    def on_train_epoch_start(self, trainer, pl_module):
+        self._lap(None)
+
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx):
+        self._lap("data")
+
+    def on_before_backward(self, trainer, pl_module, loss):
+        self._lap("forward")
+
+    def on_after_backward(self, trainer, pl_module):
+        self._lap("backward")
+
+    def on_before_optimizer_step(self, trainer, pl_module, optimizer, optimizer_idx):
+        self._lap(None)
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx):
+        self._lap("optimizer")
+
+
+def peak_rss() -> float:
+    """Peak resident set size of the process, in MB."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+
+
+def benchmark_config(config: str, args) -> Dict:
+    """
+    Train the model of a configuration for the warm-up and timed steps, on the synthetic dataset, on the CPU.
+
+    Parameters
+    ----------
+    config : str
+        Path to the configuration (yaml) file.
+    args : argparse.Namespace
+        Command line arguments.
+
+    Returns
+    -------
+    Dict
+        Median time of the data loading, forward (including the loss), backward, optimizer step and whole training
+        step, in seconds, throughput of the data loader and of the training, in samples per second, number of
+        parameters and peak resident set size after building the model and after training, in MB.
+    """
+    torch.set_num_threads(args.num_threads)
+    pl.seed_everything(0, workers=True)
+
+    cfg = OmegaConf.load(config)
+    data_kwargs = dataset_arguments(cfg, args)
+    data_path = generate_dataset(
+        Path(args.data_dir) / "_".join(f"{k}={v}" for k, v in data_kwargs.items()).replace(" ", ""), **data_kwargs
+    )
+    cfg = prepare_config(cfg, data_path, args)
+
+    timer = StepTimer()
+    trainer = pl.Trainer(callbacks=[timer], **cfg.trainer)
+    model = importlib.import_module(args.launcher).MODELS.get(cfg.model.model_name)(cfg.model, trainer=trainer)
+    rss_model = peak_rss()
+    trainer.fit(model)
+
+    if len(timer.times["optimizer"]) <= args.warmup:
+        raise RuntimeError(f"Trained for {len(timer.times['optimizer'])} steps only, of {args.warmup + args.steps}.")
+    times = {name: statistics.median(values[args.warmup :]) for name, values in timer.times.items()}
+    times["step"] = sum(times.values())
+    return {
+        "model": cfg.model.model_name,
+        "dataset": data_kwargs,
+        "parameters": sum(p.numel() for p in model.parameters()),
+        **times,
+        "loader_throughput": args.batch_size / times["data"],
+        "train_throughput": args.batch_size / times["step"],
+        "rss_model": rss_model,
+        "peak_rss": peak_rss(),
+        "steps": len(timer.times["optimizer"]) - args.warmup,
+    }
+
+
+def config_name(config: str) -> str:
+    """Name of a configuration, with its project if in the model zoo, e.g. ``reconstruction/base_cirim_train``."""
+    path = Path(config)
+    if path.parent.name == "conf" and path.parent.parent.name == "model_zoo":
+        return f"{path.parents[2].name}/{path.stem}"
+    return path.stem
+
+
+def worker_arguments(args) -> List[str]:
+    """Command line arguments of the worker processes, i.e. the arguments of the benchmark."""
+    return [
+        f"--coils={args.coils}",
+        "--shape",
+        str(args.shape[0]),
+        str(args.shape[1]),
+        f"--echoes={args.echoes}",
+        f"--segmentation-classes={args.segmentation_classes}",
+        f"--volumes={args.volumes}",
+        f"--slices={args.slices}",
+        f"--steps={args.steps}",
+        f"--warmup={args.warmup}",
+        f"--batch-size={args.batch_size}",
+        f"--num-workers={args.num_workers}",
+        f"--num-threads={args.num_threads}",
+        f"--data-dir={args.data_dir}",
+        f"--launcher={args.launcher}",
+    ]
+
+
+def run_config(config: str, args) -> Dict:
+    """
+    Benchmark a configuration in a fresh process, so that its peak memory is not shared with the other
+    configurations, and its failures are reported instead of stopping the benchmark.
+
+    Parameters
+    ----------
+    config : str
+        Path to the configuration (yaml) file.
+    args : argparse.Namespace
+        Command line arguments.
+
+    Returns
+    -------
+    Dict
+        Results of ``benchmark_config``, or the error of the configuration.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        try:
+            process = subprocess.run(
+                [sys.executable, __file__, config, f"--worker={output.name}", *worker_arguments(args)],
+                capture_output=True,
+                text=True,
+                timeout=args.timeout,
+                cwd=REPO_ROOT,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            return {"config": config, "status": f"timeout after {args.timeout} s"}
+        if process.returncode != 0:
+            if args.verbose:
+                print(process.stderr, file=sys.stderr)
+            errors = [line for line in process.stderr.splitlines() if EXCEPTION_LINE.match(line)]
+            if process.returncode < 0:
+                # e.g. SIGKILL by the out-of-memory killer
+                errors.append(f"killed by signal {-process.returncode}")
+            return {"config": config, "status": errors[-1] if errors else f"exit code {process.returncode}"}
+        with open(output.name, "r") as f:
+            return {"config": config, "status": "ok", **json.load(f)}
+
+
+def print_table(results: List[Dict], baseline: Optional[Dict] = None):
+    """
+    Print the results as a table, sorted by the training step time, optionally with the ratio of the step time to
+    the one of a baseline run.
+
+    Parameters
+    ----------
+    results : List[Dict]
+        Results of ``run_config``.
+    baseline : Dict, optional
+        Results of a previous run, as stored by ``main``. Default is ``None``.
+    """
+    baseline_steps = {
+        config_name(result["config"]): result["step"]
+        for result in (baseline or {}).get("results", [])
+        if result["status"] == "ok"
+    }
+    header = (
+        f"{'config':<40} {'model':<26} {'params':>8} {'data':>9} {'forward':>9} {'backward':>9} {'optim':>9} "
+        f"{'step':>9} {'load/s':>8} {'train/s':>8} {'peak RSS':>10}"
+    )
+    print(header + ("  vs base" if baseline is not None else ""))
+    print("-" * (len(header) + (9 if baseline is not None else 0)))
+    for result in sorted(results, key=lambda r: (r["status"] != "ok", r.get("step", 0))):
+        name = config_name(result["config"])
+        if result["status"] != "ok":
+            print(f"{name:<40} {result['status'][:120]}")
+            continue
+        row = (
+            f"{name:<40} {result['model'][:26]:<26} {result['parameters'] / 1e6:7.2f}M "
+            + " ".join(f"{result[k] * 1e3:6.0f} ms" for k in ["data", "forward", "backward", "optimizer", "step"])
+            + f" {result['loader_throughput']:8.2f} {result['train_throughput']:8.2f} {result['peak_rss']:7.0f} MB"
+        )
+        if name in baseline_steps:
+            row += f"  {result['step'] / baseline_steps[name]:6.2f}x"
+        print(row)
+
+
+def main(args):
+    """Benchmark the configurations, printing a comparison table and optionally storing the results as json."""
+    if args.worker is not None:
+        with open(args.worker, "w") as f:
+            json.dump(benchmark_config(args.configs[0], args), f)
+        return
+
+    results = []
+    for config in args.configs:
+        if args.filter and not any(f in config_name(config) for f in args.filter):
+            continue
+        start = time.perf_counter()
+        result = run_config(config, args)
+        results.append(result)
+        status = f"{result['step'] * 1e3:.0f} ms/step" if result["status"] == "ok" else result["status"][:100]
+        print(f"{config_name(config):<40} {status} ({time.perf_counter() - start:.0f} s)", flush=True)
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    print()
+    print_table(results, baseline)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        **{k: v for k, v in vars(args).items() if k not in ["configs", "worker", "output"]},
+                        "python": sys.version.split()[0],
+                        "torch": torch.__version__,
+                        "pytorch_lightning": pl.__version__,
+                        "machine": platform.platform(),
+                        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the training cost of the model zoo configurations on a synthetic fastMRI-style "
+        "dataset, on the CPU: time of the data loading, forward, backward and optimizer step, throughput and peak "
+        "memory, e.g. to pick models for a latency budget or to compare releases."
+    )
+    parser.add_argument(
+        "configs", nargs="*", default=DEFAULT_CONFIGS, help="Configuration files. Default is every training config."
+    )
+    parser.add_argument(
+        "-k", "--filter", nargs="*", default=[], help="Run only the configs whose name contains any of these strings."
+    )
+    parser.add_argument("--coils", type=int, default=8, help="Number of coils of the synthetic data.")
+    parser.add_argument("--shape", type=int, nargs=2, default=[320, 320], help="Size of the synthetic slices.")
+    parser.add_argument(
+        "--echoes", type=int, default=1, help="Number of echoes of the synthetic data, if not set by the config."
+    )
+    parser.add_argument(
+        "--segmentation-classes",
+        type=int,
+        default=2,
+        help="Number of segmentation classes of the synthetic data, if not set by a segmentation config.",
+    )
+    parser.add_argument("--volumes", type=int, default=2, help="Number of synthetic volumes.")
+    parser.add_argument("--slices", type=int, default=4, help="Number of slices per synthetic volume.")
+    parser.add_argument("-n", "--steps", type=int, default=5, help="Number of timed training steps.")
+    parser.add_argument("--warmup", type=int, default=1, help="Number of training steps before timing.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Batch size.")
+    parser.add_argument("--num-workers", type=int, default=0, help="Number of data loader workers.")
+    parser.add_argument("--num-threads", type=int, default=1, help="Number of torch threads.")
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=str(Path(tempfile.gettempdir()) / "mridc_model_zoo_benchmark"),
+        help="Directory of the synthetic datasets, reused between runs.",
+    )
+    parser.add_argument(
+        "--launcher",
+        type=str,
+        default="mridc.launch",
+        help="Module of the registry of the models, i.e. of MODELS, e.g. mridc.cli.launch for the models of mridc run.",
+    )
+    parser.add_argument("--timeout", type=float, default=1800, help="Timeout per config, in s.")
+    parser.add_argument("-o", "--output", type=str, default=None, help="Json file to store the results.")
+    parser.add_argument("--baseline", type=str, default=None, help="Json file of a previous run to compare against.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print the errors of the failed configs.")
+    parser.add_argument("--worker", type=str, default=None, help=argparse.SUPPRESS)
+    main(parser.parse_args())
@@ -4,7 +4,10 @@ __author__ = "Dimitrios Karkalousos"
 import argparse
 
 from mridc.app.launch import register_parser as register_app_subcommand
+from mridc.cli.evaluate import register_parser as register_evaluate_subcommand
 from mridc.cli.launch import register_parser as register_launch_subcommand
+from mridc.cli.precompute_qmaps import register_parser as register_precompute_qmaps_subcommand
+from mridc.cli.precompute_targets import register_parser as register_precompute_targets_subcommand
 
 
 def main():
@@ -16,7 +19,10 @@ def main():
     subparser.dest = "subcommand"
 
     register_app_subcommand(subparser)
+    register_evaluate_subcommand(subparser)
     register_launch_subcommand(subparser)
+    register_precompute_qmaps_subcommand(subparser)
+    register_precompute_targets_subcommand(subparser)
 
     args = parser.parse_args()
     args.func(args)
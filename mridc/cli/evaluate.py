@@ -0,0 +1,133 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import argparse
+
+
+def register_parser(parser: argparse._SubParsersAction):
+    """Register parser for the evaluate command."""
+    parser_evaluate = parser.add_parser(
+        "evaluate",
+        help="Evaluate reconstructions against their targets, in parallel and resumably, "
+        "e.g. mridc evaluate /path/to/targets /path/to/reconstructions -o /path/to/metrics",
+    )
+    parser_evaluate.add_argument(
+        "targets", type=str, help="Directory of the target files, or json file with a list of target files."
+    )
+    parser_evaluate.add_argument(
+        "reconstructions_dir", type=str, help="Directory of the reconstructions, with the same file names."
+    )
+    parser_evaluate.add_argument(
+        "-o", "--output-dir", required=True, type=str, help="Directory to write the per slice and volume metrics to."
+    )
+    add_target_arguments(parser_evaluate)
+    parser_evaluate.add_argument(
+        "--reconstruction-key", type=str, default="reconstruction", help="Dataset of the reconstruction files."
+    )
+    parser_evaluate.add_argument(
+        "--metrics",
+        nargs="+",
+        default=None,
+        help="Metrics to compute, any of MSE, NMSE, PSNR, SSIM, HaarPSI and VSI. Default is MSE, NMSE, PSNR and SSIM.",
+    )
+    parser_evaluate.add_argument(
+        "--chunk-size", type=int, default=32, help="Number of slices the HaarPSI and VSI process at once."
+    )
+    parser_evaluate.add_argument(
+        "--num-threads", type=int, default=0, help="Number of threads to process the HaarPSI and VSI chunks with."
+    )
+    parser_evaluate.add_argument(
+        "-j", "--num-workers", type=int, default=0, help="Number of worker processes. 0 evaluates in process."
+    )
+    parser_evaluate.add_argument(
+        "--format", dest="output_format", choices=["csv", "json"], default="csv", help="Format of the metrics files."
+    )
+    parser_evaluate.add_argument(
+        "--targets-cache",
+        type=str,
+        default=None,
+        help="Root directory of the targets prepared by mridc precompute-targets with the same target options.",
+    )
+    parser_evaluate.add_argument(
+        "--overwrite", action="store_true", help="Evaluate all volumes again, instead of resuming a previous run."
+    )
+    parser_evaluate.set_defaults(func=main)
+
+
+def add_target_arguments(parser: argparse.ArgumentParser):
+    """Add the arguments of the target preparation options, shared by the evaluate and precompute-targets commands."""
+    parser.add_argument(
+        "--target-keys",
+        nargs="+",
+        default=None,
+        help="Candidate datasets of the target files, the first one present is used. Default is "
+        "reconstruction_sense, reconstruction_rss, reconstruction and target.",
+    )
+    parser.add_argument(
+        "--target-from-kspace",
+        choices=["SENSE", "RSS"],
+        type=str.upper,
+        default=None,
+        help="Compute the targets from the fully sampled k-space, with SENSE or RSS coil combination.",
+    )
+    parser.add_argument("--kspace-key", type=str, default="kspace", help="Dataset of the k-space.")
+    parser.add_argument(
+        "--sensitivity-map-key", type=str, default="sensitivity_map", help="Dataset of the coil sensitivity maps."
+    )
+    parser.add_argument(
+        "--crop-size", nargs=2, type=int, default=None, help="Center crop the images to this size, e.g. 320 320."
+    )
+    parser.add_argument(
+        "--normalization",
+        choices=["volume", "slice", "none"],
+        default="volume",
+        help="Normalize the images by their volume or slice maximum.",
+    )
+    parser.add_argument("--clip", action="store_true", help="Clip the normalized images to [0, 1].")
+
+
+def options_from_args(args: argparse.Namespace):
+    """Build the evaluation options from the parsed arguments."""
+    # imported on use, so that registering the command does not import the collections
+    from mridc.collections.reconstruction.metrics.evaluate import EvaluationOptions
+
+    # the unset target keys and metrics are the defaults of the options
+    defaults = {
+        name: getattr(args, name) for name in ["target_keys", "metrics"] if getattr(args, name, None) is not None
+    }
+    return EvaluationOptions(
+        reconstruction_key=getattr(args, "reconstruction_key", "reconstruction"),
+        target_from_kspace=args.target_from_kspace,
+        kspace_key=args.kspace_key,
+        sensitivity_map_key=args.sensitivity_map_key,
+        crop_size=args.crop_size,
+        normalization=args.normalization,
+        clip=args.clip,
+        chunk_size=getattr(args, "chunk_size", 32),
+        num_threads=getattr(args, "num_threads", 0),
+        **defaults,
+    )
+
+
+def main(args):
+    """Evaluate the reconstructions and print the mean and standard deviation of every metric across volumes."""
+    from mridc.collections.reconstruction.metrics.evaluate import evaluate
+
+    summary = evaluate(
+        args.targets,
+        args.reconstructions_dir,
+        args.output_dir,
+        options=options_from_args(args),
+        num_workers=args.num_workers,
+        output_format=args.output_format,
+        resume=not args.overwrite,
+        targets_cache_root=args.targets_cache,
+    )
+    print(" ".join(f"{name} = {value['mean']:.4g} +/- {2 * value['std']:.4g}" for name, value in summary.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    register_parser(parser.add_subparsers())
+    args = parser.parse_args()
+    args.func(args)
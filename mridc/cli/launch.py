@@ -7,42 +7,51 @@ import pytorch_lightning as pl
 import torch
 from omegaconf import DictConfig, OmegaConf
 
-from mridc.collections.multitask.rs.nn.idslr import IDSLR
-from mridc.collections.multitask.rs.nn.idslr_unet import IDSLRUNet
-from mridc.collections.multitask.rs.nn.mtlrs import MTLRS
-from mridc.collections.multitask.rs.nn.recseg_unet import RecSegUNet
-from mridc.collections.multitask.rs.nn.segnet import SegNet
-from mridc.collections.multitask.rs.nn.seranet import SERANet
-from mridc.collections.quantitative.nn.qcirim import qCIRIM
-from mridc.collections.quantitative.nn.qvn import qVarNet
-from mridc.collections.reconstruction.nn.ccnn import CascadeNet
-from mridc.collections.reconstruction.nn.cirim import CIRIM
-from mridc.collections.reconstruction.nn.crnn import CRNNet
-from mridc.collections.reconstruction.nn.cs import CS
-from mridc.collections.reconstruction.nn.dunet import DUNet
-from mridc.collections.reconstruction.nn.jointicnet import JointICNet
-from mridc.collections.reconstruction.nn.kikinet import KIKINet
-from mridc.collections.reconstruction.nn.lpd import LPDNet
-from mridc.collections.reconstruction.nn.multidomainnet import MultiDomainNet
-from mridc.collections.reconstruction.nn.pics import PICS
-from mridc.collections.reconstruction.nn.proximal_gradient import ProximalGradient
-from mridc.collections.reconstruction.nn.resnet import ResNet
-from mridc.collections.reconstruction.nn.rvn import RecurrentVarNet
-from mridc.collections.reconstruction.nn.unet import UNet
-from mridc.collections.reconstruction.nn.vn import VarNet
-from mridc.collections.reconstruction.nn.vsnet import VSNet
-from mridc.collections.reconstruction.nn.xpdnet import XPDNet
-from mridc.collections.reconstruction.nn.zf import ZF
-from mridc.collections.segmentation.nn.attention_unet import SegmentationAttentionUNet
-from mridc.collections.segmentation.nn.dynunet import SegmentationDYNUNet
-from mridc.collections.segmentation.nn.lambda_unet import SegmentationLambdaUNet
-from mridc.collections.segmentation.nn.unet import SegmentationUNet
-from mridc.collections.segmentation.nn.unet3d import Segmentation3DUNet
-from mridc.collections.segmentation.nn.unetr import SegmentationUNetR
-from mridc.collections.segmentation.nn.vnet import SegmentationVNet
 from mridc.core.conf.hydra_runner import hydra_runner
 from mridc.utils import logging
 from mridc.utils.exp_manager import exp_manager
+from mridc.utils.model_registry import MODELS_ENTRY_POINT_GROUP, ModelRegistry
+
+# models are imported on use, so that launching a model does not import the whole model zoo
+MODELS = ModelRegistry(
+    {
+        "CASCADENET": "mridc.collections.reconstruction.nn.ccnn:CascadeNet",
+        "CIRIM": "mridc.collections.reconstruction.nn.cirim:CIRIM",
+        "CRNNET": "mridc.collections.reconstruction.nn.crnn:CRNNet",
+        "CS": "mridc.collections.reconstruction.nn.cs:CS",
+        "DUNET": "mridc.collections.reconstruction.nn.dunet:DUNet",
+        "E2EVN": "mridc.collections.reconstruction.nn.vn:VarNet",
+        "VN": "mridc.collections.reconstruction.nn.vn:VarNet",
+        "IDSLR": "mridc.collections.multitask.rs.nn.idslr:IDSLR",
+        "IDSLRUNET": "mridc.collections.multitask.rs.nn.idslr_unet:IDSLRUNet",
+        "JOINTICNET": "mridc.collections.reconstruction.nn.jointicnet:JointICNet",
+        "MTLRS": "mridc.collections.multitask.rs.nn.mtlrs:MTLRS",
+        "KIKINET": "mridc.collections.reconstruction.nn.kikinet:KIKINet",
+        "LPDNET": "mridc.collections.reconstruction.nn.lpd:LPDNet",
+        "MULTIDOMAINNET": "mridc.collections.reconstruction.nn.multidomainnet:MultiDomainNet",
+        "QCIRIM": "mridc.collections.quantitative.nn.qcirim:qCIRIM",
+        "PG": "mridc.collections.reconstruction.nn.proximal_gradient:ProximalGradient",
+        "PICS": "mridc.collections.reconstruction.nn.pics:PICS",
+        "QVN": "mridc.collections.quantitative.nn.qvn:qVarNet",
+        "RECSEGNET": "mridc.collections.multitask.rs.nn.recseg_unet:RecSegUNet",
+        "RESNET": "mridc.collections.reconstruction.nn.resnet:ResNet",
+        "RVN": "mridc.collections.reconstruction.nn.rvn:RecurrentVarNet",
+        "SEGMENTATIONATTENTIONUNET": "mridc.collections.segmentation.nn.attention_unet:SegmentationAttentionUNet",
+        "SEGMENTATIONDYNUNET": "mridc.collections.segmentation.nn.dynunet:SegmentationDYNUNet",
+        "SEGMENTATIONLAMBDAUNET": "mridc.collections.segmentation.nn.lambda_unet:SegmentationLambdaUNet",
+        "SEGMENTATIONUNET": "mridc.collections.segmentation.nn.unet:SegmentationUNet",
+        "SEGMENTATIONUNETR": "mridc.collections.segmentation.nn.unetr:SegmentationUNetR",
+        "SEGMENTATION3DUNET": "mridc.collections.segmentation.nn.unet3d:Segmentation3DUNet",
+        "SEGMENTATIONVNET": "mridc.collections.segmentation.nn.vnet:SegmentationVNet",
+        "SEGNET": "mridc.collections.multitask.rs.nn.segnet:SegNet",
+        "SERANET": "mridc.collections.multitask.rs.nn.seranet:SERANet",
+        "UNET": "mridc.collections.reconstruction.nn.unet:UNet",
+        "VSNET": "mridc.collections.reconstruction.nn.vsnet:VSNet",
+        "XPDNET": "mridc.collections.reconstruction.nn.xpdnet:XPDNet",
+        "ZF": "mridc.collections.reconstruction.nn.zf:ZF",
+    },
+    entry_point_group=MODELS_ENTRY_POINT_GROUP,
+)
 
 
 def register_parser(parser: argparse._SubParsersAction):
@@ -80,80 +89,7 @@ def main(cfg: DictConfig):  # noqa: D103
 
     model_name = (cfg.model["model_name"]).upper()
 
-    if model_name == "CASCADENET":
-        model = CascadeNet(cfg.model, trainer=trainer)
-    elif model_name == "CIRIM":
-        model = CIRIM(cfg.model, trainer=trainer)
-    elif model_name == "CRNNET":
-        model = CRNNet(cfg.model, trainer=trainer)
-    elif model_name == "CS":
-        model = CS(cfg.model, trainer=trainer)
-    elif model_name == "DUNET":
-        model = DUNet(cfg.model, trainer=trainer)
-    elif model_name in ("E2EVN", "VN"):
-        model = VarNet(cfg.model, trainer=trainer)
-    elif model_name == "IDSLR":
-        model = IDSLR(cfg.model, trainer=trainer)
-    elif model_name == "IDSLRUNET":
-        model = IDSLRUNet(cfg.model, trainer=trainer)
-    elif model_name == "JOINTICNET":
-        model = JointICNet(cfg.model, trainer=trainer)
-    elif model_name == "MTLRS":
-        model = MTLRS(cfg.model, trainer=trainer)
-    elif model_name == "KIKINET":
-        model = KIKINet(cfg.model, trainer=trainer)
-    elif model_name == "LPDNET":
-        model = LPDNet(cfg.model, trainer=trainer)
-    elif model_name == "MULTIDOMAINNET":
-        model = MultiDomainNet(cfg.model, trainer=trainer)
-    elif model_name == "QCIRIM":
-        model = qCIRIM(cfg.model, trainer=trainer)
-    elif model_name == "PG":
-        model = ProximalGradient(cfg.model, trainer=trainer)
-    elif model_name == "PICS":
-        model = PICS(cfg.model, trainer=trainer)
-    elif model_name == "QVN":
-        model = qVarNet(cfg.model, trainer=trainer)
-    elif model_name == "RECSEGNET":
-        model = RecSegUNet(cfg.model, trainer=trainer)
-    elif model_name == "RESNET":
-        model = ResNet(cfg.model, trainer=trainer)
-    elif model_name == "RVN":
-        model = RecurrentVarNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONATTENTIONUNET":
-        model = SegmentationAttentionUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONDYNUNET":
-        model = SegmentationDYNUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONLAMBDAUNET":
-        model = SegmentationLambdaUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONUNET":
-        model = SegmentationUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONUNETR":
-        model = SegmentationUNetR(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATION3DUNET":
-        model = Segmentation3DUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONVNET":
-        model = SegmentationVNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGNET":
-        model = SegNet(cfg.model, trainer=trainer)
-    elif model_name == "SERANET":
-        model = SERANet(cfg.model, trainer=trainer)
-    elif model_name == "UNET":
-        model = UNet(cfg.model, trainer=trainer)
-    elif model_name == "VSNET":
-        model = VSNet(cfg.model, trainer=trainer)
-    elif model_name == "XPDNET":
-        model = XPDNet(cfg.model, trainer=trainer)
-    elif model_name == "ZF":
-        model = ZF(cfg.model, trainer=trainer)
-    else:
-        raise NotImplementedError(
-            f"{model_name} is not implemented in MRIDC. You can use one of the following methods: "
-            "CASCADENET, CIRIM, CRNNET, DUNET, E2EVN, IDSLR, JOINTICNET, MTLRS, KIKINET, LPDNET, MULTIDOMAINNET, "
-            "qCIRIM, qVN, RECSEGNET, RESNET, RVN, SEGMENTATIONATTENTIONUNET, SEGMENTATIONLAMBDAUNET, "
-            "SEGMENTATIONUNET, SEGMENTATION3DUNET, SEGMENTATIONVNET, SEGNET, UNET, VSNET, XPDNET, or Zero-Filled. \n"
-            "If you are interested in another model, please consider opening an issue on GitHub."
-        )
+    model = MODELS.get(model_name)(cfg.model, trainer=trainer)
 
     if cfg.get("pretrained", None):
         checkpoint = cfg.get("checkpoint", None)
@@ -0,0 +1,81 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import argparse
+
+from omegaconf import OmegaConf
+
+from mridc.utils import logging
+
+
+def register_parser(parser: argparse._SubParsersAction):
+    """Register parser for the precompute-qmaps command."""
+    parser_precompute = parser.add_parser(
+        "precompute-qmaps",
+        help="Precompute the initial and target quantitative maps of the datasets of a configuration (yaml) file "
+        "into a cache, e.g. mridc precompute-qmaps -c /path/to/config.yaml",
+    )
+    parser_precompute.add_argument(
+        "-c",
+        "--config-path",
+        required=True,
+        type=str,
+        help="Path to the configuration file.",
+    )
+    parser_precompute.add_argument(
+        "-o",
+        "--output-path",
+        type=str,
+        default=None,
+        help="Path to store the cached maps. If not specified, the qmaps_cache_path of each dataset is used.",
+    )
+    parser_precompute.add_argument(
+        "-s",
+        "--splits",
+        nargs="+",
+        default=["train_ds", "validation_ds", "test_ds"],
+        help="Datasets of the configuration to precompute the quantitative maps of.",
+    )
+    parser_precompute.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Recompute the maps of files that are already cached with the same settings.",
+    )
+    parser_precompute.set_defaults(func=main)
+
+
+def main(args):
+    """Precompute the initial and target quantitative maps of every dataset split of the configuration."""
+    # imported on use, so that registering the command does not import the collections
+    from mridc.collections.common.parts import utils
+    from mridc.collections.quantitative.data.qmri_data import cache_quantitative_maps
+    from mridc.collections.quantitative.models.base import BaseqMRIReconstructionModel
+
+    cfg = OmegaConf.load(args.config_path)
+    model_cfg = cfg.get("model", cfg)
+
+    for split in args.splits:
+        ds_cfg = model_cfg.get(split, None)
+        if ds_cfg is None:
+            continue
+
+        qmaps_cache_path = args.output_path if args.output_path is not None else ds_cfg.get("qmaps_cache_path", None)
+        if utils.is_none(qmaps_cache_path):
+            raise ValueError(f"Please specify an output path or set qmaps_cache_path for {split}.")
+
+        # all slices are needed, computed from scratch and in order
+        ds_cfg = OmegaConf.merge(
+            ds_cfg,
+            {"precompute_quantitative_maps": True, "qmaps_cache_path": None, "sample_rate": 1.0, "shuffle": False},
+        )
+        dataset = BaseqMRIReconstructionModel._setup_dataloader_from_config(ds_cfg).dataset  # noqa: W0212
+
+        logging.info(f"Caching the quantitative maps of {split} ({len(dataset)} slices) to {qmaps_cache_path}.")
+        cache_quantitative_maps(dataset, qmaps_cache_path, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    register_parser(parser.add_subparsers())
+    args = parser.parse_args()
+    args.func(args)
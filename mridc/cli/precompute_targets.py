@@ -0,0 +1,52 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import argparse
+
+from mridc.cli.evaluate import add_target_arguments, options_from_args
+
+
+def register_parser(parser: argparse._SubParsersAction):
+    """Register parser for the precompute-targets command."""
+    parser_precompute = parser.add_parser(
+        "precompute-targets",
+        help="Prepare the cropped and normalized evaluation targets of a dataset once, to be read by mridc evaluate "
+        "with --targets-cache, e.g. mridc precompute-targets /path/to/targets -o /path/to/cache",
+    )
+    parser_precompute.add_argument(
+        "targets", type=str, help="Directory of the target files, or json file with a list of target files."
+    )
+    parser_precompute.add_argument(
+        "-o", "--output-path", required=True, type=str, help="Root directory to store the prepared targets."
+    )
+    add_target_arguments(parser_precompute)
+    parser_precompute.add_argument(
+        "-j", "--num-workers", type=int, default=0, help="Number of worker processes. 0 prepares in process."
+    )
+    parser_precompute.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Prepare again the targets of files that are already cached with the same settings.",
+    )
+    parser_precompute.set_defaults(func=main)
+
+
+def main(args):
+    """Prepare and cache the evaluation targets of every volume."""
+    # imported on use, so that registering the command does not import the collections
+    from mridc.collections.reconstruction.metrics.evaluate import materialize_targets
+
+    materialize_targets(
+        args.targets,
+        args.output_path,
+        options=options_from_args(args),
+        num_workers=args.num_workers,
+        overwrite=args.overwrite,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    register_parser(parser.add_subparsers())
+    args = parser.parse_args()
+    args.func(args)
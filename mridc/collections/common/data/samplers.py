@@ -0,0 +1,99 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import torch.distributed as dist
+from torch.utils.data import Dataset, DistributedSampler
+
+__all__ = ["DistributedVolumeSampler"]
+
+
+class DistributedVolumeSampler(DistributedSampler):
+    """
+    Sequential sampler that partitions a slice dataset across the distributed processes by whole volumes, so that
+    every slice of a volume is seen by the same process. This allows each process to assemble and save the volumes it
+    predicts, without gathering the predictions of the other processes.
+
+    The volumes are assigned in order to contiguous, slice balanced, ranges of processes. Without a process group,
+    all slices are sampled in order, as with ``torch.utils.data.SequentialSampler``.
+
+    Parameters
+    ----------
+    dataset : torch.utils.data.Dataset
+        Slice dataset, with a list of ``(fname, dataslice, metadata)`` examples.
+    num_replicas : int, optional
+        Number of processes. If ``None``, the world size of the process group at iteration time is used, since the
+        dataloaders are usually set up before the process group is initialized.
+    rank : int, optional
+        Rank of the current process. If ``None``, the rank in the process group at iteration time is used.
+
+    Examples
+    --------
+    >>> from types import SimpleNamespace
+    >>> dataset = SimpleNamespace(examples=[("a.h5", 0, {}), ("a.h5", 1, {}), ("b.h5", 0, {}), ("c.h5", 0, {})])
+    >>> list(DistributedVolumeSampler(dataset, num_replicas=2, rank=0))
+    [0, 1]
+    >>> list(DistributedVolumeSampler(dataset, num_replicas=2, rank=1))
+    [2, 3]
+    """
+
+    def __init__(self, dataset: Dataset, num_replicas: Optional[int] = None, rank: Optional[int] = None):
+        # the parent constructor is not called, as it requires an initialized process group
+        self.dataset = dataset
+        self._num_replicas = num_replicas
+        self._rank = rank
+        self.epoch = 0
+        self.seed = 0
+        self.shuffle = False
+        self.drop_last = False
+
+    @property
+    def num_replicas(self) -> int:  # type: ignore
+        """Number of processes the dataset is partitioned across."""
+        if self._num_replicas is not None:
+            return self._num_replicas
+        return dist.get_world_size() if dist.is_available() and dist.is_initialized() else 1
+
+    @property
+    def rank(self) -> int:  # type: ignore
+        """Rank of the current process."""
+        if self._rank is not None:
+            return self._rank
+        return dist.get_rank() if dist.is_available() and dist.is_initialized() else 0
+
+    def volumes(self) -> Dict[str, List[int]]:
+        """Indices of the slices of each volume of the dataset, in order of first appearance."""
+        examples = getattr(self.dataset, "examples", None)
+        if examples is None:
+            return OrderedDict((str(idx), [idx]) for idx in range(len(self.dataset)))  # type: ignore
+
+        volumes: Dict[str, List[int]] = OrderedDict()
+        for idx, (fname, _, _) in enumerate(examples):
+            volumes.setdefault(Path(fname).name, []).append(idx)
+        return volumes
+
+    def indices(self) -> List[int]:
+        """Indices of the slices of the volumes assigned to the current process."""
+        volumes = list(self.volumes().values())
+        num_replicas, rank = self.num_replicas, self.rank
+        if num_replicas == 1:
+            return [idx for volume in volumes for idx in volume]
+
+        # assign every volume to the process its first slice falls into, when slices are split evenly
+        num_slices = sum(len(volume) for volume in volumes)
+        indices: List[int] = []
+        offset = 0
+        for volume in volumes:
+            if offset * num_replicas // num_slices == rank:
+                indices += volume
+            offset += len(volume)
+        return indices
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.indices())
+
+    def __len__(self) -> int:
+        return len(self.indices())
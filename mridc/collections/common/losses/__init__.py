@@ -1,5 +1,8 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.common.losses.aggregator import AggregatorLoss
-from mridc.collections.common.losses.ssim import SSIMLoss
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, submodule_attributes={"aggregator": ["AggregatorLoss"], "ssim": ["SSIMLoss"]}
+)
@@ -1,11 +1,19 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.common.metrics.global_average_loss_metric import GlobalAverageLossMetric
-from mridc.collections.common.metrics.reconstruction_metrics import mse, nmse, psnr, ssim
-from mridc.collections.common.metrics.segmentation_metrics import (
-    binary_cross_entropy_with_logits_metric,
-    dice_metric,
-    f1_per_class_metric,
-    hausdorff_distance_metric,
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "global_average_loss_metric": ["GlobalAverageLossMetric"],
+        "reconstruction_metrics": ["mse", "nmse", "psnr", "ssim"],
+        "segmentation_metrics": [
+            "binary_cross_entropy_with_logits_metric",
+            "dice_metric",
+            "f1_per_class_metric",
+            "hausdorff_distance_metric",
+        ],
+        "volume_metrics": ["VolumeMetricsAccumulator"],
+    },
 )
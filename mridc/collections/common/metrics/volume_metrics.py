@@ -0,0 +1,137 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import torch
+import torch.distributed as dist
+
+__all__ = ["VolumeMetricsAccumulator"]
+
+
+class VolumeMetricsAccumulator:
+    """
+    Accumulates evaluation metrics per volume, and reduces them to the sum of the per volume means across all the
+    distributed processes.
+
+    Every volume file name is mapped to an integer id, indexing the rows of preallocated sum and count tensors, which
+    are updated with ``index_add_`` on the device of the metrics. The per volume mean of a metric is the mean of all
+    the values added to that volume. At the end of an epoch, the sums of the per volume means and the number of
+    volumes are all-reduced at once.
+
+    Parameters
+    ----------
+    metrics : Sequence[str]
+        Names of the metrics to accumulate.
+    capacity : int
+        Number of volumes to preallocate memory for. The tensors grow as needed. Default is ``64``.
+
+    Examples
+    --------
+    >>> import torch
+    >>> accumulator = VolumeMetricsAccumulator(["MSE", "SSIM"])
+    >>> accumulator.update(["a.h5", "a.h5", "b.h5"], MSE=torch.tensor([1.0, 3.0, 4.0]))
+    >>> accumulator.update("b.h5", SSIM=torch.tensor([0.8, 1.0]))
+    >>> metrics, num_volumes = accumulator.compute()
+    >>> {name: round(value.item(), 4) for name, value in metrics.items()}, num_volumes.item()
+    ({'MSE': 6.0, 'SSIM': 0.9}, 2.0)
+    """
+
+    def __init__(self, metrics: Sequence[str], capacity: int = 64):
+        self.metrics = list(metrics)
+        self.metric_index = {name: idx for idx, name in enumerate(self.metrics)}
+        self.capacity = max(capacity, 1)
+        self.volume_ids: Dict[str, int] = {}
+        self.sums: Optional[torch.Tensor] = None
+        self.counts: Optional[torch.Tensor] = None
+
+    def __len__(self) -> int:
+        return len(self.volume_ids)
+
+    def update(self, fname: Union[str, Sequence[str]], **values: torch.Tensor):
+        """
+        Adds the values of the metrics to their volumes.
+
+        Parameters
+        ----------
+        fname : Union[str, Sequence[str]]
+            File name of the volume all the values are added to, or file name of every slice of a batch, in which case
+            the first dimension of the values indexes the slices.
+        **values : torch.Tensor
+            Values of the metrics, by name. Metrics that are not given are left unchanged.
+        """
+        fnames = [fname] if isinstance(fname, str) else [str(name) for name in fname]
+        num_slices = len(fnames)
+
+        unknown = set(values) - set(self.metric_index)
+        if unknown:
+            raise KeyError(f"Unknown metrics {sorted(unknown)}, expected any of {self.metrics}.")
+
+        device = next(iter(values.values())).device if values else torch.device("cpu")
+        ids = [self.volume_ids.setdefault(name, len(self.volume_ids)) for name in fnames]
+        self._allocate(len(self.volume_ids), device)
+
+        sums = torch.zeros(num_slices, len(self.metrics), dtype=self.sums.dtype, device=self.sums.device)
+        counts = torch.zeros_like(sums)
+        for name, value in values.items():
+            value = torch.as_tensor(value).detach().to(device=self.sums.device, dtype=self.sums.dtype)
+            value = value.reshape(num_slices, -1)
+            sums[:, self.metric_index[name]] = value.sum(1)
+            counts[:, self.metric_index[name]] = value.shape[1]
+
+        index = torch.tensor(ids, dtype=torch.long, device=self.sums.device)
+        self.sums.index_add_(0, index, sums)  # type: ignore
+        self.counts.index_add_(0, index, counts)  # type: ignore
+
+    def compute(
+        self, device: Optional[Union[str, torch.device]] = None
+    ) -> Tuple[Dict[str, torch.Tensor], torch.Tensor]:
+        """
+        Reduces the accumulated metrics across all the distributed processes, with a single all-reduce.
+
+        Parameters
+        ----------
+        device : Union[str, torch.device], optional
+            Device to reduce on, if no metrics were accumulated by this process. Default is the device of the
+            accumulated metrics, or the CPU.
+
+        Returns
+        -------
+        Tuple[Dict[str, torch.Tensor], torch.Tensor]
+            The sum of the per volume means of every metric, and the number of volumes. Divide the former by the latter
+            for the mean across volumes.
+        """
+        if self.sums is None:
+            reduced = torch.zeros(len(self.metrics) + 1, device=device)
+        else:
+            num_volumes = len(self.volume_ids)
+            sums, counts = self.sums[:num_volumes], self.counts[:num_volumes]  # type: ignore
+            means = torch.where(counts > 0, sums / counts.clamp(min=1), torch.zeros_like(sums))
+            seen = (counts > 0).any(1).sum().to(sums.dtype)
+            reduced = torch.cat([means.sum(0), seen.view(1)])
+
+        if dist.is_available() and dist.is_initialized():
+            dist.all_reduce(reduced)
+        return dict(zip(self.metrics, reduced[:-1])), reduced[-1]
+
+    def reset(self):
+        """Clears the accumulated metrics, keeping the allocated memory."""
+        self.volume_ids.clear()
+        if self.sums is not None:
+            self.sums.zero_()
+            self.counts.zero_()  # type: ignore
+
+    def _allocate(self, num_volumes: int, device: torch.device):
+        """Allocate, or grow, the sum and count tensors to hold the given number of volumes."""
+        if self.sums is not None and self.sums.device != device:
+            self.sums, self.counts = self.sums.to(device), self.counts.to(device)  # type: ignore
+        if self.sums is not None and self.sums.shape[0] >= num_volumes:
+            return
+        while self.capacity < num_volumes:
+            self.capacity *= 2
+        sums = torch.zeros(self.capacity, len(self.metrics), device=device)
+        counts = torch.zeros_like(sums)
+        if self.sums is not None:
+            sums[: self.sums.shape[0]] = self.sums
+            counts[: self.counts.shape[0]] = self.counts  # type: ignore
+        self.sums, self.counts = sums, counts
@@ -1,9 +1,12 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
+import os
 from abc import ABC
-from typing import Dict, Optional, Sequence, Tuple
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
 
+import numpy as np
 import torch
 import wandb
 from omegaconf import DictConfig, OmegaConf
@@ -14,6 +17,8 @@ from torchmetrics.metric import Metric
 
 from mridc.collections.common.parts import utils
 from mridc.collections.common.parts.fft import ifft2
+from mridc.collections.common.parts.image_logger import ImageLogger
+from mridc.collections.common.parts.writers import VolumeWriter
 from mridc.collections.reconstruction.nn.unet_base import unet_block
 from mridc.core.classes import modelPT
 from mridc.utils import model_utils
@@ -88,6 +93,20 @@ class BaseMRIModel(modelPT.ModelPT, ABC):  # type: ignore
 
         cfg_dict = OmegaConf.to_container(cfg, resolve=True)
         self.log_images = cfg_dict.get("log_images", True)
+        # images are sampled per epoch, downsampled and packed on device, and written from a background thread
+        self.image_logger = ImageLogger(
+            self._write_image,
+            max_volumes=cfg_dict.get("log_images_max_volumes", None),
+            slice_interval=cfg_dict.get("log_images_slice_interval", 1),
+            downsample=cfg_dict.get("log_images_downsample", 1),
+            fp16=cfg_dict.get("log_images_fp16", True),
+            asynchronous=cfg_dict.get("log_images_async", True),
+        )
+
+        # test predictions are streamed to one file per volume, optionally compressed
+        self.test_predictions_compression = cfg_dict.get("test_predictions_compression", None)
+        self.test_predictions_compression_opts = cfg_dict.get("test_predictions_compression_opts", None)
+        self.test_writer: Optional[VolumeWriter] = None
 
     def training_step(self, batch: Dict[float, torch.Tensor], batch_idx: int) -> Dict[str, torch.Tensor]:  # noqa: D102
         """
@@ -147,9 +166,27 @@ class BaseMRIModel(modelPT.ModelPT, ABC):  # type: ignore
         """
         raise NotImplementedError
 
+    def should_log_images(self, fname: str, slice_num: int) -> bool:
+        """
+        Whether to log the images of a slice, if images are logged, as sampled by the image logger for this epoch.
+
+        Parameters
+        ----------
+        fname : str
+            File name of the volume.
+        slice_num : int
+            Slice number.
+
+        Returns
+        -------
+        bool
+            Whether the images of the slice are logged.
+        """
+        return self.log_images and self.image_logger.should_log(fname, slice_num)
+
     def log_image(self, name, image):
         """
-        Logs an image.
+        Logs an image, from a background thread.
 
         Parameters
         ----------
@@ -158,22 +195,36 @@ class BaseMRIModel(modelPT.ModelPT, ABC):  # type: ignore
         image : torch.Tensor
             Image to log.
         """
-        if image.dim() > 3:
-            image = image[0, 0, :, :].unsqueeze(0)
-        elif image.shape[0] != 1:
-            image = image[0].unsqueeze(0)
-
         if ".h5" in name:
             name = name.replace(".h5", "")
 
+        logger_module = self.logger.__module__.lower()
+        if "wandb" not in logger_module and "tensorboard" not in logger_module:
+            raise NotImplementedError(f"Logging images is not implemented for {self.logger.__module__}.")
+
+        self.image_logger.log(name, image, self.global_step)
+
+    def _write_image(self, name: str, image: np.ndarray, step: int):
+        """Writes an image of shape [1, n_x, n_y] to the experiment logger."""
         if "wandb" in self.logger.__module__.lower():
-            if image.is_cuda:
-                image = image.detach().cpu()
-            self.logger.experiment.log({name: wandb.Image(image.numpy())})
-        elif "tensorboard" in self.logger.__module__.lower():
-            self.logger.experiment.add_image(name, image, global_step=self.global_step)
+            self.logger.experiment.log({name: wandb.Image(image)})
         else:
-            raise NotImplementedError(f"Logging images is not implemented for {self.logger.__module__}.")
+            self.logger.experiment.add_image(name, image, global_step=step)
+
+    def on_validation_epoch_start(self):
+        """Sample the volumes to log images of anew."""
+        super().on_validation_epoch_start()
+        self.image_logger.reset()
+
+    def on_test_epoch_start(self):
+        """Sample the volumes to log images of anew."""
+        super().on_test_epoch_start()
+        self.image_logger.reset()
+
+    def teardown(self, stage: str):
+        """Wait for the logged images to be written, and stop the image logging thread."""
+        self.image_logger.close()
+        super().teardown(stage)
 
     def validation_epoch_end(self, outputs):
         """
@@ -207,6 +258,85 @@ class BaseMRIModel(modelPT.ModelPT, ABC):  # type: ignore
         """
         raise NotImplementedError
 
+    def log_volume_metrics(self):
+        """
+        Logs the mean across volumes of the metrics accumulated in ``self.volume_metrics`` by all processes, and
+        resets them for the next epoch. Nothing is logged if no volume was evaluated.
+        """
+        metrics, num_volumes = self.volume_metrics.compute(device=self.device)
+        self.volume_metrics.reset()
+        if num_volumes == 0:
+            return
+        # the metrics are already reduced across processes, syncing them again would average the means
+        for metric, value in metrics.items():
+            self.log(metric, value / num_volumes, sync_dist=False)
+
+    def test_predictions(self, outputs: Tuple[str, int, np.ndarray]) -> Tuple[str, int, Dict[str, np.ndarray]]:
+        """
+        Split the outputs of a test step into the predictions to save, by dataset name.
+
+        Parameters
+        ----------
+        outputs : Tuple[str, int, np.ndarray]
+            Outputs of a test step, as (file name, slice number, prediction).
+
+        Returns
+        -------
+        Tuple[str, int, Dict[str, np.ndarray]]
+            The file name, the slice number and the predictions to save, by dataset name.
+        """
+        fname, slice_num, prediction = outputs
+        return fname, slice_num, {"reconstruction": prediction}
+
+    def test_predictions_postprocess(self) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+        """Function applied to every predicted volume, sorted by slice, before saving it. ``None`` by default."""
+        return None
+
+    def test_predictions_dir(self) -> Path:
+        """Directory to save the test predictions to."""
+        return Path(os.path.join(self.logger.log_dir, "reconstructions"))
+
+    def on_test_start(self):
+        """Start streaming the test predictions to one file per volume."""
+        super().on_test_start()
+        self.test_writer = VolumeWriter(
+            self.test_predictions_dir(),
+            VolumeWriter.slices_per_volume(self.trainer.test_dataloaders),
+            postprocess=self.test_predictions_postprocess(),
+            compression=self.test_predictions_compression,
+            compression_opts=self.test_predictions_compression_opts,
+        )
+
+    def test_step_end(self, outputs: Tuple[str, int, np.ndarray]):  # noqa: W0221
+        """
+        Streams the predictions of a test step to the writer, so they are not kept in memory until the end of the
+        test epoch.
+
+        Parameters
+        ----------
+        outputs : Tuple[str, int, np.ndarray]
+            Outputs of the test step.
+
+        Returns
+        -------
+        Tuple[str, int]
+            The file name and the slice number of the test step.
+        """
+        if self.test_writer is None:
+            return outputs
+        fname, slice_num, predictions = self.test_predictions(outputs)
+        self.test_writer.write(fname, slice_num, predictions)
+        # only the slice is kept for test_epoch_end, returning None would keep the outputs of the test step
+        return fname, slice_num
+
+    def on_test_epoch_end(self):
+        """Write the remaining test predictions and images, and wait for all of them to be saved."""
+        super().on_test_epoch_end()
+        if self.test_writer is not None:
+            test_writer, self.test_writer = self.test_writer, None
+            test_writer.close()
+        self.image_logger.flush()
+
     def setup_training_data(self, train_data_config: Optional[DictConfig]):
         """
         Setups the training data.
@@ -310,6 +440,11 @@ class BaseSensitivityModel(nn.Module, ABC):
         Dimension of the coils. Default is ``1``.
     normalize : bool
         If ``True``, the input data is normalized. Default is ``True``.
+    mask_center : bool
+        If ``True``, only the center of k-space is used for the estimation. Default is ``True``.
+    coil_chunk_size : int, optional
+        Maximum number of coil images per forward pass of the U-Net. If ``None``, all coils of the batch are forwarded
+        at once. Default is ``None``.
 
     Returns
     -------
@@ -342,6 +477,7 @@ class BaseSensitivityModel(nn.Module, ABC):
         coil_dim: int = 1,
         normalize: bool = True,
         mask_center: bool = True,
+        coil_chunk_size: Optional[int] = None,
     ):
         super().__init__()
 
@@ -365,6 +501,7 @@ class BaseSensitivityModel(nn.Module, ABC):
         self.spatial_dims = spatial_dims if spatial_dims is not None else [-2, -1]
         self.coil_dim = coil_dim
         self.normalize = normalize
+        self.coil_chunk_size = coil_chunk_size
 
     @staticmethod
     def chans_to_batch_dim(x: torch.Tensor) -> Tuple[torch.Tensor, int]:
@@ -381,8 +518,8 @@ class BaseSensitivityModel(nn.Module, ABC):
         Tuple[torch.Tensor, int]
             Tuple of the converted tensor and the batch size.
         """
-        batch_size, coils, height, width, complex_dim = x.shape
-        return x.view(batch_size * coils, 1, height, width, complex_dim), batch_size
+        x, batch_size = utils.coil_to_batch_dim(x, coil_dim=1)
+        return x.unsqueeze(1), batch_size
 
     @staticmethod
     def batch_chans_to_chan_dim(x: torch.Tensor, batch_size: int) -> torch.Tensor:
@@ -401,9 +538,7 @@ class BaseSensitivityModel(nn.Module, ABC):
         torch.Tensor
             Converted tensor.
         """
-        batch_size_coils, _, height, width, complex_dim = x.shape
-        coils = torch.div(batch_size_coils, batch_size, rounding_mode="trunc")
-        return x.view(batch_size, coils, height, width, complex_dim)
+        return utils.batch_to_coil_dim(x.squeeze(1), batch_size, coil_dim=1)
 
     @staticmethod
     def divide_root_sum_of_squares(x: torch.Tensor, coil_dim: int) -> torch.Tensor:
@@ -492,17 +627,17 @@ class BaseSensitivityModel(nn.Module, ABC):
             )
 
         # convert to image space
-        images, batches = self.chans_to_batch_dim(
-            ifft2(
-                masked_kspace,
-                centered=self.fft_centered,
-                normalization=self.fft_normalization,
-                spatial_dims=self.spatial_dims,
-            )
+        images = ifft2(
+            masked_kspace,
+            centered=self.fft_centered,
+            normalization=self.fft_normalization,
+            spatial_dims=self.spatial_dims,
         )
 
-        # estimate sensitivities
-        images = self.batch_chans_to_chan_dim(self.norm_unet(images), batches)
+        # estimate sensitivities, with the coils folded into the batch dimension
+        images = utils.apply_per_coil(
+            lambda x: self.norm_unet(x.unsqueeze(1)).squeeze(1), images, self.coil_dim, chunk_size=self.coil_chunk_size
+        )
         if self.normalize:
             images = self.divide_root_sum_of_squares(images, self.coil_dim)
         return images
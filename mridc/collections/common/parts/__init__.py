@@ -1,11 +1,41 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.common.parts.fft import fft2, fftshift, ifft2, ifftshift, roll, roll_one_dim
-from mridc.collections.common.parts.ptl_overrides import MRIDCNativeMixedPrecisionPlugin
-from mridc.collections.common.parts.rnn_utils import rnn_weights_init
-from mridc.collections.common.parts.training_utils import (
-    avoid_bfloat16_autocast_context,
-    avoid_float16_autocast_context,
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "fft": ["fft2", "fftshift", "ifft2", "ifftshift", "roll", "roll_one_dim"],
+        "image_logger": ["ImageLogger"],
+        "ptl_overrides": ["MRIDCNativeMixedPrecisionPlugin"],
+        "rnn_utils": ["rnn_weights_init"],
+        "training_utils": ["avoid_bfloat16_autocast_context", "avoid_float16_autocast_context"],
+        "utils": [
+            "is_none",
+            "to_tensor",
+            "tensor_to_complex_np",
+            "complex_mul",
+            "complex_conj",
+            "complex_abs",
+            "complex_abs_sq",
+            "rss",
+            "rss_complex",
+            "sense",
+            "coil_combination",
+            "coil_combination_method",
+            "coil_to_batch_dim",
+            "batch_to_coil_dim",
+            "apply_per_coil",
+            "save_reconstructions",
+            "check_stacked_complex",
+            "apply_mask",
+            "mask_center",
+            "batched_mask_center",
+            "center_crop",
+            "complex_center_crop",
+            "center_crop_to_smallest",
+        ],
+        "writers": ["VolumeWriter", "consecutive_slices_to_volume"],
+    },
 )
-from mridc.collections.common.parts.utils import *
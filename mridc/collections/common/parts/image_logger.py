@@ -0,0 +1,193 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import queue
+import threading
+from typing import Callable, Optional, Set, Union
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from mridc.utils import logging
+
+__all__ = ["ImageLogger"]
+
+
+class ImageLogger:
+    """
+    Logs images from a background thread, so that the validation and test steps do not wait for the images to be
+    copied to the host and written by the experiment logger.
+
+    The images to log are sampled per epoch, by volume and by slice. The sampled images are downsampled and packed to
+    half precision on their device, and queued for a background thread, which copies them to the host and writes them.
+    When the queue is full, which happens when writing is slower than predicting, images are dropped instead of
+    slowing down the steps, and the number of dropped images is reported on flush.
+
+    Parameters
+    ----------
+    write_fn : Callable[[str, np.ndarray, int], None]
+        Function writing an image, given its name, the image of shape [1, n_x, n_y] and the global step.
+    max_volumes : int, optional
+        Maximum number of volumes to log images of per epoch. The first volumes seen are logged. Default is ``None``,
+        for all volumes.
+    slice_interval : int
+        Log the images of every ``slice_interval``-th slice of a volume. Default is ``1``.
+    downsample : int
+        Downsampling factor of the images, by average pooling. Default is ``1``.
+    fp16 : bool
+        Pack the images to half precision before copying them to the host. Default is ``True``.
+    asynchronous : bool
+        Write the images from a background thread. If ``False``, images are written as they are logged. Default is
+        ``True``.
+    max_queued_images : int
+        Maximum number of images waiting to be written. Default is ``256``.
+
+    Examples
+    --------
+    >>> written = []
+    >>> image_logger = ImageLogger(lambda name, image, step: written.append((name, image.shape)), slice_interval=2)
+    >>> for slice_num in range(4):
+    ...     if image_logger.should_log("a.h5", slice_num):
+    ...         image_logger.log(f"a_{slice_num}", torch.rand(1, 8, 8), step=0)
+    >>> image_logger.flush()
+    >>> written
+    [('a_0', (1, 8, 8)), ('a_2', (1, 8, 8))]
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[[str, np.ndarray, int], None],
+        max_volumes: Optional[int] = None,
+        slice_interval: int = 1,
+        downsample: int = 1,
+        fp16: bool = True,
+        asynchronous: bool = True,
+        max_queued_images: int = 256,
+    ):
+        self.write_fn = write_fn
+        self.max_volumes = max_volumes
+        self.slice_interval = max(slice_interval, 1)
+        self.downsample = max(downsample, 1)
+        self.fp16 = fp16
+        self.asynchronous = asynchronous
+        self.max_queued_images = max(max_queued_images, 1)
+
+        self.volumes: Set[str] = set()
+        self.dropped = 0
+        self.error: Optional[BaseException] = None
+        # the queue and the thread are created on the first logged image
+        self.queue: Optional[queue.Queue] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def reset(self):
+        """Start a new epoch, sampling the volumes to log anew."""
+        self.volumes.clear()
+
+    def should_log(self, fname: str, slice_num: Union[int, torch.Tensor]) -> bool:
+        """
+        Whether to log the images of a slice. Repeated calls for the same slice give the same answer within an epoch.
+
+        Parameters
+        ----------
+        fname : str
+            File name of the volume.
+        slice_num : Union[int, torch.Tensor]
+            Slice number.
+
+        Returns
+        -------
+        bool
+            Whether the images of the slice are logged.
+        """
+        if int(slice_num) % self.slice_interval != 0:
+            return False
+        fname = str(fname)
+        if fname in self.volumes:
+            return True
+        if self.max_volumes is not None and len(self.volumes) >= self.max_volumes:
+            return False
+        self.volumes.add(fname)
+        return True
+
+    def log(self, name: str, image: torch.Tensor, step: int):
+        """
+        Prepare an image on its device and queue it for writing.
+
+        Parameters
+        ----------
+        name : str
+            Name of the image.
+        image : torch.Tensor
+            Image to log. The first channel of the first element is logged, as an image of shape [1, n_x, n_y].
+        step : int
+            Global step.
+        """
+        self._raise_error()
+
+        image = image.detach()
+        if image.dim() > 3:
+            image = image[0, 0, :, :].unsqueeze(0)
+        elif image.shape[0] != 1:
+            image = image[0].unsqueeze(0)
+
+        if not torch.is_floating_point(image):
+            image = image.float()
+        if self.downsample > 1:
+            image = F.avg_pool2d(image.unsqueeze(0), self.downsample, ceil_mode=True).squeeze(0)
+        # a copy, so that the queued image does not keep the whole batch in memory
+        image = image.to(dtype=torch.float16 if self.fp16 else image.dtype, copy=True)
+
+        if not self.asynchronous:
+            self._write(name, image, step)
+            return
+
+        if self.thread is None:
+            self.queue = queue.Queue(maxsize=self.max_queued_images)
+            self.thread = threading.Thread(target=self._run, name="ImageLogger", daemon=True)
+            self.thread.start()
+        try:
+            self.queue.put_nowait((name, image, step))  # type: ignore
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait for the queued images to be written."""
+        if self.thread is not None:
+            self.queue.join()  # type: ignore
+        if self.dropped > 0:
+            logging.warning(f"Dropped {self.dropped} images, as they were logged faster than they could be written.")
+            self.dropped = 0
+        self._raise_error()
+
+    def close(self):
+        """Write the queued images and stop the background thread."""
+        if self.thread is not None:
+            self.queue.put(None)  # type: ignore
+            self.thread.join()
+            self.thread, self.queue = None, None
+        self.flush()
+
+    def _write(self, name: str, image: torch.Tensor, step: int):
+        """Copy an image to the host and write it."""
+        self.write_fn(name, image.float().cpu().numpy(), step)
+
+    def _run(self):
+        """Write the queued images until the logger is closed."""
+        while True:
+            item = self.queue.get()  # type: ignore
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    self._write(*item)
+            except Exception as e:  # noqa: W0703
+                self.error = e
+            finally:
+                self.queue.task_done()  # type: ignore
+
+    def _raise_error(self):
+        """Raise the error of the background thread, if any."""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Failed to log the images.") from error
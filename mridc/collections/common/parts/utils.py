@@ -4,7 +4,7 @@ __author__ = "Dimitrios Karkalousos"
 # Parts of the code have been taken from https://github.com/facebookresearch/fastMRI
 
 from pathlib import Path
-from typing import Any, Dict, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
 
 import h5py
 import numpy as np
@@ -22,6 +22,10 @@ __all__ = [
     "rss_complex",
     "sense",
     "coil_combination",
+    "coil_combination_method",
+    "coil_to_batch_dim",
+    "batch_to_coil_dim",
+    "apply_per_coil",
     "save_reconstructions",
     "check_stacked_complex",
     "apply_mask",
@@ -272,6 +276,97 @@ def coil_combination(
     raise ValueError("Output type not supported.")
 
 
+def coil_combination_method(
+    data: torch.Tensor, sensitivity_maps: torch.Tensor, method: str = "SENSE", dim: int = 0
+) -> torch.Tensor:
+    """
+    Coil combination, as called by the ``mridc.collections.*.nn`` models. See :func:`coil_combination`.
+
+    Parameters
+    ----------
+    data: The input tensor.
+    sensitivity_maps: The sensitivity maps.
+    method: The coil combination method.
+    dim: The dimensions along which to apply the coil combination transform.
+
+    Returns
+    -------
+    Coil combined data.
+    """
+    return coil_combination(data, sensitivity_maps, method, dim)
+
+
+def coil_to_batch_dim(data: torch.Tensor, coil_dim: int = 1) -> Tuple[torch.Tensor, int]:
+    """
+    Folds the coil dimension into the batch dimension.
+
+    Parameters
+    ----------
+    data: The input tensor, with the batch dimension first. Shape [batch_size, ..., n_coils, ...].
+    coil_dim: The coil dimension.
+
+    Returns
+    -------
+    The folded tensor of shape [batch_size * n_coils, ...] and the batch size.
+    """
+    batch_size = data.shape[0]
+    data = data.movedim(coil_dim, 1)
+    return data.reshape(batch_size * data.shape[1], *data.shape[2:]), batch_size
+
+
+def batch_to_coil_dim(data: torch.Tensor, batch_size: int, coil_dim: int = 1) -> torch.Tensor:
+    """
+    Unfolds the coil dimension from the batch dimension. Inverse of :func:`coil_to_batch_dim`.
+
+    Parameters
+    ----------
+    data: The folded tensor. Shape [batch_size * n_coils, ...].
+    batch_size: The batch size.
+    coil_dim: The coil dimension to restore.
+
+    Returns
+    -------
+    The unfolded tensor of shape [batch_size, ..., n_coils, ...].
+    """
+    return data.reshape(batch_size, -1, *data.shape[1:]).movedim(1, coil_dim)
+
+
+def apply_per_coil(
+    model: Callable,
+    data: torch.Tensor,
+    coil_dim: int = 1,
+    chunk_size: Optional[int] = None,
+    checkpoint_fn: Optional[Callable] = None,
+) -> torch.Tensor:
+    """
+    Applies a model to every coil independently, with the coil dimension folded into the batch dimension.
+
+    The model is called on chunks of at most ``chunk_size`` coil images, instead of once per coil, so memory can be
+    capped while keeping the number of forward passes low.
+
+    Parameters
+    ----------
+    model: The model, taking and returning tensors with batch dimension first.
+    data: The input tensor. Shape [batch_size, ..., n_coils, ...].
+    coil_dim: The coil dimension.
+    chunk_size: Maximum number of coil images per forward pass. If None, all coils of the batch are forwarded at once.
+    checkpoint_fn: Optional function to run the model with, called as ``checkpoint_fn(model, chunk, step=idx)``, e.g.
+        for activation checkpointing.
+
+    Returns
+    -------
+    The output tensor. Shape [batch_size, ..., n_coils, ...].
+    """
+    data, batch_size = coil_to_batch_dim(data, coil_dim)
+    if chunk_size is None or chunk_size <= 0:
+        chunk_size = data.shape[0]
+    if checkpoint_fn is None:
+        checkpoint_fn = lambda function, *args, step=0: function(*args)  # noqa: E731
+    output = [checkpoint_fn(model, chunk, step=idx) for idx, chunk in enumerate(torch.split(data, chunk_size, dim=0))]
+    output = output[0] if len(output) == 1 else torch.cat(output, dim=0)
+    return batch_to_coil_dim(output, batch_size, coil_dim)
+
+
 def save_reconstructions(reconstructions: Dict[str, np.ndarray], out_dir: Path):
     """
     Save reconstruction images.
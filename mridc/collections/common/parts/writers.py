@@ -0,0 +1,238 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Union
+
+import h5py
+import numpy as np
+from torch.utils.data import DataLoader
+
+from mridc.utils import logging
+
+__all__ = ["VolumeWriter", "consecutive_slices_to_volume"]
+
+
+def consecutive_slices_to_volume(volume: np.ndarray, consecutive_slices: int) -> np.ndarray:
+    """
+    Assemble the predictions of consecutive slices into a volume, keeping the first slice of the first prediction,
+    the middle slice of the next ones and all the slices of the last one.
+
+    Parameters
+    ----------
+    volume : np.ndarray
+        Predictions of a volume, sorted by slice. Shape [n_slices, consecutive_slices, ...].
+    consecutive_slices : int
+        Number of consecutive slices of each prediction.
+
+    Returns
+    -------
+    np.ndarray
+        The assembled volume.
+    """
+    if consecutive_slices <= 1:
+        return volume
+    return np.concatenate(
+        [volume[:1, 0], volume[1:-1, consecutive_slices // 2], volume[-1, :consecutive_slices]]
+        if volume.shape[0] > 1
+        else [volume[:1, 0]],
+        axis=0,
+    )
+
+
+class VolumeWriter:
+    """
+    Streams the per slice predictions of a test run to one HDF5 file per volume.
+
+    Every prediction is copied into a preallocated volume as soon as it arrives. Once all the slices of a volume
+    have arrived, the volume is handed over to a background thread, which writes it with per slice chunks and
+    optional compression, so that only the volumes being predicted or written are kept in memory.
+
+    Parameters
+    ----------
+    out_dir : Union[str, Path]
+        Directory to write the volumes to.
+    slices_per_volume : Dict[str, Sequence[int]]
+        The slice numbers to expect for each volume file name.
+    postprocess : Callable[[np.ndarray], np.ndarray], optional
+        Function applied to each assembled volume, sorted by slice, before writing it.
+    compression : str, optional
+        HDF5 compression filter of the datasets, e.g. ``"gzip"`` or ``"lzf"``. Default is ``None``.
+    compression_opts : int, optional
+        Options of the compression filter, e.g. the ``gzip`` level. Default is ``None``.
+    max_queued_volumes : int, optional
+        Maximum number of assembled volumes waiting to be written, bounding the memory taken by the writer when
+        writing is slower than predicting. Default is ``2``.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as out_dir:
+    ...     writer = VolumeWriter(out_dir, {"a.h5": [0, 1]})
+    ...     writer.write("a.h5", 1, {"reconstruction": np.ones((2, 2))})
+    ...     writer.write("a.h5", 0, {"reconstruction": np.zeros((2, 2))})
+    ...     writer.close()
+    ...     with h5py.File(os.path.join(out_dir, "a.h5"), "r") as hf:
+    ...         hf["reconstruction"][:, 0, 0]
+    array([0., 1.])
+    """
+
+    def __init__(
+        self,
+        out_dir: Union[str, Path],
+        slices_per_volume: Dict[str, Sequence[int]],
+        postprocess: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        compression: Optional[str] = None,
+        compression_opts: Optional[int] = None,
+        max_queued_volumes: int = 2,
+    ):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(exist_ok=True, parents=True)
+        self.slice_positions = {
+            fname: {slice_num: pos for pos, slice_num in enumerate(sorted(set(slices)))}
+            for fname, slices in slices_per_volume.items()
+        }
+        self.postprocess = postprocess
+        self.compression = compression
+        self.compression_opts = compression_opts
+
+        self.volumes: Dict[str, Dict[str, np.ndarray]] = {}
+        self.received: Dict[str, Set[int]] = {}
+        self.written: Set[str] = set()
+        self.error: Optional[BaseException] = None
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max(max_queued_volumes, 1))
+        self.thread = threading.Thread(target=self._run, name="VolumeWriter", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def slices_per_volume(dataloaders: Iterable[DataLoader]) -> Dict[str, List[int]]:
+        """
+        Find the slice numbers of each volume sampled by the dataloaders of the current process.
+
+        Parameters
+        ----------
+        dataloaders : Iterable[torch.utils.data.DataLoader]
+            Dataloaders of slice datasets, with a list of ``(fname, dataslice, metadata)`` examples.
+
+        Returns
+        -------
+        Dict[str, List[int]]
+            The slice numbers of each volume file name.
+        """
+        slices_per_volume: Dict[str, List[int]] = {}
+        for dataloader in dataloaders:
+            examples = dataloader.dataset.examples
+            indices = dataloader.sampler if dataloader.sampler is not None else range(len(examples))
+            for idx in indices:
+                fname, dataslice, _ = examples[idx]
+                slices_per_volume.setdefault(Path(fname).name, []).append(int(dataslice))
+        return slices_per_volume
+
+    def write(self, fname: str, slice_num: int, predictions: Dict[str, np.ndarray]):
+        """
+        Add the predictions of a slice to its volume, and queue the volume for writing if it is complete.
+
+        Parameters
+        ----------
+        fname : str
+            File name of the volume.
+        slice_num : int
+            Slice number. A one element tensor, e.g. a collated slice index, is converted to an int.
+        predictions : Dict[str, np.ndarray]
+            Predictions of the slice, by dataset name.
+        """
+        self._raise_error()
+        # tensors hash by identity, so they would never match the known slice numbers
+        slice_num = int(slice_num)
+        if fname in self.written:
+            # slices repeated to even out the processes are already written
+            return
+
+        positions = self.slice_positions.get(fname)
+        if positions is None:
+            positions = self.slice_positions[fname] = {}
+        if slice_num not in positions:
+            # unknown slices are appended, and the volume is written on close
+            positions[slice_num] = len(positions)
+
+        volume = self.volumes.setdefault(fname, {})
+        position = positions[slice_num]
+        for name, prediction in predictions.items():
+            prediction = np.asarray(prediction)
+            if name not in volume or volume[name].shape[0] < len(positions):
+                volume[name] = self._grow(volume.get(name), prediction, len(positions))
+            volume[name][position] = prediction
+
+        received = self.received.setdefault(fname, set())
+        received.add(slice_num)
+        if len(received) == len(positions):
+            self._flush(fname)
+
+    def close(self):
+        """Write the incomplete volumes, wait for all the volumes to be written and stop the background thread."""
+        for fname in list(self.volumes):
+            missing = len(self.slice_positions[fname]) - len(self.received[fname])
+            logging.warning(f"Writing {fname} with {missing} missing slices.")
+            self._flush(fname)
+        self.queue.put(None)
+        self.thread.join()
+        self._raise_error()
+
+    @staticmethod
+    def _grow(volume: Optional[np.ndarray], prediction: np.ndarray, num_slices: int) -> np.ndarray:
+        """Allocate, or grow, a volume to hold the given number of slices."""
+        new_volume = np.zeros((num_slices, *prediction.shape), dtype=prediction.dtype)
+        if volume is not None:
+            new_volume[: volume.shape[0]] = volume
+        return new_volume
+
+    def _flush(self, fname: str):
+        """Hand over a volume to the background thread."""
+        volume = self.volumes.pop(fname)
+        received = self.received.pop(fname)
+        positions = self.slice_positions[fname]
+        if len(received) < len(positions):
+            keep = sorted(positions[slice_num] for slice_num in received)
+            volume = {name: data[keep] for name, data in volume.items()}
+        self.written.add(fname)
+        self.queue.put((fname, volume))
+
+    def _run(self):
+        """Write the queued volumes until the writer is closed."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            fname, volume = item
+            try:
+                self._write_volume(fname, volume)
+            except Exception as e:  # noqa: W0703
+                self.error = e
+
+    def _write_volume(self, fname: str, volume: Dict[str, np.ndarray]):
+        """Write a volume to a temporary file, and move it in place once complete."""
+        out_file = self.out_dir / fname
+        tmp_file = out_file.with_name(f"{out_file.name}.tmp")
+        with h5py.File(tmp_file, "w") as hf:
+            for name, data in volume.items():
+                if self.postprocess is not None:
+                    data = self.postprocess(data)
+                hf.create_dataset(
+                    name,
+                    data=data,
+                    chunks=(1, *data.shape[1:]) if data.ndim > 1 and data.size > 0 else None,
+                    compression=self.compression,
+                    compression_opts=self.compression_opts,
+                )
+        os.replace(tmp_file, out_file)
+
+    def _raise_error(self):
+        """Raise the error of the background thread, if any."""
+        if self.error is not None:
+            raise RuntimeError("Failed to write the predictions.") from self.error
@@ -3,11 +3,10 @@ __author__ = "Dimitrios Karkalousos"
 
 import os
 from abc import ABC
-from collections import defaultdict
+from functools import partial
 from pathlib import Path
-from typing import Dict, Tuple, Union
+from typing import Callable, Dict, Optional, Tuple, Union
 
-import h5py
 import numpy as np
 import torch
 from omegaconf import DictConfig, OmegaConf
@@ -18,8 +17,11 @@ from torch.utils.data import DataLoader
 import mridc.collections.reconstruction.losses as reconstruction_losses
 import mridc.collections.segmentation.losses as segmentation_losses
 from mridc.collections.common.data import subsample
-from mridc.collections.common.nn.base import BaseMRIModel, BaseSensitivityModel, DistributedMetricSum
+from mridc.collections.common.data.samplers import DistributedVolumeSampler
+from mridc.collections.common.metrics.volume_metrics import VolumeMetricsAccumulator
+from mridc.collections.common.nn.base import BaseMRIModel, BaseSensitivityModel
 from mridc.collections.common.parts import fft, utils
+from mridc.collections.common.parts.writers import consecutive_slices_to_volume
 from mridc.collections.multitask.rs.data import mrirs_loader
 from mridc.collections.multitask.rs.parts.transforms import RSMRIDataTransforms
 from mridc.collections.reconstruction.metrics import reconstruction_metrics
@@ -88,6 +90,8 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                 reduction=cfg_dict.get("cross_entropy_loss_reduction", "none"),
                 label_smoothing=cfg_dict.get("cross_entropy_loss_label_smoothing", 0.0),
                 weight=cross_entropy_loss_weight,
+                num_samples_per_chunk=cfg_dict.get("cross_entropy_loss_num_samples_per_chunk", None),
+                antithetic=cfg_dict.get("cross_entropy_loss_antithetic_sampling", False),
             )
             self.cross_entropy_loss_weighting_factor = cfg_dict.get("cross_entropy_loss_weighting_factor", 1.0)
 
@@ -122,6 +126,8 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
             reduction=cfg_dict.get("cross_entropy_metric_reduction", "none"),
             label_smoothing=cfg_dict.get("cross_entropy_metric_label_smoothing", 0.0),
             weight=cross_entropy_metric_weight,
+            num_samples_per_chunk=cfg_dict.get("cross_entropy_metric_num_samples_per_chunk", None),
+            antithetic=cfg_dict.get("cross_entropy_metric_antithetic_sampling", False),
         )
 
         self.dice_coefficient_metric = segmentation_losses.dice.Dice(  # type: ignore
@@ -141,12 +147,6 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
 
         self.segmentation_classes_thresholds = cfg_dict.get("segmentation_classes_thresholds", None)
 
-        self.CROSS_ENTROPY = DistributedMetricSum()
-        self.cross_entropy_vals: Dict = defaultdict(dict)
-
-        self.DICE = DistributedMetricSum()
-        self.dice_vals: Dict = defaultdict(dict)
-
         self.ssdu = cfg_dict.get("ssdu", False)
 
         self.use_reconstruction_module = cfg_dict.get("use_reconstruction_module")
@@ -177,16 +177,11 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                 "reconstruction_loss_regularization_factor", 1.0
             )
 
-            self.MSE = DistributedMetricSum()
-            self.NMSE = DistributedMetricSum()
-            self.SSIM = DistributedMetricSum()
-            self.PSNR = DistributedMetricSum()
-            self.TotExamples = DistributedMetricSum()
-
-            self.mse_vals_reconstruction: Dict = defaultdict(dict)
-            self.nmse_vals_reconstruction: Dict = defaultdict(dict)
-            self.ssim_vals_reconstruction: Dict = defaultdict(dict)
-            self.psnr_vals_reconstruction: Dict = defaultdict(dict)
+        # Set evaluation metrics accumulator
+        metrics = ["Cross_Entropy_Segmentation", "DICE_Segmentation"]
+        if self.use_reconstruction_module:
+            metrics += ["MSE_Reconstruction", "NMSE_Reconstruction", "SSIM_Reconstruction", "PSNR_Reconstruction"]
+        self.volume_metrics = VolumeMetricsAccumulator(metrics)
 
     def process_reconstruction_loss(  # noqa: W0221
         self,
@@ -391,9 +386,7 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
         loss_dict = {"cross_entropy_loss": 0.0, "dice_loss": 0.0}
         if self.segmentation_loss_fn["cross_entropy"] is not None:
             loss_dict["cross_entropy_loss"] = (
-                self.segmentation_loss_fn["cross_entropy"].cpu()(
-                    target.argmax(1).detach().cpu(), prediction.detach().cpu()
-                )
+                self.segmentation_loss_fn["cross_entropy"].to(self.device)(target.argmax(1), prediction)
                 * self.cross_entropy_loss_weighting_factor
             )
         if self.segmentation_loss_fn["dice"] is not None:
@@ -725,7 +718,7 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     batch_size * slices, *pred_reconstruction_n2r.shape[2:]  # type: ignore
                 )
 
-        if self.log_images:
+        if self.should_log_images(fname[0], slice_idx):  # type: ignore
             slice_idx = int(slice_idx)
             key = f"{fname[0]}_images_idx_{slice_idx}"  # type: ignore
             self.log_image(f"{key}/reconstruction/target", target_reconstruction)
@@ -787,39 +780,25 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     pred_reconstruction.shape[0] * pred_reconstruction.shape[1], *pred_reconstruction.shape[2:]
                 )
 
-            target_reconstruction = (
-                torch.abs(target_reconstruction / torch.max(torch.abs(target_reconstruction))).detach().cpu()
-            )
-            output_reconstruction = (
-                torch.abs(pred_reconstruction / torch.max(torch.abs(pred_reconstruction))).detach().cpu()
-            )
+            target_reconstruction = torch.abs(
+                target_reconstruction / torch.max(torch.abs(target_reconstruction))
+            ).detach()
+            output_reconstruction = torch.abs(pred_reconstruction / torch.max(torch.abs(pred_reconstruction))).detach()
 
-            if self.log_images:
+            if self.should_log_images(fname[0], slice_idx):  # type: ignore
                 self.log_image(f"{key}/reconstruction/prediction", output_reconstruction)
                 self.log_image(f"{key}/reconstruction/error", torch.abs(target_reconstruction - output_reconstruction))
 
-            target_reconstruction = target_reconstruction.numpy()  # type: ignore
-            output_reconstruction = output_reconstruction.numpy()
-            self.mse_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.mse(target_reconstruction, output_reconstruction)
-            ).view(1)
-            self.nmse_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.nmse(target_reconstruction, output_reconstruction)
-            ).view(1)
-            self.ssim_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.ssim(
-                    target_reconstruction,
-                    output_reconstruction,
-                    maxval=output_reconstruction.max() - output_reconstruction.min(),
-                )
-            ).view(1)
-            self.psnr_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.psnr(
-                    target_reconstruction,
-                    output_reconstruction,
-                    maxval=output_reconstruction.max() - output_reconstruction.min(),
-                )
-            ).view(1)
+            mse, nmse, ssim, psnr = reconstruction_metrics.batched_metrics(
+                target_reconstruction.unsqueeze(0), output_reconstruction.unsqueeze(0)
+            )
+            self.volume_metrics.update(
+                str(fname[0]),  # type: ignore
+                MSE_Reconstruction=mse,
+                NMSE_Reconstruction=nmse,
+                SSIM_Reconstruction=ssim,
+                PSNR_Reconstruction=psnr,
+            )
         else:
             val_loss = self.total_segmentation_loss_weight * segmentation_loss
 
@@ -832,7 +811,7 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     )  # type: ignore
                     pred_segmentation[:, class_idx] = pred_segmentation[:, class_idx] > class_threshold
 
-        if self.log_images:
+        if self.should_log_images(fname[0], slice_idx):  # type: ignore
             for class_idx in range(pred_segmentation.shape[1]):  # type: ignore
                 target_image_segmentation_class = target_segmentation[:, class_idx]  # type: ignore
                 output_image_segmentation_class = pred_segmentation[:, class_idx]
@@ -849,11 +828,13 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     torch.abs(target_image_segmentation_class - output_image_segmentation_class),
                 )
 
-        self.cross_entropy_vals[fname][slice_idx] = self.cross_entropy_metric.to(self.device)(  # noqa: E1102
+        cross_entropy = self.cross_entropy_metric.to(self.device)(  # noqa: E1102
             target_segmentation.argmax(1), pred_segmentation  # type: ignore
         )
         dice_score, _ = self.dice_coefficient_metric(target_segmentation, pred_segmentation)
-        self.dice_vals[fname][slice_idx] = dice_score
+        self.volume_metrics.update(
+            str(fname[0]), Cross_Entropy_Segmentation=cross_entropy, DICE_Segmentation=dice_score  # type: ignore
+        )
 
         return {"val_loss": val_loss}
 
@@ -954,7 +935,7 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                 batch_size * slices, *target_reconstruction.shape[2:]  # type: ignore
             )
 
-        if self.log_images:
+        if self.should_log_images(fname[0], slice_idx):  # type: ignore
             slice_idx = int(slice_idx)
             key = f"{fname[0]}_images_idx_{slice_idx}"  # type: ignore
             if target_reconstruction.dim() > 2:  # type: ignore
@@ -979,39 +960,25 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     pred_reconstruction.shape[0] * pred_reconstruction.shape[1], *pred_reconstruction.shape[2:]
                 )
 
-            target_reconstruction = (
-                torch.abs(target_reconstruction / torch.max(torch.abs(target_reconstruction))).detach().cpu()
-            )
-            output_reconstruction = (
-                torch.abs(pred_reconstruction / torch.max(torch.abs(pred_reconstruction))).detach().cpu()
-            )
+            target_reconstruction = torch.abs(
+                target_reconstruction / torch.max(torch.abs(target_reconstruction))
+            ).detach()
+            output_reconstruction = torch.abs(pred_reconstruction / torch.max(torch.abs(pred_reconstruction))).detach()
 
-            if self.log_images:
+            if self.should_log_images(fname[0], slice_idx):  # type: ignore
                 self.log_image(f"{key}/reconstruction/prediction", output_reconstruction)
                 self.log_image(f"{key}/reconstruction/error", torch.abs(target_reconstruction - output_reconstruction))
 
-            target_reconstruction = target_reconstruction.numpy()  # type: ignore
-            output_reconstruction = output_reconstruction.numpy()
-            self.mse_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.mse(target_reconstruction, output_reconstruction)
-            ).view(1)
-            self.nmse_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.nmse(target_reconstruction, output_reconstruction)
-            ).view(1)
-            self.ssim_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.ssim(
-                    target_reconstruction,
-                    output_reconstruction,
-                    maxval=output_reconstruction.max() - output_reconstruction.min(),
-                )
-            ).view(1)
-            self.psnr_vals_reconstruction[fname][slice_idx] = torch.tensor(
-                reconstruction_metrics.psnr(
-                    target_reconstruction,
-                    output_reconstruction,
-                    maxval=output_reconstruction.max() - output_reconstruction.min(),
-                )
-            ).view(1)
+            mse, nmse, ssim, psnr = reconstruction_metrics.batched_metrics(
+                target_reconstruction.unsqueeze(0), output_reconstruction.unsqueeze(0)
+            )
+            self.volume_metrics.update(
+                str(fname[0]),  # type: ignore
+                MSE_Reconstruction=mse,
+                NMSE_Reconstruction=nmse,
+                SSIM_Reconstruction=ssim,
+                PSNR_Reconstruction=psnr,
+            )
 
         # normalize for visualization
         if not utils.is_none(self.segmentation_classes_thresholds):
@@ -1023,7 +990,7 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                         )  # type: ignore
                     pred_segmentation[:, class_idx] = pred_segmentation[:, class_idx] > class_threshold
 
-        if self.log_images:
+        if self.should_log_images(fname[0], slice_idx):  # type: ignore
             for class_idx in range(pred_segmentation.shape[1]):  # type: ignore
                 output_image_segmentation_class = pred_segmentation[:, class_idx]
                 self.log_image(
@@ -1043,11 +1010,13 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     )
 
         if target_segmentation.dim() != 1:  # type: ignore
-            self.cross_entropy_vals[fname][slice_idx] = self.cross_entropy_metric.to(self.device)(  # noqa: E1102
+            cross_entropy = self.cross_entropy_metric.to(self.device)(  # noqa: E1102
                 target_segmentation.argmax(1), pred_segmentation  # type: ignore
             )
             dice_score, _ = self.dice_coefficient_metric(target_segmentation, pred_segmentation)
-            self.dice_vals[fname][slice_idx] = dice_score
+            self.volume_metrics.update(
+                str(fname[0]), Cross_Entropy_Segmentation=cross_entropy, DICE_Segmentation=dice_score  # type: ignore
+            )
 
         predictions = (
             (pred_segmentation.detach().cpu().numpy(), pred_reconstruction.detach().cpu().numpy())
@@ -1055,7 +1024,7 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
             else (pred_segmentation.detach().cpu().numpy(), pred_segmentation.detach().cpu().numpy())
         )
 
-        return (str(fname[0]), slice_idx, predictions)  # type: ignore
+        return (str(fname[0]), int(slice_idx), predictions)  # type: ignore
 
     def train_epoch_end(self, outputs):
         """
@@ -1079,7 +1048,7 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
         )
         self.log("lr", torch.stack([x["lr"] for x in outputs]).mean(), sync_dist=True)
 
-    def validation_epoch_end(self, outputs):  # noqa: W0221, MC0001
+    def validation_epoch_end(self, outputs):  # noqa: W0221
         """
         Called at the end of validation epoch to aggregate outputs.
 
@@ -1095,79 +1064,12 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
         """
         self.log("val_loss", torch.stack([x["val_loss"] for x in outputs]).mean(), sync_dist=True)
 
-        # Log metrics.
-        cross_entropy_vals = defaultdict(dict)
-        dice_vals = defaultdict(dict)
+        self.log_volume_metrics()
 
-        for k, v in self.cross_entropy_vals.items():
-            cross_entropy_vals[k].update(v)
-        for k, v in self.dice_vals.items():
-            dice_vals[k].update(v)
-
-        metrics_segmentation = {"Cross_Entropy": 0, "DICE": 0}
-
-        if self.use_reconstruction_module:
-            mse_vals_reconstruction = defaultdict(dict)
-            nmse_vals_reconstruction = defaultdict(dict)
-            ssim_vals_reconstruction = defaultdict(dict)
-            psnr_vals_reconstruction = defaultdict(dict)
-
-            for k, v in self.mse_vals_reconstruction.items():
-                mse_vals_reconstruction[k].update(v)
-            for k, v in self.nmse_vals_reconstruction.items():
-                nmse_vals_reconstruction[k].update(v)
-            for k, v in self.ssim_vals_reconstruction.items():
-                ssim_vals_reconstruction[k].update(v)
-            for k, v in self.psnr_vals_reconstruction.items():
-                psnr_vals_reconstruction[k].update(v)
-
-            metrics_reconstruction = {"MSE": 0, "NMSE": 0, "SSIM": 0, "PSNR": 0}
-
-        local_examples = 0
-        for fname in dice_vals:
-            local_examples += 1
-
-            metrics_segmentation["Cross_Entropy"] = metrics_segmentation["Cross_Entropy"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in cross_entropy_vals[fname].items()])
-            )
-            metrics_segmentation["DICE"] = metrics_segmentation["DICE"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in dice_vals[fname].items()])
-            )
-
-            if self.use_reconstruction_module:
-                metrics_reconstruction["MSE"] = metrics_reconstruction["MSE"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in mse_vals_reconstruction[fname].items()])
-                )
-                metrics_reconstruction["NMSE"] = metrics_reconstruction["NMSE"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in nmse_vals_reconstruction[fname].items()])
-                )
-                metrics_reconstruction["SSIM"] = metrics_reconstruction["SSIM"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in ssim_vals_reconstruction[fname].items()])
-                )
-                metrics_reconstruction["PSNR"] = metrics_reconstruction["PSNR"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in psnr_vals_reconstruction[fname].items()])
-                )
-
-        # reduce across ddp via sum
-        metrics_segmentation["Cross_Entropy"] = self.CROSS_ENTROPY(metrics_segmentation["Cross_Entropy"])
-        metrics_segmentation["DICE"] = self.DICE(metrics_segmentation["DICE"])
-
-        if self.use_reconstruction_module:
-            metrics_reconstruction["MSE"] = self.MSE(metrics_reconstruction["MSE"])
-            metrics_reconstruction["NMSE"] = self.NMSE(metrics_reconstruction["NMSE"])
-            metrics_reconstruction["SSIM"] = self.SSIM(metrics_reconstruction["SSIM"])
-            metrics_reconstruction["PSNR"] = self.PSNR(metrics_reconstruction["PSNR"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics_segmentation.items():
-            self.log(f"{metric}_Segmentation", value / tot_examples, sync_dist=True)
-        if self.use_reconstruction_module:
-            for metric, value in metrics_reconstruction.items():
-                self.log(f"{metric}_Reconstruction", value / tot_examples, sync_dist=True)
-
-    def test_epoch_end(self, outputs):  # noqa: MC0001
+    def test_epoch_end(self, outputs):
         """
-        Called at the end of test epoch to aggregate outputs, log metrics and save predictions.
+        Called at the end of test epoch to aggregate outputs and log metrics. The predictions are saved by the test
+        writer, as soon as all the slices of a volume are predicted.
 
         Parameters
         ----------
@@ -1179,133 +1081,39 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
         metrics : dict
             Dictionary of metrics.
         """
-        # Log metrics.
-        cross_entropy_vals = defaultdict(dict)
-        dice_vals = defaultdict(dict)
+        self.log_volume_metrics()
 
-        for k, v in self.cross_entropy_vals.items():
-            cross_entropy_vals[k].update(v)
-        for k, v in self.dice_vals.items():
-            dice_vals[k].update(v)
-
-        metrics_segmentation = {"Cross_Entropy": 0, "DICE": 0}
-
-        if self.use_reconstruction_module:
-            mse_vals_reconstruction = defaultdict(dict)
-            nmse_vals_reconstruction = defaultdict(dict)
-            ssim_vals_reconstruction = defaultdict(dict)
-            psnr_vals_reconstruction = defaultdict(dict)
-
-            for k, v in self.mse_vals_reconstruction.items():
-                mse_vals_reconstruction[k].update(v)
-            for k, v in self.nmse_vals_reconstruction.items():
-                nmse_vals_reconstruction[k].update(v)
-            for k, v in self.ssim_vals_reconstruction.items():
-                ssim_vals_reconstruction[k].update(v)
-            for k, v in self.psnr_vals_reconstruction.items():
-                psnr_vals_reconstruction[k].update(v)
-
-            metrics_reconstruction = {"MSE": 0, "NMSE": 0, "SSIM": 0, "PSNR": 0}
-
-        local_examples = 0
-        for fname in dice_vals:
-            local_examples += 1
-
-            metrics_segmentation["Cross_Entropy"] = metrics_segmentation["Cross_Entropy"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in cross_entropy_vals[fname].items()])
-            )
-            metrics_segmentation["DICE"] = metrics_segmentation["DICE"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in dice_vals[fname].items()])
-            )
-
-            if self.use_reconstruction_module:
-                metrics_reconstruction["MSE"] = metrics_reconstruction["MSE"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in mse_vals_reconstruction[fname].items()])
-                )
-                metrics_reconstruction["NMSE"] = metrics_reconstruction["NMSE"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in nmse_vals_reconstruction[fname].items()])
-                )
-                metrics_reconstruction["SSIM"] = metrics_reconstruction["SSIM"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in ssim_vals_reconstruction[fname].items()])
-                )
-                metrics_reconstruction["PSNR"] = metrics_reconstruction["PSNR"] + torch.mean(
-                    torch.cat([v.view(-1).float() for _, v in psnr_vals_reconstruction[fname].items()])
-                )
+    def test_predictions(  # noqa: W0221
+        self, outputs: Tuple[str, int, Tuple[np.ndarray, np.ndarray]]
+    ) -> Tuple[str, int, Dict[str, np.ndarray]]:
+        """
+        Split the outputs of a test step into the predictions to save, by dataset name.
 
-        # reduce across ddp via sum
-        metrics_segmentation["Cross_Entropy"] = self.CROSS_ENTROPY(metrics_segmentation["Cross_Entropy"])
-        metrics_segmentation["DICE"] = self.DICE(metrics_segmentation["DICE"])
+        Parameters
+        ----------
+        outputs : Tuple[str, int, Tuple[np.ndarray, np.ndarray]]
+            Outputs of a test step, as (file name, slice number, (segmentation, reconstruction)).
 
+        Returns
+        -------
+        Tuple[str, int, Dict[str, np.ndarray]]
+            The file name, the slice number and the predictions to save, by dataset name.
+        """
+        fname, slice_num, (segmentations_pred, reconstructions_pred) = outputs
+        predictions = {"segmentation": segmentations_pred}
         if self.use_reconstruction_module:
-            metrics_reconstruction["MSE"] = self.MSE(metrics_reconstruction["MSE"])
-            metrics_reconstruction["NMSE"] = self.NMSE(metrics_reconstruction["NMSE"])
-            metrics_reconstruction["SSIM"] = self.SSIM(metrics_reconstruction["SSIM"])
-            metrics_reconstruction["PSNR"] = self.PSNR(metrics_reconstruction["PSNR"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics_segmentation.items():
-            self.log(f"{metric}_Segmentation", value / tot_examples, sync_dist=True)
-        if self.use_reconstruction_module:
-            for metric, value in metrics_reconstruction.items():
-                self.log(f"{metric}_Reconstruction", value / tot_examples, sync_dist=True)
+            predictions["reconstruction"] = reconstructions_pred
+        return fname, slice_num, predictions
 
-        segmentations = defaultdict(list)
-        for fname, slice_num, output in outputs:
-            segmentations_pred, _ = output
-            segmentations[fname].append((slice_num, segmentations_pred))
+    def test_predictions_postprocess(self) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+        """If we have consecutive slices, we need to make sure that we will save all slices."""
+        if self.consecutive_slices > 1:
+            return partial(consecutive_slices_to_volume, consecutive_slices=self.consecutive_slices)
+        return None
 
-        for fname in segmentations:
-            segmentations[fname] = np.stack([out for _, out in sorted(segmentations[fname])])
-            if self.consecutive_slices > 1:
-                # If we have consecutive slices, we need to make sure that we will save all slices.
-                segmentations_slices = []
-                for i in range(segmentations[fname].shape[0]):
-                    if i == 0:
-                        segmentations_slices.append(segmentations[fname][i][0])
-                    elif i == segmentations[fname].shape[0] - 1:
-                        for j in range(self.consecutive_slices):
-                            segmentations_slices.append(segmentations[fname][i][j])
-                    else:
-                        segmentations_slices.append(segmentations[fname][i][self.consecutive_slices // 2])
-                segmentations[fname] = np.stack(segmentations_slices)
-
-        if self.use_reconstruction_module:  # noqa: R1792
-            reconstructions = defaultdict(list)
-            for fname, slice_num, output in outputs:
-                _, reconstructions_pred = output
-                reconstructions[fname].append((slice_num, reconstructions_pred))
-
-            for fname in reconstructions:
-                reconstructions[fname] = np.stack([out for _, out in sorted(reconstructions[fname])])
-                if self.consecutive_slices > 1:
-                    # If we have consecutive slices, we need to make sure that we will save all slices.
-                    reconstructions_slices = []
-                    for i in range(reconstructions[fname].shape[0]):
-                        if i == 0:
-                            reconstructions_slices.append(reconstructions[fname][i][0])
-                        elif i == segmentations[fname].shape[0] - 1:
-                            for j in range(self.consecutive_slices):
-                                reconstructions_slices.append(reconstructions[fname][i][j])
-                        else:
-                            reconstructions_slices.append(reconstructions[fname][i][self.consecutive_slices // 2])
-                    reconstructions[fname] = np.stack(reconstructions_slices)
-        else:
-            reconstructions = None
-
-        out_dir = Path(os.path.join(self.logger.log_dir, "predictions"))
-        out_dir.mkdir(exist_ok=True, parents=True)
-
-        if reconstructions is not None:
-            for (fname, segmentations_pred), (_, reconstructions_pred) in zip(
-                segmentations.items(), reconstructions.items()
-            ):
-                with h5py.File(out_dir / fname, "w") as hf:
-                    hf.create_dataset("segmentation", data=segmentations_pred)
-                    hf.create_dataset("reconstruction", data=reconstructions_pred)
-        else:
-            for fname, segmentations_pred in segmentations.items():
-                with h5py.File(out_dir / fname, "w") as hf:
-                    hf.create_dataset("segmentation", data=segmentations_pred)
+    def test_predictions_dir(self) -> Path:
+        """Directory to save the test predictions to."""
+        return Path(os.path.join(self.logger.log_dir, "predictions"))
 
     @staticmethod
     def _setup_dataloader_from_config(cfg: DictConfig) -> DataLoader:
@@ -1403,11 +1211,13 @@ class BaseMRIReconstructionSegmentationModel(BaseMRIModel, ABC):  # type: ignore
             segmentation_classes_to_separate=cfg.get("segmentation_classes_to_separate", None),
             segmentation_classes_thresholds=cfg.get("segmentation_classes_thresholds", None),
             complex_data=complex_data,
+            cache_segmentation_labels=cfg.get("cache_segmentation_labels", False),
         )
         if cfg.shuffle:
             sampler = torch.utils.data.RandomSampler(dataset)
         else:
-            sampler = torch.utils.data.SequentialSampler(dataset)
+            # whole volumes per process, so that every process can save the volumes it predicts
+            sampler = DistributedVolumeSampler(dataset)
 
         return torch.utils.data.DataLoader(
             dataset=dataset,
@@ -233,9 +233,7 @@ class SegNet(base_rs_models.BaseMRIReconstructionSegmentationModel, ABC):  # typ
         for i in range(len(prediction)):  # noqa: C0200
             if self.segmentation_loss_fn["cross_entropy"] is not None:
                 cross_entropy_loss.append(
-                    self.segmentation_loss_fn["cross_entropy"].cpu()(
-                        target.argmax(1).detach().cpu(), prediction[i].detach().cpu()
-                    )
+                    self.segmentation_loss_fn["cross_entropy"].to(self.device)(target.argmax(1), prediction[i])
                 )
             if self.segmentation_loss_fn["dice"] is not None:
                 _, loss_dice = self.segmentation_loss_fn["dice"](target, prediction[i])  # noqa: E1102
@@ -1,4 +1,8 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos, Chaoping Zhang"
 
-from mridc.collections.quantitative.data.qmri_data import qMRISliceDataset
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, submodule_attributes={"qmri_data": ["cache_quantitative_maps", "qMRISliceDataset"]}
+)
@@ -1,11 +1,12 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos, Chaoping Zhang"
 
+import hashlib
 import logging
 import os
 import random
 from pathlib import Path
-from typing import Callable, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import h5py
 import numpy as np
@@ -15,7 +16,51 @@ from torch.utils.data import Dataset
 import mridc.collections.common.parts.utils as utils
 
 
-class qMRISliceDataset(Dataset):
+class qMRIMapsCacheMixin:
+    """
+    Finds the quantitative maps cached by :func:`cache_quantitative_maps` for the files of a dataset with a
+    ``qmaps_cache_root``, a ``kspace_scaling_factor`` and a ``transform``. Every file is checked once per dataset.
+    """
+
+    def get_qmaps_cache_file(self, data, fname):
+        """
+        Get the file of the cached quantitative maps, if the maps are not stored in the data file itself.
+
+        Parameters
+        ----------
+        data: Data file.
+        fname: Path to the data file.
+
+        Returns
+        -------
+        Path to the cache file, or None if there are no maps cached from the current data file with the settings of
+        the transform and the same k-space scaling factor.
+        """
+        if self.qmaps_cache_root is None:  # type: ignore
+            return None
+        qmaps_cache_files = self.__dict__.setdefault("_qmaps_cache_files", {})
+        if fname not in qmaps_cache_files:
+            qmaps_cache_files[fname] = self._find_qmaps_cache_file(data, fname)
+        return qmaps_cache_files[fname]
+
+    def _find_qmaps_cache_file(self, data, fname):
+        """Find the up to date cache file of a data file, see :meth:`get_qmaps_cache_file`."""
+        if any("_map_init_" in _ for _ in data.keys()):
+            return None
+        qmaps_cache_key = getattr(self.transform, "qmaps_cache_key", None)  # type: ignore
+        if qmaps_cache_key is None:
+            return None
+        qmaps_cache_file = get_qmaps_cache_file(
+            self.qmaps_cache_root, fname, qmaps_cache_key, self.kspace_scaling_factor  # type: ignore
+        )
+        if not is_qmaps_cache_up_to_date(
+            qmaps_cache_file, fname, qmaps_cache_key, self.kspace_scaling_factor  # type: ignore
+        ):
+            return None
+        return qmaps_cache_file
+
+
+class qMRISliceDataset(qMRIMapsCacheMixin, Dataset):
     """A dataset that loads slices from a single dataset."""
 
     def __init__(
@@ -35,6 +80,7 @@ class qMRISliceDataset(Dataset):
         init_coil_dim: int = 0,
         fixed_precomputed_acceleration: Optional[int] = None,
         kspace_scaling_factor: float = 10000,
+        qmaps_cache_root: Union[str, Path, os.PathLike] = None,
     ):
         """
         Parameters
@@ -63,6 +109,8 @@ class qMRISliceDataset(Dataset):
         fixed_precomputed_acceleration: Optional; A list of integers that determine the fixed acceleration of the
             data. If provided, the data will be loaded with the fixed acceleration.
         kspace_scaling_factor: A float that determines the scaling factor of the k-space data.
+        qmaps_cache_root: Optional; Path to the initial and target quantitative maps cached by
+            ``cache_quantitative_maps``. They are loaded when the file itself does not store quantitative maps.
         """
         if sequence not in ("MEGRE", "FUTURE_SEQUENCES"):
             raise ValueError(f'Sequence should be either "MEGRE" or "FUTURE_SEQUENCES". Found {sequence}.')
@@ -81,6 +129,7 @@ class qMRISliceDataset(Dataset):
         self.init_coil_dim = init_coil_dim
         self.fixed_precomputed_acceleration = fixed_precomputed_acceleration
         self.kspace_scaling_factor = kspace_scaling_factor
+        self.qmaps_cache_root = None if utils.is_none(qmaps_cache_root) else qmaps_cache_root
 
         self.transform = transform
         self.recons_key = "reconstruction"
@@ -242,6 +291,58 @@ class qMRISliceDataset(Dataset):
                 qdata = [qdata[0] * count]
         return qdata
 
+    def get_stored_qmaps(self, data, dataslice):
+        """
+        Get the stored initial and target quantitative maps.
+
+        Parameters
+        ----------
+        data: Data to extract slices from.
+        dataslice: Slice to extract.
+
+        Returns
+        -------
+        The B0, S0, R2* and phi maps, each a list of the initial maps per acceleration followed by the target map, or
+        an empty array if the map is not stored.
+        """
+        if any("B0_map_init_" in _ for _ in data.keys()):
+            B0_map = self.check_stored_qdata(data, "B0_map_init_", dataslice)
+            if all("B0_map_target" not in _ for _ in data.keys()):
+                raise ValueError("While B0 map initializations are found, no B0 map target found in file.")
+            B0_map_target = self.get_consecutive_slices(data, "B0_map_target", dataslice)
+            B0_map.append(B0_map_target)
+        else:
+            B0_map = np.empty([])
+
+        if any("S0_map_init_" in _ for _ in data.keys()):
+            S0_map = self.check_stored_qdata(data, "S0_map_init_", dataslice)
+            if all("S0_map_target" not in _ for _ in data.keys()):
+                raise ValueError("While S0 map initializations are found, no S0 map target found in file.")
+            S0_map_target = self.get_consecutive_slices(data, "S0_map_target", dataslice)
+            S0_map.append(S0_map_target)
+        else:
+            S0_map = np.empty([])
+
+        if any("R2star_map_init_" in _ for _ in data.keys()):
+            R2star_map = self.check_stored_qdata(data, "R2star_map_init_", dataslice)
+            if all("R2star_map_target" not in _ for _ in data.keys()):
+                raise ValueError("While R2star map initializations are found, no R2star map target found in file.")
+            R2star_map_target = self.get_consecutive_slices(data, "R2star_map_target", dataslice)
+            R2star_map.append(R2star_map_target)
+        else:
+            R2star_map = np.empty([])
+
+        if any("phi_map_init_" in _ for _ in data.keys()):
+            phi_map = self.check_stored_qdata(data, "phi_map_init_", dataslice)
+            if all("phi_map_target" not in _ for _ in data.keys()):
+                raise ValueError("While phi map initializations are found, no phi map target found in file.")
+            phi_map_target = self.get_consecutive_slices(data, "phi_map_target", dataslice)
+            phi_map.append(phi_map_target)
+        else:
+            phi_map = np.empty([])
+
+        return [B0_map, S0_map, R2star_map, phi_map]
+
     def __len__(self):
         return len(self.examples)
 
@@ -303,43 +404,14 @@ class qMRISliceDataset(Dataset):
 
             mask = [mask, mask_brain, mask_head]
 
-            if any("B0_map_init_" in _ for _ in hf.keys()):
-                B0_map = self.check_stored_qdata(hf, "B0_map_init_", dataslice)
-                if all("B0_map_target" not in _ for _ in hf.keys()):
-                    raise ValueError("While B0 map initializations are found, no B0 map target found in file.")
-                B0_map_target = self.get_consecutive_slices(hf, "B0_map_target", dataslice)
-                B0_map.append(B0_map_target)
-            else:
-                B0_map = np.empty([])
-
-            if any("S0_map_init_" in _ for _ in hf.keys()):
-                S0_map = self.check_stored_qdata(hf, "S0_map_init_", dataslice)
-                if all("S0_map_target" not in _ for _ in hf.keys()):
-                    raise ValueError("While S0 map initializations are found, no S0 map target found in file.")
-                S0_map_target = self.get_consecutive_slices(hf, "S0_map_target", dataslice)
-                S0_map.append(S0_map_target)
-            else:
-                S0_map = np.empty([])
-
-            if any("R2star_map_init_" in _ for _ in hf.keys()):
-                R2star_map = self.check_stored_qdata(hf, "R2star_map_init_", dataslice)
-                if all("R2star_map_target" not in _ for _ in hf.keys()):
-                    raise ValueError("While R2star map initializations are found, no R2star map target found in file.")
-                R2star_map_target = self.get_consecutive_slices(hf, "R2star_map_target", dataslice)
-                R2star_map.append(R2star_map_target)
+            qmaps_cache_file = self.get_qmaps_cache_file(hf, fname)
+            if qmaps_cache_file is not None:
+                with h5py.File(qmaps_cache_file, "r") as cf:
+                    qmaps = self.get_stored_qmaps(cf, dataslice)
+                    qmaps_cache_key = cf.attrs.get("qmaps_cache_key")
             else:
-                R2star_map = np.empty([])
-
-            if any("phi_map_init_" in _ for _ in hf.keys()):
-                phi_map = self.check_stored_qdata(hf, "phi_map_init_", dataslice)
-                if all("phi_map_target" not in _ for _ in hf.keys()):
-                    raise ValueError("While phi map initializations are found, no phi map target found in file.")
-                phi_map_target = self.get_consecutive_slices(hf, "phi_map_target", dataslice)
-                phi_map.append(phi_map_target)
-            else:
-                phi_map = np.empty([])
-
-            qmaps = [B0_map, S0_map, R2star_map, phi_map]
+                qmaps = self.get_stored_qmaps(hf, dataslice)
+                qmaps_cache_key = None
 
             eta = (
                 self.get_consecutive_slices(hf, "eta", dataslice).astype(np.complex64) if "eta" in hf else np.array([])
@@ -352,6 +424,8 @@ class qMRISliceDataset(Dataset):
 
             attrs = dict(hf.attrs)
             attrs.update(metadata)
+            if qmaps_cache_key is not None:
+                attrs["qmaps_cache_key"] = qmaps_cache_key
 
         if self.data_saved_per_slice:
             # arbitrary slice number for logging purposes
@@ -386,3 +460,159 @@ class qMRISliceDataset(Dataset):
                 dataslice,
             )
         )
+
+
+def get_qmaps_cache_file(
+    qmaps_cache_root: Union[str, Path, os.PathLike],
+    fname: Union[str, Path, os.PathLike],
+    qmaps_cache_key: str,
+    kspace_scaling_factor: float,
+) -> Path:
+    """
+    Get the path of the cached quantitative maps of a data file.
+
+    The maps are cached in a directory keyed by the settings they are computed with, in a subdirectory named after the
+    directory of the data file. Maps computed with different settings, or of files with the same name in different
+    splits, are therefore cached side by side.
+
+    Parameters
+    ----------
+    qmaps_cache_root: Path to the cached maps.
+    fname: Path to the data file.
+    qmaps_cache_key: The ``qmaps_cache_key`` of the transform computing the maps.
+    kspace_scaling_factor: The k-space scaling factor of the dataset.
+
+    Returns
+    -------
+    The path of the cache file.
+    """
+    fname = Path(fname)
+    settings = f"{qmaps_cache_key};kspace_scaling_factor={kspace_scaling_factor}"
+    settings_dir = hashlib.sha1(settings.encode()).hexdigest()[:16]
+    return Path(qmaps_cache_root) / settings_dir / fname.resolve().parent.name / fname.name
+
+
+def _source_version(fname: Union[str, Path, os.PathLike]) -> str:
+    """Version of a data file, from its size and modification time, to invalidate the maps cached from it."""
+    stat = os.stat(fname)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def is_qmaps_cache_up_to_date(
+    qmaps_cache_file: Path,
+    fname: Union[str, Path, os.PathLike],
+    qmaps_cache_key: str,
+    kspace_scaling_factor: float,
+) -> bool:
+    """
+    Check whether the quantitative maps of a data file are cached from its current version with the same settings.
+
+    Parameters
+    ----------
+    qmaps_cache_file: Path of the cache file.
+    fname: Path to the data file.
+    qmaps_cache_key: The ``qmaps_cache_key`` of the transform computing the maps.
+    kspace_scaling_factor: The k-space scaling factor of the dataset.
+
+    Returns
+    -------
+    True if the cached maps can be used.
+    """
+    if not qmaps_cache_file.exists():
+        return False
+    with h5py.File(qmaps_cache_file, "r") as cf:
+        return (
+            cf.attrs.get("qmaps_cache_key") == qmaps_cache_key
+            and cf.attrs.get("kspace_scaling_factor") == kspace_scaling_factor
+            and cf.attrs.get("source_version") == _source_version(fname)
+        )
+
+
+def cache_quantitative_maps(
+    dataset: qMRISliceDataset, qmaps_cache_root: Union[str, Path, os.PathLike], overwrite: bool = False
+) -> List[Path]:
+    """
+    Compute the initial and target quantitative maps of all slices of a dataset once, and store them per file in a
+    side cache, to be loaded by a :class:`qMRISliceDataset` with the same ``qmaps_cache_root``.
+
+    The maps are computed by the transform of the dataset and stored per acceleration, in the order of the mask
+    functions, as the ``*_map_init_{acc}x`` and ``*_map_target`` datasets read by ``check_stored_qdata``. The cache
+    files are stored and tagged by the ``qmaps_cache_key`` of the transform and the k-space scaling factor, so they are
+    only reused with the same settings, and by the size and modification time of the data file, so they are computed
+    again when the data file changes. See :func:`get_qmaps_cache_file` for the layout of the cache.
+
+    Parameters
+    ----------
+    dataset: The dataset to cache the quantitative maps of. Its transform must be a ``qMRIDataTransforms`` that
+        computes the maps (``precompute_quantitative_maps=True``) from reproducible masks.
+    qmaps_cache_root: Path to store the cached maps.
+    overwrite: Whether to recompute files that are already cached with the same settings.
+
+    Returns
+    -------
+    The paths of the cache files.
+    """
+    qmaps_cache_key = getattr(dataset.transform, "qmaps_cache_key", None)
+    if qmaps_cache_key is None or not getattr(dataset.transform, "precompute_quantitative_maps", False):
+        raise ValueError(
+            "Quantitative maps can only be cached with a qMRIDataTransforms that computes them "
+            "(precompute_quantitative_maps=True) from reproducible masks (stored masks, or random1d, equispaced1d or "
+            "equispaced2d masks with use_seed=True)."
+        )
+    if dataset.consecutive_slices != 1:
+        raise ValueError("Quantitative maps can only be cached for single slices (consecutive_slices=1).")
+
+    qmaps_cache_root = Path(qmaps_cache_root)
+
+    examples_per_file: Dict[Path, List[int]] = {}
+    for idx, (fname, _, _) in enumerate(dataset.examples):
+        examples_per_file.setdefault(Path(fname), []).append(idx)
+
+    # the maps must be computed, not loaded from a previous cache
+    dataset_qmaps_cache_root, dataset.qmaps_cache_root = dataset.qmaps_cache_root, None
+    cache_files = []
+    try:
+        for fname, indices in examples_per_file.items():
+            cache_file = get_qmaps_cache_file(qmaps_cache_root, fname, qmaps_cache_key, dataset.kspace_scaling_factor)
+            cache_files.append(cache_file)
+
+            if not overwrite and is_qmaps_cache_up_to_date(
+                cache_file, fname, qmaps_cache_key, dataset.kspace_scaling_factor
+            ):
+                logging.info(f"Quantitative maps of {fname.name} are already cached.")
+                continue
+
+            indices = sorted(indices, key=lambda idx: dataset.examples[idx][1])
+            if [dataset.examples[idx][1] for idx in indices] != list(range(len(indices))):
+                raise ValueError(f"Not all slices of {fname} are in the dataset. Set sample_rate to 1.0.")
+
+            qmaps: Dict[str, List[np.ndarray]] = {}
+            accelerations = None
+            for idx in indices:
+                sample = dataset[idx]
+                acc = sample[-1]
+                if accelerations is None:
+                    accelerations = [int(round(float(a))) for a in (acc if isinstance(acc, list) else [acc])]
+
+                for name, maps_init, map_target in zip(
+                    ("R2star_map", "S0_map", "B0_map", "phi_map"), sample[0:8:2], sample[1:8:2]
+                ):
+                    for _acc, map_init in zip(accelerations, maps_init):
+                        qmaps.setdefault(f"{name}_init_{_acc}x", []).append(map_init.numpy())
+                    qmaps.setdefault(f"{name}_target", []).append(map_target.numpy())
+
+            # keep the insertion order, so that the initializations are read back in the order of the mask functions
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with h5py.File(cache_file, "w", track_order=True) as cf:
+                for key, maps in qmaps.items():
+                    cf.create_dataset(key, data=np.stack(maps).astype(np.float32))
+                cf.attrs["qmaps_cache_key"] = qmaps_cache_key
+                cf.attrs["kspace_scaling_factor"] = dataset.kspace_scaling_factor
+                cf.attrs["source_version"] = _source_version(fname)
+            logging.info(f"Cached quantitative maps of {fname.name} to {cache_file}.")
+    finally:
+        dataset.qmaps_cache_root = dataset_qmaps_cache_root
+        # the cache files found before caching may be outdated
+        dataset.__dict__.pop("_qmaps_cache_files", None)
+
+    return cache_files
@@ -1,6 +1,7 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
+import contextlib
 import os
 import re
 from pathlib import Path
@@ -11,9 +12,10 @@ import numpy as np
 
 from mridc.collections.common.data.mri_loader import MRIDataset
 from mridc.collections.common.parts import utils
+from mridc.collections.quantitative.data.qmri_data import qMRIMapsCacheMixin
 
 
-class qMRIDataset(MRIDataset):
+class qMRIDataset(qMRIMapsCacheMixin, MRIDataset):
     """
     A dataset class for loading quantitative MRI data.
 
@@ -59,6 +61,10 @@ class qMRIDataset(MRIDataset):
         the fixed acceleration.
     kspace_scaling_factor : float, optional
         A float that determines the scaling factor of the k-space data. Default is ``10000``.
+    qmaps_cache_root : Union[str, Path, os.PathLike], optional
+        Path to the initial and target quantitative maps cached by
+        :func:`mridc.collections.quantitative.data.qmri_data.cache_quantitative_maps`. They are loaded when the file
+        itself does not store quantitative maps.
 
     Examples
     --------
@@ -92,6 +98,7 @@ class qMRIDataset(MRIDataset):
         sequence: str = None,
         fixed_precomputed_acceleration: Optional[int] = None,
         kspace_scaling_factor: float = 10000,
+        qmaps_cache_root: Union[str, Path, os.PathLike] = None,
         **kwargs,
     ):
         super().__init__(
@@ -117,6 +124,7 @@ class qMRIDataset(MRIDataset):
             None if utils.is_none(fixed_precomputed_acceleration) else fixed_precomputed_acceleration
         )
         self.kspace_scaling_factor = kspace_scaling_factor
+        self.qmaps_cache_root = None if utils.is_none(qmaps_cache_root) else qmaps_cache_root
 
     def check_stored_qdata(self, data: Dict, key: str, dataslice: int) -> List[np.ndarray]:
         """
@@ -209,51 +217,60 @@ class qMRIDataset(MRIDataset):
 
             mask = [mask, mask_brain, mask_head]
 
-            B0_map_target = (
-                self.get_consecutive_slices(hf, "B0_map_target", dataslice) if "B0_map_target" in hf else np.empty([])
-            )
-            B0_map_init = (
-                self.check_stored_qdata(hf, "B0_map_init_", dataslice)
-                if any("B0_map_init_" in _ for _ in hf.keys())
-                else np.empty([])
-            )
-            B0_map = [B0_map_init, B0_map_target]
+            qmaps_cache_file = self.get_qmaps_cache_file(hf, fname)
+            with (
+                h5py.File(qmaps_cache_file, "r") if qmaps_cache_file is not None else contextlib.nullcontext(hf)
+            ) as qf:
+                B0_map_target = (
+                    self.get_consecutive_slices(qf, "B0_map_target", dataslice)
+                    if "B0_map_target" in qf
+                    else np.empty([])
+                )
+                B0_map_init = (
+                    self.check_stored_qdata(qf, "B0_map_init_", dataslice)
+                    if any("B0_map_init_" in _ for _ in qf.keys())
+                    else np.empty([])
+                )
+                B0_map = [B0_map_init, B0_map_target]
 
-            S0_map_target = (
-                self.get_consecutive_slices(hf, "S0_map_target", dataslice) if "S0_map_target" in hf else np.empty([])
-            )
-            S0_map_init = (
-                self.check_stored_qdata(hf, "S0_map_init_", dataslice)
-                if any("S0_map_init_" in _ for _ in hf.keys())
-                else np.empty([])
-            )
-            S0_map = [S0_map_init, S0_map_target]
+                S0_map_target = (
+                    self.get_consecutive_slices(qf, "S0_map_target", dataslice)
+                    if "S0_map_target" in qf
+                    else np.empty([])
+                )
+                S0_map_init = (
+                    self.check_stored_qdata(qf, "S0_map_init_", dataslice)
+                    if any("S0_map_init_" in _ for _ in qf.keys())
+                    else np.empty([])
+                )
+                S0_map = [S0_map_init, S0_map_target]
 
-            R2star_map_target = (
-                self.get_consecutive_slices(hf, "R2star_map_target", dataslice)
-                if "R2star_map_target" in hf
-                else np.empty([])
-            )
-            R2star_map_init = (
-                self.check_stored_qdata(hf, "R2star_map_init_", dataslice)
-                if any("R2star_map_init_" in _ for _ in hf.keys())
-                else np.empty([])
-            )
-            R2star_map = [R2star_map_init, R2star_map_target]
+                R2star_map_target = (
+                    self.get_consecutive_slices(qf, "R2star_map_target", dataslice)
+                    if "R2star_map_target" in qf
+                    else np.empty([])
+                )
+                R2star_map_init = (
+                    self.check_stored_qdata(qf, "R2star_map_init_", dataslice)
+                    if any("R2star_map_init_" in _ for _ in qf.keys())
+                    else np.empty([])
+                )
+                R2star_map = [R2star_map_init, R2star_map_target]
 
-            phi_map_target = (
-                self.get_consecutive_slices(hf, "phi_map_target", dataslice)
-                if "phi_map_target" in hf
-                else np.empty([])
-            )
-            phi_map_init = (
-                self.check_stored_qdata(hf, "phi_map_init_", dataslice)
-                if any("phi_map_init_" in _ for _ in hf.keys())
-                else np.empty([])
-            )
-            phi_map = [phi_map_init, phi_map_target]
+                phi_map_target = (
+                    self.get_consecutive_slices(qf, "phi_map_target", dataslice)
+                    if "phi_map_target" in qf
+                    else np.empty([])
+                )
+                phi_map_init = (
+                    self.check_stored_qdata(qf, "phi_map_init_", dataslice)
+                    if any("phi_map_init_" in _ for _ in qf.keys())
+                    else np.empty([])
+                )
+                phi_map = [phi_map_init, phi_map_target]
 
-            qmaps = [B0_map, S0_map, R2star_map, phi_map]
+                qmaps = [B0_map, S0_map, R2star_map, phi_map]
+                qmaps_cache_key = qf.attrs.get("qmaps_cache_key") if qmaps_cache_file is not None else None
 
             prediction = (
                 self.get_consecutive_slices(hf, "eta", dataslice).astype(np.complex64) if "eta" in hf else np.array([])
@@ -271,6 +288,8 @@ class qMRIDataset(MRIDataset):
 
             attrs = dict(hf.attrs)
             attrs.update(metadata)
+            if qmaps_cache_key is not None:
+                attrs["qmaps_cache_key"] = qmaps_cache_key
 
         if self.data_saved_per_slice:
             # arbitrary slice number for logging purposes
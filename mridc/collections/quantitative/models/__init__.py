@@ -1,6 +1,8 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos, Chaoping Zhang"
 
-from mridc.collections.quantitative.models.base import BaseqMRIReconstructionModel
-from mridc.collections.quantitative.models.qcirim import qCIRIM
-from mridc.collections.quantitative.models.qvn import qVarNet
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, submodule_attributes={"base": ["BaseqMRIReconstructionModel"], "qcirim": ["qCIRIM"], "qvn": ["qVarNet"]}
+)
@@ -1,13 +1,10 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos, Chaoping Zhang"
 
-import os
 from abc import ABC
 from collections import defaultdict
-from pathlib import Path
 from typing import Dict, Tuple
 
-import h5py
 import numpy as np
 import torch
 from omegaconf import DictConfig, OmegaConf
@@ -15,6 +12,7 @@ from pytorch_lightning import Trainer
 from torch.nn import L1Loss, MSELoss
 from torch.utils.data import DataLoader
 
+import mridc.collections.common.data.samplers as samplers
 import mridc.collections.common.losses as reconstruction_losses
 import mridc.collections.common.metrics.reconstruction_metrics as reconstruction_metrics
 import mridc.collections.common.parts.utils as utils
@@ -1375,7 +1373,7 @@ class BaseqMRIReconstructionModel(base_reconstruction_models.BaseMRIReconstructi
 
         Returns
         -------
-        Saves the reconstructed images to .h5 files.
+        Logs the metrics. The predictions are saved to .h5 files by the test writer.
         """
         # Log metrics.
         # Taken from: https://github.com/facebookresearch/fastMRI/blob/main/fastmri/pl_modules/mri_module.py
@@ -1582,19 +1580,6 @@ class BaseqMRIReconstructionModel(base_reconstruction_models.BaseMRIReconstructi
             self.log(f"{metric}_B0", value["B0"] / tot_examples)
             self.log(f"{metric}_phi", value["phi"] / tot_examples)
 
-        reconstructions = defaultdict(list)
-        for fname, slice_num, output in outputs:
-            reconstructions[fname].append((slice_num, output))
-
-        for fname in reconstructions:
-            reconstructions[fname] = np.stack([out for _, out in sorted(reconstructions[fname])])  # type: ignore
-
-        out_dir = Path(os.path.join(self.logger.log_dir, "reconstructions"))
-        out_dir.mkdir(exist_ok=True, parents=True)
-        for fname, recons in reconstructions.items():
-            with h5py.File(out_dir / fname, "w") as hf:
-                hf.create_dataset("reconstruction", data=recons)
-
     @staticmethod
     def _setup_dataloader_from_config(cfg: DictConfig) -> DataLoader:
         """
@@ -1664,11 +1649,13 @@ class BaseqMRIReconstructionModel(base_reconstruction_models.BaseMRIReconstructi
             init_coil_dim=cfg.get("init_coil_dim"),
             fixed_precomputed_acceleration=cfg.get("fixed_precomputed_acceleration"),
             kspace_scaling_factor=cfg.get("kspace_scaling_factor"),
+            qmaps_cache_root=cfg.get("qmaps_cache_path", None),
         )
         if cfg.shuffle:
             sampler = torch.utils.data.RandomSampler(dataset)
         else:
-            sampler = torch.utils.data.SequentialSampler(dataset)
+            # whole volumes per process, so that every process can save the volumes it predicts
+            sampler = samplers.DistributedVolumeSampler(dataset)
 
         return torch.utils.data.DataLoader(
             dataset=dataset,
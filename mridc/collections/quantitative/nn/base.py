@@ -1,13 +1,9 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-import os
 from abc import ABC
-from collections import defaultdict
-from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-import h5py
 import numpy as np
 import torch
 from numpy import ndarray
@@ -19,14 +15,15 @@ from torch.utils.data import DataLoader
 
 import mridc.collections.quantitative.parts.transforms as quantitative_transforms
 import mridc.collections.reconstruction.losses as reconstruction_losses
-import mridc.collections.reconstruction.nn.base as base_reconstruction_models
 from mridc.collections.common.data import subsample
+from mridc.collections.common.data.samplers import DistributedVolumeSampler
+from mridc.collections.common.metrics.volume_metrics import VolumeMetricsAccumulator
 from mridc.collections.common.nn.base import BaseMRIModel, BaseSensitivityModel
 from mridc.collections.common.parts import fft, utils
 from mridc.collections.quantitative.data import qmri_loader
 from mridc.collections.reconstruction.metrics import reconstruction_metrics
 
-__all__ = ["BaseqMRIReconstructionModel", "SignalForwardModel"]
+__all__ = ["BaseqMRIReconstructionModel", "SignalForwardModel", "megre_signal_model"]
 
 
 class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
@@ -55,6 +52,10 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
 
         self.coil_combination_method = cfg_dict.get("coil_combination_method", "SENSE")
 
+        # Number of echoes reconstructed at once, folded into the batch dimension, by the reconstruction module. If
+        # None, all echoes are reconstructed at once.
+        self.reconstruction_module_echo_chunk_size = cfg_dict.get("reconstruction_module_echo_chunk_size", None)
+
         self.ssdu = cfg_dict.get("ssdu", False)
 
         # Initialize the sensitivity network if cfg_dict.get("use_sens_net") is True
@@ -99,37 +100,14 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
             "phi": loss_regularization_factors[3]["phi"],
         }
 
-        self.MSE = base_reconstruction_models.DistributedMetricSum()
-        self.NMSE = base_reconstruction_models.DistributedMetricSum()
-        self.SSIM = base_reconstruction_models.DistributedMetricSum()
-        self.PSNR = base_reconstruction_models.DistributedMetricSum()
-        self.TotExamples = base_reconstruction_models.DistributedMetricSum()
-
-        # Set evaluation metrics dictionaries
-        self.mse_vals_reconstruction: Dict = defaultdict(dict)
-        self.nmse_vals_reconstruction: Dict = defaultdict(dict)
-        self.ssim_vals_reconstruction: Dict = defaultdict(dict)
-        self.psnr_vals_reconstruction: Dict = defaultdict(dict)
-
-        self.mse_vals_R2star: Dict = defaultdict(dict)
-        self.nmse_vals_R2star: Dict = defaultdict(dict)
-        self.ssim_vals_R2star: Dict = defaultdict(dict)
-        self.psnr_vals_R2star: Dict = defaultdict(dict)
-
-        self.mse_vals_S0: Dict = defaultdict(dict)
-        self.nmse_vals_S0: Dict = defaultdict(dict)
-        self.ssim_vals_S0: Dict = defaultdict(dict)
-        self.psnr_vals_S0: Dict = defaultdict(dict)
-
-        self.mse_vals_B0: Dict = defaultdict(dict)
-        self.nmse_vals_B0: Dict = defaultdict(dict)
-        self.ssim_vals_B0: Dict = defaultdict(dict)
-        self.psnr_vals_B0: Dict = defaultdict(dict)
-
-        self.mse_vals_phi: Dict = defaultdict(dict)
-        self.nmse_vals_phi: Dict = defaultdict(dict)
-        self.ssim_vals_phi: Dict = defaultdict(dict)
-        self.psnr_vals_phi: Dict = defaultdict(dict)
+        # Set evaluation metrics accumulator
+        self.volume_metrics = VolumeMetricsAccumulator(
+            [
+                f"{metric}_{name}"
+                for metric in ("MSE", "NMSE", "SSIM", "PSNR")
+                for name in ("Reconstruction", "R2star", "S0", "B0", "phi")
+            ]
+        )
 
     def process_quantitative_loss(  # noqa: W0221
         self,
@@ -406,6 +384,112 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
 
         return compute_reconstruction_loss(target, prediction) * self.reconstruction_loss_regularization_factor
 
+    def echo_chunks(self, num_echoes: int) -> List[slice]:
+        """
+        Splits the echoes in chunks of ``reconstruction_module_echo_chunk_size`` echoes.
+
+        Parameters
+        ----------
+        num_echoes : int
+            Number of echoes.
+
+        Returns
+        -------
+        List[slice]
+            Slices of the echo dimension.
+        """
+        chunk_size = self.reconstruction_module_echo_chunk_size
+        if chunk_size is None or chunk_size <= 0:
+            chunk_size = num_echoes
+        return [slice(i, min(i + chunk_size, num_echoes)) for i in range(0, num_echoes, chunk_size)]
+
+    @staticmethod
+    def echoes_to_batch_dim(
+        y: torch.Tensor, sensitivity_maps: torch.Tensor, sampling_mask: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Folds the echo dimension into the batch dimension, so that all echoes are reconstructed in a single pass. The
+        sensitivity maps and the sampling mask are shared between the echoes.
+
+        Parameters
+        ----------
+        y : torch.Tensor
+            Subsampled k-space data of shape [batch_size, n_echoes, n_coils, n_x, n_y, 2].
+        sensitivity_maps : torch.Tensor
+            Coil sensitivity maps of shape [batch_size, n_coils, n_x, n_y, 2].
+        sampling_mask : torch.Tensor
+            Sampling mask of shape [batch_size, 1, n_x, n_y, 1].
+
+        Returns
+        -------
+        Tuple[torch.Tensor, torch.Tensor, torch.Tensor]
+            The k-space data, sensitivity maps and sampling mask of shape [batch_size * n_echoes, ...].
+        """
+        batch_size, num_echoes = y.shape[:2]
+
+        def expand(x: torch.Tensor) -> torch.Tensor:
+            x = x.unsqueeze(1).expand(batch_size, num_echoes, *x.shape[1:])
+            return x.reshape(batch_size * num_echoes, *x.shape[2:])
+
+        return y.reshape(batch_size * num_echoes, *y.shape[2:]), expand(sensitivity_maps), expand(sampling_mask)
+
+    @staticmethod
+    def batch_to_echoes_dim(x: torch.Tensor, batch_size: int) -> torch.Tensor:
+        """
+        Unfolds the echo dimension from the batch dimension. Inverse of ``echoes_to_batch_dim``.
+
+        Parameters
+        ----------
+        x : torch.Tensor
+            Tensor of shape [batch_size * n_echoes, ...].
+        batch_size : int
+            Batch size.
+
+        Returns
+        -------
+        torch.Tensor
+            Tensor of shape [batch_size, n_echoes, ...].
+        """
+        return x.reshape(batch_size, -1, *x.shape[1:])
+
+    def initialize_quantitative_maps(
+        self, prediction: torch.Tensor, TEs: List, mask_brain: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Computes the initial quantitative maps from the reconstructed echoes, for the whole batch at once.
+
+        Parameters
+        ----------
+        prediction : torch.Tensor
+            Reconstructed echoes of shape [batch_size, n_echoes, n_x, n_y, 2].
+        TEs : List
+            List of echo times.
+        mask_brain : torch.Tensor
+            Brain mask of shape [batch_size, n_x, n_y].
+
+        Returns
+        -------
+        Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]
+            Initial R2*, S0, B0 and phi maps of shape [batch_size, n_x, n_y].
+        """
+        R2star_map_init, S0_map_init, B0_map_init, phi_map_init = quantitative_transforms.R2star_B0_S0_phi_mapping(
+            prediction,
+            TEs,
+            mask_brain,
+            torch.ones_like(mask_brain),
+            fully_sampled=True,
+            shift=self.shift_B0_input,
+            fft_centered=self.fft_centered,
+            fft_normalization=self.fft_normalization,
+            spatial_dims=self.spatial_dims,
+        )
+        return (
+            R2star_map_init.to(prediction),
+            S0_map_init.to(prediction),
+            B0_map_init.to(prediction),
+            phi_map_init.to(prediction),
+        )
+
     @staticmethod
     def process_inputs(  # noqa: W0221
         R2star_map_init: Union[list, torch.Tensor],
@@ -913,9 +997,9 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
                 1,
             )
 
-            recon_pred = recon_pred.detach().cpu()
+            recon_pred = recon_pred.detach()
             recon_pred = torch.abs(recon_pred / torch.max(torch.abs(recon_pred)))
-            target = target.detach().cpu()  # type: ignore
+            target = target.detach()  # type: ignore
             target = torch.abs(target / torch.max(torch.abs(target)))
 
         R2star_map_pred = self.__check_if_isinstance_pred__(R2star_map_pred)
@@ -926,24 +1010,24 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         slice_num = int(slice_num)
         name = str(fname[0])  # type: ignore
         key = f"{name}_images_idx_{slice_num}"  # type: ignore
-        R2star_map_output = R2star_map_pred.detach().cpu()
+        R2star_map_output = R2star_map_pred.detach()
         R2star_map_output = torch.abs(R2star_map_output / torch.max(torch.abs(R2star_map_output)))
-        S0_map_output = S0_map_pred.detach().cpu()
+        S0_map_output = S0_map_pred.detach()
         S0_map_output = torch.abs(S0_map_output / torch.max(torch.abs(S0_map_output)))
-        B0_map_output = B0_map_pred.detach().cpu()
+        B0_map_output = B0_map_pred.detach()
         B0_map_output = torch.abs(B0_map_output / torch.max(torch.abs(B0_map_output)))
-        phi_map_output = phi_map_pred.detach().cpu()
+        phi_map_output = phi_map_pred.detach()
         phi_map_output = torch.abs(phi_map_output / torch.max(torch.abs(phi_map_output)))
-        R2star_map_target = R2star_map_target.detach().cpu()  # type: ignore
+        R2star_map_target = R2star_map_target.detach()  # type: ignore
         R2star_map_target = torch.abs(R2star_map_target / torch.max(torch.abs(R2star_map_target)))
-        S0_map_target = S0_map_target.detach().cpu()  # type: ignore
+        S0_map_target = S0_map_target.detach()  # type: ignore
         S0_map_target = torch.abs(S0_map_target / torch.max(torch.abs(S0_map_target)))
-        B0_map_target = B0_map_target.detach().cpu()  # type: ignore
+        B0_map_target = B0_map_target.detach()  # type: ignore
         B0_map_target = torch.abs(B0_map_target / torch.max(torch.abs(B0_map_target)))
-        phi_map_target = phi_map_target.detach().cpu()  # type: ignore
+        phi_map_target = phi_map_target.detach()  # type: ignore
         phi_map_target = torch.abs(phi_map_target / torch.max(torch.abs(phi_map_target)))
 
-        if self.log_images:
+        if self.should_log_images(name, slice_num):
             if self.use_reconstruction_module:
                 for echo_time in range(target.shape[1]):  # type: ignore
                     self.log_image(
@@ -974,127 +1058,36 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
             self.log_image(f"{key}/phi/reconstruction", phi_map_output)
             self.log_image(f"{key}/phi/error", phi_map_target - phi_map_output)
 
+        # the batch slices are a volume, per echo for the reconstruction
         if self.use_reconstruction_module:
-            recon_pred = recon_pred.numpy()  # type: ignore
-            target = target.numpy()  # type: ignore
-
-            mses = []
-            nmses = []
-            ssims = []
-            psnrs = []
-            for echo_time in range(target.shape[1]):  # type: ignore
-                mses.append(
-                    torch.tensor(
-                        reconstruction_metrics.mse(
-                            target[:, echo_time, ...], recon_pred[:, echo_time, ...]  # type: ignore
-                        )
-                    ).view(1)
-                )
-                nmses.append(
-                    torch.tensor(
-                        reconstruction_metrics.nmse(
-                            target[:, echo_time, ...], recon_pred[:, echo_time, ...]  # type: ignore
-                        )
-                    ).view(1)
-                )
-                ssims.append(
-                    torch.tensor(
-                        reconstruction_metrics.ssim(
-                            target[:, echo_time, ...],  # type: ignore
-                            recon_pred[:, echo_time, ...],
-                            maxval=recon_pred[:, echo_time, ...].max() - recon_pred[:, echo_time, ...].min(),
-                        )
-                    ).view(1)
-                )
-                psnrs.append(
-                    torch.tensor(
-                        reconstruction_metrics.psnr(
-                            target[:, echo_time, ...],  # type: ignore
-                            recon_pred[:, echo_time, ...],
-                            maxval=recon_pred[:, echo_time, ...].max() - recon_pred[:, echo_time, ...].min(),
-                        )
-                    ).view(1)
-                )
-
-                self.mse_vals_reconstruction[fname][slice_num] = torch.tensor(mses).mean()
-                self.nmse_vals_reconstruction[fname][slice_num] = torch.tensor(nmses).mean()
-                self.ssim_vals_reconstruction[fname][slice_num] = torch.tensor(ssims).mean()
-                self.psnr_vals_reconstruction[fname][slice_num] = torch.tensor(psnrs).mean()
-        else:
-            self.mse_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-            self.nmse_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-            self.ssim_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-            self.psnr_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-
-        R2star_map_output = R2star_map_output.numpy()  # type: ignore
-        S0_map_output = S0_map_output.numpy()  # type: ignore
-        B0_map_output = B0_map_output.numpy()  # type: ignore
-        phi_map_output = phi_map_output.numpy()  # type: ignore
-
-        R2star_map_target = R2star_map_target.numpy()  # type: ignore
-        S0_map_target = S0_map_target.numpy()  # type: ignore
-        B0_map_target = B0_map_target.numpy()  # type: ignore
-        phi_map_target = phi_map_target.numpy()  # type: ignore
-
-        self.mse_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(R2star_map_target, R2star_map_output)
-        ).view(1)
-        self.nmse_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(R2star_map_target, R2star_map_output)
-        ).view(1)
-        self.ssim_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(
-                R2star_map_target, R2star_map_output, maxval=R2star_map_output.max() - R2star_map_output.min()
-            )
-        ).view(1)
-        self.psnr_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(
-                R2star_map_target, R2star_map_output, maxval=R2star_map_output.max() - R2star_map_output.min()
-            )
-        ).view(1)
-
-        self.mse_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(S0_map_target, S0_map_output)
-        ).view(1)
-        self.nmse_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(S0_map_target, S0_map_output)
-        ).view(1)
-        self.ssim_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(S0_map_target, S0_map_output, maxval=S0_map_output.max() - S0_map_output.min())
-        ).view(1)
-        self.psnr_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(S0_map_target, S0_map_output, maxval=S0_map_output.max() - S0_map_output.min())
-        ).view(1)
-
-        self.mse_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(B0_map_target, B0_map_output)
-        ).view(1)
-        self.nmse_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(B0_map_target, B0_map_output)
-        ).view(1)
-        self.ssim_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(B0_map_target, B0_map_output, maxval=B0_map_output.max() - B0_map_output.min())
-        ).view(1)
-        self.psnr_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(B0_map_target, B0_map_output, maxval=B0_map_output.max() - B0_map_output.min())
-        ).view(1)
-
-        self.mse_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(phi_map_target, phi_map_output)
-        ).view(1)
-        self.nmse_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(phi_map_target, phi_map_output)
-        ).view(1)
-        self.ssim_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(
-                phi_map_target, phi_map_output, maxval=phi_map_output.max() - phi_map_output.min()
-            )
-        ).view(1)
-        self.psnr_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(
-                phi_map_target, phi_map_output, maxval=phi_map_output.max() - phi_map_output.min()
+            mses, nmses, ssims, psnrs = reconstruction_metrics.batched_metrics(
+                target.transpose(0, 1), recon_pred.transpose(0, 1)
+            )
+            self.volume_metrics.update(
+                name,
+                MSE_Reconstruction=mses.mean(),
+                NMSE_Reconstruction=nmses.mean(),
+                SSIM_Reconstruction=ssims.mean(),
+                PSNR_Reconstruction=psnrs.mean(),
+            )
+        for map_name, map_target, map_output in (
+            ("R2star", R2star_map_target, R2star_map_output),
+            ("S0", S0_map_target, S0_map_output),
+            ("B0", B0_map_target, B0_map_output),
+            ("phi", phi_map_target, phi_map_output),
+        ):
+            mse, nmse, ssim, psnr = reconstruction_metrics.batched_metrics(
+                map_target.unsqueeze(0), map_output.unsqueeze(0)
+            )
+            self.volume_metrics.update(
+                name,
+                **{
+                    f"MSE_{map_name}": mse,
+                    f"NMSE_{map_name}": nmse,
+                    f"SSIM_{map_name}": ssim,
+                    f"PSNR_{map_name}": psnr,
+                },
             )
-        ).view(1)
 
         return {"val_loss": val_loss}
 
@@ -1246,9 +1239,9 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
                 1,
             )
 
-            recon_pred = recon_pred.detach().cpu()
+            recon_pred = recon_pred.detach()
             recon_pred = torch.abs(recon_pred / torch.max(torch.abs(recon_pred)))
-            target = target.detach().cpu()  # type: ignore
+            target = target.detach()  # type: ignore
             target = torch.abs(target / torch.max(torch.abs(target)))
 
         R2star_map_pred = self.__check_if_isinstance_pred__(R2star_map_pred)
@@ -1259,24 +1252,24 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         slice_num = int(slice_num)
         name = str(fname[0])  # type: ignore
         key = f"{name}_images_idx_{slice_num}"  # type: ignore
-        R2star_map_output = R2star_map_pred.detach().cpu()
+        R2star_map_output = R2star_map_pred.detach()
         R2star_map_output = torch.abs(R2star_map_output / torch.max(torch.abs(R2star_map_output)))
-        S0_map_output = S0_map_pred.detach().cpu()
+        S0_map_output = S0_map_pred.detach()
         S0_map_output = torch.abs(S0_map_output / torch.max(torch.abs(S0_map_output)))
-        B0_map_output = B0_map_pred.detach().cpu()
+        B0_map_output = B0_map_pred.detach()
         B0_map_output = torch.abs(B0_map_output / torch.max(torch.abs(B0_map_output)))
-        phi_map_output = phi_map_pred.detach().cpu()
+        phi_map_output = phi_map_pred.detach()
         phi_map_output = torch.abs(phi_map_output / torch.max(torch.abs(phi_map_output)))
-        R2star_map_target = R2star_map_target.detach().cpu()  # type: ignore
+        R2star_map_target = R2star_map_target.detach()  # type: ignore
         R2star_map_target = torch.abs(R2star_map_target / torch.max(torch.abs(R2star_map_target)))
-        S0_map_target = S0_map_target.detach().cpu()  # type: ignore
+        S0_map_target = S0_map_target.detach()  # type: ignore
         S0_map_target = torch.abs(S0_map_target / torch.max(torch.abs(S0_map_target)))
-        B0_map_target = B0_map_target.detach().cpu()  # type: ignore
+        B0_map_target = B0_map_target.detach()  # type: ignore
         B0_map_target = torch.abs(B0_map_target / torch.max(torch.abs(B0_map_target)))
-        phi_map_target = phi_map_target.detach().cpu()  # type: ignore
+        phi_map_target = phi_map_target.detach()  # type: ignore
         phi_map_target = torch.abs(phi_map_target / torch.max(torch.abs(phi_map_target)))
 
-        if self.log_images:
+        if self.should_log_images(name, slice_num):
             if self.use_reconstruction_module:
                 for echo_time in range(target.shape[1]):  # type: ignore
                     self.log_image(
@@ -1307,127 +1300,36 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
             self.log_image(f"{key}/phi/reconstruction", phi_map_output)
             self.log_image(f"{key}/phi/error", torch.abs(phi_map_target - phi_map_output))
 
+        # the batch slices are a volume, per echo for the reconstruction
         if self.use_reconstruction_module:
-            recon_pred = recon_pred.numpy()  # type: ignore
-            target = target.numpy()  # type: ignore
-
-            mses = []
-            nmses = []
-            ssims = []
-            psnrs = []
-            for echo_time in range(target.shape[1]):  # type: ignore
-                mses.append(
-                    torch.tensor(
-                        reconstruction_metrics.mse(
-                            target[:, echo_time, ...], recon_pred[:, echo_time, ...]  # type: ignore
-                        )
-                    ).view(1)
-                )
-                nmses.append(
-                    torch.tensor(
-                        reconstruction_metrics.nmse(
-                            target[:, echo_time, ...], recon_pred[:, echo_time, ...]  # type: ignore
-                        )
-                    ).view(1)
-                )  # type: ignore
-                ssims.append(
-                    torch.tensor(
-                        reconstruction_metrics.ssim(
-                            target[:, echo_time, ...],  # type: ignore
-                            recon_pred[:, echo_time, ...],
-                            maxval=recon_pred[:, echo_time, ...].max() - recon_pred[:, echo_time, ...].min(),
-                        )
-                    ).view(1)
-                )
-                psnrs.append(
-                    torch.tensor(
-                        reconstruction_metrics.psnr(
-                            target[:, echo_time, ...],  # type: ignore
-                            recon_pred[:, echo_time, ...],
-                            maxval=recon_pred[:, echo_time, ...].max() - recon_pred[:, echo_time, ...].min(),
-                        )
-                    ).view(1)
-                )
-
-                self.mse_vals_reconstruction[fname][slice_num] = torch.tensor(mses).mean()
-                self.nmse_vals_reconstruction[fname][slice_num] = torch.tensor(nmses).mean()
-                self.ssim_vals_reconstruction[fname][slice_num] = torch.tensor(ssims).mean()
-                self.psnr_vals_reconstruction[fname][slice_num] = torch.tensor(psnrs).mean()
-        else:
-            self.mse_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-            self.nmse_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-            self.ssim_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-            self.psnr_vals_reconstruction[fname][slice_num] = torch.tensor(0).view(1)
-
-        R2star_map_output = R2star_map_output.numpy()  # type: ignore
-        S0_map_output = S0_map_output.numpy()  # type: ignore
-        B0_map_output = B0_map_output.numpy()  # type: ignore
-        phi_map_output = phi_map_output.numpy()  # type: ignore
-
-        R2star_map_target = R2star_map_target.numpy()  # type: ignore
-        S0_map_target = S0_map_target.numpy()  # type: ignore
-        B0_map_target = B0_map_target.numpy()  # type: ignore
-        phi_map_target = phi_map_target.numpy()  # type: ignore
-
-        self.mse_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(R2star_map_target, R2star_map_output)
-        ).view(1)
-        self.nmse_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(R2star_map_target, R2star_map_output)
-        ).view(1)
-        self.ssim_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(
-                R2star_map_target, R2star_map_output, maxval=R2star_map_output.max() - R2star_map_output.min()
-            )
-        ).view(1)
-        self.psnr_vals_R2star[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(
-                R2star_map_target, R2star_map_output, maxval=R2star_map_output.max() - R2star_map_output.min()
-            )
-        ).view(1)
-
-        self.mse_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(S0_map_target, S0_map_output)
-        ).view(1)
-        self.nmse_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(S0_map_target, S0_map_output)
-        ).view(1)
-        self.ssim_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(S0_map_target, S0_map_output, maxval=S0_map_output.max() - S0_map_output.min())
-        ).view(1)
-        self.psnr_vals_S0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(S0_map_target, S0_map_output, maxval=S0_map_output.max() - S0_map_output.min())
-        ).view(1)
-
-        self.mse_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(B0_map_target, B0_map_output)
-        ).view(1)
-        self.nmse_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(B0_map_target, B0_map_output)
-        ).view(1)
-        self.ssim_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(B0_map_target, B0_map_output, maxval=B0_map_output.max() - B0_map_output.min())
-        ).view(1)
-        self.psnr_vals_B0[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(B0_map_target, B0_map_output, maxval=B0_map_output.max() - B0_map_output.min())
-        ).view(1)
-
-        self.mse_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.mse(phi_map_target, phi_map_output)
-        ).view(1)
-        self.nmse_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.nmse(phi_map_target, phi_map_output)
-        ).view(1)
-        self.ssim_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(
-                phi_map_target, phi_map_output, maxval=phi_map_output.max() - phi_map_output.min()
-            )
-        ).view(1)
-        self.psnr_vals_phi[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(
-                phi_map_target, phi_map_output, maxval=phi_map_output.max() - phi_map_output.min()
+            mses, nmses, ssims, psnrs = reconstruction_metrics.batched_metrics(
+                target.transpose(0, 1), recon_pred.transpose(0, 1)
+            )
+            self.volume_metrics.update(
+                name,
+                MSE_Reconstruction=mses.mean(),
+                NMSE_Reconstruction=nmses.mean(),
+                SSIM_Reconstruction=ssims.mean(),
+                PSNR_Reconstruction=psnrs.mean(),
+            )
+        for map_name, map_target, map_output in (
+            ("R2star", R2star_map_target, R2star_map_output),
+            ("S0", S0_map_target, S0_map_output),
+            ("B0", B0_map_target, B0_map_output),
+            ("phi", phi_map_target, phi_map_output),
+        ):
+            mse, nmse, ssim, psnr = reconstruction_metrics.batched_metrics(
+                map_target.unsqueeze(0), map_output.unsqueeze(0)
+            )
+            self.volume_metrics.update(
+                name,
+                **{
+                    f"MSE_{map_name}": mse,
+                    f"NMSE_{map_name}": nmse,
+                    f"SSIM_{map_name}": ssim,
+                    f"PSNR_{map_name}": psnr,
+                },
             )
-        ).view(1)
 
         return (
             name,
@@ -1451,7 +1353,7 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         self.log(f"loss_B0_{self.acc}x", torch.stack([x[f"loss_B0_{self.acc}x"] for x in outputs]).mean())
         self.log(f"loss_phi_{self.acc}x", torch.stack([x[f"loss_phi_{self.acc}x"] for x in outputs]).mean())
 
-    def validation_epoch_end(self, outputs):  # noqa: MC0001
+    def validation_epoch_end(self, outputs):
         """
         Called at the end of validation epoch to aggregate outputs.
 
@@ -1467,214 +1369,12 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         """
         self.log("val_loss", torch.stack([x["val_loss"] for x in outputs]).mean())
 
-        # Log metrics.
-        # Taken from: https://github.com/facebookresearch/fastMRI/blob/main/fastmri/pl_modules/mri_module.py
-        mse_vals_reconstruction = defaultdict(dict)
-        nmse_vals_reconstruction = defaultdict(dict)
-        ssim_vals_reconstruction = defaultdict(dict)
-        psnr_vals_reconstruction = defaultdict(dict)
-
-        mse_vals_R2star = defaultdict(dict)
-        nmse_vals_R2star = defaultdict(dict)
-        ssim_vals_R2star = defaultdict(dict)
-        psnr_vals_R2star = defaultdict(dict)
-
-        mse_vals_S0 = defaultdict(dict)
-        nmse_vals_S0 = defaultdict(dict)
-        ssim_vals_S0 = defaultdict(dict)
-        psnr_vals_S0 = defaultdict(dict)
-
-        mse_vals_B0 = defaultdict(dict)
-        nmse_vals_B0 = defaultdict(dict)
-        ssim_vals_B0 = defaultdict(dict)
-        psnr_vals_B0 = defaultdict(dict)
-
-        mse_vals_phi = defaultdict(dict)
-        nmse_vals_phi = defaultdict(dict)
-        ssim_vals_phi = defaultdict(dict)
-        psnr_vals_phi = defaultdict(dict)
-
-        for k, v in self.mse_vals_reconstruction.items():
-            mse_vals_reconstruction[k].update(v)
-        for k, v in self.nmse_vals_reconstruction.items():
-            nmse_vals_reconstruction[k].update(v)
-        for k, v in self.ssim_vals_reconstruction.items():
-            ssim_vals_reconstruction[k].update(v)
-        for k, v in self.psnr_vals_reconstruction.items():
-            psnr_vals_reconstruction[k].update(v)
-
-        for k, v in self.mse_vals_R2star.items():
-            mse_vals_R2star[k].update(v)
-        for k, v in self.nmse_vals_R2star.items():
-            nmse_vals_R2star[k].update(v)
-        for k, v in self.ssim_vals_R2star.items():
-            ssim_vals_R2star[k].update(v)
-        for k, v in self.psnr_vals_R2star.items():
-            psnr_vals_R2star[k].update(v)
-
-        for k, v in self.mse_vals_S0.items():
-            mse_vals_S0[k].update(v)
-        for k, v in self.nmse_vals_S0.items():
-            nmse_vals_S0[k].update(v)
-        for k, v in self.ssim_vals_S0.items():
-            ssim_vals_S0[k].update(v)
-        for k, v in self.psnr_vals_S0.items():
-            psnr_vals_S0[k].update(v)
-
-        for k, v in self.mse_vals_B0.items():
-            mse_vals_B0[k].update(v)
-        for k, v in self.nmse_vals_B0.items():
-            nmse_vals_B0[k].update(v)
-        for k, v in self.ssim_vals_B0.items():
-            ssim_vals_B0[k].update(v)
-        for k, v in self.psnr_vals_B0.items():
-            psnr_vals_B0[k].update(v)
-
-        for k, v in self.mse_vals_phi.items():
-            mse_vals_phi[k].update(v)
-        for k, v in self.nmse_vals_phi.items():
-            nmse_vals_phi[k].update(v)
-        for k, v in self.ssim_vals_phi.items():
-            ssim_vals_phi[k].update(v)
-        for k, v in self.psnr_vals_phi.items():
-            psnr_vals_phi[k].update(v)
-
-        # apply means across image volumes
-        metrics = {
-            "MSE": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-            "NMSE": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-            "SSIM": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-            "PSNR": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-        }
-        local_examples = 0
-        for fname in mse_vals_R2star:
-            local_examples += 1
-            metrics["MSE"]["reconstruction"] = metrics["MSE"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_reconstruction[fname].items()])
-            )
-            metrics["NMSE"]["reconstruction"] = metrics["NMSE"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_reconstruction[fname].items()])
-            )
-            metrics["SSIM"]["reconstruction"] = metrics["SSIM"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_reconstruction[fname].items()])
-            )
-            metrics["PSNR"]["reconstruction"] = metrics["PSNR"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_reconstruction[fname].items()])
-            )
+        self.log_volume_metrics()
 
-            metrics["MSE"]["R2star"] = metrics["MSE"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_R2star[fname].items()])
-            )
-            metrics["NMSE"]["R2star"] = metrics["NMSE"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_R2star[fname].items()])
-            )
-            metrics["SSIM"]["R2star"] = metrics["SSIM"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_R2star[fname].items()])
-            )
-            metrics["PSNR"]["R2star"] = metrics["PSNR"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_R2star[fname].items()])
-            )
-
-            metrics["MSE"]["S0"] = metrics["MSE"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_S0[fname].items()])
-            )
-            metrics["NMSE"]["S0"] = metrics["NMSE"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_S0[fname].items()])
-            )
-            metrics["SSIM"]["S0"] = metrics["SSIM"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_S0[fname].items()])
-            )
-            metrics["PSNR"]["S0"] = metrics["PSNR"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_S0[fname].items()])
-            )
-
-            metrics["MSE"]["B0"] = metrics["MSE"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_B0[fname].items()])
-            )
-            metrics["NMSE"]["B0"] = metrics["NMSE"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_B0[fname].items()])
-            )
-            metrics["SSIM"]["B0"] = metrics["SSIM"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_B0[fname].items()])
-            )
-            metrics["PSNR"]["B0"] = metrics["PSNR"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_B0[fname].items()])
-            )
-
-            metrics["MSE"]["phi"] = metrics["MSE"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_phi[fname].items()])
-            )
-            metrics["NMSE"]["phi"] = metrics["NMSE"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_phi[fname].items()])
-            )
-            metrics["SSIM"]["phi"] = metrics["SSIM"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_phi[fname].items()])
-            )
-            metrics["PSNR"]["phi"] = metrics["PSNR"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_phi[fname].items()])
-            )
-
-        # reduce across ddp via sum
-        metrics["MSE"]["reconstruction"] = self.MSE(metrics["MSE"]["reconstruction"])
-        metrics["NMSE"]["reconstruction"] = self.NMSE(metrics["NMSE"]["reconstruction"])
-        metrics["SSIM"]["reconstruction"] = self.SSIM(metrics["SSIM"]["reconstruction"])
-        metrics["PSNR"]["reconstruction"] = self.PSNR(metrics["PSNR"]["reconstruction"])
-
-        metrics["MSE"]["R2star"] = self.MSE(metrics["MSE"]["R2star"])
-        metrics["NMSE"]["R2star"] = self.NMSE(metrics["NMSE"]["R2star"])
-        metrics["SSIM"]["R2star"] = self.SSIM(metrics["SSIM"]["R2star"])
-        metrics["PSNR"]["R2star"] = self.PSNR(metrics["PSNR"]["R2star"])
-
-        metrics["MSE"]["S0"] = self.MSE(metrics["MSE"]["S0"])
-        metrics["NMSE"]["S0"] = self.NMSE(metrics["NMSE"]["S0"])
-        metrics["SSIM"]["S0"] = self.SSIM(metrics["SSIM"]["S0"])
-        metrics["PSNR"]["S0"] = self.PSNR(metrics["PSNR"]["S0"])
-
-        metrics["MSE"]["B0"] = self.MSE(metrics["MSE"]["B0"])
-        metrics["NMSE"]["B0"] = self.NMSE(metrics["NMSE"]["B0"])
-        metrics["SSIM"]["B0"] = self.SSIM(metrics["SSIM"]["B0"])
-        metrics["PSNR"]["B0"] = self.PSNR(metrics["PSNR"]["B0"])
-
-        metrics["MSE"]["phi"] = self.MSE(metrics["MSE"]["phi"])
-        metrics["NMSE"]["phi"] = self.NMSE(metrics["NMSE"]["phi"])
-        metrics["SSIM"]["phi"] = self.SSIM(metrics["SSIM"]["phi"])
-        metrics["PSNR"]["phi"] = self.PSNR(metrics["PSNR"]["phi"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics.items():
-            self.log(f"{metric}_Reconstruction", value["reconstruction"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_R2star", value["R2star"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_S0", value["S0"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_B0", value["B0"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_phi", value["phi"] / tot_examples, sync_dist=True)
-
-    def test_epoch_end(self, outputs):  # noqa: MC0001
+    def test_epoch_end(self, outputs):
         """
-        Called at the end of test epoch to aggregate outputs, log metrics and save predictions.
+        Called at the end of test epoch to aggregate outputs and log metrics. The predictions are saved by the test
+        writer, as soon as all the slices of a volume are predicted.
 
         Parameters
         ----------
@@ -1686,223 +1386,7 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         metrics : dict
             Dictionary of metrics.
         """
-        # Log metrics.
-        # Taken from: https://github.com/facebookresearch/fastMRI/blob/main/fastmri/pl_modules/mri_module.py
-        mse_vals_reconstruction = defaultdict(dict)
-        nmse_vals_reconstruction = defaultdict(dict)
-        ssim_vals_reconstruction = defaultdict(dict)
-        psnr_vals_reconstruction = defaultdict(dict)
-
-        mse_vals_R2star = defaultdict(dict)
-        nmse_vals_R2star = defaultdict(dict)
-        ssim_vals_R2star = defaultdict(dict)
-        psnr_vals_R2star = defaultdict(dict)
-
-        mse_vals_S0 = defaultdict(dict)
-        nmse_vals_S0 = defaultdict(dict)
-        ssim_vals_S0 = defaultdict(dict)
-        psnr_vals_S0 = defaultdict(dict)
-
-        mse_vals_B0 = defaultdict(dict)
-        nmse_vals_B0 = defaultdict(dict)
-        ssim_vals_B0 = defaultdict(dict)
-        psnr_vals_B0 = defaultdict(dict)
-
-        mse_vals_phi = defaultdict(dict)
-        nmse_vals_phi = defaultdict(dict)
-        ssim_vals_phi = defaultdict(dict)
-        psnr_vals_phi = defaultdict(dict)
-
-        for k, v in self.mse_vals_reconstruction.items():
-            mse_vals_reconstruction[k].update(v)
-        for k, v in self.nmse_vals_reconstruction.items():
-            nmse_vals_reconstruction[k].update(v)
-        for k, v in self.ssim_vals_reconstruction.items():
-            ssim_vals_reconstruction[k].update(v)
-        for k, v in self.psnr_vals_reconstruction.items():
-            psnr_vals_reconstruction[k].update(v)
-
-        for k, v in self.mse_vals_R2star.items():
-            mse_vals_R2star[k].update(v)
-        for k, v in self.nmse_vals_R2star.items():
-            nmse_vals_R2star[k].update(v)
-        for k, v in self.ssim_vals_R2star.items():
-            ssim_vals_R2star[k].update(v)
-        for k, v in self.psnr_vals_R2star.items():
-            psnr_vals_R2star[k].update(v)
-
-        for k, v in self.mse_vals_S0.items():
-            mse_vals_S0[k].update(v)
-        for k, v in self.nmse_vals_S0.items():
-            nmse_vals_S0[k].update(v)
-        for k, v in self.ssim_vals_S0.items():
-            ssim_vals_S0[k].update(v)
-        for k, v in self.psnr_vals_S0.items():
-            psnr_vals_S0[k].update(v)
-
-        for k, v in self.mse_vals_B0.items():
-            mse_vals_B0[k].update(v)
-        for k, v in self.nmse_vals_B0.items():
-            nmse_vals_B0[k].update(v)
-        for k, v in self.ssim_vals_B0.items():
-            ssim_vals_B0[k].update(v)
-        for k, v in self.psnr_vals_B0.items():
-            psnr_vals_B0[k].update(v)
-
-        for k, v in self.mse_vals_phi.items():
-            mse_vals_phi[k].update(v)
-        for k, v in self.nmse_vals_phi.items():
-            nmse_vals_phi[k].update(v)
-        for k, v in self.ssim_vals_phi.items():
-            ssim_vals_phi[k].update(v)
-        for k, v in self.psnr_vals_phi.items():
-            psnr_vals_phi[k].update(v)
-
-        # apply means across image volumes
-        metrics = {
-            "MSE": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-            "NMSE": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-            "SSIM": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-            "PSNR": {
-                "reconstruction": 0,
-                "R2star": 0,
-                "S0": 0,
-                "B0": 0,
-                "phi": 0,
-            },
-        }
-        local_examples = 0
-        for fname in mse_vals_R2star:
-            local_examples += 1
-            metrics["MSE"]["reconstruction"] = metrics["MSE"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_reconstruction[fname].items()])
-            )
-            metrics["NMSE"]["reconstruction"] = metrics["NMSE"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_reconstruction[fname].items()])
-            )
-            metrics["SSIM"]["reconstruction"] = metrics["SSIM"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_reconstruction[fname].items()])
-            )
-            metrics["PSNR"]["reconstruction"] = metrics["PSNR"]["reconstruction"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_reconstruction[fname].items()])
-            )
-
-            metrics["MSE"]["R2star"] = metrics["MSE"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_R2star[fname].items()])
-            )
-            metrics["NMSE"]["R2star"] = metrics["NMSE"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_R2star[fname].items()])
-            )
-            metrics["SSIM"]["R2star"] = metrics["SSIM"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_R2star[fname].items()])
-            )
-            metrics["PSNR"]["R2star"] = metrics["PSNR"]["R2star"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_R2star[fname].items()])
-            )
-
-            metrics["MSE"]["S0"] = metrics["MSE"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_S0[fname].items()])
-            )
-            metrics["NMSE"]["S0"] = metrics["NMSE"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_S0[fname].items()])
-            )
-            metrics["SSIM"]["S0"] = metrics["SSIM"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_S0[fname].items()])
-            )
-            metrics["PSNR"]["S0"] = metrics["PSNR"]["S0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_S0[fname].items()])
-            )
-
-            metrics["MSE"]["B0"] = metrics["MSE"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_B0[fname].items()])
-            )
-            metrics["NMSE"]["B0"] = metrics["NMSE"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_B0[fname].items()])
-            )
-            metrics["SSIM"]["B0"] = metrics["SSIM"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_B0[fname].items()])
-            )
-            metrics["PSNR"]["B0"] = metrics["PSNR"]["B0"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_B0[fname].items()])
-            )
-
-            metrics["MSE"]["phi"] = metrics["MSE"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in mse_vals_phi[fname].items()])
-            )
-            metrics["NMSE"]["phi"] = metrics["NMSE"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in nmse_vals_phi[fname].items()])
-            )
-            metrics["SSIM"]["phi"] = metrics["SSIM"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in ssim_vals_phi[fname].items()])
-            )
-            metrics["PSNR"]["phi"] = metrics["PSNR"]["phi"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in psnr_vals_phi[fname].items()])
-            )
-
-        # reduce across ddp via sum
-        metrics["MSE"]["reconstruction"] = self.MSE(metrics["MSE"]["reconstruction"])
-        metrics["NMSE"]["reconstruction"] = self.NMSE(metrics["NMSE"]["reconstruction"])
-        metrics["SSIM"]["reconstruction"] = self.SSIM(metrics["SSIM"]["reconstruction"])
-        metrics["PSNR"]["reconstruction"] = self.PSNR(metrics["PSNR"]["reconstruction"])
-
-        metrics["MSE"]["R2star"] = self.MSE(metrics["MSE"]["R2star"])
-        metrics["NMSE"]["R2star"] = self.NMSE(metrics["NMSE"]["R2star"])
-        metrics["SSIM"]["R2star"] = self.SSIM(metrics["SSIM"]["R2star"])
-        metrics["PSNR"]["R2star"] = self.PSNR(metrics["PSNR"]["R2star"])
-
-        metrics["MSE"]["S0"] = self.MSE(metrics["MSE"]["S0"])
-        metrics["NMSE"]["S0"] = self.NMSE(metrics["NMSE"]["S0"])
-        metrics["SSIM"]["S0"] = self.SSIM(metrics["SSIM"]["S0"])
-        metrics["PSNR"]["S0"] = self.PSNR(metrics["PSNR"]["S0"])
-
-        metrics["MSE"]["B0"] = self.MSE(metrics["MSE"]["B0"])
-        metrics["NMSE"]["B0"] = self.NMSE(metrics["NMSE"]["B0"])
-        metrics["SSIM"]["B0"] = self.SSIM(metrics["SSIM"]["B0"])
-        metrics["PSNR"]["B0"] = self.PSNR(metrics["PSNR"]["B0"])
-
-        metrics["MSE"]["phi"] = self.MSE(metrics["MSE"]["phi"])
-        metrics["NMSE"]["phi"] = self.NMSE(metrics["NMSE"]["phi"])
-        metrics["SSIM"]["phi"] = self.SSIM(metrics["SSIM"]["phi"])
-        metrics["PSNR"]["phi"] = self.PSNR(metrics["PSNR"]["phi"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics.items():
-            self.log(f"{metric}_Reconstruction", value["reconstruction"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_R2star", value["R2star"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_S0", value["S0"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_B0", value["B0"] / tot_examples, sync_dist=True)
-            self.log(f"{metric}_phi", value["phi"] / tot_examples, sync_dist=True)
-
-        reconstructions = defaultdict(list)
-        for fname, slice_num, output in outputs:
-            reconstructions[fname].append((slice_num, output))
-
-        for fname in reconstructions:
-            reconstructions[fname] = np.stack([out for _, out in sorted(reconstructions[fname])])  # type: ignore
-
-        out_dir = Path(os.path.join(self.logger.log_dir, "reconstructions"))
-        out_dir.mkdir(exist_ok=True, parents=True)
-        for fname, recons in reconstructions.items():
-            with h5py.File(out_dir / fname, "w") as hf:
-                hf.create_dataset("reconstruction", data=recons)
+        self.log_volume_metrics()
 
     @staticmethod
     def _setup_dataloader_from_config(cfg: DictConfig) -> DataLoader:
@@ -1996,11 +1480,13 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
             sequence=cfg.get("sequence", None),
             fixed_precomputed_acceleration=cfg.get("fixed_precomputed_acceleration", None),
             kspace_scaling_factor=cfg.get("kspace_scaling_factor", 1000),
+            qmaps_cache_root=cfg.get("qmaps_cache_path", None),
         )
         if cfg.shuffle:
             sampler = torch.utils.data.RandomSampler(dataset)
         else:
-            sampler = torch.utils.data.SequentialSampler(dataset)
+            # whole volumes per process, so that every process can save the volumes it predicts
+            sampler = DistributedVolumeSampler(dataset)
 
         return torch.utils.data.DataLoader(
             dataset=dataset,
@@ -2012,6 +1498,45 @@ class BaseqMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         )
 
 
+def megre_signal_model(
+    R2star_map: torch.Tensor, S0_map: torch.Tensor, B0_map: torch.Tensor, phi_map: torch.Tensor, TEs: torch.Tensor
+) -> torch.Tensor:
+    """
+    MEGRE signal (S0 + i * phi) * exp(-TE * R2*) * exp(-i * TE * B0) in real arithmetic, with the exponential and
+    trigonometric terms computed once per echo. It is used as the fused kernel of the :class:`SignalForwardModel`
+    when scripted with TorchScript.
+
+    Parameters
+    ----------
+    R2star_map : torch.Tensor
+        R2* map of shape [batch_size, n_x, n_y].
+    S0_map : torch.Tensor
+        S0 map of shape [batch_size, n_x, n_y].
+    B0_map : torch.Tensor
+        B0 map of shape [batch_size, n_x, n_y].
+    phi_map : torch.Tensor
+        phi map of shape [batch_size, n_x, n_y].
+    TEs : torch.Tensor
+        Scaled echo times of shape [n_echoes].
+
+    Returns
+    -------
+    torch.Tensor
+        Signal of shape [batch_size, n_echoes, n_x, n_y, 2].
+    """
+    TEs = TEs[None, :, None, None]
+    decay = torch.exp(-TEs * R2star_map.unsqueeze(1))
+    phase = TEs * B0_map.unsqueeze(1)
+    cos_phase = torch.cos(phase)
+    sin_phase = torch.sin(phase)
+    S0_map = S0_map.unsqueeze(1)
+    phi_map = phi_map.unsqueeze(1)
+    pred = torch.stack(
+        (decay * (S0_map * cos_phase + phi_map * sin_phase), decay * (phi_map * cos_phase - S0_map * sin_phase)), -1
+    )
+    return torch.where(torch.isnan(pred), torch.zeros_like(pred), pred)
+
+
 class SignalForwardModel:
     """
     Defines a signal forward model based on sequence.
@@ -2020,12 +1545,16 @@ class SignalForwardModel:
     ----------
     sequence : str
         Sequence name.
+    use_torchscript : bool
+        Whether to compute the MEGRE signal with a TorchScript kernel (:func:`megre_signal_model`), which can be fused
+        into a single kernel on GPU. Default is ``False``.
     """
 
-    def __init__(self, sequence: Union[str, None] = None):
+    def __init__(self, sequence: Union[str, None] = None, use_torchscript: bool = False):
         super().__init__()
         self.sequence = sequence.lower() if isinstance(sequence, str) else None
         self.scaling = 1e-3
+        self.megre_kernel = torch.jit.script(megre_signal_model) if use_torchscript else None
 
     def __call__(  # noqa: W0221
         self,
@@ -2051,6 +1580,7 @@ class SignalForwardModel:
         """
         if TEs is None:
             TEs = torch.Tensor([3.0, 11.5, 20.0, 28.5])
+        TEs = torch.as_tensor(TEs, dtype=R2star_map.dtype, device=R2star_map.device) * self.scaling
         if self.sequence == "megre":
             return self.MEGRESignalModel(R2star_map, S0_map, B0_map, phi_map, TEs)
         if self.sequence == "megre_no_phase":
@@ -2066,10 +1596,10 @@ class SignalForwardModel:
         S0_map: torch.Tensor,
         B0_map: torch.Tensor,
         phi_map: torch.Tensor,
-        TEs: Optional[List] = None,
+        TEs: torch.Tensor,
     ):
         """
-        MEGRE forward model.
+        MEGRE forward model, (S0 + i * phi) * exp(-TE * (R2* + i * B0)) broadcast over the echo times.
 
         Parameters
         ----------
@@ -2081,42 +1611,24 @@ class SignalForwardModel:
             B0 map of shape [batch_size, n_x, n_y].
         phi_map : torch.Tensor
             phi map of shape [batch_size, n_x, n_y].
-        TEs : list of float, optional
-            List of echo times.
+        TEs : torch.Tensor
+            Scaled echo times of shape [n_echoes].
         """
-        S0_map_real = S0_map
-        S0_map_imag = phi_map
-
-        def first_term(i):
-            return torch.exp(-TEs[i] * self.scaling * R2star_map)
-
-        def second_term(i):
-            return torch.cos(B0_map * self.scaling * -TEs[i])
+        if self.megre_kernel is not None:
+            return self.megre_kernel(R2star_map, S0_map, B0_map, phi_map, TEs)
 
-        def third_term(i):
-            return torch.sin(B0_map * self.scaling * -TEs[i])
-
-        pred = torch.stack(
-            [
-                torch.stack(
-                    (
-                        S0_map_real * first_term(i) * second_term(i) - S0_map_imag * first_term(i) * third_term(i),
-                        S0_map_real * first_term(i) * third_term(i) + S0_map_imag * first_term(i) * second_term(i),
-                    ),
-                    -1,
-                )
-                for i in range(len(TEs))  # type: ignore
-            ],
-            1,
+        TEs = TEs.reshape(1, -1, 1, 1)
+        pred = torch.complex(S0_map, phi_map).unsqueeze(1) * torch.exp(
+            -TEs * torch.complex(R2star_map, B0_map).unsqueeze(1)
         )
-        pred = torch.where(torch.isnan(pred), torch.zeros_like(pred), pred)
-        return torch.view_as_real(pred[..., 0] + 1j * pred[..., 1])
+        pred = torch.view_as_real(pred)
+        return torch.where(torch.isnan(pred), torch.zeros_like(pred), pred)
 
     def MEGRENoPhaseSignalModel(
         self,
         R2star_map: torch.Tensor,
         S0_map: torch.Tensor,
-        TEs: Optional[List] = None,
+        TEs: torch.Tensor,
     ):
         """
         MEGRE no phase forward model.
@@ -2127,21 +1639,9 @@ class SignalForwardModel:
             R2* map of shape [batch_size, n_x, n_y].
         S0_map : torch.Tensor
             S0 map of shape [batch_size, n_x, n_y].
-        TEs : list of float, optional
-            List of echo times.
+        TEs : torch.Tensor
+            Scaled echo times of shape [n_echoes].
         """
-        pred = torch.stack(
-            [
-                torch.stack(
-                    (
-                        S0_map * torch.exp(-TEs[i] * self.scaling * R2star_map),  # type: ignore
-                        S0_map * torch.exp(-TEs[i] * self.scaling * R2star_map),  # type: ignore
-                    ),
-                    -1,
-                )
-                for i in range(len(TEs))  # type: ignore
-            ],
-            1,
-        )
-        pred = torch.where(torch.isnan(pred), torch.zeros_like(pred), pred)
-        return torch.view_as_real(pred[..., 0] + 1j * pred[..., 1])
+        pred = S0_map.unsqueeze(1) * torch.exp(-TEs.reshape(1, -1, 1, 1) * R2star_map.unsqueeze(1))
+        pred = torch.stack((pred, pred), -1)
+        return torch.where(torch.isnan(pred), torch.zeros_like(pred), pred)
@@ -15,7 +15,6 @@ import mridc.collections.quantitative.nn.qrim.utils as qrim_utils
 import mridc.core.classes.common as common_classes
 from mridc.collections.common.parts import fft, utils
 from mridc.collections.quantitative.nn.qrim import qrim_block
-from mridc.collections.quantitative.parts import transforms
 from mridc.collections.reconstruction.nn.rim import rim_block
 
 __all__ = ["qCIRIM"]
@@ -113,7 +112,8 @@ class qCIRIM(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # type
                     time_steps=cfg_dict.get("quantitative_module_time_steps"),
                     conv_dim=cfg_dict.get("quantitative_module_conv_dim"),
                     linear_forward_model=base_quantitative_models.SignalForwardModel(
-                        sequence=cfg_dict.get("quantitative_module_signal_forward_model_sequence")
+                        sequence=cfg_dict.get("quantitative_module_signal_forward_model_sequence"),
+                        use_torchscript=cfg_dict.get("quantitative_module_signal_forward_model_torchscript", False),
                     ),
                     fft_centered=self.fft_centered,
                     fft_normalization=self.fft_normalization,
@@ -175,11 +175,15 @@ class qCIRIM(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # type
              If False, returns the final estimate.
         """
         if self.use_reconstruction_module:
-            echoes_predictions = []
+            batch_size = y.shape[0]
             cascades_echoes_predictions = []
             sigma = 1.0
-            for echo in range(y.shape[1]):
-                prediction = y[:, echo, ...].clone()
+            # the echoes share the sensitivity maps and the mask, so they are reconstructed folded into the batch
+            for echoes in self.echo_chunks(y.shape[1]):
+                y_echoes, sensitivity_maps_echoes, sampling_mask_echoes = self.echoes_to_batch_dim(
+                    y[:, echoes], sensitivity_maps, sampling_mask.squeeze(1)
+                )
+                prediction = y_echoes.clone()
                 init_pred = None
                 hx = None
                 cascades_predictions = []
@@ -187,19 +191,23 @@ class qCIRIM(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # type
                     # Forward pass through the cascades
                     prediction, hx = cascade(
                         prediction,
-                        y[:, echo, ...],
-                        sensitivity_maps,
-                        sampling_mask.squeeze(1),
+                        y_echoes,
+                        sensitivity_maps_echoes,
+                        sampling_mask_echoes,
                         init_pred,
                         hx,
                         sigma,
                         keep_prediction=False if i == 0 else self.reconstruction_module_keep_prediction,
                     )
-                    cascades_predictions.append([torch.view_as_complex(x) for x in prediction])
-                cascades_echoes_predictions.append(cascades_predictions)
-                echoes_predictions.append(cascades_predictions[-1][-1])
+                    cascades_predictions.append(
+                        [self.batch_to_echoes_dim(torch.view_as_complex(x), batch_size) for x in prediction]
+                    )
+                cascades_echoes_predictions.extend(
+                    [[x[:, echo] for x in time_steps] for time_steps in cascades_predictions]
+                    for echo in range(cascades_predictions[-1][-1].shape[1])
+                )
 
-            prediction = torch.stack(echoes_predictions, dim=1)
+            prediction = torch.stack([x[-1][-1] for x in cascades_echoes_predictions], dim=1)
             if prediction.shape[-1] != 2:
                 prediction = torch.view_as_real(prediction)
             y = fft.fft2(
@@ -209,30 +217,9 @@ class qCIRIM(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # type
                 self.spatial_dims,
             )
 
-            R2star_maps_init = []
-            S0_maps_init = []
-            B0_maps_init = []
-            phi_maps_init = []
-            for batch_idx in range(prediction.shape[0]):
-                R2star_map_init, S0_map_init, B0_map_init, phi_map_init = transforms.R2star_B0_S0_phi_mapping(
-                    prediction[batch_idx],
-                    TEs,
-                    mask_brain,
-                    torch.ones_like(mask_brain),
-                    fully_sampled=True,
-                    shift=self.shift_B0_input,
-                    fft_centered=self.fft_centered,
-                    fft_normalization=self.fft_normalization,
-                    spatial_dims=self.spatial_dims,
-                )
-                R2star_maps_init.append(R2star_map_init.squeeze(0))
-                S0_maps_init.append(S0_map_init.squeeze(0))
-                B0_maps_init.append(B0_map_init.squeeze(0))
-                phi_maps_init.append(phi_map_init.squeeze(0))
-            R2star_map_init = torch.stack(R2star_maps_init, dim=0).to(y)
-            S0_map_init = torch.stack(S0_maps_init, dim=0).to(y)
-            B0_map_init = torch.stack(B0_maps_init, dim=0).to(y)
-            phi_map_init = torch.stack(phi_maps_init, dim=0).to(y)
+            R2star_map_init, S0_map_init, B0_map_init, phi_map_init = self.initialize_quantitative_maps(
+                prediction, TEs, mask_brain
+            )
 
         R2star_map_pred = R2star_map_init / self.gamma[0]
         S0_map_pred = S0_map_init / self.gamma[1]
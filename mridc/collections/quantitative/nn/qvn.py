@@ -14,7 +14,6 @@ import mridc.collections.quantitative.nn.qrim.utils as qrim_utils
 import mridc.core.classes.common as common_classes
 from mridc.collections.common.parts import fft, utils
 from mridc.collections.quantitative.nn.qvarnet import qvn_block
-from mridc.collections.quantitative.parts import transforms
 from mridc.collections.reconstruction.nn.unet_base import unet_block
 
 __all__ = ["qVarNet"]
@@ -93,7 +92,8 @@ class qVarNet(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # typ
                     coil_dim=self.coil_dim,
                     no_dc=cfg_dict.get("quantitative_module_no_dc"),
                     linear_forward_model=base_quantitative_models.SignalForwardModel(
-                        sequence=cfg_dict.get("quantitative_module_signal_forward_model_sequence")
+                        sequence=cfg_dict.get("quantitative_module_signal_forward_model_sequence"),
+                        use_torchscript=cfg_dict.get("quantitative_module_signal_forward_model_torchscript", False),
                     ),
                 )
                 for _ in range(quantitative_module_num_cascades)
@@ -149,12 +149,17 @@ class qVarNet(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # typ
              If False, returns the final estimate.
         """
         if self.use_reconstruction_module:
+            batch_size = y.shape[0]
             cascades_echoes_predictions = []
-            for echo in range(y.shape[1]):
-                prediction = y[:, echo, ...].clone()
+            # the echoes share the sensitivity maps and the mask, so they are reconstructed folded into the batch
+            for echoes in self.echo_chunks(y.shape[1]):
+                y_echoes, sensitivity_maps_echoes, sampling_mask_echoes = self.echoes_to_batch_dim(
+                    y[:, echoes], sensitivity_maps, sampling_mask.squeeze(1)
+                )
+                prediction = y_echoes.clone()
                 for cascade in self.vn:
                     # Forward pass through the cascades
-                    prediction = cascade(prediction, y[:, echo, ...], sensitivity_maps, sampling_mask.squeeze(1))
+                    prediction = cascade(prediction, y_echoes, sensitivity_maps_echoes, sampling_mask_echoes)
                 estimation = fft.ifft2(
                     prediction,
                     centered=self.fft_centered,
@@ -162,11 +167,13 @@ class qVarNet(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # typ
                     spatial_dims=self.spatial_dims,
                 )
                 estimation = utils.coil_combination_method(
-                    estimation, sensitivity_maps, method=self.coil_combination_method, dim=self.coil_dim - 1
+                    estimation, sensitivity_maps_echoes, method=self.coil_combination_method, dim=self.coil_dim - 1
+                )
+                cascades_echoes_predictions.append(
+                    self.batch_to_echoes_dim(torch.view_as_complex(estimation), batch_size)
                 )
-                cascades_echoes_predictions.append(torch.view_as_complex(estimation))
 
-            prediction = torch.stack(cascades_echoes_predictions, dim=1)
+            prediction = torch.cat(cascades_echoes_predictions, dim=1)
             if prediction.shape[-1] != 2:
                 prediction = torch.view_as_real(prediction)
             y = fft.fft2(
@@ -177,30 +184,9 @@ class qVarNet(base_quantitative_models.BaseqMRIReconstructionModel, ABC):  # typ
             )
             recon_prediction = torch.view_as_complex(prediction).clone()
 
-            R2star_maps_init = []
-            S0_maps_init = []
-            B0_maps_init = []
-            phi_maps_init = []
-            for batch_idx in range(prediction.shape[0]):
-                R2star_map_init, S0_map_init, B0_map_init, phi_map_init = transforms.R2star_B0_S0_phi_mapping(
-                    prediction[batch_idx],
-                    TEs,
-                    mask_brain,
-                    torch.ones_like(mask_brain),
-                    fully_sampled=True,
-                    shift=self.shift_B0_input,
-                    fft_centered=self.fft_centered,
-                    fft_normalization=self.fft_normalization,
-                    spatial_dims=self.spatial_dims,
-                )
-                R2star_maps_init.append(R2star_map_init.squeeze(0))
-                S0_maps_init.append(S0_map_init.squeeze(0))
-                B0_maps_init.append(B0_map_init.squeeze(0))
-                phi_maps_init.append(phi_map_init.squeeze(0))
-            R2star_map_init = torch.stack(R2star_maps_init, dim=0).to(y)
-            S0_map_init = torch.stack(S0_maps_init, dim=0).to(y)
-            B0_map_init = torch.stack(B0_maps_init, dim=0).to(y)
-            phi_map_init = torch.stack(phi_maps_init, dim=0).to(y)
+            R2star_map_init, S0_map_init, B0_map_init, phi_map_init = self.initialize_quantitative_maps(
+                prediction, TEs, mask_brain
+            )
 
         R2star_map_pred = R2star_map_init / self.gamma[0]
         S0_map_pred = S0_map_init / self.gamma[1]
@@ -1,4 +1,6 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos, Chaoping Zhang"
 
-from mridc.collections.quantitative.parts.transforms import qMRIDataTransforms
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, submodule_attributes={"transforms": ["qMRIDataTransforms"]})
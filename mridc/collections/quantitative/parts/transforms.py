@@ -60,7 +60,8 @@ class qMRIDataTransforms:
         ----------
         TEs: Echo times.
             List[float]
-        precompute_quantitative_maps: Precompute quantitative maps.
+        precompute_quantitative_maps: Precompute quantitative maps. Maps loaded from a cache with a matching
+            ``qmaps_cache_key`` are used as they are.
             bool
         apply_prewhitening: Apply prewhitening.
             bool
@@ -171,6 +172,49 @@ class qMRIDataTransforms:
         )
 
         self.use_seed = use_seed
+        self.qmaps_cache_key = self.quantitative_maps_cache_key()
+
+    def quantitative_maps_cache_key(self) -> Optional[str]:
+        """
+        Key of the settings the initial and target quantitative maps depend on, so that maps cached by
+        :func:`mridc.collections.quantitative.data.qmri_data.cache_quantitative_maps` are only reused by a transform
+        with the same echo times, masking and cropping.
+
+        Returns
+        -------
+        The cache key, or None if the maps cannot be cached because the sampling masks are drawn randomly on every call.
+        """
+        if utils.is_none(self.mask_func):
+            masks = ["stored"]
+        else:
+            mask_funcs = self.mask_func if isinstance(self.mask_func, list) else [self.mask_func]
+            # Gaussian and Poisson masks are drawn from the global random state, so the seed does not reproduce them.
+            seeded_mask_funcs = (
+                subsample.RandomMaskFunc,
+                subsample.Equispaced1DMaskFunc,
+                subsample.Equispaced2DMaskFunc,
+            )
+            if not self.use_seed or not all(isinstance(m, seeded_mask_funcs) for m in mask_funcs):
+                return None
+            masks = [f"{type(m).__name__}({list(m.center_fractions)}, {list(m.accelerations)})" for m in mask_funcs]
+        settings = {
+            "TEs": list(self.TEs),
+            "masks": masks,
+            "shift_mask": self.shift_mask,
+            "mask_center_scale": self.mask_center_scale,
+            "half_scan_percentage": self.half_scan_percentage,
+            "remask": self.remask,
+            "dimensionality": self.dimensionality,
+            "crop_size": None if utils.is_none(self.crop_size) else list(self.crop_size),
+            "kspace_crop": self.kspace_crop,
+            "crop_before_masking": self.crop_before_masking,
+            "fft_centered": self.fft_centered,
+            "fft_normalization": self.fft_normalization,
+            "spatial_dims": list(self.spatial_dims),
+            "coil_dim": self.coil_dim,
+            "shift_B0_input": self.shift_B0_input,
+        }
+        return ";".join(f"{k}={v}" for k, v in settings.items())
 
     def __call__(
         self,
@@ -550,7 +594,10 @@ class qMRIDataTransforms:
 
         mask_head = torch.ones_like(mask_brain)
 
-        if self.precompute_quantitative_maps:
+        # Maps cached with the same settings are loaded by the dataset, so there is no need to recompute them.
+        use_cached_qmaps = self.qmaps_cache_key is not None and attrs.get("qmaps_cache_key") == self.qmaps_cache_key
+
+        if self.precompute_quantitative_maps and not use_cached_qmaps:
             R2star_maps_init = []
             S0_maps_init = []
             B0_maps_init = []
@@ -935,13 +982,14 @@ def R2star_B0_real_S0_complex_mapping(
     Parameters
     ----------
     prediction : torch.Tensor
-        The prediction of the model.
+        The prediction of the model. Shape [n_echoes, n_x, n_y, 2] or [batch_size, n_echoes, n_x, n_y, 2], or the
+        complex-valued equivalent without the last dimension.
     TEs : Union[Optional[List[float]], float]
         The TEs of the images.
     brain_mask : torch.Tensor
-        The brain mask of the images.
+        The brain mask of the images. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     head_mask : torch.Tensor
-        The head mask of the images.
+        The head mask of the images. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     fully_sampled : bool
         Whether the images are fully sampled.
     shift : bool
@@ -964,7 +1012,19 @@ def R2star_B0_real_S0_complex_mapping(
     phi : torch.Tensor
         The phi map.
     """
+    if torch.is_complex(prediction):
+        prediction = torch.view_as_real(prediction)
+
     R2star_map = R2star_S0_mapping(prediction, TEs)
+
+    # B0 and S0 are both estimated from the smoothed echoes, so smooth them once
+    prediction = gaussian_smooth_echoes(
+        prediction,
+        shift=shift,
+        fft_centered=fft_centered,
+        fft_normalization=fft_normalization,
+        spatial_dims=spatial_dims,
+    )
     B0_map = -B0_phi_mapping(
         prediction,
         TEs,
@@ -975,6 +1035,7 @@ def R2star_B0_real_S0_complex_mapping(
         fft_centered=fft_centered,
         fft_normalization=fft_normalization,
         spatial_dims=spatial_dims,
+        smooth=False,
     )[0]
     S0_map_real, S0_map_imag = S0_mapping_complex(
         prediction,
@@ -989,6 +1050,75 @@ def R2star_B0_real_S0_complex_mapping(
     return R2star_map, S0_map_real, B0_map, S0_map_imag
 
 
+def R2star_B0_S0_phi_mapping(
+    prediction: torch.Tensor,
+    TEs: Union[Optional[List[float]], float],
+    brain_mask: torch.Tensor,
+    head_mask: torch.Tensor,
+    fully_sampled: bool = True,
+    shift: bool = False,
+    fft_centered: bool = True,
+    fft_normalization: str = "ortho",
+    spatial_dims: Sequence[int] = None,
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Maps a batch of multi-echo predictions to R2*, S0, B0, and phi maps, with a single call for the whole batch.
+
+    Parameters
+    ----------
+    prediction : torch.Tensor
+        The prediction of the model. Shape [batch_size, n_echoes, n_x, n_y, 2] or complex-valued
+        [batch_size, n_echoes, n_x, n_y].
+    TEs : Union[Optional[List[float]], float]
+        The TEs of the images.
+    brain_mask : torch.Tensor
+        The brain mask of the images. Shape [batch_size, n_x, n_y].
+    head_mask : torch.Tensor
+        The head mask of the images. Shape [batch_size, n_x, n_y].
+    fully_sampled : bool
+        Whether the images are fully sampled.
+    shift : bool
+        If True, the gaussian kernel is centered at (kernel_size - 1) / 2.
+    fft_centered : bool
+        Whether to center the FFT for a real- or complex-valued input.
+    fft_normalization : str
+        Whether to normalize the FFT output (None, "ortho", "backward", "forward", "none").
+    spatial_dims : Sequence[int]
+        Spatial dimensions to keep in the FFT.
+
+    Returns
+    -------
+    R2star : torch.Tensor
+        The R2* map. Shape [batch_size, n_x, n_y].
+    S0 : torch.Tensor
+        The S0 map (real part). Shape [batch_size, n_x, n_y].
+    B0 : torch.Tensor
+        The B0 map. Shape [batch_size, n_x, n_y].
+    phi : torch.Tensor
+        The phi map (imaginary part of S0). Shape [batch_size, n_x, n_y].
+    """
+    if torch.is_complex(prediction):
+        prediction = torch.view_as_real(prediction)
+    if prediction.dim() == 4:
+        prediction = prediction.unsqueeze(0)
+    if brain_mask.dim() == 2:
+        brain_mask = brain_mask.unsqueeze(0)
+    if head_mask.dim() == 2:
+        head_mask = head_mask.unsqueeze(0)
+
+    return R2star_B0_real_S0_complex_mapping(
+        prediction,
+        TEs,
+        brain_mask,
+        head_mask,
+        fully_sampled=fully_sampled,
+        shift=shift,
+        fft_centered=fft_centered,
+        fft_normalization=fft_normalization,
+        spatial_dims=spatial_dims,
+    )
+
+
 def R2star_S0_mapping(
     prediction: torch.Tensor,
     TEs: Union[Optional[List[float]], float],
@@ -997,10 +1127,14 @@ def R2star_S0_mapping(
     """
     R2* map and S0 map estimation for multi-echo GRE from stored magnitude image files acquired at multiple TEs.
 
+    The log-linear signal model is fitted per pixel with weighted least squares, weighting the residuals with the
+    square root of the signal magnitude (as ``np.polyfit(TEs, log(signal), 1, w=sqrt(signal))``). The fit is solved in
+    closed form for all pixels at once and stays on the device of the prediction.
+
     Parameters
     ----------
     prediction : torch.Tensor
-        The prediction of the model.
+        The prediction of the model. Shape [n_echoes, n_x, n_y, 2] or [batch_size, n_echoes, n_x, n_y, 2].
     TEs : Union[Optional[List[float]], float]
         The TEs of the images.
     scaling_factor : float
@@ -1009,27 +1143,70 @@ def R2star_S0_mapping(
     Returns
     -------
     R2star : torch.Tensor
-        The R2* map.
-    S0 : torch.Tensor
-        The S0 map.
+        The R2* map. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     """
-    prediction = torch.abs(torch.view_as_complex(prediction)) + 1e-8
-    prediction_flatten = torch.flatten(prediction, start_dim=1, end_dim=-1).detach().cpu()  # .numpy()
-    TEs = torch.tensor(TEs).to(prediction_flatten)
-
-    # TODO: this part needs a proper implementation in PyTorch
-    R2star_map = torch.zeros([prediction_flatten.shape[1]])
-    for i in range(prediction_flatten.shape[1]):
-        R2star_map[i], _ = torch.from_numpy(
-            np.polyfit(
-                TEs * scaling_factor,  # type:ignore
-                np.log(prediction_flatten[:, i]),
-                1,
-                w=np.sqrt(prediction_flatten[:, i]),
-            )
-        ).to(prediction)
-    R2star_map = torch.reshape(-R2star_map, prediction.shape[1:4])
-    return R2star_map
+    prediction = torch.abs(torch.view_as_complex(prediction.detach())) + 1e-8
+    echo_dim = prediction.dim() - 3
+    TEs = torch.as_tensor(TEs).to(prediction).reshape(-1, 1, 1) * scaling_factor
+
+    # np.polyfit weights the residuals, so the squared weights are the signal magnitude
+    weights = prediction
+    log_signal = torch.log(prediction)
+    weights_sum = weights.sum(echo_dim, keepdim=True)
+    TEs_centered = TEs - (weights * TEs).sum(echo_dim, keepdim=True) / weights_sum
+    slope = (weights * TEs_centered * log_signal).sum(echo_dim) / (weights * TEs_centered**2).sum(echo_dim)
+    return -slope
+
+
+def gaussian_smooth_echoes(
+    prediction: torch.Tensor,
+    kernel_size: int = 9,
+    sigma: float = 1.0,
+    shift: bool = False,
+    fft_centered: bool = True,
+    fft_normalization: str = "ortho",
+    spatial_dims: Sequence[int] = None,
+) -> torch.Tensor:
+    """
+    Smooths the real and imaginary parts of all echoes (and samples) with a single grouped gaussian convolution.
+
+    Parameters
+    ----------
+    prediction : torch.Tensor
+        The prediction of the model. Shape [..., n_x, n_y, 2].
+    kernel_size : int
+        Gaussian kernel size.
+    sigma : float
+        Gaussian kernel standard deviation.
+    shift : bool
+        If True, the gaussian kernel is centered at (kernel_size - 1) / 2.
+    fft_centered : bool
+        Whether to center the FFT for a real- or complex-valued input.
+    fft_normalization : str
+        Whether to normalize the FFT output (None, "ortho", "backward", "forward", "none").
+    spatial_dims : Sequence[int]
+        Spatial dimensions to keep in the FFT.
+
+    Returns
+    -------
+    torch.Tensor
+        The smoothed prediction, with the same shape as the input.
+    """
+    smoothing = GaussianSmoothing(
+        channels=2,
+        kernel_size=kernel_size,
+        sigma=sigma,
+        dim=2,
+        shift=shift,
+        fft_centered=fft_centered,
+        fft_normalization=fft_normalization,
+        spatial_dims=spatial_dims,
+    )
+    shape = prediction.shape
+    pad = kernel_size // 2
+    prediction = prediction.reshape(-1, *shape[-3:]).permute(0, 3, 1, 2)
+    prediction = smoothing(F.pad(prediction, (pad, pad, pad, pad), mode="reflect"))
+    return prediction.permute(0, 2, 3, 1).reshape(shape).contiguous()
 
 
 def B0_phi_mapping(
@@ -1043,20 +1220,24 @@ def B0_phi_mapping(
     fft_centered: bool = True,
     fft_normalization: str = "ortho",
     spatial_dims: Sequence[int] = None,
+    smooth: bool = True,
 ):
     """
     B0 map and Phi map estimation for multi-echo GRE from stored magnitude image files acquired at multiple TEs.
 
+    The B0 map is the least-squares slope of the unwrapped phase differences over the TE differences, which for a
+    single unknown per pixel is the closed-form ratio sum(dTE * dphase) / sum(dTE ** 2).
+
     Parameters
     ----------
     prediction : torch.Tensor
-        The prediction of the model.
+        The prediction of the model. Shape [n_echoes, n_x, n_y, 2] or [batch_size, n_echoes, n_x, n_y, 2].
     TEs : Union[Optional[List[float]], float]
         The TEs of the images.
     brain_mask : torch.Tensor
-        The brain mask of the images.
+        The brain mask of the images. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     head_mask : torch.Tensor
-        The head mask of the images.
+        The head mask of the images. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     fully_sampled : bool
         Whether the images are fully sampled.
     scaling_factor : float
@@ -1069,94 +1250,92 @@ def B0_phi_mapping(
         Whether to normalize the FFT output (None, "ortho", "backward", "forward", "none").
     spatial_dims : Sequence[int]
         Spatial dimensions to keep in the FFT.
+    smooth : bool
+        Whether to smooth the echoes before estimating the phase. Set to False if the prediction is already smoothed
+        with ``gaussian_smooth_echoes``.
 
     Returns
     -------
     B0 : torch.Tensor
-        The B0 map.
+        The B0 map. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     phi : torch.Tensor
-        The phi map.
+        The phi map. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     """
-    lsq = LeastSquares(device=prediction.device)
+    batched = prediction.dim() == 5
+    if not batched:
+        prediction = prediction.unsqueeze(0)
+    if brain_mask.dim() == 2:
+        brain_mask = brain_mask.unsqueeze(0)
+    if head_mask.dim() == 2:
+        head_mask = head_mask.unsqueeze(0)
 
     TEnotused = 3  # if fully_sampled else 3
-    TEs = torch.tensor(TEs)
-
-    # brain_mask is used only for descale of phase difference (so that phase_diff is in between -2pi and 2pi)
-    brain_mask_descale = brain_mask
-    shape = prediction.shape
-
-    # apply gaussian blur with radius r to
-    smoothing = GaussianSmoothing(
-        channels=2,
-        kernel_size=9,
-        sigma=1.0,
-        dim=2,
-        shift=shift,
-        fft_centered=fft_centered,
-        fft_normalization=fft_normalization,
-        spatial_dims=spatial_dims,
-    )
-    prediction = prediction.unsqueeze(1).permute([0, 1, 4, 2, 3])  # add a dummy batch dimension
-    for i in range(prediction.shape[0]):
-        prediction[i] = smoothing(F.pad(prediction[i], (4, 4, 4, 4), mode="reflect"))
-    prediction = prediction.permute([0, 1, 3, 4, 2]).squeeze(1)
+    TEs = torch.as_tensor(TEs).to(prediction)
+
+    if smooth:
+        # apply gaussian blur with radius r to
+        prediction = gaussian_smooth_echoes(
+            prediction,
+            shift=shift,
+            fft_centered=fft_centered,
+            fft_normalization=fft_normalization,
+            spatial_dims=spatial_dims,
+        )
 
     if shift:
         prediction = fft.ifft2(
-            torch.fft.fftshift(fft.fft2(prediction, fft_centered, fft_normalization, spatial_dims), dim=(1, 2)),
+            torch.fft.fftshift(fft.fft2(prediction, fft_centered, fft_normalization, spatial_dims), dim=(-3, -2)),
             fft_centered,
             fft_normalization,
             spatial_dims,
         )
 
-    phase = torch.angle(torch.view_as_complex(prediction))
+    phase = torch.angle(torch.view_as_complex(prediction)).detach().cpu().numpy()
 
-    # unwrap phases
-    phase_unwrapped = torch.zeros_like(phase)
+    # unwrap phases, per sample and echo time
     mask_head_np = np.invert(head_mask.cpu().detach().numpy() > 0.5)
-
-    # loop over echo times
-    for i in range(phase.shape[0]):
-        phase_unwrapped[i] = torch.from_numpy(
-            unwrap_phase(np.ma.array(phase[i].detach().cpu().numpy(), mask=mask_head_np)).data
-        ).to(prediction)
-
-    phase_diff_set = []
-    TE_diff = []
+    phase_unwrapped = torch.from_numpy(
+        np.stack(
+            [
+                np.stack([unwrap_phase(np.ma.array(echo, mask=mask_head_np[batch_idx])).data for echo in sample])
+                for batch_idx, sample in enumerate(phase)
+            ]
+        )
+    ).to(prediction)
 
     # obtain phase differences and TE differences
-    for i in range(phase_unwrapped.shape[0] - TEnotused):
-        phase_diff_set.append(torch.flatten(phase_unwrapped[i + 1] - phase_unwrapped[i]))
-        phase_diff_set[i] = (
-            phase_diff_set[i]
-            - torch.round(
-                torch.abs(
-                    torch.sum(phase_diff_set[i] * torch.flatten(brain_mask_descale))
-                    / torch.sum(brain_mask_descale)
-                    / 2
-                    / np.pi
-                )
+    n_diffs = phase_unwrapped.shape[1] - TEnotused
+    phase_diff = phase_unwrapped[:, 1 : n_diffs + 1] - phase_unwrapped[:, :n_diffs]
+
+    # brain_mask is used only for descale of phase difference (so that phase_diff is in between -2pi and 2pi)
+    brain_mask_descale = brain_mask.unsqueeze(1).to(phase_diff)
+    phase_diff = (
+        phase_diff
+        - torch.round(
+            torch.abs(
+                torch.sum(phase_diff * brain_mask_descale, dim=(-2, -1), keepdim=True)
+                / torch.sum(brain_mask_descale, dim=(-2, -1), keepdim=True)
+                / 2
+                / np.pi
             )
-            * 2
-            * np.pi
         )
-        TE_diff.append(TEs[i + 1] - TEs[i])  # type: ignore
-
-    phase_diff_set = torch.stack(phase_diff_set, 0)
-    TE_diff = torch.stack(TE_diff, 0).to(prediction)
+        * 2
+        * np.pi
+    )
+    TE_diff = ((TEs[1 : n_diffs + 1] - TEs[:n_diffs]) * scaling_factor).reshape(-1, 1, 1)
 
     # least squares fitting to obtain phase map
-    B0_map_tmp = lsq.lstq_pinv(
-        phase_diff_set.unsqueeze(2).permute(1, 0, 2), TE_diff.unsqueeze(1) * scaling_factor  # type: ignore
-    )
-    B0_map = B0_map_tmp.reshape(shape[-3], shape[-2])
-    B0_map = B0_map * torch.abs(head_mask)
+    B0_map = torch.sum(TE_diff * phase_diff, dim=1) / torch.sum(TE_diff**2)
+    B0_map = B0_map * torch.abs(head_mask).to(B0_map)
 
     # obtain phi map
-    phi_map = (phase_unwrapped[0] - scaling_factor * TEs[0] * B0_map).squeeze(0)  # type: ignore
+    phi_map = phase_unwrapped[:, 0] - scaling_factor * TEs[0] * B0_map
 
-    return B0_map.to(prediction), phi_map.to(prediction)
+    if not batched:
+        B0_map = B0_map.squeeze(0)
+        phi_map = phi_map.squeeze(0)
+
+    return B0_map, phi_map
 
 
 def S0_mapping_complex(
@@ -1173,16 +1352,20 @@ def S0_mapping_complex(
     """
     Complex S0 mapping.
 
+    S0 is the single complex unknown of the per-pixel least-squares fit of the echoes to the signal model
+    exp(-TE * (R2* + i * B0)), which is the closed-form ratio sum(conj(model) * signal) / sum(|model| ** 2). The first
+    four echoes are used.
+
     Parameters
     ----------
     prediction : torch.Tensor
-        The prediction of the model.
+        The prediction of the model. Shape [n_echoes, n_x, n_y, 2] or [batch_size, n_echoes, n_x, n_y, 2].
     TEs : Union[Optional[List[float]], float]
         The TEs of the images.
     R2star_map : torch.Tensor
-        The R2* map.
+        The R2* map. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     B0_map : torch.Tensor
-        The B0 map.
+        The B0 map. Shape [n_x, n_y] or [batch_size, n_x, n_y].
     scaling_factor : float
         The scaling factor.
     shift : bool
@@ -1199,28 +1382,20 @@ def S0_mapping_complex(
     S0 : torch.Tensor
         The S0 map.
     """
-    lsq = LeastSquares(device=prediction.device)
-
     prediction = torch.view_as_complex(prediction)
-    prediction_flatten = prediction.reshape(prediction.shape[0], -1)
 
-    TEs = torch.tensor(TEs).to(prediction)
+    TEs = torch.as_tensor(TEs).to(prediction)[0:4]
+    prediction = prediction.narrow(-3, 0, TEs.shape[0])
 
     R2star_B0_complex_map = R2star_map.to(prediction) + 1j * B0_map.to(prediction)
-    R2star_B0_complex_map_flatten = R2star_B0_complex_map.flatten()
-
-    TEs_r2 = TEs[0:4].unsqueeze(1) * -R2star_B0_complex_map_flatten  # type: ignore
-
-    S0_map = lsq.lstq_pinv_complex_np(
-        prediction_flatten.permute(1, 0).unsqueeze(2),
-        torch.exp(scaling_factor * TEs_r2.permute(1, 0).unsqueeze(2)),
-    )
+    signal_model = torch.exp(scaling_factor * TEs.reshape(-1, 1, 1) * -R2star_B0_complex_map.unsqueeze(-3))
 
-    S0_map = torch.view_as_real(S0_map.reshape(prediction.shape[1:]))
+    S0_map = torch.sum(torch.conj(signal_model) * prediction, dim=-3) / torch.sum(torch.abs(signal_model) ** 2, dim=-3)
+    S0_map = torch.view_as_real(S0_map)
 
     if shift:
         S0_map = fft.ifft2(
-            torch.fft.fftshift(fft.fft2(S0_map, fft_centered, fft_normalization, spatial_dims), dim=(0, 1)),
+            torch.fft.fftshift(fft.fft2(S0_map, fft_centered, fft_normalization, spatial_dims), dim=(-3, -2)),
             fft_centered,
             fft_normalization,
             spatial_dims,
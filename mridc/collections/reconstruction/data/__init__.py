@@ -1,13 +1,20 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.reconstruction.data.mri_data import MRISliceDataset
-from mridc.collections.reconstruction.data.subsample import (
-    Equispaced1DMaskFunc,
-    Equispaced2DMaskFunc,
-    Gaussian1DMaskFunc,
-    Gaussian2DMaskFunc,
-    Poisson2DMaskFunc,
-    RandomMaskFunc,
-    create_mask_for_mask_type,
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "mri_data": ["MRISliceDataset"],
+        "subsample": [
+            "Equispaced1DMaskFunc",
+            "Equispaced2DMaskFunc",
+            "Gaussian1DMaskFunc",
+            "Gaussian2DMaskFunc",
+            "Poisson2DMaskFunc",
+            "RandomMaskFunc",
+            "create_mask_for_mask_type",
+        ],
+    },
 )
@@ -1,4 +1,6 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.reconstruction.losses import ssim  # noqa: F401
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, submodules=["ssim"])
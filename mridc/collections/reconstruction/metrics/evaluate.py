@@ -0,0 +1,665 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import csv
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import h5py
+import numpy as np
+import torch
+
+from mridc.collections.common.parts import fft, utils
+from mridc.collections.reconstruction.metrics.reconstruction_metrics import (
+    batched_haarpsi,
+    batched_mse,
+    batched_nmse,
+    batched_psnr,
+    batched_ssim,
+    batched_vsi,
+)
+from mridc.utils import logging
+
+__all__ = [
+    "EvaluationOptions",
+    "evaluate",
+    "evaluate_volume",
+    "list_targets",
+    "load_target",
+    "materialize_targets",
+    "target_from_kspace",
+    "targets_cache_dir",
+]
+
+METRICS = ("MSE", "NMSE", "PSNR", "SSIM", "HaarPSI", "VSI")
+DEFAULT_METRICS = ("MSE", "NMSE", "PSNR", "SSIM")
+DEFAULT_TARGET_KEYS = ("reconstruction_sense", "reconstruction_rss", "reconstruction", "target")
+
+
+class EvaluationOptions:
+    """
+    Options of the offline evaluation of reconstructions against their targets.
+
+    Parameters
+    ----------
+    target_keys : Sequence[str]
+        Candidate datasets of the target files, the first one present is used. Default is ``reconstruction_sense``,
+        ``reconstruction_rss``, ``reconstruction`` and ``target``.
+    reconstruction_key : str
+        Dataset of the reconstruction files. Default is ``reconstruction``.
+    target_from_kspace : str, optional
+        Compute the targets from the fully sampled k-space instead, with ``"SENSE"`` or ``"RSS"`` coil combination.
+        Default is ``None``.
+    kspace_key : str
+        Dataset of the k-space, if the targets are computed from it. Default is ``kspace``.
+    sensitivity_map_key : str
+        Dataset of the coil sensitivity maps, if the targets are computed with SENSE. Default is ``sensitivity_map``.
+    crop_size : Tuple[int, int], optional
+        Center crop the targets and the reconstructions to this size, or to their smallest size if smaller. Default
+        is ``None``.
+    normalization : str
+        Normalize the magnitude of the targets and the reconstructions by their ``"volume"`` maximum, their
+        ``"slice"`` maximum, or not at all with ``"none"``. Default is ``"volume"``.
+    clip : bool
+        Clip the normalized images to [0, 1]. Default is ``False``.
+    metrics : Sequence[str]
+        Metrics to compute, any of ``MSE``, ``NMSE``, ``PSNR``, ``SSIM``, ``HaarPSI`` and ``VSI``. Default is ``MSE``,
+        ``NMSE``, ``PSNR`` and ``SSIM``.
+    chunk_size : int
+        Number of slices the perceptual metrics, HaarPSI and VSI, process at once. Default is ``32``.
+    num_threads : int
+        Number of threads to process the chunks of the perceptual metrics with. Default is ``0``, for sequentially.
+    """
+
+    def __init__(
+        self,
+        target_keys: Sequence[str] = DEFAULT_TARGET_KEYS,
+        reconstruction_key: str = "reconstruction",
+        target_from_kspace: Optional[str] = None,
+        kspace_key: str = "kspace",
+        sensitivity_map_key: str = "sensitivity_map",
+        crop_size: Optional[Tuple[int, int]] = None,
+        normalization: str = "volume",
+        clip: bool = False,
+        metrics: Sequence[str] = DEFAULT_METRICS,
+        chunk_size: int = 32,
+        num_threads: int = 0,
+    ):
+        if target_from_kspace is not None and target_from_kspace.upper() not in ("SENSE", "RSS"):
+            raise ValueError(f"Unknown coil combination method {target_from_kspace}, expected SENSE or RSS.")
+        if normalization not in ("volume", "slice", "none"):
+            raise ValueError(f"Unknown normalization {normalization}, expected volume, slice or none.")
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics {sorted(unknown)}, expected any of {list(METRICS)}.")
+
+        self.target_keys = list(target_keys)
+        self.reconstruction_key = reconstruction_key
+        self.target_from_kspace = target_from_kspace.upper() if target_from_kspace is not None else None
+        self.kspace_key = kspace_key
+        self.sensitivity_map_key = sensitivity_map_key
+        self.crop_size = tuple(crop_size) if crop_size is not None else None
+        self.normalization = normalization
+        self.clip = clip
+        self.metrics = [metric for metric in METRICS if metric in metrics]
+        self.chunk_size = chunk_size
+        self.num_threads = num_threads
+
+    def targets_cache_key(self) -> str:
+        """
+        Key of the settings the prepared targets depend on, so that targets materialized by
+        :func:`materialize_targets` are only reused with the same target source, cropping and normalization.
+
+        Returns
+        -------
+        str
+            The cache key.
+        """
+        if self.target_from_kspace is not None:
+            source = f"{self.target_from_kspace}({self.kspace_key}, {self.sensitivity_map_key})"
+        else:
+            source = str(self.target_keys)
+        settings = {
+            "source": source,
+            "crop_size": None if self.crop_size is None else list(self.crop_size),
+            "normalization": self.normalization,
+            "clip": self.clip,
+        }
+        return ";".join(f"{k}={v}" for k, v in settings.items())
+
+    def evaluation_key(self) -> str:
+        """
+        Key of the settings the metrics depend on, so that the metrics of a previous run are only resumed with the
+        same targets, reconstructions and metrics.
+
+        Returns
+        -------
+        str
+            The evaluation key.
+        """
+        return f"{self.targets_cache_key()};reconstruction_key={self.reconstruction_key};metrics={self.metrics}"
+
+
+def list_targets(targets: Union[str, Path]) -> List[Path]:
+    """
+    List the target files, from a directory or from a json file with a list of files.
+
+    Parameters
+    ----------
+    targets : Union[str, Path]
+        Directory of the target files, or json file listing them.
+
+    Returns
+    -------
+    List[Path]
+        The target files, sorted.
+    """
+    targets = Path(targets)
+    if targets.suffix == ".json":
+        with open(targets, "r") as f:
+            return sorted(Path(target) for target in json.load(f))
+    return sorted(target for target in targets.iterdir() if target.is_file())
+
+
+def target_from_kspace(
+    kspace: np.ndarray, sensitivity_maps: Optional[np.ndarray] = None, method: str = "SENSE"
+) -> torch.Tensor:
+    """
+    Compute the magnitude targets of all the slices of a volume at once, from the fully sampled k-space.
+
+    Parameters
+    ----------
+    kspace : np.ndarray
+        Complex k-space. Shape [n_slices, n_coils, n_x, n_y].
+    sensitivity_maps : np.ndarray, optional
+        Complex coil sensitivity maps, required for SENSE. Shape [n_slices, n_coils, n_x, n_y].
+    method : str
+        Coil combination method, ``"SENSE"`` or ``"RSS"``. Default is ``"SENSE"``.
+
+    Returns
+    -------
+    torch.Tensor
+        The coil combined magnitude images. Shape [n_slices, n_x, n_y].
+    """
+    kspace = torch.from_numpy(np.asarray(kspace)).to(torch.complex128)
+    imspace = fft.ifft2(torch.view_as_real(kspace), centered=True, spatial_dims=[-2, -1])
+    if method.upper() == "RSS":
+        return utils.rss_complex(imspace, dim=1)
+    if sensitivity_maps is None:
+        raise ValueError("Sensitivity maps are required to compute SENSE targets.")
+    sensitivity_maps = torch.view_as_real(torch.from_numpy(np.asarray(sensitivity_maps)).to(torch.complex128))
+    return utils.complex_abs(utils.sense(imspace, sensitivity_maps, dim=1))
+
+
+def load_target(target_file: Union[str, Path], options: EvaluationOptions) -> torch.Tensor:
+    """
+    Load the magnitude targets of a volume, opening the target file once.
+
+    Parameters
+    ----------
+    target_file : Union[str, Path]
+        Target file.
+    options : EvaluationOptions
+        Evaluation options.
+
+    Returns
+    -------
+    torch.Tensor
+        The magnitude targets. Shape [n_slices, n_x, n_y].
+    """
+    with h5py.File(target_file, "r") as hf:
+        if options.target_from_kspace is not None:
+            sensitivity_maps = None
+            if options.target_from_kspace == "SENSE":
+                sensitivity_maps = hf[options.sensitivity_map_key][()]
+            return target_from_kspace(hf[options.kspace_key][()], sensitivity_maps, options.target_from_kspace)
+
+        key = next((key for key in options.target_keys if key in hf), None)
+        if key is None:
+            raise KeyError(f"None of the datasets {options.target_keys} found in {target_file}.")
+        return _to_magnitude_slices(hf[key][()])
+
+
+def _to_magnitude_slices(data: np.ndarray) -> torch.Tensor:
+    """Convert a volume to magnitude images, flattening all but the last two dimensions into slices."""
+    data = torch.from_numpy(np.asarray(data))
+    if data.is_complex():
+        data = torch.abs(data)
+    return data.to(torch.float64).reshape(-1, *data.shape[-2:])
+
+
+def _normalize(data: torch.Tensor, normalization: str, clip: bool) -> torch.Tensor:
+    """Normalize magnitude images by their volume or slice maximum, and optionally clip them to [0, 1]."""
+    if normalization == "volume":
+        data = data / data.max()
+    elif normalization == "slice":
+        data = data / data.reshape(data.shape[0], -1).amax(1).view(-1, 1, 1)
+    if clip:
+        data = torch.clamp(data, 0, 1)
+    return data
+
+
+def _crop_size(options: EvaluationOptions, *shapes: Sequence[int]) -> Optional[Tuple[int, int]]:
+    """The crop size of the options, bounded by the in-plane size of every given shape."""
+    if options.crop_size is None:
+        return None
+    return (
+        min(options.crop_size[0], *(shape[-2] for shape in shapes)),
+        min(options.crop_size[1], *(shape[-1] for shape in shapes)),
+    )
+
+
+def _source_version(target_file: Union[str, Path]) -> str:
+    """Version of a target file, from its size and modification time, to invalidate the targets prepared from it."""
+    stat = os.stat(target_file)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def targets_cache_dir(targets_cache_root: Union[str, Path], options: EvaluationOptions) -> Path:
+    """
+    Directory of the targets materialized with the given options, so that targets prepared with different settings
+    can be cached side by side.
+
+    Parameters
+    ----------
+    targets_cache_root : Union[str, Path]
+        Root directory of the cached targets.
+    options : EvaluationOptions
+        Evaluation options.
+
+    Returns
+    -------
+    Path
+        The cache directory.
+    """
+    return Path(targets_cache_root) / hashlib.sha1(options.targets_cache_key().encode()).hexdigest()[:16]
+
+
+def _load_cached_target(
+    cache_dir: Path, target_file: Path, options: EvaluationOptions, reconstruction_shape: Sequence[int]
+) -> Optional[torch.Tensor]:
+    """Load the prepared targets of a volume from the cache, if they are up to date and need no further cropping."""
+    cache_file = cache_dir / target_file.name
+    if not cache_file.exists():
+        return None
+    with h5py.File(cache_file, "r") as cf:
+        if cf.attrs.get("targets_cache_key") != options.targets_cache_key() or cf.attrs.get(
+            "source_version"
+        ) != _source_version(target_file):
+            return None
+        target = cf["target"]
+        # the targets are cropped to the crop size bounded by their own size, a smaller reconstruction needs them anew
+        if options.crop_size is not None and _crop_size(options, target.shape, reconstruction_shape) != tuple(
+            target.shape[-2:]
+        ):
+            return None
+        return torch.from_numpy(target[()]).to(torch.float64)
+
+
+def _materialize_target(target_file: Path, cache_dir: Path, options: EvaluationOptions, overwrite: bool) -> bool:
+    """Prepare and cache the targets of a volume, unless they are already cached. Return whether they were."""
+    cache_file = cache_dir / target_file.name
+    if not overwrite and cache_file.exists():
+        with h5py.File(cache_file, "r") as cf:
+            if cf.attrs.get("targets_cache_key") == options.targets_cache_key() and cf.attrs.get(
+                "source_version"
+            ) == _source_version(target_file):
+                return False
+
+    target = load_target(target_file, options)
+    crop_size = _crop_size(options, target.shape)
+    if crop_size is not None:
+        target = utils.center_crop(target, crop_size)
+    target = _normalize(target, options.normalization, options.clip)
+
+    tmp_file = cache_file.with_name(f"{cache_file.name}.tmp")
+    with h5py.File(tmp_file, "w") as cf:
+        cf.create_dataset("target", data=target.numpy().astype(np.float32), chunks=(1, *target.shape[1:]))
+        cf.attrs["targets_cache_key"] = options.targets_cache_key()
+        cf.attrs["source_version"] = _source_version(target_file)
+    os.replace(tmp_file, cache_file)
+    return True
+
+
+def _materialize_target_worker(
+    target_file: Path, cache_dir: Path, options: EvaluationOptions, overwrite: bool
+) -> bool:
+    """Prepare and cache the targets of a volume in a worker process, with a single thread."""
+    torch.set_num_threads(1)
+    return _materialize_target(target_file, cache_dir, options, overwrite)
+
+
+def materialize_targets(
+    targets: Union[str, Path, Sequence[Union[str, Path]]],
+    targets_cache_root: Union[str, Path],
+    options: Optional[EvaluationOptions] = None,
+    num_workers: int = 0,
+    overwrite: bool = False,
+) -> Path:
+    """
+    Prepare the cropped and normalized targets of a set of volumes once, and store them per volume in a side cache,
+    to be read by :func:`evaluate` with the same ``targets_cache_root`` and options.
+
+    The cache files are stored in the :func:`targets_cache_dir` of the options, and are tagged with their
+    ``targets_cache_key`` and the size and modification time of the target file, so they are only reused with the same
+    settings and the same version of the dataset.
+
+    Parameters
+    ----------
+    targets : Union[str, Path, Sequence[Union[str, Path]]]
+        Directory of the target files, json file listing them, or list of target files.
+    targets_cache_root : Union[str, Path]
+        Root directory to store the prepared targets.
+    options : EvaluationOptions, optional
+        Evaluation options. Default is ``EvaluationOptions()``.
+    num_workers : int
+        Number of worker processes. If ``0``, the targets are prepared in the current process. Default is ``0``.
+    overwrite : bool
+        Prepare again the targets that are already cached with the same settings. Default is ``False``.
+
+    Returns
+    -------
+    Path
+        The cache directory of the options.
+    """
+    options = options if options is not None else EvaluationOptions()
+    target_files = list_targets(targets) if isinstance(targets, (str, Path)) else [Path(t) for t in targets]
+    cache_dir = targets_cache_dir(targets_cache_root, options)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    if num_workers > 0 and len(target_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(target_files))) as executor:
+            futures = {
+                executor.submit(_materialize_target_worker, target, cache_dir, options, overwrite): target
+                for target in target_files
+            }
+            done = [(futures[future], future.result()) for future in as_completed(futures)]
+    else:
+        done = [(target, _materialize_target(target, cache_dir, options, overwrite)) for target in target_files]
+
+    num_cached = sum(cached for _, cached in done)
+    logging.info(
+        f"Cached the targets of {num_cached} volumes to {cache_dir}, {len(done) - num_cached} were up to date."
+    )
+    return cache_dir
+
+
+def evaluate_volume(
+    target_file: Union[str, Path],
+    reconstruction_file: Union[str, Path],
+    options: EvaluationOptions,
+    targets_cache_root: Optional[Union[str, Path]] = None,
+) -> Tuple[str, List[Dict], Dict]:
+    """
+    Evaluate the reconstruction of a volume against its target, computing the metrics of all its slices at once.
+
+    The volume metrics are those of the whole volume, as computed by the per volume metrics of
+    :mod:`mridc.collections.reconstruction.metrics.reconstruction_metrics`: the PSNR and SSIM use the maximum of the
+    target volume as data range, the MSE and NMSE are computed over all the voxels. The HaarPSI and VSI, with the same
+    data range, are the mean of the slices.
+
+    Parameters
+    ----------
+    target_file : Union[str, Path]
+        Target file.
+    reconstruction_file : Union[str, Path]
+        Reconstruction file.
+    options : EvaluationOptions
+        Evaluation options.
+    targets_cache_root : Union[str, Path], optional
+        Root directory of the targets prepared by :func:`materialize_targets`. The targets are read from the cache if
+        they are up to date, or prepared from the target file otherwise. Default is ``None``.
+
+    Returns
+    -------
+    Tuple[str, List[Dict], Dict]
+        The volume file name, the metrics of every slice and the metrics of the volume.
+    """
+    target_file = Path(target_file)
+    fname = target_file.name
+    with h5py.File(reconstruction_file, "r") as hf:
+        reconstruction = _to_magnitude_slices(hf[options.reconstruction_key][()])
+
+    target = None
+    if targets_cache_root is not None:
+        cache_dir = targets_cache_dir(targets_cache_root, options)
+        target = _load_cached_target(cache_dir, target_file, options, reconstruction.shape)
+    if target is not None:
+        if options.crop_size is not None:
+            reconstruction = utils.center_crop(reconstruction, tuple(target.shape[-2:]))
+    else:
+        target = load_target(target_file, options)
+        crop_size = _crop_size(options, target.shape, reconstruction.shape)
+        if crop_size is not None:
+            target = utils.center_crop(target, crop_size)
+            reconstruction = utils.center_crop(reconstruction, crop_size)
+        target = _normalize(target, options.normalization, options.clip)
+
+    if target.shape != reconstruction.shape:
+        raise ValueError(
+            f"Target shape {tuple(target.shape)} does not match reconstruction shape {tuple(reconstruction.shape)} "
+            f"of {fname}. Set a crop size to compare their centers."
+        )
+    reconstruction = _normalize(reconstruction, options.normalization, options.clip)
+    maxval = target.max()
+
+    slice_metrics: Dict[str, torch.Tensor] = {}
+    volume_metrics: Dict[str, float] = {}
+    if "MSE" in options.metrics or "PSNR" in options.metrics:
+        mse = batched_mse(target, reconstruction)
+        volume_mse = mse.mean()
+        if "MSE" in options.metrics:
+            slice_metrics["MSE"], volume_metrics["MSE"] = mse, volume_mse.item()
+        if "PSNR" in options.metrics:
+            slice_metrics["PSNR"] = batched_psnr(target, reconstruction, maxval=maxval)
+            volume_metrics["PSNR"] = (10 * torch.log10(maxval**2 / volume_mse)).item()
+    if "NMSE" in options.metrics:
+        slice_metrics["NMSE"] = batched_nmse(target, reconstruction)
+        volume_metrics["NMSE"] = (torch.sum((target - reconstruction) ** 2) / torch.sum(target**2)).item()
+    if "SSIM" in options.metrics:
+        slice_metrics["SSIM"] = batched_ssim(target, reconstruction, maxval=maxval)
+        volume_metrics["SSIM"] = slice_metrics["SSIM"].mean().item()
+    for name, metric in (("HaarPSI", batched_haarpsi), ("VSI", batched_vsi)):
+        if name in options.metrics:
+            slice_metrics[name] = metric(
+                target,
+                reconstruction,
+                maxval=maxval,
+                chunk_size=options.chunk_size,
+                num_threads=options.num_threads,
+            )
+            volume_metrics[name] = slice_metrics[name].mean().item()
+
+    slice_rows = [
+        {"fname": fname, "slice": slice_num, **{m: slice_metrics[m][slice_num].item() for m in options.metrics}}
+        for slice_num in range(target.shape[0])
+    ]
+    volume_row = {"fname": fname, "num_slices": target.shape[0], **{m: volume_metrics[m] for m in options.metrics}}
+    return fname, slice_rows, volume_row
+
+
+def _evaluate_volume_worker(
+    target_file: Path,
+    reconstruction_file: Path,
+    options: EvaluationOptions,
+    targets_cache_root: Optional[Union[str, Path]] = None,
+) -> Tuple[str, List[Dict], Dict]:
+    """Evaluate a volume in a worker process, with a single thread to not oversubscribe the cores."""
+    torch.set_num_threads(1)
+    return evaluate_volume(target_file, reconstruction_file, options, targets_cache_root)
+
+
+class _RecordWriter:
+    """Appends records to a csv or json lines file, flushing after every volume so that runs can be resumed."""
+
+    def __init__(self, path: Path, fields: List[str], output_format: str, keep: Optional[Set[str]] = None):
+        self.path = path
+        self.fields = fields
+        self.output_format = output_format
+
+        # keep the records of the completed volumes only, dropping those of a volume interrupted halfway
+        records = [
+            record for record in _read_records(path, output_format) if keep is not None and record["fname"] in keep
+        ]
+        self.file = open(path, "w", newline="")  # noqa: R1732
+        if output_format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=fields)
+            self.writer.writeheader()
+        self.write(records)
+
+    def write(self, records: List[Dict]):
+        """Append records and flush them to disk."""
+        for record in records:
+            if self.output_format == "csv":
+                self.writer.writerow({field: record.get(field) for field in self.fields})
+            else:
+                self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+
+def _read_records(path: Path, output_format: str) -> List[Dict]:
+    """Read the records of a csv or json lines file, if it exists."""
+    if not path.exists():
+        return []
+    with open(path, "r", newline="") as f:
+        if output_format == "csv":
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _summarize(volume_rows: List[Dict], metrics: Sequence[str]) -> Dict[str, Dict[str, float]]:
+    """Compute the mean and standard deviation of every metric across volumes."""
+    summary = {}
+    for metric in metrics:
+        values = np.array([float(row[metric]) for row in volume_rows], dtype=np.float64)
+        summary[metric] = {
+            "mean": float(values.mean()) if values.size else math.nan,
+            "std": float(values.std(ddof=1)) if values.size > 1 else 0.0,
+        }
+    return summary
+
+
+def evaluate(
+    targets: Union[str, Path, Sequence[Union[str, Path]]],
+    reconstructions_dir: Union[str, Path],
+    output_dir: Union[str, Path],
+    options: Optional[EvaluationOptions] = None,
+    num_workers: int = 0,
+    output_format: str = "csv",
+    resume: bool = True,
+    targets_cache_root: Optional[Union[str, Path]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Evaluate the reconstructions of a set of volumes against their targets, in parallel processes.
+
+    Every volume is evaluated as a whole by a worker process. As volumes complete, their per slice and per volume
+    metrics are appended to ``slices.{csv,jsonl}`` and ``volumes.{csv,jsonl}`` in the output directory, so that an
+    interrupted run can be resumed, skipping the volumes already evaluated with the same options. Targets without a
+    reconstruction are skipped. The mean and standard deviation of every
+    metric across volumes are written to ``summary.json``.
+
+    Parameters
+    ----------
+    targets : Union[str, Path, Sequence[Union[str, Path]]]
+        Directory of the target files, json file listing them, or list of target files.
+    reconstructions_dir : Union[str, Path]
+        Directory of the reconstruction files, with the same file names as the targets.
+    output_dir : Union[str, Path]
+        Directory to write the metrics to.
+    options : EvaluationOptions, optional
+        Evaluation options. Default is ``EvaluationOptions()``.
+    num_workers : int
+        Number of worker processes. If ``0``, the volumes are evaluated in the current process. Default is ``0``.
+    output_format : str
+        Format of the metrics files, ``"csv"`` or ``"json"`` for json lines. Default is ``"csv"``.
+    resume : bool
+        Skip the volumes already evaluated in the output directory, if they were evaluated with the same options.
+        Default is ``True``.
+    targets_cache_root : Union[str, Path], optional
+        Root directory of the targets prepared by :func:`materialize_targets`, to read them from instead of preparing
+        them from the target files. Default is ``None``.
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        The mean and standard deviation of every metric across volumes.
+    """
+    if output_format not in ("csv", "json"):
+        raise ValueError(f"Unknown output format {output_format}, expected csv or json.")
+    options = options if options is not None else EvaluationOptions()
+    target_files = list_targets(targets) if isinstance(targets, (str, Path)) else [Path(t) for t in targets]
+    reconstructions_dir = Path(reconstructions_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    extension = "csv" if output_format == "csv" else "jsonl"
+    volumes_file = output_dir / f"volumes.{extension}"
+    slices_file = output_dir / f"slices.{extension}"
+
+    # the metrics of a previous run are resumed only if they were computed with the same options
+    key_file = output_dir / "evaluation_key.txt"
+    volume_rows = _read_records(volumes_file, output_format) if resume else []
+    if volume_rows and (not key_file.exists() or key_file.read_text() != options.evaluation_key()):
+        logging.warning(f"The metrics in {output_dir} were computed with other options, evaluating all volumes again.")
+        volume_rows = []
+    key_file.write_text(options.evaluation_key())
+
+    done = {row["fname"] for row in volume_rows}
+    pending = [target for target in target_files if target.name not in done]
+    if done:
+        logging.info(f"Skipping {len(target_files) - len(pending)} volumes already evaluated in {output_dir}.")
+
+    missing = [target.name for target in pending if not (reconstructions_dir / target.name).exists()]
+    if missing:
+        logging.warning(
+            f"Skipping {len(missing)} volumes without a reconstruction in {reconstructions_dir}: {missing}"
+        )
+        pending = [target for target in pending if target.name not in missing]
+
+    volume_writer = _RecordWriter(volumes_file, ["fname", "num_slices", *options.metrics], output_format, done)
+    slice_writer = _RecordWriter(slices_file, ["fname", "slice", *options.metrics], output_format, done)
+    try:
+        if num_workers > 0 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(num_workers, len(pending))) as executor:
+                futures = [
+                    executor.submit(
+                        _evaluate_volume_worker, target, reconstructions_dir / target.name, options, targets_cache_root
+                    )
+                    for target in pending
+                ]
+                results = (future.result() for future in as_completed(futures))
+                volume_rows += _write_results(results, slice_writer, volume_writer)
+        else:
+            results = (
+                evaluate_volume(target, reconstructions_dir / target.name, options, targets_cache_root)
+                for target in pending
+            )
+            volume_rows += _write_results(results, slice_writer, volume_writer)
+    finally:
+        slice_writer.close()
+        volume_writer.close()
+
+    summary = _summarize(volume_rows, options.metrics)
+    with open(output_dir / "summary.json", "w") as f:
+        json.dump({"num_volumes": len(volume_rows), "metrics": summary}, f, indent=4)
+    return summary
+
+
+def _write_results(results, slice_writer: _RecordWriter, volume_writer: _RecordWriter) -> List[Dict]:
+    """Write the metrics of every volume as it completes, the slices first so that a volume row marks it done."""
+    volume_rows = []
+    for fname, slice_rows, volume_row in results:
+        slice_writer.write(slice_rows)
+        volume_writer.write([volume_row])
+        volume_rows.append(volume_row)
+        logging.info(f"Evaluated {fname}.")
+    return volume_rows
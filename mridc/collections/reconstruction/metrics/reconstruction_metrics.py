@@ -3,7 +3,12 @@ __author__ = "Dimitrios Karkalousos"
 
 # Parts of the code have been taken from https://github.com/facebookresearch/fastMRI
 
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, Union
+
 import numpy as np
+import torch
+import torch.nn.functional as F
 from runstats import Statistics
 from skimage.metrics import peak_signal_noise_ratio, structural_similarity
 
@@ -157,6 +162,438 @@ def ssim(x: np.ndarray, y: np.ndarray, maxval: np.ndarray = None) -> float:
     return ssim_score / x.shape[0]
 
 
+def batched_mse(x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
+    """
+    Compute the Mean Squared Error (MSE) of every element of a batch, on the device of the inputs.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        Target images. The first dimension is the batch dimension.
+    y : torch.Tensor
+        Predicted images. The first dimension is the batch dimension.
+
+    Returns
+    -------
+    torch.Tensor
+        Mean Squared Error of every element of the batch. Shape [batch_size].
+
+    Examples
+    --------
+    >>> from mridc.collections.reconstruction.metrics.reconstruction_metrics import batched_mse
+    >>> import torch
+    >>> batched_mse(torch.zeros(2, 1, 4, 4), torch.ones(2, 1, 4, 4))
+    tensor([1., 1.])
+    """
+    return torch.mean((x - y).reshape(x.shape[0], -1) ** 2, dim=1)
+
+
+def batched_nmse(x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
+    """
+    Compute the Normalized Mean Squared Error (NMSE) of every element of a batch, on the device of the inputs.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        Target images. The first dimension is the batch dimension.
+    y : torch.Tensor
+        Predicted images. The first dimension is the batch dimension.
+
+    Returns
+    -------
+    torch.Tensor
+        Normalized Mean Squared Error of every element of the batch. Shape [batch_size].
+
+    Examples
+    --------
+    >>> from mridc.collections.reconstruction.metrics.reconstruction_metrics import batched_nmse
+    >>> import torch
+    >>> batched_nmse(torch.ones(2, 1, 4, 4), torch.zeros(2, 1, 4, 4))
+    tensor([1., 1.])
+    """
+    x, y = x.reshape(x.shape[0], -1), y.reshape(y.shape[0], -1)
+    return torch.sum((x - y) ** 2, dim=1) / torch.sum(x**2, dim=1)
+
+
+def batched_psnr(
+    x: torch.Tensor, y: torch.Tensor, maxval: Optional[Union[torch.Tensor, float]] = None
+) -> torch.Tensor:
+    """
+    Compute the Peak Signal to Noise Ratio (PSNR) of every element of a batch, on the device of the inputs.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        Target images. The first dimension is the batch dimension.
+    y : torch.Tensor
+        Predicted images. The first dimension is the batch dimension.
+    maxval : Union[torch.Tensor, float], optional
+        Data range of every element of the batch, of shape [batch_size], or of all of them. If None, the maximum
+        value of every target is used.
+
+    Returns
+    -------
+    torch.Tensor
+        Peak Signal to Noise Ratio of every element of the batch. Shape [batch_size].
+
+    Examples
+    --------
+    >>> from mridc.collections.reconstruction.metrics.reconstruction_metrics import batched_psnr
+    >>> import torch
+    >>> batched_psnr(torch.ones(2, 1, 4, 4), torch.ones(2, 1, 4, 4) * 0.9, maxval=1.0)
+    tensor([20.0000, 20.0000])
+
+    .. note::
+        Matches the scikit-image implementation of the PSNR metric, computed for every element of the batch.
+    """
+    if maxval is None:
+        maxval = x.reshape(x.shape[0], -1).amax(dim=1)
+    maxval = torch.as_tensor(maxval, dtype=x.dtype, device=x.device)
+    return 10 * torch.log10(maxval**2 / batched_mse(x, y))
+
+
+def batched_ssim(
+    x: torch.Tensor,
+    y: torch.Tensor,
+    maxval: Optional[Union[torch.Tensor, float]] = None,
+    win_size: int = 7,
+    gaussian_weights: bool = False,
+    sigma: float = 1.5,
+    use_sample_covariance: bool = True,
+    K1: float = 0.01,
+    K2: float = 0.03,
+) -> torch.Tensor:
+    """
+    Compute the Structural Similarity Index Measure (SSIM) of every element of a batch, on the device of the inputs.
+
+    The local statistics of all the slices of the batch are computed with a single separable convolution, cropped
+    to the windows that do not cross the image borders, as scikit-image does.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        Target images. Shape [batch_size, n_x, n_y] or [batch_size, n_slices, n_x, n_y]. The SSIM of an element of
+        the batch is the mean SSIM of its slices.
+    y : torch.Tensor
+        Predicted images. Same shape as the target images.
+    maxval : Union[torch.Tensor, float], optional
+        Data range of every element of the batch, of shape [batch_size], or of all of them. If None, the maximum
+        value of every target is used.
+    win_size : int
+        Side length of the uniform sliding window. Ignored if ``gaussian_weights`` is True. Default is ``7``.
+    gaussian_weights : bool
+        Weight the window with a Gaussian kernel of standard deviation ``sigma``, truncated at 3.5 standard
+        deviations. Default is ``False``.
+    sigma : float
+        Standard deviation of the Gaussian kernel. Default is ``1.5``.
+    use_sample_covariance : bool
+        Normalize the covariances by N-1 instead of N, where N is the number of pixels of the window. Default is
+        ``True``.
+    K1 : float
+        Constant of the luminance term. Default is ``0.01``.
+    K2 : float
+        Constant of the contrast term. Default is ``0.03``.
+
+    Returns
+    -------
+    torch.Tensor
+        Structural Similarity Index Measure of every element of the batch. Shape [batch_size].
+
+    Examples
+    --------
+    >>> from mridc.collections.reconstruction.metrics.reconstruction_metrics import batched_ssim
+    >>> import torch
+    >>> x = torch.rand(2, 1, 32, 32)
+    >>> batched_ssim(x, x, maxval=1.0)
+    tensor([1., 1.])
+
+    .. note::
+        Matches the scikit-image implementation of the SSIM metric, computed for every slice of the batch.
+        Source: https://scikit-image.org/docs/dev/api/skimage.metrics.html#skimage.metrics.structural_similarity
+    """
+    if x.shape != y.shape:
+        raise ValueError("Ground truth dimensions does not match prediction dimensions.")
+    if x.dim() not in (3, 4):
+        raise ValueError("Unexpected number of dimensions in ground truth.")
+
+    batch_size = x.shape[0]
+    x = x.reshape(-1, 1, *x.shape[-2:])
+    y = y.reshape(-1, 1, *y.shape[-2:])
+    num_slices = x.shape[0] // batch_size
+
+    if maxval is None:
+        maxval = x.reshape(batch_size, -1).amax(dim=1)
+    maxval = torch.as_tensor(maxval, dtype=x.dtype, device=x.device).expand(batch_size)
+    maxval = maxval.repeat_interleave(num_slices).view(-1, 1, 1, 1)
+
+    if gaussian_weights:
+        radius = int(3.5 * sigma + 0.5)
+        win_size = 2 * radius + 1
+        kernel = torch.exp(-0.5 * (torch.arange(-radius, radius + 1, dtype=x.dtype, device=x.device) / sigma) ** 2)
+    else:
+        kernel = torch.ones(win_size, dtype=x.dtype, device=x.device)
+    kernel = kernel / kernel.sum()
+    if min(x.shape[-2:]) < win_size:
+        raise ValueError("The images must be at least as large as the window.")
+
+    # local means of x, y, x^2, y^2 and xy, as channels of a single separable "valid" convolution
+    stats = torch.cat([x, y, x * x, y * y, x * y], dim=1)
+    stats = F.conv2d(stats, kernel.view(1, 1, -1, 1).expand(5, 1, -1, 1), groups=5)
+    stats = F.conv2d(stats, kernel.view(1, 1, 1, -1).expand(5, 1, 1, -1), groups=5)
+    ux, uy, uxx, uyy, uxy = stats.split(1, dim=1)
+
+    cov_norm = win_size**2 / (win_size**2 - 1) if use_sample_covariance else 1.0
+    vx = cov_norm * (uxx - ux * ux)
+    vy = cov_norm * (uyy - uy * uy)
+    vxy = cov_norm * (uxy - ux * uy)
+
+    C1 = (K1 * maxval) ** 2
+    C2 = (K2 * maxval) ** 2
+    S = ((2 * ux * uy + C1) * (2 * vxy + C2)) / ((ux**2 + uy**2 + C1) * (vx + vy + C2))
+
+    return S.reshape(batch_size, -1).mean(dim=1)
+
+
+def batched_metrics(x: torch.Tensor, y: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Compute the MSE, NMSE, SSIM and PSNR of every element of a batch at once, on the device of the inputs. The SSIM
+    and PSNR use the range of every predicted element as data range.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        Target images. Shape [batch_size, n_x, n_y] or [batch_size, n_slices, n_x, n_y].
+    y : torch.Tensor
+        Predicted images. Same shape as the target images.
+
+    Returns
+    -------
+    Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]
+        The MSE, NMSE, SSIM and PSNR of every element of the batch. Each of shape [batch_size].
+
+    Examples
+    --------
+    >>> from mridc.collections.reconstruction.metrics.reconstruction_metrics import batched_metrics
+    >>> import torch
+    >>> x = torch.rand(2, 1, 32, 32)
+    >>> mse, nmse, ssim, psnr = batched_metrics(x, x * 0.5)
+    >>> ssim.shape
+    torch.Size([2])
+    """
+    y_flat = y.reshape(y.shape[0], -1)
+    maxval = y_flat.amax(dim=1) - y_flat.amin(dim=1)
+    return (
+        batched_mse(x, y),
+        batched_nmse(x, y),
+        batched_ssim(x, y, maxval=maxval),
+        batched_psnr(x, y, maxval=maxval),
+    )
+
+
+def _batched_piq_metric(
+    metric: Callable,
+    x: torch.Tensor,
+    y: torch.Tensor,
+    maxval: Optional[Union[torch.Tensor, float]] = None,
+    chunk_size: int = 32,
+    num_threads: int = 0,
+    **kwargs,
+) -> torch.Tensor:
+    """
+    Compute a piq metric of every element of a batch, on chunks of slices of shape [chunk_size, 1, n_x, n_y].
+
+    Every slice is scaled by the data range of its element and clipped to [0, 1], as piq requires, so that the chunks
+    can mix the slices of elements with different data ranges.
+    """
+    if x.shape != y.shape:
+        raise ValueError("Ground truth dimensions does not match prediction dimensions.")
+    if x.dim() not in (3, 4):
+        raise ValueError("Unexpected number of dimensions in ground truth.")
+
+    batch_size = x.shape[0]
+    x = x.reshape(-1, 1, *x.shape[-2:])
+    y = y.reshape(-1, 1, *y.shape[-2:])
+    num_slices = x.shape[0] // batch_size
+
+    if maxval is None:
+        maxval = x.reshape(batch_size, -1).amax(dim=1)
+    maxval = torch.as_tensor(maxval, dtype=x.dtype, device=x.device).expand(batch_size)
+    maxval = maxval.repeat_interleave(num_slices).view(-1, 1, 1, 1)
+    x = torch.clamp(x / maxval, 0, 1)
+    y = torch.clamp(y / maxval, 0, 1)
+
+    chunk_size = chunk_size if chunk_size > 0 else x.shape[0]
+
+    def _metric(start: int) -> torch.Tensor:
+        with torch.no_grad():
+            return metric(
+                x[start : start + chunk_size],
+                y[start : start + chunk_size],
+                reduction="none",
+                data_range=1.0,
+                **kwargs,
+            )
+
+    starts = range(0, x.shape[0], chunk_size)
+    if num_threads > 0 and len(starts) > 1:
+        # the convolutions of piq release the GIL, so the chunks run in parallel
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            values = list(executor.map(_metric, starts))
+    else:
+        values = [_metric(start) for start in starts]
+    return torch.cat(values).reshape(batch_size, -1).mean(dim=1)
+
+
+def batched_haarpsi(
+    x: torch.Tensor,
+    y: torch.Tensor,
+    maxval: Optional[Union[torch.Tensor, float]] = None,
+    chunk_size: int = 32,
+    num_threads: int = 0,
+    scales: int = 3,
+    subsample: bool = True,
+    c: float = 30.0,
+    alpha: float = 4.2,
+) -> torch.Tensor:
+    """
+    Compute the Haar Wavelet-Based Perceptual Similarity Index (HaarPSI) of every element of a batch, on the device
+    of the inputs.
+
+    The slices of the batch are processed by ``piq.haarpsi`` in chunks, instead of one at a time.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        Target images. Shape [batch_size, n_x, n_y] or [batch_size, n_slices, n_x, n_y]. The HaarPSI of an element
+        of the batch is the mean HaarPSI of its slices, so a volume of shape [n_slices, n_x, n_y] gives the HaarPSI of
+        every slice.
+    y : torch.Tensor
+        Predicted images. Same shape as the target images.
+    maxval : Union[torch.Tensor, float], optional
+        Data range of every element of the batch, of shape [batch_size], or of all of them. If None, the maximum
+        value of every target is used. Values outside of the data range are clipped.
+    chunk_size : int
+        Number of slices per call of ``piq.haarpsi``. If ``0``, all slices are processed at once. Default is ``32``.
+    num_threads : int
+        Number of threads to process the chunks with. If ``0``, the chunks are processed sequentially. Default is
+        ``0``.
+    scales : int
+        Number of Haar wavelets used for the image decomposition. Default is ``3``.
+    subsample : bool
+        Average pool the images before computing the HaarPSI. Default is ``True``.
+    c : float
+        Constant of the similarity maps. Default is ``30.0``.
+    alpha : float
+        Exponent of the weighting of the similarity maps. Default is ``4.2``.
+
+    Returns
+    -------
+    torch.Tensor
+        HaarPSI of every element of the batch. Shape [batch_size].
+
+    Examples
+    --------
+    >>> from mridc.collections.reconstruction.metrics.reconstruction_metrics import batched_haarpsi
+    >>> import torch
+    >>> x = torch.rand(4, 32, 32)
+    >>> batched_haarpsi(x, x, maxval=1.0, chunk_size=2)
+    tensor([1., 1., 1., 1.])
+
+    .. note::
+        Matches ``piq.haarpsi`` computed for every slice of the batch.
+        Source: https://github.com/photosynthesis-team/piq
+    """
+    # piq is an optional dependency, imported only by the perceptual metrics
+    from piq import haarpsi
+
+    return _batched_piq_metric(
+        haarpsi, x, y, maxval, chunk_size, num_threads, scales=scales, subsample=subsample, c=c, alpha=alpha
+    )
+
+
+def batched_vsi(
+    x: torch.Tensor,
+    y: torch.Tensor,
+    maxval: Optional[Union[torch.Tensor, float]] = None,
+    chunk_size: int = 32,
+    num_threads: int = 0,
+    c1: float = 1.27,
+    c2: float = 386.0,
+    c3: float = 130.0,
+    alpha: float = 0.4,
+    beta: float = 0.02,
+    omega_0: float = 0.021,
+    sigma_f: float = 1.34,
+    sigma_d: float = 145.0,
+    sigma_c: float = 0.001,
+) -> torch.Tensor:
+    """
+    Compute the Visual Saliency-induced Index (VSI) of every element of a batch, on the device of the inputs.
+
+    The slices of the batch are processed by ``piq.vsi`` in chunks, instead of one at a time.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        Target images. Shape [batch_size, n_x, n_y] or [batch_size, n_slices, n_x, n_y]. The VSI of an element of the
+        batch is the mean VSI of its slices, so a volume of shape [n_slices, n_x, n_y] gives the VSI of every slice.
+    y : torch.Tensor
+        Predicted images. Same shape as the target images.
+    maxval : Union[torch.Tensor, float], optional
+        Data range of every element of the batch, of shape [batch_size], or of all of them. If None, the maximum
+        value of every target is used. Values outside of the data range are clipped.
+    chunk_size : int
+        Number of slices per call of ``piq.vsi``. If ``0``, all slices are processed at once. Default is ``32``.
+    num_threads : int
+        Number of threads to process the chunks with. If ``0``, the chunks are processed sequentially. Default is
+        ``0``.
+    c1, c2, c3 : float
+        Coefficients of the saliency, gradient and color components. Default is ``1.27``, ``386.0`` and ``130.0``.
+    alpha, beta : float
+        Powers of the gradient and color components. Default is ``0.4`` and ``0.02``.
+    omega_0, sigma_f : float
+        Coefficients of the log Gabor filter of the saliency detection. Default is ``0.021`` and ``1.34``.
+    sigma_d, sigma_c : float
+        Coefficients of the saliency detection. Default is ``145.0`` and ``0.001``.
+
+    Returns
+    -------
+    torch.Tensor
+        VSI of every element of the batch. Shape [batch_size].
+
+    Examples
+    --------
+    >>> from mridc.collections.reconstruction.metrics.reconstruction_metrics import batched_vsi
+    >>> import torch
+    >>> x = torch.rand(4, 32, 32)
+    >>> batched_vsi(x, x, maxval=1.0, chunk_size=2)
+    tensor([1., 1., 1., 1.])
+
+    .. note::
+        Matches ``piq.vsi`` computed for every slice of the batch.
+        Source: https://github.com/photosynthesis-team/piq
+    """
+    from piq import vsi
+
+    return _batched_piq_metric(
+        vsi,
+        x,
+        y,
+        maxval,
+        chunk_size,
+        num_threads,
+        c1=c1,
+        c2=c2,
+        c3=c3,
+        alpha=alpha,
+        beta=beta,
+        omega_0=omega_0,
+        sigma_f=sigma_f,
+        sigma_d=sigma_d,
+        sigma_c=sigma_c,
+    )
+
+
 METRIC_FUNCS = {"MSE": mse, "NMSE": nmse, "PSNR": psnr, "SSIM": ssim}
 
 
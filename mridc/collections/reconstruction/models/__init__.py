@@ -1,19 +1,26 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.reconstruction.models.base import BaseMRIReconstructionModel, BaseSensitivityModel
-from mridc.collections.reconstruction.models.ccnn import CascadeNet
-from mridc.collections.reconstruction.models.cirim import CIRIM
-from mridc.collections.reconstruction.models.crnn import CRNNet
-from mridc.collections.reconstruction.models.dunet import DUNet
-from mridc.collections.reconstruction.models.jointicnet import JointICNet
-from mridc.collections.reconstruction.models.kikinet import KIKINet
-from mridc.collections.reconstruction.models.lpd import LPDNet
-from mridc.collections.reconstruction.models.multidomainnet import MultiDomainNet
-from mridc.collections.reconstruction.models.pics import PICS
-from mridc.collections.reconstruction.models.rvn import RecurrentVarNet
-from mridc.collections.reconstruction.models.unet import UNet
-from mridc.collections.reconstruction.models.vn import VarNet
-from mridc.collections.reconstruction.models.vsnet import VSNet
-from mridc.collections.reconstruction.models.xpdnet import XPDNet
-from mridc.collections.reconstruction.models.zf import ZF
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "base": ["BaseMRIReconstructionModel", "BaseSensitivityModel"],
+        "ccnn": ["CascadeNet"],
+        "cirim": ["CIRIM"],
+        "crnn": ["CRNNet"],
+        "dunet": ["DUNet"],
+        "jointicnet": ["JointICNet"],
+        "kikinet": ["KIKINet"],
+        "lpd": ["LPDNet"],
+        "multidomainnet": ["MultiDomainNet"],
+        "pics": ["PICS"],
+        "rvn": ["RecurrentVarNet"],
+        "unet": ["UNet"],
+        "vn": ["VarNet"],
+        "vsnet": ["VSNet"],
+        "xpdnet": ["XPDNet"],
+        "zf": ["ZF"],
+    },
+)
@@ -5,9 +5,8 @@ import os
 from abc import ABC
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, Optional, Sequence, Tuple
+from typing import Callable, Dict, Optional, Sequence, Tuple
 
-import h5py
 import numpy as np
 import torch
 import wandb
@@ -17,9 +16,11 @@ from torch import nn
 from torch.utils.data import DataLoader
 from torchmetrics.metric import Metric
 
+import mridc.collections.common.data.samplers as samplers
 import mridc.collections.common.metrics.reconstruction_metrics as reconstruction_metrics
 import mridc.collections.common.parts.fft as fft
 import mridc.collections.common.parts.utils as utils
+import mridc.collections.common.parts.writers as writers
 import mridc.collections.reconstruction.data.mri_data as mri_data
 import mridc.collections.reconstruction.data.subsample as subsample
 import mridc.collections.reconstruction.models.unet_base.unet_block as unet_block
@@ -107,6 +108,11 @@ class BaseMRIReconstructionModel(modelPT.ModelPT, ABC):
 
         self.log_images = cfg_dict.get("log_images", True)
 
+        # test predictions are streamed to one file per volume, optionally compressed
+        self.test_predictions_compression = cfg_dict.get("test_predictions_compression", None)
+        self.test_predictions_compression_opts = cfg_dict.get("test_predictions_compression_opts", None)
+        self.test_writer: Optional[writers.VolumeWriter] = None
+
     def process_loss(self, target, pred, _loss_fn, mask=None):
         """
         Processes the loss.
@@ -529,7 +535,7 @@ class BaseMRIReconstructionModel(modelPT.ModelPT, ABC):
 
         Returns
         -------
-        Saves the reconstructed images to .h5 files.
+        Logs the metrics. The reconstructed images are saved to .h5 files by the test writer.
         """
         # Log metrics.
         # Taken from: https://github.com/facebookresearch/fastMRI/blob/main/fastmri/pl_modules/mri_module.py
@@ -573,18 +579,68 @@ class BaseMRIReconstructionModel(modelPT.ModelPT, ABC):
         for metric, value in metrics.items():
             self.log(f"{metric}", value / tot_examples)
 
-        reconstructions = defaultdict(list)
-        for fname, slice_num, output in outputs:
-            reconstructions[fname].append((slice_num, output))
+    def test_predictions(self, outputs: Tuple[str, int, np.ndarray]) -> Tuple[str, int, Dict[str, np.ndarray]]:
+        """
+        Splits the outputs of a test step into the predictions to save, by dataset name.
+
+        Parameters
+        ----------
+        outputs: Outputs of a test step.
+            tuple of (file name, slice number, prediction)
 
-        for fname in reconstructions:
-            reconstructions[fname] = np.stack([out for _, out in sorted(reconstructions[fname])])  # type: ignore
+        Returns
+        -------
+        The file name, the slice number and the predictions to save, by dataset name.
+        """
+        fname, slice_num, prediction = outputs
+        return fname, slice_num, {"reconstruction": prediction}
+
+    def test_predictions_postprocess(self) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+        """Function applied to every predicted volume, sorted by slice, before saving it. None by default."""
+        return None
+
+    def test_predictions_dir(self) -> Path:
+        """Directory to save the test predictions to."""
+        return Path(os.path.join(self.logger.log_dir, "reconstructions"))
+
+    def on_test_start(self):
+        """Starts streaming the test predictions to one file per volume."""
+        super().on_test_start()
+        self.test_writer = writers.VolumeWriter(
+            self.test_predictions_dir(),
+            writers.VolumeWriter.slices_per_volume(self.trainer.test_dataloaders),
+            postprocess=self.test_predictions_postprocess(),
+            compression=self.test_predictions_compression,
+            compression_opts=self.test_predictions_compression_opts,
+        )
 
-        out_dir = Path(os.path.join(self.logger.log_dir, "reconstructions"))
-        out_dir.mkdir(exist_ok=True, parents=True)
-        for fname, recons in reconstructions.items():
-            with h5py.File(out_dir / fname, "w") as hf:
-                hf.create_dataset("reconstruction", data=recons)
+    def test_step_end(self, outputs: Tuple[str, int, np.ndarray]):  # noqa: W0221
+        """
+        Streams the predictions of a test step to the writer, so they are not kept in memory until the end of the
+        test epoch.
+
+        Parameters
+        ----------
+        outputs: Outputs of the test step.
+            tuple of (file name, slice number, prediction)
+
+        Returns
+        -------
+        The file name and the slice number of the test step.
+        """
+        if self.test_writer is None:
+            return outputs
+        fname, slice_num, predictions = self.test_predictions(outputs)
+        self.test_writer.write(fname, slice_num, predictions)
+        # only the slice is kept for test_epoch_end, returning None would keep the outputs of the test step
+        return fname, slice_num
+
+    def on_test_epoch_end(self):
+        """Writes the remaining test predictions, and waits for all of them to be saved."""
+        super().on_test_epoch_end()
+        if self.test_writer is not None:
+            test_writer, self.test_writer = self.test_writer, None
+            test_writer.close()
 
     def setup_training_data(self, train_data_config: Optional[DictConfig]):
         """
@@ -700,7 +756,8 @@ class BaseMRIReconstructionModel(modelPT.ModelPT, ABC):
         if cfg.shuffle:
             sampler = torch.utils.data.RandomSampler(dataset)
         else:
-            sampler = torch.utils.data.SequentialSampler(dataset)
+            # whole volumes per process, so that every process can save the volumes it predicts
+            sampler = samplers.DistributedVolumeSampler(dataset)
 
         return torch.utils.data.DataLoader(
             dataset=dataset,
@@ -14,12 +14,6 @@ import mridc.collections.common.parts.utils as utils
 import mridc.collections.reconstruction.models.base as base_models
 import mridc.core.classes.common as common_classes
 
-try:
-    import bart
-except:
-    pass
-
-
 __all__ = ["PICS"]
 
 
@@ -97,6 +91,8 @@ class PICS(base_models.BaseMRIReconstructionModel, ABC):
         pred: torch.Tensor, shape [batch_size, n_x, n_y, 2]
             Predicted data.
         """
+        import bart  # optional dependency, imported on use
+
         if "cuda" in str(self._device):
             pred = bart.bart(1, f"pics -d0 -g -S -R W:7:0:{self.reg_wt} -i {self.num_iters}", y, sensitivity_maps)[0]
         else:
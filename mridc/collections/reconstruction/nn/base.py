@@ -1,23 +1,23 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-import os
 from abc import ABC
-from collections import defaultdict
-from pathlib import Path
-from typing import Dict, Tuple, Union
+from functools import partial
+from typing import Any, Callable, Dict, Sequence, Tuple, Union
 
-import h5py
 import numpy as np
 import torch
 from omegaconf import DictConfig, OmegaConf
 from pytorch_lightning import Trainer
 from torch.nn import L1Loss, MSELoss
+from torch.utils.checkpoint import checkpoint
 from torch.utils.data import DataLoader
 
 import mridc.collections.reconstruction.losses as reconstruction_losses
 from mridc.collections.common.data import subsample
-from mridc.collections.common.nn.base import BaseMRIModel, BaseSensitivityModel, DistributedMetricSum
+from mridc.collections.common.data.samplers import DistributedVolumeSampler
+from mridc.collections.common.metrics.volume_metrics import VolumeMetricsAccumulator
+from mridc.collections.common.nn.base import BaseMRIModel, BaseSensitivityModel
 from mridc.collections.common.parts import fft, utils
 from mridc.collections.reconstruction.data import mri_reconstruction_loader
 from mridc.collections.reconstruction.metrics import reconstruction_metrics
@@ -49,6 +49,8 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         self.coil_dim = cfg_dict.get("coil_dim", 1)
 
         self.coil_combination_method = cfg_dict.get("coil_combination_method", "SENSE")
+        # Maximum number of coil images per forward pass of per-coil networks. If None, all coils are forwarded at once.
+        self.coil_chunk_size = cfg_dict.get("coil_chunk_size", None)
 
         self.ssdu = cfg_dict.get("ssdu", False)
         self.n2r = cfg_dict.get("n2r", False)
@@ -66,6 +68,7 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
                 mask_type=cfg_dict.get("sens_mask_type", "2D"),
                 normalize=cfg_dict.get("sens_normalize", True),
                 mask_center=cfg_dict.get("sens_mask_center", True),
+                coil_chunk_size=self.coil_chunk_size,
             )
 
         if cfg_dict.get("loss_fn") == "ssim":
@@ -92,17 +95,56 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
 
         self.accumulate_predictions = cfg_dict.get("accumulate_predictions", False)
 
-        self.MSE = DistributedMetricSum()
-        self.NMSE = DistributedMetricSum()
-        self.SSIM = DistributedMetricSum()
-        self.PSNR = DistributedMetricSum()
-        self.TotExamples = DistributedMetricSum()
+        # Activation checkpointing of the cascades/unrolled iterations, to trade compute for memory when training.
+        self.use_activation_checkpointing = cfg_dict.get("use_activation_checkpointing", False)
+        self.activation_checkpointing_interval = cfg_dict.get("activation_checkpointing_interval", 1)
+        if self.activation_checkpointing_interval < 1:
+            raise ValueError(
+                "activation_checkpointing_interval must be a positive integer, "
+                f"got {self.activation_checkpointing_interval}."
+            )
+
+        # Perceptual metrics to log next to the MSE, NMSE, SSIM and PSNR, any of HaarPSI and VSI.
+        self.perceptual_metrics = list(cfg_dict.get("perceptual_metrics", []))
+        unknown = set(self.perceptual_metrics) - {"HaarPSI", "VSI"}
+        if unknown:
+            raise ValueError(f"Unknown perceptual metrics {sorted(unknown)}, expected any of HaarPSI and VSI.")
+        self.perceptual_metrics_chunk_size = cfg_dict.get("perceptual_metrics_chunk_size", 32)
+
+        # Set evaluation metrics accumulator
+        self.volume_metrics = VolumeMetricsAccumulator(["MSE", "NMSE", "SSIM", "PSNR"] + self.perceptual_metrics)
+
+    def checkpoint_step(self, function: Callable, *args, step: int = 0, **kwargs) -> Any:
+        """
+        Runs a single cascade or unrolled iteration, with activation checkpointing if enabled. When checkpointing, the
+        intermediate activations of ``function`` are not stored, but recomputed in the backward pass. The RNG state is
+        preserved, so dropout layers draw the same masks in the forward and the recomputed pass.
+
+        Parameters
+        ----------
+        function : Callable
+            The cascade or iteration to run, e.g. a torch.nn.Module.
+        *args
+            Positional arguments passed to ``function``.
+        step : int
+            Index of the cascade or iteration. Only every ``activation_checkpointing_interval``-th step is
+            checkpointed. Default is ``0``.
+        **kwargs
+            Keyword arguments passed to ``function``.
 
-        # Set evaluation metrics dictionaries
-        self.mse_vals: Dict = defaultdict(dict)
-        self.nmse_vals: Dict = defaultdict(dict)
-        self.ssim_vals: Dict = defaultdict(dict)
-        self.psnr_vals: Dict = defaultdict(dict)
+        Returns
+        -------
+        Any
+            The output of ``function``.
+        """
+        if (
+            self.use_activation_checkpointing
+            and self.training
+            and torch.is_grad_enabled()
+            and step % self.activation_checkpointing_interval == 0
+        ):
+            return checkpoint(partial(function, **kwargs), *args, use_reentrant=False, preserve_rng_state=True)
+        return function(*args, **kwargs)
 
     def process_reconstruction_loss(  # noqa: W0221
         self,
@@ -514,6 +556,61 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
 
         return {"loss": train_loss, "log": tensorboard_logs}
 
+    @staticmethod
+    def normalize_for_metrics(preds: torch.Tensor, target: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Takes the magnitude of the predictions and the targets, and normalizes every element of the batch by its
+        maximum, without leaving the device.
+
+        Parameters
+        ----------
+        preds : torch.Tensor
+            Predicted data. Shape [batch_size, ...].
+        target : torch.Tensor
+            Target data. Shape [batch_size, ...].
+
+        Returns
+        -------
+        Tuple[torch.Tensor, torch.Tensor]
+            The normalized magnitude of the predictions and of the targets.
+        """
+        output = torch.abs(preds).detach()
+        target = torch.abs(target).detach()
+        shape = (-1,) + (1,) * (output.dim() - 1)
+        output = output / output.reshape(output.shape[0], -1).amax(1).view(shape)
+        target = target / target.reshape(target.shape[0], -1).amax(1).view(shape)
+        return output, target
+
+    def update_metrics(self, fname: Sequence[str], target: torch.Tensor, output: torch.Tensor):
+        """
+        Computes the MSE, NMSE, SSIM and PSNR, and the perceptual metrics if any, of every slice of a batch at once, on
+        the device of the inputs, and adds them to the metrics of their volumes.
+
+        Parameters
+        ----------
+        fname : Sequence[str]
+            File name of every slice of the batch.
+        target : torch.Tensor
+            Normalized target data. Shape [batch_size, 1, n_x, n_y].
+        output : torch.Tensor
+            Normalized predicted data. Shape [batch_size, 1, n_x, n_y].
+        """
+        mse, nmse, ssim, psnr = reconstruction_metrics.batched_metrics(target, output)
+        perceptual_metrics = {}
+        if self.perceptual_metrics:
+            # the same data range as the SSIM and PSNR
+            output_flat = output.reshape(output.shape[0], -1)
+            maxval = output_flat.amax(dim=1) - output_flat.amin(dim=1)
+            batched_perceptual_metrics = {
+                "HaarPSI": reconstruction_metrics.batched_haarpsi,
+                "VSI": reconstruction_metrics.batched_vsi,
+            }
+            for name in self.perceptual_metrics:
+                perceptual_metrics[name] = batched_perceptual_metrics[name](
+                    target, output, maxval=maxval, chunk_size=self.perceptual_metrics_chunk_size
+                )
+        self.volume_metrics.update(fname, MSE=mse, NMSE=nmse, SSIM=ssim, PSNR=psnr, **perceptual_metrics)
+
     def validation_step(self, batch: Dict[float, torch.Tensor], batch_idx: int) -> Dict:  # noqa: W0221
         """
         Performs a validation step.
@@ -727,30 +824,18 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
 
         target = target.unsqueeze(1)  # type: ignore
         preds = preds.unsqueeze(1)  # type: ignore
-        for batch_idx in range(target.shape[0]):  # type: ignore
-            output = torch.abs(preds[batch_idx]).detach().cpu()
-            _target = torch.abs(target[batch_idx]).detach().cpu()  # type: ignore
-            output = output / output.max()  # type: ignore
-            _target = _target / _target.max()  # type: ignore
-
-            key = f"{fname[batch_idx]}_images_idx_{int(slice_num[batch_idx])}"  # type: ignore
-
-            if self.log_images:
-                error = torch.abs(_target - output)
-                self.log_image(f"{key}/target", _target)
-                self.log_image(f"{key}/reconstruction", output)
-                self.log_image(f"{key}/error", error)
-
-            _target = _target.numpy()  # type: ignore
-            output = output.numpy()  # type: ignore
-            self.mse_vals[fname][slice_num] = torch.tensor(reconstruction_metrics.mse(_target, output)).view(1)
-            self.nmse_vals[fname][slice_num] = torch.tensor(reconstruction_metrics.nmse(_target, output)).view(1)
-            self.ssim_vals[fname][slice_num] = torch.tensor(
-                reconstruction_metrics.ssim(_target, output, maxval=output.max() - output.min())
-            ).view(1)
-            self.psnr_vals[fname][slice_num] = torch.tensor(
-                reconstruction_metrics.psnr(_target, output, maxval=output.max() - output.min())
-            ).view(1)
+        output, _target = self.normalize_for_metrics(preds, target)  # type: ignore
+
+        if self.log_images:
+            for batch_idx in range(_target.shape[0]):  # type: ignore
+                if not self.should_log_images(fname[batch_idx], slice_num[batch_idx]):  # type: ignore
+                    continue
+                key = f"{fname[batch_idx]}_images_idx_{int(slice_num[batch_idx])}"  # type: ignore
+                self.log_image(f"{key}/target", _target[batch_idx])
+                self.log_image(f"{key}/reconstruction", output[batch_idx])
+                self.log_image(f"{key}/error", torch.abs(_target[batch_idx] - output[batch_idx]))
+
+        self.update_metrics(fname, _target, output)
 
         return {"val_loss": val_loss}
 
@@ -825,33 +910,21 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
 
         target = target.unsqueeze(1)  # type: ignore
         preds = preds.unsqueeze(1)  # type: ignore
-        for batch_idx in range(target.shape[0]):  # type: ignore
-            output = torch.abs(preds[batch_idx]).detach().cpu()
-            _target = torch.abs(target[batch_idx]).detach().cpu()  # type: ignore
-            output = output / output.max()  # type: ignore
-            _target = _target / _target.max()  # type: ignore
-
-            name = str(fname[batch_idx])  # type: ignore
-            slice_num = int(slice_num[batch_idx])  # type: ignore
-            key = f"{name}_images_idx_{slice_num}"  # type: ignore
-
-            if self.log_images:
-                error = torch.abs(_target - output)
-                self.log_image(f"{key}/target", _target)
-                self.log_image(f"{key}/reconstruction", output)
-                self.log_image(f"{key}/error", error)
-
-            _target = _target.numpy()  # type: ignore
-            output = output.numpy()  # type: ignore
-            self.mse_vals[fname][slice_num] = torch.tensor(reconstruction_metrics.mse(_target, output)).view(1)
-            self.nmse_vals[fname][slice_num] = torch.tensor(reconstruction_metrics.nmse(_target, output)).view(1)
-            self.ssim_vals[fname][slice_num] = torch.tensor(
-                reconstruction_metrics.ssim(_target, output, maxval=output.max() - output.min())
-            ).view(1)
-            self.psnr_vals[fname][slice_num] = torch.tensor(
-                reconstruction_metrics.psnr(_target, output, maxval=output.max() - output.min())
-            ).view(1)
+        output, _target = self.normalize_for_metrics(preds, target)  # type: ignore
+
+        if self.log_images:
+            for batch_idx in range(_target.shape[0]):  # type: ignore
+                if not self.should_log_images(fname[batch_idx], slice_num[batch_idx]):  # type: ignore
+                    continue
+                key = f"{fname[batch_idx]}_images_idx_{int(slice_num[batch_idx])}"  # type: ignore
+                self.log_image(f"{key}/target", _target[batch_idx])
+                self.log_image(f"{key}/reconstruction", output[batch_idx])
+                self.log_image(f"{key}/error", torch.abs(_target[batch_idx] - output[batch_idx]))
 
+        self.update_metrics(fname, _target, output)
+
+        name = str(fname[-1])  # type: ignore
+        slice_num = int(slice_num[-1])  # type: ignore
         return name, slice_num, preds.detach().cpu().numpy()  # type: ignore
 
     def validation_epoch_end(self, outputs):
@@ -870,51 +943,12 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         """
         self.log("val_loss", torch.stack([x["val_loss"] for x in outputs]).mean())
 
-        # Log metrics.
-        # Taken from: https://github.com/facebookresearch/fastMRI/blob/main/fastmri/pl_modules/mri_module.py
-        mse_vals = defaultdict(dict)
-        nmse_vals = defaultdict(dict)
-        ssim_vals = defaultdict(dict)
-        psnr_vals = defaultdict(dict)
-
-        for k, v in self.mse_vals.items():
-            mse_vals[k].update(v)
-        for k, v in self.nmse_vals.items():
-            nmse_vals[k].update(v)
-        for k, v in self.ssim_vals.items():
-            ssim_vals[k].update(v)
-        for k, v in self.psnr_vals.items():
-            psnr_vals[k].update(v)
-
-        # apply means across image volumes
-        metrics = {"MSE": 0, "NMSE": 0, "SSIM": 0, "PSNR": 0}
-        local_examples = 0
-        for fname in mse_vals:
-            local_examples += 1
-            metrics["MSE"] = metrics["MSE"] + torch.mean(torch.cat([v.view(-1) for _, v in mse_vals[fname].items()]))
-            metrics["NMSE"] = metrics["NMSE"] + torch.mean(
-                torch.cat([v.view(-1) for _, v in nmse_vals[fname].items()])
-            )
-            metrics["SSIM"] = metrics["SSIM"] + torch.mean(
-                torch.cat([v.view(-1) for _, v in ssim_vals[fname].items()])
-            )
-            metrics["PSNR"] = metrics["PSNR"] + torch.mean(
-                torch.cat([v.view(-1) for _, v in psnr_vals[fname].items()])
-            )
-
-        # reduce across ddp via sum
-        metrics["MSE"] = self.MSE(metrics["MSE"])
-        metrics["NMSE"] = self.NMSE(metrics["NMSE"])
-        metrics["SSIM"] = self.SSIM(metrics["SSIM"])
-        metrics["PSNR"] = self.PSNR(metrics["PSNR"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics.items():
-            self.log(f"{metric}", value / tot_examples, sync_dist=True)
+        self.log_volume_metrics()
 
     def test_epoch_end(self, outputs):  # noqa: W0221
         """
-        Called at the end of test epoch to aggregate outputs, log metrics and save predictions.
+        Called at the end of test epoch to aggregate outputs and log metrics. The predictions are saved by the test
+        writer, as soon as all the slices of a volume are predicted.
 
         Parameters
         ----------
@@ -926,60 +960,7 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         metrics : dict
             Dictionary of metrics.
         """
-        # Log metrics.
-        # Taken from: https://github.com/facebookresearch/fastMRI/blob/main/fastmri/pl_modules/mri_module.py
-        mse_vals = defaultdict(dict)
-        nmse_vals = defaultdict(dict)
-        ssim_vals = defaultdict(dict)
-        psnr_vals = defaultdict(dict)
-
-        for k, v in self.mse_vals.items():
-            mse_vals[k].update(v)
-        for k, v in self.nmse_vals.items():
-            nmse_vals[k].update(v)
-        for k, v in self.ssim_vals.items():
-            ssim_vals[k].update(v)
-        for k, v in self.psnr_vals.items():
-            psnr_vals[k].update(v)
-
-        # apply means across image volumes
-        metrics = {"MSE": 0, "NMSE": 0, "SSIM": 0, "PSNR": 0}
-        local_examples = 0
-        for fname in mse_vals:
-            local_examples += 1
-            metrics["MSE"] = metrics["MSE"] + torch.mean(torch.cat([v.view(-1) for _, v in mse_vals[fname].items()]))
-            metrics["NMSE"] = metrics["NMSE"] + torch.mean(
-                torch.cat([v.view(-1) for _, v in nmse_vals[fname].items()])
-            )
-            metrics["SSIM"] = metrics["SSIM"] + torch.mean(
-                torch.cat([v.view(-1) for _, v in ssim_vals[fname].items()])
-            )
-            metrics["PSNR"] = metrics["PSNR"] + torch.mean(
-                torch.cat([v.view(-1) for _, v in psnr_vals[fname].items()])
-            )
-
-        # reduce across ddp via sum
-        metrics["MSE"] = self.MSE(metrics["MSE"])
-        metrics["NMSE"] = self.NMSE(metrics["NMSE"])
-        metrics["SSIM"] = self.SSIM(metrics["SSIM"])
-        metrics["PSNR"] = self.PSNR(metrics["PSNR"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics.items():
-            self.log(f"{metric}", value / tot_examples, sync_dist=True)
-
-        reconstructions = defaultdict(list)
-        for fname, slice_num, output in outputs:
-            reconstructions[fname].append((slice_num, output))
-
-        for fname in reconstructions:
-            reconstructions[fname] = np.stack([out for _, out in sorted(reconstructions[fname])])  # type: ignore
-
-        out_dir = Path(os.path.join(self.logger.log_dir, "reconstructions"))
-        out_dir.mkdir(exist_ok=True, parents=True)
-        for fname, recons in reconstructions.items():
-            with h5py.File(out_dir / fname, "w") as hf:
-                hf.create_dataset("reconstruction", data=recons)
+        self.log_volume_metrics()
 
     @staticmethod
     def _setup_dataloader_from_config(cfg: DictConfig) -> DataLoader:
@@ -1078,7 +1059,8 @@ class BaseMRIReconstructionModel(BaseMRIModel, ABC):  # type: ignore
         if cfg.shuffle:
             sampler = torch.utils.data.RandomSampler(dataset)
         else:
-            sampler = torch.utils.data.SequentialSampler(dataset)
+            # whole volumes per process, so that every process can save the volumes it predicts
+            sampler = DistributedVolumeSampler(dataset)
 
         return torch.utils.data.DataLoader(
             dataset=dataset,
@@ -109,7 +109,8 @@ class CIRIM(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
         cascades_predictions = []
         for i, cascade in enumerate(self.cirim):
             # Forward pass through the cascades
-            prediction, _ = cascade(
+            prediction, _ = self.checkpoint_step(
+                cascade,
                 prediction,
                 y,
                 sensitivity_maps,
@@ -117,6 +118,7 @@ class CIRIM(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
                 init_pred,
                 hx,
                 sigma,
+                step=i,
                 keep_prediction=False if i == 0 else self.keep_prediction,
             )
             time_steps_predictions = [
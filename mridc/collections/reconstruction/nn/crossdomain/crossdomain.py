@@ -3,7 +3,7 @@ __author__ = "Dimitrios Karkalousos"
 
 # Taken and adapted from: https://github.com/NKI-AI/direct/blob/main/direct/nn/crossdomain/crossdomain.py
 
-from typing import Optional, Tuple, Union
+from typing import Callable, Optional, Tuple, Union
 
 import torch
 from torch import nn
@@ -251,6 +251,7 @@ class CrossDomainNetwork(nn.Module):
         masked_kspace: torch.Tensor,
         sensitivity_maps: torch.Tensor,
         sampling_mask: torch.Tensor,
+        checkpoint_fn: Optional[Callable] = None,
     ) -> torch.Tensor:
         """
         Computes the forward pass of CrossDomainNetwork.
@@ -263,27 +264,46 @@ class CrossDomainNetwork(nn.Module):
             Coil sensitivity maps. Shape [batch_size, n_coils, n_x, n_y, 2]
         sampling_mask : torch.Tensor
             Subsampling mask. Shape [1, 1, n_x, n_y, 1]
+        checkpoint_fn : Callable, optional
+            Function to run each domain correction through, with signature ``checkpoint_fn(function, *args, step)``,
+            e.g. to apply activation checkpointing. Default is ``None``.
 
         Returns
         -------
         torch.Tensor
             Reconstructed image. Shape [batch_size, n_x, n_y, 2]
         """
+        if checkpoint_fn is None:
+            checkpoint_fn = lambda function, *args, step: function(*args)  # noqa: E731
+
         input_image = self._backward_operator(masked_kspace, sampling_mask, sensitivity_maps)
 
         image_buffer = torch.cat([input_image] * self.image_buffer_size, -1).to(masked_kspace.device)
         kspace_buffer = torch.cat([masked_kspace] * self.kspace_buffer_size, -1).to(masked_kspace.device)
 
         kspace_block_idx, image_block_idx = 0, 0
-        for block_domain in self.domain_sequence:
+        for step, block_domain in enumerate(self.domain_sequence):
             if block_domain == "K":
-                kspace_buffer = self.kspace_correction(
-                    kspace_block_idx, image_buffer, kspace_buffer, sampling_mask, sensitivity_maps, masked_kspace
+                kspace_buffer = checkpoint_fn(
+                    self.kspace_correction,
+                    kspace_block_idx,
+                    image_buffer,
+                    kspace_buffer,
+                    sampling_mask,
+                    sensitivity_maps,
+                    masked_kspace,
+                    step=step,
                 )
                 kspace_block_idx += 1
             else:
-                image_buffer = self.image_correction(
-                    image_block_idx, image_buffer, kspace_buffer, sampling_mask, sensitivity_maps
+                image_buffer = checkpoint_fn(
+                    self.image_correction,
+                    image_block_idx,
+                    image_buffer,
+                    kspace_buffer,
+                    sampling_mask,
+                    sensitivity_maps,
+                    step=step,
                 )
                 image_block_idx += 1
 
@@ -3,9 +3,13 @@ __author__ = "Dimitrios Karkalousos"
 
 # Taken and adapted from: https://github.com/NKI-AI/direct/blob/main/direct/nn/crossdomain/multicoil.py
 
+from typing import Optional
+
 import torch
 from torch import nn
 
+from mridc.collections.common.parts import utils
+
 
 class MultiCoil(nn.Module):
     """
@@ -23,14 +27,20 @@ class MultiCoil(nn.Module):
     coil_to_batch : bool, optional
         If True batch and coil dimensions are merged when forwarded by the model and unmerged when outputted.
         Otherwise, input is forwarded to the model per coil. Default is ``False``.
+    coil_chunk_size : int, optional
+        If coil_to_batch is set to True, maximum number of coil images per forward pass. If ``None``, all coils of the
+        batch are forwarded at once. Default is ``None``.
     """
 
-    def __init__(self, model: nn.Module, coil_dim: int = 1, coil_to_batch: bool = False):
+    def __init__(
+        self, model: nn.Module, coil_dim: int = 1, coil_to_batch: bool = False, coil_chunk_size: Optional[int] = None
+    ):
         super().__init__()
 
         self.model = model
         self.coil_to_batch = coil_to_batch
         self.coil_dim = coil_dim
+        self.coil_chunk_size = coil_chunk_size
 
     def _compute_model_per_coil(self, data: torch.Tensor) -> torch.Tensor:
         """Computes the model per coil."""
@@ -59,12 +69,7 @@ class MultiCoil(nn.Module):
             Output data of shape (N, N_coils, H, W, C).
         """
         if self.coil_to_batch:
-            x = x.clone()
-
-            batch, coil, channels, height, width = x.size()
-            x = x.reshape(batch * coil, channels, height, width).contiguous()
-            x = self.model(x).permute(0, 2, 3, 1)
-            x = x.reshape(batch, coil, height, width, -1).permute(0, 1, 4, 2, 3)
+            x = utils.apply_per_coil(self.model, x, self.coil_dim, chunk_size=self.coil_chunk_size)
         else:
             x = self._compute_model_per_coil(x).contiguous()
 
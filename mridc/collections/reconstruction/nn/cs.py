@@ -3,15 +3,14 @@ __author__ = "Dimitrios Karkalousos"
 
 from abc import ABC
 
-import sigpy.mri as spmri
 import torch
 from omegaconf import DictConfig, OmegaConf
 from pytorch_lightning import Trainer
-from sigpy.pytorch import from_pytorch, to_pytorch
 
 import mridc.collections.reconstruction.nn.base as base_models
 import mridc.core.classes.common as common_classes
-from mridc.collections.common.parts import fft, utils
+from mridc.collections.common.parts import fft
+from mridc.collections.reconstruction.nn.cs_base import cs_block
 
 __all__ = ["CS"]
 
@@ -24,6 +23,11 @@ class CS(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
     ----------
     .. [1] Lustig, M., Donoho, D. L., Santos, J. M., & Pauly, J. M. (2008). Compressed sensing MRI. IEEE signal
     processing magazine, 25(2), 72-82.
+
+    The reconstruction is solved either with sigpy, one sample at a time on the CPU, or natively in PyTorch over the
+    whole batch, on the device of the input (``cs_backend: torch``). The PyTorch backend uses FISTA for the l1-wavelet
+    penalty and the Primal-Dual Hybrid Gradient for the total variation penalty, with the same operators and step sizes
+    as sigpy.
     """
 
     def __init__(self, cfg: DictConfig, trainer: Trainer = None):
@@ -37,6 +41,9 @@ class CS(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
         self.center_mask = cfg_dict.get("center_mask")
         self.center_reconstruction = cfg_dict.get("center_reconstruction")
         self.spatial_dims = cfg_dict.get("spatial_dims")
+        self.cs_backend = cfg_dict.get("cs_backend", "torch")
+        if self.cs_backend not in ("torch", "sigpy"):
+            raise ValueError(f"Unknown cs_backend: {self.cs_backend}. Must be one of torch, sigpy.")
 
     @common_classes.typecheck()  # type: ignore
     def forward(  # noqa: W0221
@@ -78,20 +85,67 @@ class CS(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
         if self.center_mask:
             mask = fft.fftshift(mask, dim=self.spatial_dims)
 
-        # import matplotlib
-        # matplotlib.use('TkAgg')
-        # import matplotlib.pyplot as plt
-        # import numpy as np
-        # tmp = torch.view_as_complex(fft.ifft2(y, self.fft_centered, self.fft_normalization, self.spatial_dims))
-        # plt.subplot(1, 4, 1)
-        # plt.imshow(np.abs(tmp.detach().cpu().numpy()[0, 0, :, :]), cmap='gray')
-        # plt.subplot(1, 4, 2)
-        # plt.imshow(np.abs(sensitivity_maps.detach().cpu().numpy()[0, 0, :, :]), cmap='gray')
-        # plt.subplot(1, 4, 3)
-        # plt.imshow(np.abs(mask.squeeze().detach().cpu().numpy()), cmap='gray')
-        # plt.subplot(1, 4, 4)
-        # plt.imshow(np.abs(np.sum(tmp.detach().cpu().numpy()[0, :, :, :]*sensitivity_maps.detach().cpu().numpy()[0, :, :, :].conj(), 0)), cmap='gray')
-        # plt.show()
+        if self.cs_backend == "torch":
+            prediction = self._batched_reconstruction(y.detach(), sensitivity_maps.detach(), mask.detach())
+        else:
+            prediction = self._sigpy_reconstruction(y, sensitivity_maps, mask)
+        if self.center_reconstruction:
+            prediction = fft.fftshift(prediction, dim=self.spatial_dims)
+        return prediction
+
+    def _batched_reconstruction(
+        self, y: torch.Tensor, sensitivity_maps: torch.Tensor, mask: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Reconstructs the whole batch at once with PyTorch.
+
+        Parameters
+        ----------
+        y : torch.Tensor
+            Complex subsampled k-space data. Shape [batch_size, n_coils, n_x, n_y]
+        sensitivity_maps : torch.Tensor
+            Complex coil sensitivity maps. Shape [batch_size, n_coils, n_x, n_y]
+        mask : torch.Tensor
+            Subsampling mask. Shape [batch_size, 1, n_x, n_y]
+
+        Returns
+        -------
+        torch.Tensor
+            Complex reconstructed image. Shape [batch_size, n_x, n_y]
+        """
+        mask = mask.to(y)
+        # as sigpy, the FFT is centered and orthonormal, the center_* options account for the data convention
+        A = cs_block.SenseOperator(sensitivity_maps, mask, fft_centered=True, fft_normalization="ortho")
+        y = y * mask**0.5
+        if self.cs_type == "l1_wavelet":
+            return cs_block.l1_wavelet_reconstruction(A, y, self.reg_wt, self.num_iters)
+        if self.cs_type == "total_variation":
+            return cs_block.total_variation_reconstruction(A, y, self.reg_wt, self.num_iters)
+        raise ValueError(f"Unknown cs_type: {self.cs_type}")
+
+    def _sigpy_reconstruction(
+        self, y: torch.Tensor, sensitivity_maps: torch.Tensor, mask: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Reconstructs every sample of the batch with sigpy, on the CPU.
+
+        Parameters
+        ----------
+        y : torch.Tensor
+            Complex subsampled k-space data. Shape [batch_size, n_coils, n_x, n_y]
+        sensitivity_maps : torch.Tensor
+            Complex coil sensitivity maps. Shape [batch_size, n_coils, n_x, n_y]
+        mask : torch.Tensor
+            Subsampling mask. Shape [batch_size, 1, n_x, n_y]
+
+        Returns
+        -------
+        torch.Tensor
+            Complex reconstructed image. Shape [batch_size, n_x, n_y]
+        """
+        # sigpy is an optional dependency, imported only by this backend
+        import sigpy.mri as spmri
+        from sigpy.pytorch import from_pytorch, to_pytorch
 
         y = from_pytorch(y.detach().cpu())
         sensitivity_maps = from_pytorch(sensitivity_maps.detach().cpu())
@@ -138,6 +192,4 @@ class CS(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
             raise ValueError(f"Unknown cs_type: {self.cs_type}")
         if prediction.shape[-1] == 2:
             prediction = torch.view_as_complex(prediction)
-        if self.center_reconstruction:
-            prediction = fft.fftshift(prediction, dim=self.spatial_dims)
         return prediction
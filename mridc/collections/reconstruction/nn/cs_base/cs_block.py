@@ -0,0 +1,330 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+from typing import List, Optional, Sequence, Tuple
+
+import pywt
+import torch
+import torch.nn.functional as F
+
+from mridc.collections.common.parts import fft
+
+
+class WaveletTransform2D:
+    """
+    Batched 2D discrete wavelet transform, with zero boundary extension.
+
+    The transform follows the conventions of ``pywt.wavedecn`` / ``pywt.waverecn`` with ``mode="zero"``, as used by
+    ``sigpy.linop.Wavelet``, so that coefficients and reconstructions match the sigpy path. Odd-sized spatial dimensions
+    are zero-padded at the front to an even size and cropped back after the inverse transform.
+
+    Parameters
+    ----------
+    wave_name : str
+        Name of the wavelet, as in ``pywt.Wavelet``. Default is ``"db4"``.
+    level : int, optional
+        Number of decomposition levels. If ``None``, the maximum level for the input size is used. Default is ``None``.
+    """
+
+    def __init__(self, wave_name: str = "db4", level: Optional[int] = None):
+        wavelet = pywt.Wavelet(wave_name)
+        self.filter_length = wavelet.dec_len
+        self.level = level
+        # conv1d computes a cross-correlation, thus the decomposition filters are flipped. Low- and high-pass filters are
+        # stacked as channels, so that both sub-bands are computed with a single (transposed) convolution.
+        self.dec_filters = torch.tensor([wavelet.dec_lo[::-1], wavelet.dec_hi[::-1]]).unsqueeze(1)
+        self.rec_filters = torch.tensor([wavelet.rec_lo, wavelet.rec_hi]).unsqueeze(1)
+
+    def _dwt(self, x: torch.Tensor, dim: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Single level decomposition of ``x`` along ``dim``."""
+        x = x.transpose(dim, -1)
+        shape = x.shape
+        # full convolution with zero extension, keeping the odd samples
+        x = F.pad(x.reshape(-1, 1, shape[-1]), [self.filter_length - 2, self.filter_length - 1])
+        x = F.conv1d(x, self.dec_filters.to(x), stride=2)
+        lo, hi = x.reshape(*shape[:-1], 2, x.shape[-1]).unbind(-2)
+        return lo.transpose(dim, -1), hi.transpose(dim, -1)
+
+    def _idwt(self, lo: torch.Tensor, hi: torch.Tensor, dim: int) -> torch.Tensor:
+        """Single level reconstruction along ``dim``."""
+        x = torch.stack([lo.transpose(dim, -1), hi.transpose(dim, -1)], dim=-2)
+        shape = x.shape
+        x = F.conv_transpose1d(x.reshape(-1, 2, shape[-1]), self.rec_filters.to(x), stride=2)
+        x = x[..., self.filter_length - 2 : 2 * shape[-1]]
+        return x.reshape(*shape[:-2], x.shape[-1]).transpose(dim, -1)
+
+    def forward(self, x: torch.Tensor) -> List:
+        """
+        Decomposes the last two dimensions of a real tensor.
+
+        Parameters
+        ----------
+        x : torch.Tensor
+            Real input data. Shape [..., n_x, n_y]
+
+        Returns
+        -------
+        list
+            ``[approximation, (detail_ad, detail_da, detail_dd)_coarsest, ..., (...)_finest]``, as ``pywt.wavedecn``.
+        """
+        x = F.pad(x, [x.shape[-1] % 2, 0, x.shape[-2] % 2, 0])
+        level = self.level
+        if level is None:
+            level = pywt.dwt_max_level(min(x.shape[-2:]), self.filter_length)
+        coefficients = []
+        for _ in range(level):
+            lo, hi = self._dwt(x, dim=-2)
+            x, ad = self._dwt(lo, dim=-1)
+            da, dd = self._dwt(hi, dim=-1)
+            coefficients.append((ad, da, dd))
+        return [x] + coefficients[::-1]
+
+    __call__ = forward
+
+    def inverse(self, coefficients: List, shape: Sequence[int]) -> torch.Tensor:
+        """
+        Reconstructs a real tensor from its wavelet coefficients.
+
+        Parameters
+        ----------
+        coefficients : list
+            Wavelet coefficients, as returned by ``forward``.
+        shape : Sequence[int]
+            Spatial shape [n_x, n_y] of the original input.
+
+        Returns
+        -------
+        torch.Tensor
+            Reconstructed data. Shape [..., n_x, n_y]
+        """
+        x = coefficients[0]
+        for ad, da, dd in coefficients[1:]:
+            # as in pywt.waverecn, the approximation is cropped if it is one sample larger than the details
+            x = x[..., : ad.shape[-2], : ad.shape[-1]]
+            x = self._idwt(self._idwt(x, ad, dim=-1), self._idwt(da, dd, dim=-1), dim=-2)
+        return x[..., x.shape[-2] - shape[-2] :, x.shape[-1] - shape[-1] :]
+
+
+def soft_threshold(x: torch.Tensor, threshold: torch.Tensor) -> torch.Tensor:
+    """Complex soft-thresholding, i.e. the proximal operator of the l1 norm."""
+    magnitude = torch.abs(x)
+    return x * torch.clamp(1 - threshold / torch.where(magnitude == 0, torch.ones_like(magnitude), magnitude), min=0)
+
+
+class SenseOperator:
+    """
+    Batched weighted SENSE operator, i.e. :math:`A = W^{1/2} F S`, matching ``sigpy.mri.linop.Sense``.
+
+    Parameters
+    ----------
+    sensitivity_maps : torch.Tensor
+        Complex coil sensitivity maps. Shape [batch_size, n_coils, n_x, n_y]
+    weights : torch.Tensor
+        Subsampling mask. Shape broadcastable to [batch_size, n_coils, n_x, n_y]
+    fft_centered : bool
+        Whether to center the FFT. Default is ``True``.
+    fft_normalization : str
+        FFT normalization. Default is ``"ortho"``.
+    spatial_dims : Sequence[int]
+        Spatial dimensions. Default is ``(-2, -1)``.
+    """
+
+    def __init__(
+        self,
+        sensitivity_maps: torch.Tensor,
+        weights: torch.Tensor,
+        fft_centered: bool = True,
+        fft_normalization: str = "ortho",
+        spatial_dims: Sequence[int] = None,
+    ):
+        self.sensitivity_maps = sensitivity_maps
+        self.weights = weights**0.5
+        self.fft_centered = fft_centered
+        self.fft_normalization = fft_normalization
+        self.spatial_dims = spatial_dims if spatial_dims is not None else [-2, -1]
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """Maps images of shape [batch_size, n_x, n_y] to k-space of shape [batch_size, n_coils, n_x, n_y]."""
+        return self.weights * torch.view_as_complex(
+            fft.fft2(
+                self.sensitivity_maps * x.unsqueeze(1),
+                centered=self.fft_centered,
+                normalization=self.fft_normalization,
+                spatial_dims=self.spatial_dims,
+            )
+        )
+
+    def adjoint(self, y: torch.Tensor) -> torch.Tensor:
+        """Maps k-space of shape [batch_size, n_coils, n_x, n_y] to images of shape [batch_size, n_x, n_y]."""
+        return torch.sum(
+            self.sensitivity_maps.conj()
+            * torch.view_as_complex(
+                fft.ifft2(
+                    self.weights * y,
+                    centered=self.fft_centered,
+                    normalization=self.fft_normalization,
+                    spatial_dims=self.spatial_dims,
+                )
+            ),
+            dim=1,
+        )
+
+    def normal(self, x: torch.Tensor) -> torch.Tensor:
+        """Applies :math:`A^H A`."""
+        return self.adjoint(self.forward(x))
+
+
+def batch_norm(x: torch.Tensor) -> torch.Tensor:
+    """Returns the l2 norm of every sample, broadcastable to ``x``."""
+    return torch.sqrt(torch.sum(torch.abs(x) ** 2, dim=list(range(1, x.dim())), keepdim=True))
+
+
+def max_eigenvalue(normal_op, x: torch.Tensor, num_iters: int = 30) -> torch.Tensor:
+    """
+    Estimates the maximum eigenvalue of a batch of Hermitian operators with the power method.
+
+    Parameters
+    ----------
+    normal_op : callable
+        Hermitian operator, applied to every sample of the batch independently.
+    x : torch.Tensor
+        Initial vector. Shape [batch_size, ...]
+    num_iters : int
+        Number of power iterations. Default is ``30``.
+
+    Returns
+    -------
+    torch.Tensor
+        Maximum eigenvalue per sample. Shape [batch_size, 1, ...]
+    """
+    max_eig = torch.ones_like(batch_norm(x))
+    for _ in range(num_iters):
+        x = normal_op(x)
+        max_eig = batch_norm(x)
+        x = x / torch.where(max_eig == 0, torch.ones_like(max_eig), max_eig)
+    return max_eig
+
+
+def l1_wavelet_reconstruction(
+    A: SenseOperator, y: torch.Tensor, reg_wt: float, num_iters: int = 100, wave_name: str = "db4"
+) -> torch.Tensor:
+    """
+    l1-wavelet regularized reconstruction, solved with FISTA over the whole batch.
+
+    Considers the problem :math:`\\min_x \\frac{1}{2} \\| A x - y \\|_2^2 + \\lambda \\| W x \\|_1`, with step size
+    :math:`1 / \\lambda_{max}(A^H A)` estimated per sample, as ``sigpy.mri.app.L1WaveletRecon``.
+
+    Parameters
+    ----------
+    A : SenseOperator
+        Forward operator.
+    y : torch.Tensor
+        Complex subsampled k-space, already weighted by the square root of the mask. Shape [batch_size, n_coils, n_x,
+        n_y]
+    reg_wt : float
+        Regularization weight :math:`\\lambda`.
+    num_iters : int
+        Number of iterations. Default is ``100``.
+    wave_name : str
+        Name of the wavelet. Default is ``"db4"``.
+
+    Returns
+    -------
+    torch.Tensor
+        Complex reconstructed image. Shape [batch_size, n_x, n_y]
+    """
+    AHy = A.adjoint(y)
+    spatial_shape = AHy.shape[-2:]
+    batch_size = AHy.shape[0]
+    wavelet = WaveletTransform2D(wave_name)
+
+    max_eig = max_eigenvalue(A.normal, torch.randn_like(AHy))
+    alpha = torch.where(max_eig == 0, torch.ones_like(max_eig), 1 / max_eig)
+
+    def prox(x: torch.Tensor) -> torch.Tensor:
+        # real and imaginary parts are transformed together, stacked along the batch dimension
+        coefficients = wavelet(torch.cat([x.real, x.imag], dim=0))
+        thresholded = []
+        for c in coefficients:
+            if isinstance(c, tuple):
+                thresholded.append(tuple(_soft_threshold_stacked(d, alpha * reg_wt, batch_size) for d in c))
+            else:
+                thresholded.append(_soft_threshold_stacked(c, alpha * reg_wt, batch_size))
+        x = wavelet.inverse(thresholded, spatial_shape)
+        return torch.complex(x[:batch_size], x[batch_size:])
+
+    x = torch.zeros_like(AHy)
+    z = x.clone()
+    t = 1.0
+    for _ in range(num_iters):
+        x_old = x
+        x = prox(z - alpha * (A.normal(z) - AHy))
+        t_old = t
+        t = (1 + (1 + 4 * t_old**2) ** 0.5) / 2
+        z = x + ((t_old - 1) / t) * (x - x_old)
+    return x
+
+
+def _soft_threshold_stacked(c: torch.Tensor, threshold: torch.Tensor, batch_size: int) -> torch.Tensor:
+    """Soft-thresholds real coefficients stacked as [real, imag] along the batch dimension as complex numbers."""
+    c = soft_threshold(torch.complex(c[:batch_size], c[batch_size:]), threshold)
+    return torch.cat([c.real, c.imag], dim=0)
+
+
+def finite_difference(x: torch.Tensor) -> torch.Tensor:
+    """Circular finite differences along the last two dimensions. Returns shape [2, *x.shape]."""
+    return torch.stack([x - torch.roll(x, 1, dims=-2), x - torch.roll(x, 1, dims=-1)], dim=0)
+
+
+def finite_difference_adjoint(u: torch.Tensor) -> torch.Tensor:
+    """Adjoint of ``finite_difference``."""
+    return u[0] - torch.roll(u[0], -1, dims=-2) + u[1] - torch.roll(u[1], -1, dims=-1)
+
+
+def total_variation_reconstruction(
+    A: SenseOperator, y: torch.Tensor, reg_wt: float, num_iters: int = 100
+) -> torch.Tensor:
+    """
+    Total variation regularized reconstruction, solved with the Primal-Dual Hybrid Gradient over the whole batch.
+
+    Considers the problem :math:`\\min_x \\frac{1}{2} \\| A x - y \\|_2^2 + \\lambda \\| G x \\|_1`, with dual step
+    :math:`\\sigma = 1` and primal step :math:`\\tau = 1 / \\lambda_{max}(A^H A + G^H G)` estimated per sample, as
+    ``sigpy.mri.app.TotalVariationRecon``.
+
+    Parameters
+    ----------
+    A : SenseOperator
+        Forward operator.
+    y : torch.Tensor
+        Complex subsampled k-space, already weighted by the square root of the mask. Shape [batch_size, n_coils, n_x,
+        n_y]
+    reg_wt : float
+        Regularization weight :math:`\\lambda`.
+    num_iters : int
+        Number of iterations. Default is ``100``.
+
+    Returns
+    -------
+    torch.Tensor
+        Complex reconstructed image. Shape [batch_size, n_x, n_y]
+    """
+    sigma = 1.0
+    x = torch.zeros_like(A.adjoint(y))
+    max_eig = max_eigenvalue(
+        lambda v: A.normal(v) + finite_difference_adjoint(finite_difference(v)), torch.randn_like(x)
+    )
+    tau = 1 / max_eig
+
+    u_data = torch.zeros_like(y)
+    u_tv = torch.zeros_like(finite_difference(x))
+    x_ext = x.clone()
+    for _ in range(num_iters):
+        # dual update, with the proximal operators of the convex conjugates
+        u_data = (u_data + sigma * A.forward(x_ext) - sigma * y) / (1 + sigma)
+        u_tv = u_tv + sigma * finite_difference(x_ext)
+        u_tv = u_tv * torch.clamp(reg_wt / torch.abs(u_tv).clamp(min=torch.finfo(u_tv.real.dtype).tiny), max=1)
+        # primal update and extrapolation
+        x_old = x
+        x = x - tau * (A.adjoint(u_data) + finite_difference_adjoint(u_tv))
+        x_ext = 2 * x - x_old
+    return x
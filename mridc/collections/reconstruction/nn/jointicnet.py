@@ -276,8 +276,10 @@ class JointICNet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
             utils.complex_conj(sensitivity_maps),
         ).sum(self.coil_dim)
         for idx in range(self.num_iter):
-            sensitivity_maps = self.update_C(idx, DC_sens, image, sensitivity_maps, y, mask)
-            image = self.update_X(idx, image, sensitivity_maps, y, mask)
+            sensitivity_maps = self.checkpoint_step(
+                self.update_C, idx, DC_sens, image, sensitivity_maps, y, mask, step=idx
+            )
+            image = self.checkpoint_step(self.update_X, idx, image, sensitivity_maps, y, mask, step=idx)
         image = torch.view_as_complex(image)
         if target.shape[-1] == 2:
             target = torch.view_as_complex(target)
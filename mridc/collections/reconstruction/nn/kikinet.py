@@ -139,7 +139,7 @@ class KIKINet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
         for idx in range(self.num_iter):
             soft_dc = torch.where(mask.bool(), kspace - y, zero) * self.dc_weight
 
-            kspace = self.kspace_model_list[idx](kspace)
+            kspace = self.checkpoint_step(self.kspace_model_list[idx], kspace, step=idx)
             if kspace.shape[-1] != 2:
                 kspace = kspace.permute(0, 1, 3, 4, 2).to(target)
                 # this is necessary, but why?
@@ -154,7 +154,9 @@ class KIKINet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
                 ),
                 utils.complex_conj(sensitivity_maps),
             ).sum(self.coil_dim)
-            image = self.image_model_list[idx](image.unsqueeze(self.coil_dim)).squeeze(self.coil_dim)
+            image = self.checkpoint_step(self.image_model_list[idx], image.unsqueeze(self.coil_dim), step=idx).squeeze(
+                self.coil_dim
+            )
 
             if not self.no_dc:
                 image = fft.fft2(
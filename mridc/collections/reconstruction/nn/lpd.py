@@ -169,7 +169,7 @@ class LPDNet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
                     spatial_dims=self.spatial_dims,
                 ).type(f_2.type()),
             )
-            dual_buffer = self.dual_net[idx](dual_buffer, f_2, y)
+            dual_buffer = self.checkpoint_step(self.dual_net[idx], dual_buffer, f_2, y, step=idx)
 
             # Primal
             h_1 = dual_buffer[..., 0:2].clone()
@@ -184,7 +184,7 @@ class LPDNet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
                 ),
                 utils.complex_conj(sensitivity_maps),
             ).sum(self.coil_dim)
-            primal_buffer = self.primal_net[idx](primal_buffer, h_1)
+            primal_buffer = self.checkpoint_step(self.primal_net[idx], primal_buffer, h_1, step=idx)
 
         output = primal_buffer[..., 0:2]
         output = (output**2).sum(-1).sqrt()
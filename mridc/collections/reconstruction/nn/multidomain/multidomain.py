@@ -318,19 +318,9 @@ class StandardizationLayer(nn.Module):
     def forward(self, coil_images: torch.Tensor, sensitivity_map: torch.Tensor) -> torch.Tensor:
         """Forward pass."""
         combined_image = utils.complex_mul(coil_images, utils.complex_conj(sensitivity_map)).sum(self.coil_dim)
-        residual_image = combined_image.unsqueeze(self.coil_dim) - utils.complex_mul(
-            combined_image.unsqueeze(self.coil_dim), sensitivity_map
-        )
-        return torch.cat(
-            [
-                torch.cat(
-                    [combined_image, residual_image.select(self.coil_dim, idx)],
-                    self.channel_dim,
-                ).unsqueeze(self.coil_dim)
-                for idx in range(coil_images.size(self.coil_dim))
-            ],
-            self.coil_dim,
-        )
+        combined_image = combined_image.unsqueeze(self.coil_dim)
+        residual_image = combined_image - utils.complex_mul(combined_image, sensitivity_map)
+        return torch.cat([combined_image.expand_as(residual_image), residual_image], self.channel_dim)
 
 
 class MultiDomainUnet2d(nn.Module):
@@ -45,7 +45,8 @@ class MultiDomainNet(base_models.BaseMRIReconstructionModel, ABC):  # type: igno
 
     def _compute_model_per_coil(self, model: torch.nn.Module, data: torch.Tensor) -> torch.Tensor:
         """
-        Computes the model per coil.
+        Computes the model per coil, with the coil dimension folded into the batch dimension and chunked by
+        ``coil_chunk_size``.
 
         Parameters
         ----------
@@ -59,12 +60,9 @@ class MultiDomainNet(base_models.BaseMRIReconstructionModel, ABC):  # type: igno
         torch.Tensor
             The computed output. Shape [batch_size, n_coils, n_x, n_y, 2].
         """
-        output = []
-        for idx in range(data.size(self.coil_dim)):
-            subselected_data = data.select(self.coil_dim, idx)
-            output.append(model(subselected_data))
-        output = torch.stack(output, dim=self.coil_dim)
-        return output
+        return utils.apply_per_coil(
+            model, data, self.coil_dim, chunk_size=self.coil_chunk_size, checkpoint_fn=self.checkpoint_step
+        )
 
     @common_classes.typecheck()  # type: ignore
     def forward(  # noqa: W0221
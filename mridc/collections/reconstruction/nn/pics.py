@@ -15,16 +15,25 @@ import mridc.core.classes.common as common_classes
 from mridc.collections.common.parts import fft, utils
 from mridc.collections.reconstruction.metrics import reconstruction_metrics
 
-os.environ["TOOLBOX_PATH"] = "/opt/amc/bart-0.8.00/bin/"
-os.environ["PYTHONPATH"] = "/opt/amc/bart-0.8.00/python"
-sys.path.append(os.environ["TOOLBOX_PATH"])
-sys.path.append(os.environ["PYTHONPATH"])
-try:
-    import bart
-except ImportError:
-    print("BART is not installed")
 __all__ = ["PICS"]
 
+# default installation of BART, used if TOOLBOX_PATH is not set
+BART_TOOLBOX_PATH = "/opt/amc/bart-0.8.00/bin/"
+BART_PYTHON_PATH = "/opt/amc/bart-0.8.00/python"
+
+
+def _import_bart():
+    """Import the python bindings of BART on first use, as BART is an optional dependency."""
+    os.environ.setdefault("TOOLBOX_PATH", BART_TOOLBOX_PATH)
+    for path in (os.environ["TOOLBOX_PATH"], BART_PYTHON_PATH):
+        if path not in sys.path:
+            sys.path.append(path)
+    try:
+        import bart
+    except ImportError as e:
+        raise ImportError("PICS requires BART. Please install BART and set TOOLBOX_PATH to its installation.") from e
+    return bart
+
 
 class PICS(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
     """
@@ -73,6 +82,7 @@ class PICS(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
         pred: torch.Tensor, shape [batch_size, n_x, n_y, 2]
             Predicted data.
         """
+        bart = _import_bart()
         if "cuda" in str(self._device):
             pred = bart.bart(1, f"pics -d0 -g -S -R W:7:0:{self.reg_wt} -i {self.num_iters}", y, sensitivity_maps)[0]
         else:
@@ -152,13 +162,12 @@ class PICS(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
 
         target = target.numpy()  # type: ignore
         output = output.numpy()  # type: ignore
-        self.mse_vals[fname][slice_num] = torch.tensor(reconstruction_metrics.mse(target, output)).view(1)
-        self.nmse_vals[fname][slice_num] = torch.tensor(reconstruction_metrics.nmse(target, output)).view(1)
-        self.ssim_vals[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.ssim(target, output, maxval=output.max() - output.min())
-        ).view(1)
-        self.psnr_vals[fname][slice_num] = torch.tensor(
-            reconstruction_metrics.psnr(target, output, maxval=output.max() - output.min())
-        ).view(1)
+        self.volume_metrics.update(
+            name,
+            MSE=torch.tensor(reconstruction_metrics.mse(target, output)),
+            NMSE=torch.tensor(reconstruction_metrics.nmse(target, output)),
+            SSIM=torch.tensor(reconstruction_metrics.ssim(target, output, maxval=output.max() - output.min())),
+            PSNR=torch.tensor(reconstruction_metrics.psnr(target, output, maxval=output.max() - output.min())),
+        )
 
         return name, slice_num, prediction.detach().cpu().numpy()
@@ -53,6 +53,8 @@ class ResNet(base_models.BaseMRIReconstructionModel, ABC):
                 self.spatial_dims,
                 self.coil_dim,
                 self.coil_combination_method,
+                cfg_dict.get("conjugate_gradient_tolerance", 0.0),
+                cfg_dict.get("conjugate_gradient_implicit_backward", False),
             )
 
     @common_classes.typecheck()  # type: ignore
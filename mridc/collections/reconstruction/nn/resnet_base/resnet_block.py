@@ -1,7 +1,7 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from typing import Sequence
+from typing import Optional, Sequence
 
 import torch
 from torch import nn
@@ -58,12 +58,39 @@ class ConjugateGradient(nn.Module):
     """
     Conjugate Gradient algorithm for solving the linear system of equations, as presented in [1].
 
+    The system is solved for every sample of the batch independently, i.e. step sizes and stopping criterion are
+    computed per sample. Optionally, the gradients are computed implicitly, by solving the adjoint system in the
+    backward pass, so that memory does not scale with the number of iterations.
+
     References
     ----------
     [1] Yaman, B, Hosseini, SAH, Moeller, S, Ellermann, J, Uğurbil, K, Akçakaya, M. Self-supervised learning of
         physics-guided reconstruction neural networks without fully sampled reference data. Magn Reson Med. 2020; 84:
         3172– 3191. https://doi.org/10.1002/mrm.28378
 
+    Parameters
+    ----------
+    CG_Iter : int
+        Maximum number of Conjugate Gradient iterations. Default is ``10``.
+    mu : nn.Parameter
+        Penalization weight. Default is ``0.05``.
+    fft_centered : bool
+        Whether to center the FFT. Default is ``False``.
+    fft_normalization : str
+        FFT normalization. Default is ``"ortho"``.
+    spatial_dims : Sequence[int]
+        Spatial dimensions. Default is ``(-2, -1)``.
+    coil_dim : int
+        Coil dimension. Default is ``1``.
+    coil_combination_method : str
+        Coil combination method. Default is ``"SENSE"``.
+    tol : float
+        Relative residual tolerance, per sample. A sample stops updating once ``||r|| <= tol * ||rhs||``, and the
+        loop exits when all samples have converged. Default is ``0.0``, i.e. always run ``CG_Iter`` iterations.
+    implicit_backward : bool
+        If True, the solution is computed without tracking gradients and the backward pass solves the adjoint system
+        instead of backpropagating through the iterations. Requires ``coil_combination_method="SENSE"``, so that the
+        normal operator is Hermitian. Default is ``False``.
     """
 
     def __init__(  # noqa: W0221
@@ -75,6 +102,8 @@ class ConjugateGradient(nn.Module):
         spatial_dims: Sequence[int] = (-2, -1),
         coil_dim: int = 1,
         coil_combination_method: str = "SENSE",
+        tol: float = 0.0,
+        implicit_backward: bool = False,
     ):
         super().__init__()
         self.CG_Iter = CG_Iter
@@ -84,8 +113,17 @@ class ConjugateGradient(nn.Module):
         self.spatial_dims = spatial_dims
         self.coil_dim = coil_dim
         self.coil_combination_method = coil_combination_method
+        self.tol = tol
+        if implicit_backward and coil_combination_method.upper() != "SENSE":
+            raise ValueError(
+                "Implicit differentiation of the Conjugate Gradient requires a Hermitian normal operator, i.e. "
+                f"coil_combination_method='SENSE'. Got {coil_combination_method}."
+            )
+        self.implicit_backward = implicit_backward
 
-    def EhE_Op(self, prediction: torch.Tensor, sens_maps: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+    def EhE_Op(
+        self, prediction: torch.Tensor, sens_maps: torch.Tensor, mask: torch.Tensor, mu: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
         """
         This function calculates the product of the operator EhE with a given vector.
 
@@ -97,12 +135,16 @@ class ConjugateGradient(nn.Module):
             The sensitivity maps.
         mask : torch.Tensor
             The undersampling mask.
+        mu : torch.Tensor, optional
+            The penalization weight. If None, ``self.mu`` is used. Default is ``None``.
 
         Returns
         -------
         torch.Tensor
             Data consistency term.
         """
+        if mu is None:
+            mu = self.mu
         kspace = fft.fft2(
             prediction.unsqueeze(self.coil_dim) * sens_maps,
             self.fft_centered,
@@ -116,50 +158,72 @@ class ConjugateGradient(nn.Module):
             image_space, torch.view_as_real(sens_maps), self.coil_combination_method, self.coil_dim
         )
         pred = torch.view_as_real(pred[..., 0] + 1j * pred[..., 1])
-        return torch.view_as_complex(pred) + self.mu * prediction
+        return torch.view_as_complex(pred) + mu * prediction
 
-    def proximal_gradient(  # noqa: W0221
-        self,
-        rsold: torch.Tensor,
-        x: torch.Tensor,
-        r: torch.Tensor,
-        p: torch.Tensor,
-        sens_maps: torch.Tensor,
-        mask: torch.Tensor,
-    ) -> torch.Tensor:
+    @staticmethod
+    def batch_dot(x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
         """
-        Proximal gradient descent.
+        Computes the complex inner product <x, y> of every sample of the batch.
 
         Parameters
         ----------
-        rsold : torch.Tensor
-            The residual.
         x : torch.Tensor
-            The current estimate.
-        r : torch.Tensor
-            The current residual.
-        p : torch.Tensor
-            The current search direction.
+            Complex tensor of shape [batch_size, ...].
+        y : torch.Tensor
+            Complex tensor of shape [batch_size, ...].
+
+        Returns
+        -------
+        torch.Tensor
+            Inner products, broadcastable to the inputs. Shape [batch_size, 1, ..., 1].
+        """
+        return torch.sum(torch.conj(x) * y, dim=tuple(range(1, x.dim())), keepdim=True)
+
+    def solve(
+        self, rhs: torch.Tensor, sens_maps: torch.Tensor, mask: torch.Tensor, mu: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """
+        Solves (EhE + mu I) x = rhs for every sample of the batch.
+
+        Parameters
+        ----------
+        rhs : torch.Tensor
+            The right-hand side of the linear system. Complex tensor of shape [batch_size, n_x, n_y].
         sens_maps : torch.Tensor
-            The sensitivity maps.
+            The sensitivity maps. Complex tensor of shape [batch_size, n_coils, n_x, n_y].
         mask : torch.Tensor
             The undersampling mask.
+        mu : torch.Tensor, optional
+            The penalization weight. If None, ``self.mu`` is used. Default is ``None``.
 
         Returns
         -------
         torch.Tensor
-            The new residual, the new estimate, the new residual, and the new search direction.
+            The solution of the linear system. Complex tensor of shape [batch_size, n_x, n_y].
         """
-        Ap = self.EhE_Op(p, sens_maps, mask)
-        alpha = rsold / torch.sum(torch.conj(p) * Ap)
-        alpha = alpha + 0j
-        x = x + alpha * p
-        r = r - alpha * Ap
-        rsnew = torch.sum(torch.conj(r) * r)
-        beta = rsnew / rsold
-        beta = beta + 0j
-        p = r + beta * p
-        return rsnew, x, r, p
+        x = torch.zeros_like(rhs)
+        r, p = rhs, rhs
+        rsold = self.batch_dot(r, r).real
+        # iterating below machine precision only underflows the step sizes, so the tolerance is bounded by it
+        threshold = max(self.tol, torch.finfo(rsold.dtype).eps) ** 2 * rsold
+        # samples with a zero right-hand side are solved by x = 0
+        converged = rsold <= threshold
+        for _ in range(self.CG_Iter):
+            if self.tol > 0 and bool(converged.all()):
+                break
+            active = (~converged).to(rsold)
+            Ap = self.EhE_Op(p, sens_maps, mask, mu)
+            pAp = self.batch_dot(p, Ap)
+            # converged samples keep their estimate, the safe denominators avoid NaNs in their (masked) updates
+            alpha = active * rsold / torch.where(converged, torch.ones_like(pAp), pAp)
+            x = x + alpha * p
+            r = r - alpha * Ap
+            rsnew = self.batch_dot(r, r).real
+            beta = active * rsnew / torch.where(converged, torch.ones_like(rsold), rsold)
+            p = r + beta * p
+            rsold = torch.where(converged, rsold, rsnew)
+            converged = converged | (rsnew <= threshold)
+        return x
 
     def forward(self, rhs: torch.Tensor, sens_maps: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
         """
@@ -181,10 +245,93 @@ class ConjugateGradient(nn.Module):
         """
         rhs = torch.view_as_complex(rhs)
         sens_maps = torch.view_as_complex(sens_maps)
-        x = torch.zeros_like(rhs)
-        i, r, p = 0, rhs, rhs
-        rsold = torch.sum(torch.conj(r) * r)
-        while i < self.CG_Iter:
-            rsold, x, r, p = self.proximal_gradient(rsold, x, r, p, sens_maps, mask)
-            i += 1
+        if self.implicit_backward:
+            x = ImplicitConjugateGradient.apply(self, rhs, sens_maps, mask, self.mu)
+        else:
+            x = self.solve(rhs, sens_maps, mask)
         return torch.view_as_real(x)
+
+
+class ImplicitConjugateGradient(torch.autograd.Function):
+    """
+    Differentiates the solution x = A^-1 b of the Conjugate Gradient implicitly, with A = EhE + mu I. The backward
+    pass solves the adjoint system A^H v = grad_x, which for a Hermitian A is another Conjugate Gradient solve. Then
+    grad_b = v and the gradients of the operator parameters are the vector-Jacobian product of A(x) with -v.
+    """
+
+    @staticmethod
+    def forward(  # noqa: W0221
+        ctx: torch.autograd.function,
+        solver: ConjugateGradient,
+        rhs: torch.Tensor,
+        sens_maps: torch.Tensor,
+        mask: torch.Tensor,
+        mu: torch.Tensor,
+    ) -> torch.Tensor:
+        """
+        Forward pass, solves the linear system without tracking the iterations.
+
+        Parameters
+        ----------
+        ctx : torch.autograd.function
+            Context object.
+        solver : ConjugateGradient
+            The Conjugate Gradient module.
+        rhs : torch.Tensor
+            The right-hand side of the linear system. Complex tensor of shape [batch_size, n_x, n_y].
+        sens_maps : torch.Tensor
+            The sensitivity maps. Complex tensor of shape [batch_size, n_coils, n_x, n_y].
+        mask : torch.Tensor
+            The undersampling mask.
+        mu : torch.Tensor
+            The penalization weight.
+
+        Returns
+        -------
+        torch.Tensor
+            The solution of the linear system. Complex tensor of shape [batch_size, n_x, n_y].
+        """
+        with torch.no_grad():
+            x = solver.solve(rhs, sens_maps, mask, mu)
+        ctx.solver = solver
+        ctx.save_for_backward(x, sens_maps, mask, mu)
+        return x
+
+    @staticmethod
+    def backward(ctx: torch.autograd.function, grad_x: torch.Tensor):  # noqa: W0221
+        """
+        Backward pass, solves the adjoint system.
+
+        Parameters
+        ----------
+        ctx : torch.autograd.function
+            Context object.
+        grad_x : torch.Tensor
+            Gradient of the solution. Complex tensor of shape [batch_size, n_x, n_y].
+
+        Returns
+        -------
+        Tuple[None, torch.Tensor, torch.Tensor, None, torch.Tensor]
+            Gradients of the right-hand side, sensitivity maps and penalization weight.
+        """
+        x, sens_maps, mask, mu = ctx.saved_tensors
+        with torch.no_grad():
+            v = ctx.solver.solve(grad_x, sens_maps, mask, mu)
+
+        grad_sens_maps, grad_mu = None, None
+        needs_sens_maps_grad, needs_mu_grad = ctx.needs_input_grad[2], ctx.needs_input_grad[4]
+        if needs_sens_maps_grad or needs_mu_grad:
+            with torch.enable_grad():
+                sens_maps = sens_maps.detach().requires_grad_(needs_sens_maps_grad)
+                mu = mu.detach().requires_grad_(needs_mu_grad)
+                Ax = ctx.solver.EhE_Op(x, sens_maps, mask, mu)
+                inputs = [
+                    t for t, needs_grad in ((sens_maps, needs_sens_maps_grad), (mu, needs_mu_grad)) if needs_grad
+                ]
+                grads = list(torch.autograd.grad(Ax, inputs, grad_outputs=-v))
+            if needs_sens_maps_grad:
+                grad_sens_maps = grads.pop(0)
+            if needs_mu_grad:
+                grad_mu = grads.pop(0)
+
+        return None, v, grad_sens_maps, None, grad_mu
@@ -170,12 +170,14 @@ class RecurrentVarNet(base_models.BaseMRIReconstructionModel, ABC):  # type: ign
 
         for step in range(self.num_steps):
             block = self.block_list[step] if self.no_parameter_sharing else self.block_list[0]
-            kspace_prediction, previous_state = block(
+            kspace_prediction, previous_state = self.checkpoint_step(
+                block,
                 kspace_prediction,
                 y,
                 mask,
                 sensitivity_maps,
                 previous_state,
+                step=step,
             )
 
         prediction = fft.ifft2(
@@ -212,32 +212,45 @@ class ConjugateGradient(torch.autograd.Function):
 
     @staticmethod
     def solve(x0: torch.Tensor, M: torch.Tensor, tol: float, max_iter: int) -> torch.Tensor:  # noqa: W0221
-        """Solve the linear system Mx=b using conjugate gradient."""
+        """
+        Solve the linear system Mx=b using conjugate gradient. Every sample of the batch is solved independently, i.e.
+        with its own step sizes, and stops updating once its relative residual is below ``tol``. The loop exits when
+        all samples have converged.
+        """
         nBatch = x0.shape[0]
         x = torch.zeros(x0.shape).to(x0.device)
         r = x0.clone()
         p = x0.clone()
         x0x0 = (x0.pow(2)).view(nBatch, -1).sum(-1)
         rr = torch.stack([(r.pow(2)).view(nBatch, -1).sum(-1), torch.zeros(nBatch).to(x0.device)], dim=-1)
+        converged = rr[..., 0] <= tol * x0x0
 
         it = 0
-        while torch.min(rr[..., 0] / x0x0) > tol and it < max_iter:
+        while not bool(converged.all()) and it < max_iter:
             it += 1
+            active = (~converged).to(x0).reshape(nBatch, 1, 1, 1, 1)
             q = M(p)
 
             data1 = rr
             data2 = ConjugateGradient.complexDot(p, q)
+            # converged samples are masked out, a unit denominator avoids NaNs in their updates
+            data2 = torch.where(converged.unsqueeze(-1), torch.ones_like(data2), data2)
 
             re1, im1 = torch.unbind(data1, -1)
             re2, im2 = torch.unbind(data2, -1)
-            alpha = torch.stack([re1 * re2 + im1 * im2, im1 * re2 - re1 * im2], -1) / utils.complex_abs(data2) ** 2
+            alpha = torch.stack([re1 * re2 + im1 * im2, im1 * re2 - re1 * im2], -1) / (
+                utils.complex_abs(data2) ** 2
+            ).unsqueeze(-1)
+            alpha = alpha.reshape(nBatch, 1, 1, 1, -1) * active
 
-            x += utils.complex_mul(alpha.reshape(nBatch, 1, 1, 1, -1), p.clone())
-            r -= utils.complex_mul(alpha.reshape(nBatch, 1, 1, 1, -1), q.clone())
+            x += utils.complex_mul(alpha, p.clone())
+            r -= utils.complex_mul(alpha, q.clone())
             rr_new = torch.stack([(r.pow(2)).view(nBatch, -1).sum(-1), torch.zeros(nBatch).to(x0.device)], dim=-1)
-            beta = torch.stack([rr_new[..., 0] / rr[..., 0], torch.zeros(nBatch).to(x0.device)], dim=-1)
-            p = r.clone() + utils.complex_mul(beta.reshape(nBatch, 1, 1, 1, -1), p)
-            rr = rr_new.clone()
+            rr_old = torch.where(converged, torch.ones_like(rr[..., 0]), rr[..., 0])
+            beta = torch.stack([rr_new[..., 0] / rr_old, torch.zeros(nBatch).to(x0.device)], dim=-1)
+            p = r.clone() + utils.complex_mul(beta.reshape(nBatch, 1, 1, 1, -1) * active, p)
+            rr = torch.where(converged.unsqueeze(-1), rr, rr_new)
+            converged = converged | (rr[..., 0] <= tol * x0x0)
         return x
 
     @staticmethod
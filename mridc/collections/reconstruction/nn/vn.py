@@ -86,8 +86,8 @@ class VarNet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
             Reconstructed image. Shape [batch_size, n_x, n_y, 2]
         """
         prediction = y.clone()
-        for cascade in self.cascades:
-            prediction = cascade(prediction, y, sensitivity_maps, mask)
+        for i, cascade in enumerate(self.cascades):
+            prediction = self.checkpoint_step(cascade, prediction, y, sensitivity_maps, mask, step=i)
         prediction = fft.ifft2(
             prediction,
             centered=self.fft_centered,
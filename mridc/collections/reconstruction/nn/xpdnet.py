@@ -94,6 +94,7 @@ class XPDNet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
                             normalize=cfg_dict.get("kspace_unet_normalize"),
                         ),
                         coil_to_batch=True,
+                        coil_chunk_size=self.coil_chunk_size,
                     )
                     for _ in range(num_iter)
                 ]
@@ -189,7 +190,7 @@ class XPDNet(base_models.BaseMRIReconstructionModel, ABC):  # type: ignore
         torch.Tensor
             Reconstructed image. Shape [batch_size, n_x, n_y, 2]
         """
-        prediction = self.xpdnet(y, sensitivity_maps, mask)
+        prediction = self.xpdnet(y, sensitivity_maps, mask, checkpoint_fn=self.checkpoint_step)
         prediction = (prediction**2).sqrt().sum(-1)
         if target.shape[-1] == 2:
             target = torch.view_as_complex(target)
@@ -1,8 +1,11 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.reconstruction.parts.transforms import (
-    GeometricDecompositionCoilCompression,
-    MRIDataTransforms,
-    NoisePreWhitening,
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "transforms": ["GeometricDecompositionCoilCompression", "MRIDataTransforms", "NoisePreWhitening"]
+    },
 )
@@ -1,7 +1,7 @@
 # coding=utf-8
 
-from mridc.collections.segmentation import data, losses, models, parts
 from mridc.package_info import __version__
+from mridc.utils.lazy_import import attach
 
 # Set collection version equal to MRIDC version.
 __version = __version__
@@ -11,3 +11,5 @@ __author__ = "Dimitrios Karkalousos"
 
 # Set collection name.
 __description__ = "Segmentation and Joint Reconstruction & Segmentation MRI models collection"
+
+__getattr__, __dir__, __all__ = attach(__name__, submodules=["data", "losses", "models", "parts"])
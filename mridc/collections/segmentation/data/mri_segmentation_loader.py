@@ -10,9 +10,10 @@ import numpy as np
 
 from mridc.collections.common.data.mri_loader import MRIDataset
 from mridc.collections.common.parts.utils import is_none
+from mridc.collections.segmentation.parts.utils import SegmentationLabelsMixin
 
 
-class SegmentationMRIDataset(MRIDataset):
+class SegmentationMRIDataset(SegmentationLabelsMixin, MRIDataset):
     """
     A dataset class for MRI segmentation.
 
@@ -73,6 +74,8 @@ class SegmentationMRIDataset(MRIDataset):
         ``(0.5, 0.5, 0.5, 0.5, 0.5)``. Default is ``None``.
     complex_data : bool, optional
         Whether the data is complex. If ``False``, the data is assumed to be magnitude only. Default is ``True``.
+    cache_segmentation_labels : bool, optional
+        Whether to cache the processed segmentation labels per file, in memory. Default is ``False``.
     **kwargs : dict
         Additional keyword arguments.
 
@@ -114,6 +117,7 @@ class SegmentationMRIDataset(MRIDataset):
         segmentation_classes_to_separate: Optional[Tuple[int]] = None,
         segmentation_classes_thresholds: Optional[Tuple[float]] = None,
         complex_data: bool = True,
+        cache_segmentation_labels: bool = False,
         **kwargs,
     ):
         super().__init__(
@@ -142,6 +146,13 @@ class SegmentationMRIDataset(MRIDataset):
         self.segmentation_classes_to_separate = segmentation_classes_to_separate
         self.segmentation_classes_thresholds = segmentation_classes_thresholds
         self.complex_data = complex_data
+        self.init_segmentation_labels(
+            segmentation_classes_to_remove,
+            segmentation_classes_to_combine,
+            segmentation_classes_to_separate,
+            segmentation_classes_thresholds,
+            cache_segmentation_labels,
+        )
 
     def process_segmentation_labels(self, segmentation_labels: np.ndarray) -> np.ndarray:  # noqa: C901
         """
@@ -177,62 +188,8 @@ class SegmentationMRIDataset(MRIDataset):
         elif segmentation_labels.ndim == 4 and segmentation_labels_dim == 2:
             segmentation_labels = np.transpose(segmentation_labels, (0, 1, 3, 2))
 
-        removed_classes = 0
-
-        # check if we need to remove any classes, e.g. background
-        if not is_none(self.segmentation_classes_to_remove):
-            segmentation_labels = np.stack(
-                [
-                    segmentation_labels[..., x]
-                    for x in range(segmentation_labels.shape[-1])
-                    if x not in self.segmentation_classes_to_remove  # type: ignore
-                ],
-                axis=-1,
-            )
-            removed_classes += len(self.segmentation_classes_to_remove)  # type: ignore
-
-        # check if we need to combine any classes, e.g. White Matter and Gray Matter
-        if not is_none(self.segmentation_classes_to_combine):
-            segmentation_labels_to_combine = []
-            segmentation_labels_to_keep = []
-            for x in range(segmentation_labels.shape[-1]):
-                if x in self.segmentation_classes_to_combine:  # type: ignore
-                    segmentation_labels_to_combine.append(segmentation_labels[..., x - removed_classes])
-                else:
-                    segmentation_labels_to_keep.append(segmentation_labels[..., x - removed_classes])
-            segmentation_labels_to_combine = np.expand_dims(
-                np.sum(np.stack(segmentation_labels_to_combine, axis=-1), axis=-1), axis=-1
-            )
-            segmentation_labels_to_keep = np.stack(segmentation_labels_to_keep, axis=-1)
-
-            if self.segmentation_classes_to_remove is not None and (
-                0 in self.segmentation_classes_to_remove or "0" in self.segmentation_classes_to_remove
-            ):
-                # if background is removed, we can stack the combined labels with the rest straight away
-                segmentation_labels = np.concatenate(
-                    [segmentation_labels_to_combine, segmentation_labels_to_keep], axis=-1
-                )
-            else:
-                # if background is not removed, we need to add it back as new background channel
-                segmentation_labels = np.concatenate(
-                    [
-                        np.expand_dims(segmentation_labels[..., 0], axis=-1),
-                        segmentation_labels_to_combine,
-                        segmentation_labels_to_keep,
-                    ],
-                    axis=-1,
-                )
-
-            removed_classes += len(self.segmentation_classes_to_combine) - 1  # type: ignore
-
-        # check if we need to separate any classes, e.g. pathologies from White Matter and Gray Matter
-        if not is_none(self.segmentation_classes_to_separate):
-            for x in self.segmentation_classes_to_separate:  # type: ignore
-                segmentation_class_to_separate = segmentation_labels[..., x - removed_classes]
-                for i in range(segmentation_labels.shape[-1]):
-                    if i == x - removed_classes:
-                        continue
-                    segmentation_labels[..., i][segmentation_class_to_separate > 0] = 0
+        # remove, combine, and separate classes, and threshold probability maps, in a single compiled remapping
+        segmentation_labels = self.segmentation_labels_remapping(segmentation_labels)
 
         segmentation_labels = (
             np.moveaxis(segmentation_labels, -1, 0)
@@ -240,12 +197,6 @@ class SegmentationMRIDataset(MRIDataset):
             else np.moveaxis(segmentation_labels, -1, 1)
         )
 
-        # # threshold probability maps if any threshold is given
-        if not is_none(self.segmentation_classes_thresholds):
-            for i, voxel_thres in enumerate(self.segmentation_classes_thresholds):  # type: ignore
-                if not is_none(voxel_thres):
-                    segmentation_labels[..., i] = segmentation_labels[..., i] > float(voxel_thres)
-
         if self.consecutive_slices == 1:
             if segmentation_labels.shape[1] == self.segmentation_classes:
                 segmentation_labels = np.moveaxis(segmentation_labels, 1, 0)
@@ -322,15 +273,7 @@ class SegmentationMRIDataset(MRIDataset):
                 sensitivity_map = np.array([])
                 mask = np.empty([])
 
-            if self.segmentations_root is not None and self.segmentations_root != "None":
-                with h5py.File(Path(self.segmentations_root) / fname.name, "r") as sf:
-                    segmentation_labels = np.asarray(self.get_consecutive_slices(sf, "segmentation", dataslice))
-                    segmentation_labels = self.process_segmentation_labels(segmentation_labels)
-            elif "segmentation" in hf:
-                segmentation_labels = np.asarray(self.get_consecutive_slices(hf, "segmentation", dataslice))
-                segmentation_labels = self.process_segmentation_labels(segmentation_labels)
-            else:
-                segmentation_labels = np.empty([])
+            segmentation_labels = self.get_segmentation_labels(hf, fname, dataslice)
 
             if not is_none(self.initial_predictions_root):
                 with h5py.File(Path(self.initial_predictions_root) / fname.name, "r") as pf:  # type: ignore
@@ -1,5 +1,8 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.segmentation.losses.cross_entropy import MC_CrossEntropyLoss
-from mridc.collections.segmentation.losses.dice import Dice
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, submodule_attributes={"cross_entropy": ["MC_CrossEntropyLoss"], "dice": ["Dice"]}
+)
@@ -3,6 +3,7 @@ __author__ = "Dimitrios Karkalousos"
 
 import torch
 from torch import nn as nn
+from torch.utils.checkpoint import checkpoint
 
 from mridc.collections.common.parts import is_none
 
@@ -17,6 +18,8 @@ class MC_CrossEntropyLoss(nn.Module):
         reduction: str = "none",
         label_smoothing: float = 0.0,
         weight: torch.Tensor = None,
+        num_samples_per_chunk: int = None,
+        antithetic: bool = False,
     ) -> None:
         """
         Parameters
@@ -31,9 +34,19 @@ class MC_CrossEntropyLoss(nn.Module):
             Label smoothing, by default 0.0
         weight : torch.Tensor, optional
             Weight for each class, by default None
+        num_samples_per_chunk : int, optional
+            Number of Monte Carlo samples drawn at once. The loss is accumulated over chunks, so that the peak memory
+            scales with the chunk size instead of the number of samples. By default None, drawing all samples at once.
+        antithetic : bool, optional
+            Draw the Monte Carlo samples in antithetic pairs (noise, -noise) within each chunk, reducing the variance
+            of the estimate for the same number of samples, by default False
         """
         super().__init__()
         self.mc_samples = num_samples
+        self.mc_samples_per_chunk = (
+            num_samples if is_none(num_samples_per_chunk) else max(min(num_samples_per_chunk, num_samples), 1)
+        )
+        self.antithetic = antithetic
 
         self.cross_entropy = torch.nn.CrossEntropyLoss(
             weight=weight,
@@ -42,16 +55,33 @@ class MC_CrossEntropyLoss(nn.Module):
             label_smoothing=label_smoothing,
         )
 
+    def mc_chunk_loss(self, target, input, pred_std, num_samples):
+        """Sum over a chunk of Monte Carlo samples of the cross entropy of the noisy predictions."""
+        noise = torch.randn(
+            [(num_samples + 1) // 2 if self.antithetic else num_samples, *input.shape],
+            device=input.device,
+            dtype=input.dtype,
+        )
+        if self.antithetic:
+            noise = torch.cat([noise, -noise])[:num_samples]
+        noisy_pred = (input.unsqueeze(0) + pred_std.unsqueeze(0) * noise).flatten(0, 1)
+        tiled_target = target.unsqueeze(0).expand(num_samples, *target.shape).flatten(0, 1)
+        return self.cross_entropy(noisy_pred, tiled_target).mean() * num_samples
+
     def forward(self, target, input, pred_log_var=None):
         """Forward pass of Monte Carlo Cross Entropy Loss"""
         if self.mc_samples == 1 or pred_log_var is None:
             return self.cross_entropy(input, target).mean()
 
-        pred_shape = [self.mc_samples, *input.shape]
-        noise = torch.randn(pred_shape, device=input.device)
-        noisy_pred = input.unsqueeze(0) + torch.sqrt(torch.exp(pred_log_var)).unsqueeze(0) * noise
-        noisy_pred = noisy_pred.view(-1, *input.shape[1:])
-        tiled_target = target.unsqueeze(0).tile((self.mc_samples,)).view(-1, *target.shape[1:])
-
-        loss = self.cross_entropy(noisy_pred, tiled_target).view(self.mc_samples, -1, *input.shape[-2:]).mean(0)
-        return loss.mean()
+        pred_std = torch.exp(0.5 * pred_log_var)
+        chunked = self.mc_samples_per_chunk < self.mc_samples
+        loss = 0.0
+        for start in range(0, self.mc_samples, self.mc_samples_per_chunk):
+            num_samples = min(self.mc_samples_per_chunk, self.mc_samples - start)
+            if chunked and torch.is_grad_enabled():
+                # recompute the noisy predictions of each chunk on the backward pass, with the same noise, so that the
+                # autograd graph does not keep all samples alive
+                loss = loss + checkpoint(self.mc_chunk_loss, target, input, pred_std, num_samples, use_reentrant=False)
+            else:
+                loss = loss + self.mc_chunk_loss(target, input, pred_std, num_samples)
+        return loss / self.mc_samples
@@ -1,11 +1,18 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from mridc.collections.segmentation.models.attention_unet import SegmentationAttentionUNet
-from mridc.collections.segmentation.models.base import BaseMRIJointReconstructionSegmentationModel
-from mridc.collections.segmentation.models.idslr import IDSLR
-from mridc.collections.segmentation.models.jrscirim import JRSCIRIM
-from mridc.collections.segmentation.models.lambda_unet import SegmentationLambdaUNet
-from mridc.collections.segmentation.models.unet import SegmentationUNet
-from mridc.collections.segmentation.models.unet3d import Segmentation3DUNet
-from mridc.collections.segmentation.models.vnet import SegmentationVNet
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "attention_unet": ["SegmentationAttentionUNet"],
+        "base": ["BaseMRIJointReconstructionSegmentationModel"],
+        "idslr": ["IDSLR"],
+        "jrscirim": ["JRSCIRIM"],
+        "lambda_unet": ["SegmentationLambdaUNet"],
+        "unet": ["SegmentationUNet"],
+        "unet3d": ["Segmentation3DUNet"],
+        "vnet": ["SegmentationVNet"],
+    },
+)
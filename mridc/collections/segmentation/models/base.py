@@ -4,10 +4,10 @@ __author__ = "Dimitrios Karkalousos"
 import os
 from abc import ABC
 from collections import defaultdict
+from functools import partial
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Callable, Dict, Optional, Tuple
 
-import h5py
 import numpy as np
 import torch
 from omegaconf import DictConfig, OmegaConf
@@ -15,10 +15,12 @@ from pytorch_lightning import Trainer
 from torch.nn import L1Loss, MSELoss
 from torch.utils.data import DataLoader
 
+import mridc.collections.common.data.samplers as samplers
 import mridc.collections.common.losses as reconstruction_losses
 import mridc.collections.common.metrics.reconstruction_metrics as reconstruction_metrics
 import mridc.collections.common.parts.fft as fft
 import mridc.collections.common.parts.utils as utils
+import mridc.collections.common.parts.writers as writers
 import mridc.collections.reconstruction.data.subsample as subsample
 import mridc.collections.reconstruction.models.base as base_reconstruction_models
 import mridc.collections.segmentation.data.mri_data as segmentation_mri_data
@@ -64,6 +66,8 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
                 reduction=cfg_dict.get("cross_entropy_loss_reduction", "none"),
                 label_smoothing=cfg_dict.get("cross_entropy_loss_label_smoothing", 0.0),
                 weight=cross_entropy_loss_weight,
+                num_samples_per_chunk=cfg_dict.get("cross_entropy_loss_num_samples_per_chunk", None),
+                antithetic=cfg_dict.get("cross_entropy_loss_antithetic_sampling", False),
             )
             self.cross_entropy_loss_weighting_factor = cfg_dict.get("cross_entropy_loss_weighting_factor", 1.0)
         if "dice" in segmentation_loss_fn:
@@ -96,6 +100,8 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
             reduction=cfg_dict.get("cross_entropy_metric_reduction", "none"),
             label_smoothing=cfg_dict.get("cross_entropy_metric_label_smoothing", 0.0),
             weight=cross_entropy_metric_weight,
+            num_samples_per_chunk=cfg_dict.get("cross_entropy_metric_num_samples_per_chunk", None),
+            antithetic=cfg_dict.get("cross_entropy_metric_antithetic_sampling", False),
         )
         self.dice_coefficient_metric = segmentation_losses.dice.Dice(  # type: ignore
             include_background=cfg_dict.get("dice_metric_include_background", False),
@@ -213,7 +219,7 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
         loss_dict = {"cross_entropy_loss": 0.0, "dice_loss": 0.0}
         if self.segmentation_loss_fn["cross_entropy"] is not None:
             loss_dict["cross_entropy_loss"] = (
-                self.segmentation_loss_fn["cross_entropy"].cpu()(target.argmax(1).detach().cpu(), pred.detach().cpu())
+                self.segmentation_loss_fn["cross_entropy"].to(self.device)(target.argmax(1), pred)
                 * self.cross_entropy_loss_weighting_factor
             )
         if self.segmentation_loss_fn["dice"] is not None:
@@ -672,7 +678,7 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
             else (pred_segmentation.detach().cpu().numpy(), pred_segmentation.detach().cpu().numpy())
         )
 
-        return (str(fname[0]), slice_idx, predictions)  # type: ignore
+        return (str(fname[0]), int(slice_idx), predictions)  # type: ignore
 
     def train_epoch_end(self, outputs):
         """
@@ -788,7 +794,7 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
 
         Returns
         -------
-        Saves the reconstructed images to .h5 files.
+        Logs the metrics. The predictions are saved to .h5 files by the test writer.
         """
         # Log metrics.
         cross_entropy_vals = defaultdict(dict)
@@ -860,63 +866,36 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
             for metric, value in metrics_reconstruction.items():
                 self.log(f"{metric}_Reconstruction", value / tot_examples, sync_dist=True)
 
-        segmentations = defaultdict(list)
-        for fname, slice_num, output in outputs:
-            segmentations_pred, _ = output
-            segmentations[fname].append((slice_num, segmentations_pred))
+    def test_predictions(  # noqa: W0221
+        self, outputs: Tuple[str, int, Tuple[np.ndarray, np.ndarray]]
+    ) -> Tuple[str, int, Dict[str, np.ndarray]]:
+        """
+        Splits the outputs of a test step into the predictions to save, by dataset name.
 
-        for fname in segmentations:
-            segmentations[fname] = np.stack([out for _, out in sorted(segmentations[fname])])
-            if self.consecutive_slices > 1:
-                # If we have consecutive slices, we need to make sure that we will save all slices.
-                segmentations_slices = []
-                for i in range(segmentations[fname].shape[0]):
-                    if i == 0:
-                        segmentations_slices.append(segmentations[fname][i][0])
-                    elif i == segmentations[fname].shape[0] - 1:
-                        for j in range(self.consecutive_slices):
-                            segmentations_slices.append(segmentations[fname][i][j])
-                    else:
-                        segmentations_slices.append(segmentations[fname][i][self.consecutive_slices // 2])
-                segmentations[fname] = np.stack(segmentations_slices)
+        Parameters
+        ----------
+        outputs: Outputs of a test step.
+            tuple of (file name, slice number, (segmentation, reconstruction))
 
+        Returns
+        -------
+        The file name, the slice number and the predictions to save, by dataset name.
+        """
+        fname, slice_num, (segmentations_pred, reconstructions_pred) = outputs
+        predictions = {"segmentation": segmentations_pred}
         if self.use_reconstruction_module:
-            reconstructions = defaultdict(list)
-            for fname, slice_num, output in outputs:
-                _, reconstructions_pred = output
-                reconstructions[fname].append((slice_num, reconstructions_pred))
-
-            for fname in reconstructions:
-                reconstructions[fname] = np.stack([out for _, out in sorted(reconstructions[fname])])
-                if self.consecutive_slices > 1:
-                    # If we have consecutive slices, we need to make sure that we will save all slices.
-                    reconstructions_slices = []
-                    for i in range(reconstructions[fname].shape[0]):
-                        if i == 0:
-                            reconstructions_slices.append(reconstructions[fname][i][0])
-                        elif i == segmentations[fname].shape[0] - 1:
-                            for j in range(self.consecutive_slices):
-                                reconstructions_slices.append(reconstructions[fname][i][j])
-                        else:
-                            reconstructions_slices.append(reconstructions[fname][i][self.consecutive_slices // 2])
-                    reconstructions[fname] = np.stack(reconstructions_slices)
-        else:
-            reconstructions = None
-
-        out_dir = Path(os.path.join(self.logger.log_dir, "predictions"))
-        out_dir.mkdir(exist_ok=True, parents=True)
-
-        if reconstructions is not None:
-            for (fname, segmentations_pred), (_, reconstructions_pred) in zip(
-                segmentations.items(), reconstructions.items()
-            ):
-                with h5py.File(out_dir / fname, "w") as hf:
-                    hf.create_dataset("segmentation", data=segmentations_pred)
-                    hf.create_dataset("reconstruction", data=reconstructions_pred)
-        else:
-            for fname, segmentations_pred in segmentations.items():
-                with h5py.File(out_dir / fname, "w") as hf:
-                    hf.create_dataset("segmentation", data=segmentations_pred)
+            predictions["reconstruction"] = reconstructions_pred
+        return fname, slice_num, predictions
+
+    def test_predictions_postprocess(self) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+        """If we have consecutive slices, we need to make sure that we will save all slices."""
+        if self.consecutive_slices > 1:
+            return partial(writers.consecutive_slices_to_volume, consecutive_slices=self.consecutive_slices)
+        return None
+
+    def test_predictions_dir(self) -> Path:
+        """Directory to save the test predictions to."""
+        return Path(os.path.join(self.logger.log_dir, "predictions"))
 
     @staticmethod
     def _setup_dataloader_from_config(cfg: DictConfig) -> DataLoader:
@@ -975,6 +954,7 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
             segmentation_classes_to_separate=cfg.get("segmentation_classes_to_separate", None),
             segmentation_classes_thresholds=cfg.get("segmentation_classes_thresholds", None),
             complex_data=complex_data,
+            cache_segmentation_labels=cfg.get("cache_segmentation_labels", False),
             data_saved_per_slice=cfg.get("data_saved_per_slice", False),
             transform=transforms.JRSMRIDataTransforms(
                 complex_data=complex_data,
@@ -1010,7 +990,8 @@ class BaseMRIJointReconstructionSegmentationModel(base_reconstruction_models.Bas
         if cfg.shuffle:
             sampler = torch.utils.data.RandomSampler(dataset)
         else:
-            sampler = torch.utils.data.SequentialSampler(dataset)
+            # whole volumes per process, so that every process can save the volumes it predicts
+            sampler = samplers.DistributedVolumeSampler(dataset)
 
         return torch.utils.data.DataLoader(
             dataset=dataset,
@@ -244,9 +244,7 @@ class SegNet(base_segmentation_models.BaseMRIJointReconstructionSegmentationMode
         for i in range(len(pred)):
             if self.segmentation_loss_fn["cross_entropy"] is not None:
                 cross_entropy_loss.append(
-                    self.segmentation_loss_fn["cross_entropy"].cpu()(
-                        target.argmax(1).detach().cpu(), pred[i].detach().cpu()
-                    )
+                    self.segmentation_loss_fn["cross_entropy"].to(self.device)(target.argmax(1), pred[i])
                 )
             if self.segmentation_loss_fn["dice"] is not None:
                 _, loss_dice = self.segmentation_loss_fn["dice"](target, pred[i])
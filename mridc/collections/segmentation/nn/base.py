@@ -3,11 +3,10 @@ __author__ = "Dimitrios Karkalousos"
 
 import os
 from abc import ABC
-from collections import defaultdict
+from functools import partial
 from pathlib import Path
-from typing import Dict, Tuple, Union
+from typing import Callable, Dict, Optional, Tuple, Union
 
-import h5py
 import numpy as np
 import torch
 from omegaconf import DictConfig, OmegaConf
@@ -16,8 +15,11 @@ from torch.utils.data import DataLoader
 
 import mridc.collections.segmentation.losses as segmentation_losses
 from mridc.collections.common.data import subsample
-from mridc.collections.common.nn.base import BaseMRIModel, DistributedMetricSum
+from mridc.collections.common.data.samplers import DistributedVolumeSampler
+from mridc.collections.common.metrics.volume_metrics import VolumeMetricsAccumulator
+from mridc.collections.common.nn.base import BaseMRIModel
 from mridc.collections.common.parts import utils
+from mridc.collections.common.parts.writers import consecutive_slices_to_volume
 from mridc.collections.segmentation.data import mri_segmentation_loader
 from mridc.collections.segmentation.parts import transforms
 
@@ -68,6 +70,8 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
                 reduction=cfg_dict.get("cross_entropy_loss_reduction", "none"),
                 label_smoothing=cfg_dict.get("cross_entropy_loss_label_smoothing", 0.0),
                 weight=cross_entropy_loss_weight,
+                num_samples_per_chunk=cfg_dict.get("cross_entropy_loss_num_samples_per_chunk", None),
+                antithetic=cfg_dict.get("cross_entropy_loss_antithetic_sampling", False),
             )
             self.cross_entropy_loss_weighting_factor = cfg_dict.get("cross_entropy_loss_weighting_factor", 1.0)
         if "dice" in segmentation_loss_fn:
@@ -100,6 +104,8 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
             reduction=cfg_dict.get("cross_entropy_metric_reduction", "none"),
             label_smoothing=cfg_dict.get("cross_entropy_metric_label_smoothing", 0.0),
             weight=cross_entropy_metric_weight,
+            num_samples_per_chunk=cfg_dict.get("cross_entropy_metric_num_samples_per_chunk", None),
+            antithetic=cfg_dict.get("cross_entropy_metric_antithetic_sampling", False),
         )
         self.dice_coefficient_metric = segmentation_losses.dice.Dice(  # type: ignore
             include_background=cfg_dict.get("dice_metric_include_background", False),
@@ -118,13 +124,8 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
 
         self.segmentation_classes_thresholds = cfg_dict.get("segmentation_classes_thresholds", None)
 
-        self.CROSS_ENTROPY = DistributedMetricSum()
-        self.cross_entropy_vals: Dict = defaultdict(dict)
-
-        self.DICE = DistributedMetricSum()
-        self.dice_vals: Dict = defaultdict(dict)
-
-        self.TotExamples = DistributedMetricSum()
+        # Set evaluation metrics accumulator
+        self.volume_metrics = VolumeMetricsAccumulator(["Cross_Entropy_Segmentation", "DICE_Segmentation"])
 
     def process_segmentation_loss(self, target: torch.Tensor, prediction: torch.Tensor) -> Dict:
         """
@@ -147,9 +148,7 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
         loss_dict = {"cross_entropy_loss": 0.0, "dice_loss": 0.0}
         if self.segmentation_loss_fn["cross_entropy"] is not None:
             loss_dict["cross_entropy_loss"] = (
-                self.segmentation_loss_fn["cross_entropy"].cpu()(
-                    target.argmax(1).detach().cpu(), prediction.detach().cpu()
-                )
+                self.segmentation_loss_fn["cross_entropy"].to(self.device)(target.argmax(1), prediction)
                 * self.cross_entropy_loss_weighting_factor
             )
         if self.segmentation_loss_fn["dice"] is not None:
@@ -360,13 +359,13 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     )
                     pred_segmentation[:, class_idx] = pred_segmentation[:, class_idx] > class_threshold
 
-        if self.log_images:
+        if self.should_log_images(fname[0], slice_idx):  # type: ignore
             slice_idx = int(slice_idx)
             key = f"{fname[0]}_images_idx_{slice_idx}"  # type: ignore
 
-            target_reconstruction = (
-                torch.abs(target_reconstruction / torch.max(torch.abs(target_reconstruction))).detach().cpu()
-            )
+            target_reconstruction = torch.abs(
+                target_reconstruction / torch.max(torch.abs(target_reconstruction))
+            ).detach()
             self.log_image(f"{key}/reconstruction/target", target_reconstruction)
 
             for class_idx in range(pred_segmentation.shape[1]):  # type: ignore
@@ -385,11 +384,13 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     torch.abs(target_image_segmentation_class - output_image_segmentation_class),
                 )
 
-        self.cross_entropy_vals[fname][slice_idx] = self.cross_entropy_metric.to(self.device)(  # noqa: F841
+        cross_entropy = self.cross_entropy_metric.to(self.device)(
             target_segmentation.argmax(1), pred_segmentation  # type: ignore
         )
         dice_score, _ = self.dice_coefficient_metric(target_segmentation, pred_segmentation)
-        self.dice_vals[fname][slice_idx] = dice_score
+        self.volume_metrics.update(
+            str(fname[0]), Cross_Entropy_Segmentation=cross_entropy, DICE_Segmentation=dice_score  # type: ignore
+        )
 
         return {"val_loss": val_loss}
 
@@ -469,13 +470,13 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
                         )
                     pred_segmentation[:, class_idx] = pred_segmentation[:, class_idx] > class_threshold
 
-        if self.log_images:
+        if self.should_log_images(fname[0], slice_idx):  # type: ignore
             slice_idx = int(slice_idx)
             key = f"{fname[0]}_images_idx_{slice_idx}"  # type: ignore
 
-            target_reconstruction = (
-                torch.abs(target_reconstruction / torch.max(torch.abs(target_reconstruction))).detach().cpu()
-            )
+            target_reconstruction = torch.abs(
+                target_reconstruction / torch.max(torch.abs(target_reconstruction))
+            ).detach()
             self.log_image(f"{key}/reconstruction/target", target_reconstruction)
 
             for class_idx in range(pred_segmentation.shape[1]):  # type: ignore
@@ -497,13 +498,15 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
                     )
 
         if target_segmentation.dim() != 1:  # type: ignore
-            self.cross_entropy_vals[fname][slice_idx] = self.cross_entropy_metric.to(self.device)(  # noqa: F841
+            cross_entropy = self.cross_entropy_metric.to(self.device)(
                 target_segmentation.argmax(1), pred_segmentation  # type: ignore
             )
             dice_score, _ = self.dice_coefficient_metric(target_segmentation, pred_segmentation)
-            self.dice_vals[fname][slice_idx] = dice_score
+            self.volume_metrics.update(
+                str(fname[0]), Cross_Entropy_Segmentation=cross_entropy, DICE_Segmentation=dice_score  # type: ignore
+            )
 
-        return str(fname[0]), slice_idx, pred_segmentation.detach().cpu().numpy()  # type: ignore
+        return str(fname[0]), int(slice_idx), pred_segmentation.detach().cpu().numpy()  # type: ignore
 
     def train_epoch_end(self, outputs):
         """
@@ -543,39 +546,12 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
         """
         self.log("val_loss", torch.stack([x["val_loss"] for x in outputs]).mean(), sync_dist=True)
 
-        # Log metrics.
-        cross_entropy_vals = defaultdict(dict)
-        dice_vals = defaultdict(dict)
-
-        for k, v in self.cross_entropy_vals.items():
-            cross_entropy_vals[k].update(v)
-        for k, v in self.dice_vals.items():
-            dice_vals[k].update(v)
-
-        metrics_segmentation = {"Cross_Entropy": 0, "DICE": 0}
-
-        local_examples = 0
-        for fname in dice_vals:
-            local_examples += 1
-
-            metrics_segmentation["Cross_Entropy"] = metrics_segmentation["Cross_Entropy"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in cross_entropy_vals[fname].items()])
-            )
-            metrics_segmentation["DICE"] = metrics_segmentation["DICE"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in dice_vals[fname].items()])
-            )
-
-        # reduce across ddp via sum
-        metrics_segmentation["Cross_Entropy"] = self.CROSS_ENTROPY(metrics_segmentation["Cross_Entropy"])
-        metrics_segmentation["DICE"] = self.DICE(metrics_segmentation["DICE"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics_segmentation.items():
-            self.log(f"{metric}_Segmentation", value / tot_examples, sync_dist=True)
+        self.log_volume_metrics()
 
     def test_epoch_end(self, outputs):  # noqa: D102
         """
-        Called at the end of test epoch to aggregate outputs, log metrics and save predictions.
+        Called at the end of test epoch to aggregate outputs and log metrics. The predictions are saved by the test
+        writer, as soon as all the slices of a volume are predicted.
 
         Parameters
         ----------
@@ -587,61 +563,34 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
         metrics : dict
             Dictionary of metrics.
         """
-        # Log metrics.
-        cross_entropy_vals = defaultdict(dict)
-        dice_vals = defaultdict(dict)
+        self.log_volume_metrics()
 
-        for k, v in self.cross_entropy_vals.items():
-            cross_entropy_vals[k].update(v)
-        for k, v in self.dice_vals.items():
-            dice_vals[k].update(v)
+    def test_predictions(self, outputs: Tuple[str, int, np.ndarray]) -> Tuple[str, int, Dict[str, np.ndarray]]:
+        """
+        Split the outputs of a test step into the predictions to save, by dataset name.
 
-        metrics_segmentation = {"Cross_Entropy": 0, "DICE": 0}
+        Parameters
+        ----------
+        outputs : Tuple[str, int, np.ndarray]
+            Outputs of a test step, as (file name, slice number, segmentation).
 
-        local_examples = 0
-        for fname in dice_vals:
-            local_examples += 1
+        Returns
+        -------
+        Tuple[str, int, Dict[str, np.ndarray]]
+            The file name, the slice number and the predictions to save, by dataset name.
+        """
+        fname, slice_num, segmentations_pred = outputs
+        return fname, slice_num, {"segmentation": segmentations_pred}
 
-            metrics_segmentation["Cross_Entropy"] = metrics_segmentation["Cross_Entropy"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in cross_entropy_vals[fname].items()])
-            )
-            metrics_segmentation["DICE"] = metrics_segmentation["DICE"] + torch.mean(
-                torch.cat([v.view(-1).float() for _, v in dice_vals[fname].items()])
-            )
+    def test_predictions_postprocess(self) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+        """If we have consecutive slices, we need to make sure that we will save all slices."""
+        if self.consecutive_slices > 1:
+            return partial(consecutive_slices_to_volume, consecutive_slices=self.consecutive_slices)
+        return None
 
-        # reduce across ddp via sum
-        metrics_segmentation["Cross_Entropy"] = self.CROSS_ENTROPY(metrics_segmentation["Cross_Entropy"])
-        metrics_segmentation["DICE"] = self.DICE(metrics_segmentation["DICE"])
-
-        tot_examples = self.TotExamples(torch.tensor(local_examples))
-        for metric, value in metrics_segmentation.items():
-            self.log(f"{metric}_Segmentation", value / tot_examples, sync_dist=True)
-
-        segmentations = defaultdict(list)
-        for fname, slice_num, segmentations_pred in outputs:
-            segmentations[fname].append((slice_num, segmentations_pred))
-
-        for fname in segmentations:
-            segmentations[fname] = np.stack([out for _, out in sorted(segmentations[fname])])
-            if self.consecutive_slices > 1:
-                # If we have consecutive slices, we need to make sure that we will save all slices.
-                segmentations_slices = []
-                for i in range(segmentations[fname].shape[0]):
-                    if i == 0:
-                        segmentations_slices.append(segmentations[fname][i][0])
-                    elif i == segmentations[fname].shape[0] - 1:
-                        for j in range(self.consecutive_slices):
-                            segmentations_slices.append(segmentations[fname][i][j])
-                    else:
-                        segmentations_slices.append(segmentations[fname][i][self.consecutive_slices // 2])
-                segmentations[fname] = np.stack(segmentations_slices)
-
-        out_dir = Path(os.path.join(self.logger.log_dir, "predictions"))
-        out_dir.mkdir(exist_ok=True, parents=True)
-
-        for fname, segmentations_pred in segmentations.items():
-            with h5py.File(out_dir / fname, "w") as hf:
-                hf.create_dataset("segmentation", data=segmentations_pred)
+    def test_predictions_dir(self) -> Path:
+        """Directory to save the test predictions to."""
+        return Path(os.path.join(self.logger.log_dir, "predictions"))
 
     @staticmethod
     def _setup_dataloader_from_config(cfg: DictConfig) -> DataLoader:
@@ -739,11 +688,13 @@ class BaseMRISegmentationModel(BaseMRIModel, ABC):  # type: ignore
             segmentation_classes_to_separate=cfg.get("segmentation_classes_to_separate", None),
             segmentation_classes_thresholds=cfg.get("segmentation_classes_thresholds", None),
             complex_data=complex_data,
+            cache_segmentation_labels=cfg.get("cache_segmentation_labels", False),
         )
         if cfg.shuffle:
             sampler = torch.utils.data.RandomSampler(dataset)
         else:
-            sampler = torch.utils.data.SequentialSampler(dataset)
+            # whole volumes per process, so that every process can save the volumes it predicts
+            sampler = DistributedVolumeSampler(dataset)
 
         return torch.utils.data.DataLoader(
             dataset=dataset,
@@ -1,11 +1,16 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-from typing import Optional, Union
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
 
+import h5py
 import numpy as np
 import torch
 
+from mridc.collections.common.parts.utils import is_none
+
 # Taken and adjusted from:
 # https://github.com/Project-MONAI/MONAI/blob/f407fcce1c32c050f327b26a16b7f7bc8a01f593/monai/transforms/utils.py#L166
 
@@ -39,3 +44,239 @@ def rescale_intensities(
     if (minv is None) or (maxv is None):
         return norm
     return (norm * (maxv - minv)) + minv  # rescale by minv and maxv, which is the normalized array by default
+
+
+class SegmentationLabelsRemapping:
+    """
+    Compiles the segmentation classes to remove, combine, and separate, and the classes thresholds, into a single
+    vectorized remapping of the channels of the segmentation labels.
+
+    The classes to remove and to combine are compiled, once per number of input classes, into a channel gather/sum
+    matrix, so that removing and combining classes is one contraction over the channels. Separating classes is
+    compiled into a precedence mask, zeroing every other class where a class to separate is present. The first class
+    to separate takes precedence over the next ones.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mridc.collections.segmentation.parts.utils import SegmentationLabelsRemapping
+    >>> remapping = SegmentationLabelsRemapping([0], [1, 2], [3], [0.5, 0.5])
+    >>> remapping(np.array([[0.0, 0.7, 0.2, 0.0], [0.0, 0.4, 0.6, 1.0]]))
+    array([[1., 0.],
+           [0., 1.]])
+    """
+
+    def __init__(
+        self,
+        segmentation_classes_to_remove: Optional[Sequence[int]] = None,
+        segmentation_classes_to_combine: Optional[Sequence[int]] = None,
+        segmentation_classes_to_separate: Optional[Sequence[int]] = None,
+        segmentation_classes_thresholds: Optional[Sequence[Optional[float]]] = None,
+    ):
+        """
+        Parameters
+        ----------
+        segmentation_classes_to_remove : Sequence[int], optional
+            Segmentation classes to remove, e.g. the background.
+        segmentation_classes_to_combine : Sequence[int], optional
+            Segmentation classes to combine into a single class, e.g. White Matter and Gray Matter.
+        segmentation_classes_to_separate : Sequence[int], optional
+            Segmentation classes to separate from the others, e.g. pathologies from White Matter and Gray Matter.
+        segmentation_classes_thresholds : Sequence[float], optional
+            Thresholds of the probability maps of the remapped classes. ``None`` entries are not thresholded.
+        """
+        self.segmentation_classes_to_remove = segmentation_classes_to_remove
+        self.segmentation_classes_to_combine = segmentation_classes_to_combine
+        self.segmentation_classes_to_separate = segmentation_classes_to_separate
+        self.segmentation_classes_thresholds = segmentation_classes_thresholds
+        self.compiled: Dict[int, Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]] = {}
+
+    def compile(self, num_classes: int) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        Compile the remapping of segmentation labels with a given number of classes.
+
+        Parameters
+        ----------
+        num_classes : int
+            Number of classes of the segmentation labels to remap.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]
+            The gather/sum matrix of shape [num_classes, num_remapped_classes], the remapped indices of the classes
+            to separate, in order of precedence, and the thresholds of the remapped classes (``nan`` if not
+            thresholded), or ``None`` if no class is thresholded.
+        """
+        if num_classes in self.compiled:
+            return self.compiled[num_classes]
+
+        # source classes of each remapped class
+        classes = [[x] for x in range(num_classes)]
+        removed_classes = 0
+
+        if not is_none(self.segmentation_classes_to_remove):
+            classes = [c for x, c in enumerate(classes) if x not in self.segmentation_classes_to_remove]
+            removed_classes += len(self.segmentation_classes_to_remove)  # type: ignore
+
+        if not is_none(self.segmentation_classes_to_combine):
+            classes_to_combine = []
+            classes_to_keep = []
+            for x in range(len(classes)):
+                if x in self.segmentation_classes_to_combine:  # type: ignore
+                    classes_to_combine += classes[x - removed_classes]
+                else:
+                    classes_to_keep.append(classes[x - removed_classes])
+
+            if self.segmentation_classes_to_remove is not None and (
+                0 in self.segmentation_classes_to_remove or "0" in self.segmentation_classes_to_remove
+            ):
+                # if background is removed, we can stack the combined classes with the rest straight away
+                classes = [classes_to_combine] + classes_to_keep
+            else:
+                # if background is not removed, we need to add it back as new background class, instead of keeping it
+                classes = [classes[0], classes_to_combine] + [c for c in classes_to_keep if c != classes[0]]
+
+            removed_classes += len(self.segmentation_classes_to_combine) - 1  # type: ignore
+
+        gather = np.zeros((num_classes, len(classes)), dtype=np.float32)
+        for i, c in enumerate(classes):
+            np.add.at(gather[:, i], c, 1)
+
+        separate = []
+        if not is_none(self.segmentation_classes_to_separate):
+            for x in self.segmentation_classes_to_separate:  # type: ignore
+                if (x - removed_classes) % len(classes) not in separate:
+                    separate.append((x - removed_classes) % len(classes))
+
+        thresholds = None
+        if not is_none(self.segmentation_classes_thresholds):
+            thresholds = np.full(len(classes), np.nan)
+            for i, voxel_thres in enumerate(self.segmentation_classes_thresholds):  # type: ignore
+                if not is_none(voxel_thres):
+                    thresholds[i] = float(voxel_thres)
+            if np.isnan(thresholds).all():
+                thresholds = None
+
+        self.compiled[num_classes] = (gather, np.array(separate, dtype=np.int64), thresholds)
+        return self.compiled[num_classes]
+
+    def __call__(self, segmentation_labels: np.ndarray) -> np.ndarray:
+        """
+        Remap segmentation labels.
+
+        Parameters
+        ----------
+        segmentation_labels : np.ndarray
+            Segmentation labels with the classes in the last dimension.
+
+        Returns
+        -------
+        np.ndarray
+            Remapped segmentation labels with the remapped classes in the last dimension.
+        """
+        gather, separate, thresholds = self.compile(segmentation_labels.shape[-1])
+
+        shape = segmentation_labels.shape[:-1]
+        segmentation_labels = np.matmul(
+            segmentation_labels.reshape(-1, gather.shape[0]),
+            gather.astype(np.result_type(segmentation_labels.dtype, np.float32)),
+        ).reshape(*shape, gather.shape[1])
+
+        if separate.size > 0:
+            # a class to separate is present where it is positive and none of the preceding classes to separate is
+            present = segmentation_labels[..., separate] > 0
+            if separate.size > 1:
+                present &= np.cumsum(present, axis=-1) == 1
+            # every other class is zeroed where a class to separate is present
+            keep = np.repeat(~present.any(-1, keepdims=True), segmentation_labels.shape[-1], axis=-1)
+            keep[..., separate] |= present
+            segmentation_labels *= keep
+
+        if thresholds is not None:
+            thresholded = np.flatnonzero(~np.isnan(thresholds))
+            if thresholded.size == thresholds.size:
+                segmentation_labels = (segmentation_labels > thresholds).astype(segmentation_labels.dtype)
+            else:
+                segmentation_labels[..., thresholded] = segmentation_labels[..., thresholded] > thresholds[thresholded]
+
+        return segmentation_labels
+
+
+class SegmentationLabelsMixin:
+    """
+    Loads the segmentation labels of the slices of a dataset, remapped by a :class:`SegmentationLabelsRemapping`, and
+    optionally caches them per file.
+
+    The dataset sets up the remapping and the cache with :meth:`init_segmentation_labels`, and provides
+    ``segmentations_root``, ``get_consecutive_slices`` and ``process_segmentation_labels``.
+    """
+
+    def init_segmentation_labels(
+        self,
+        segmentation_classes_to_remove: Optional[Sequence[int]] = None,
+        segmentation_classes_to_combine: Optional[Sequence[int]] = None,
+        segmentation_classes_to_separate: Optional[Sequence[int]] = None,
+        segmentation_classes_thresholds: Optional[Sequence[Optional[float]]] = None,
+        cache_segmentation_labels: bool = False,
+    ):
+        """
+        Set up the remapping and the cache of the segmentation labels.
+
+        Parameters
+        ----------
+        segmentation_classes_to_remove : Sequence[int], optional
+            Segmentation classes to remove, e.g. the background.
+        segmentation_classes_to_combine : Sequence[int], optional
+            Segmentation classes to combine into a single class, e.g. White Matter and Gray Matter.
+        segmentation_classes_to_separate : Sequence[int], optional
+            Segmentation classes to separate from the others, e.g. pathologies from White Matter and Gray Matter.
+        segmentation_classes_thresholds : Sequence[float], optional
+            Thresholds of the probability maps of the remapped classes. ``None`` entries are not thresholded.
+        cache_segmentation_labels : bool
+            Whether to cache the processed segmentation labels of every slice. Default is ``False``.
+        """
+        self.segmentation_labels_remapping = SegmentationLabelsRemapping(
+            segmentation_classes_to_remove,
+            segmentation_classes_to_combine,
+            segmentation_classes_to_separate,
+            segmentation_classes_thresholds,
+        )
+        self.cache_segmentation_labels = cache_segmentation_labels
+        self.segmentation_labels_cache: Dict[str, Dict[int, np.ndarray]] = defaultdict(dict)
+
+    def get_segmentation_labels(self, hf, fname, dataslice: int) -> np.ndarray:
+        """
+        Load the processed segmentation labels of a slice, from the per file cache if enabled.
+
+        Parameters
+        ----------
+        hf : h5py.File
+            The opened data file.
+        fname : Path
+            The data file name.
+        dataslice : int
+            The slice index.
+
+        Returns
+        -------
+        np.ndarray
+            The processed segmentation labels, or an empty array if there are no segmentation labels.
+        """
+        if self.cache_segmentation_labels and dataslice in self.segmentation_labels_cache[fname.name]:
+            # copy, as the transforms may modify the labels in place
+            return self.segmentation_labels_cache[fname.name][dataslice].copy()
+
+        if self.segmentations_root is not None and self.segmentations_root != "None":  # type: ignore
+            with h5py.File(Path(self.segmentations_root) / fname.name, "r") as sf:  # type: ignore
+                segmentation_labels = np.asarray(
+                    self.get_consecutive_slices(sf, "segmentation", dataslice)  # type: ignore
+                )
+        elif "segmentation" in hf:
+            segmentation_labels = np.asarray(self.get_consecutive_slices(hf, "segmentation", dataslice))  # type: ignore
+        else:
+            return np.empty([])
+        segmentation_labels = self.process_segmentation_labels(segmentation_labels)  # type: ignore
+
+        if self.cache_segmentation_labels:
+            self.segmentation_labels_cache[fname.name][dataslice] = segmentation_labels.copy()
+        return segmentation_labels
@@ -1,5 +1,8 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
 
-import mridc.core.optim.lr_scheduler
-import mridc.core.optim.optimizers
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, submodules=["classes", "conf", "connectors", "neural_types", "optim", "utils"]
+)
@@ -1,2 +1,17 @@
 # coding=utf-8
 __author__ = "Dimitrios Karkalousos"
+
+from mridc.utils.lazy_import import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodules=[
+        "adafactor",
+        "lr_scheduler",
+        "novograd",
+        "optimizer_with_main_params",
+        "optimizer_with_master_params",
+        "optimizers",
+        "radam",
+    ],
+)
@@ -5,39 +5,48 @@ import pytorch_lightning as pl
 import torch
 from omegaconf import DictConfig, OmegaConf
 
-from mridc.collections.quantitative.models.qcirim import qCIRIM
-from mridc.collections.quantitative.models.qvn import qVarNet
-from mridc.collections.reconstruction.models.ccnn import CascadeNet
-from mridc.collections.reconstruction.models.cirim import CIRIM
-from mridc.collections.reconstruction.models.crnn import CRNNet
-from mridc.collections.reconstruction.models.dunet import DUNet
-from mridc.collections.reconstruction.models.jointicnet import JointICNet
-from mridc.collections.reconstruction.models.kikinet import KIKINet
-from mridc.collections.reconstruction.models.lpd import LPDNet
-from mridc.collections.reconstruction.models.multidomainnet import MultiDomainNet
-from mridc.collections.reconstruction.models.pics import PICS
-from mridc.collections.reconstruction.models.rvn import RecurrentVarNet
-from mridc.collections.reconstruction.models.unet import UNet
-from mridc.collections.reconstruction.models.vn import VarNet
-from mridc.collections.reconstruction.models.vsnet import VSNet
-from mridc.collections.reconstruction.models.xpdnet import XPDNet
-from mridc.collections.reconstruction.models.zf import ZF
-from mridc.collections.segmentation.models.attention_unet import SegmentationAttentionUNet
-from mridc.collections.segmentation.models.dynunet import DYNUNet
-from mridc.collections.segmentation.models.idslr import IDSLR
-from mridc.collections.segmentation.models.idslr_unet import IDSLRUNET
-from mridc.collections.segmentation.models.jrscirim import JRSCIRIM
-from mridc.collections.segmentation.models.lambda_unet import SegmentationLambdaUNet
-from mridc.collections.segmentation.models.recseg_unet import RecSegUNet
-from mridc.collections.segmentation.models.segnet import SegNet
-from mridc.collections.segmentation.models.seranet import SERANet
-from mridc.collections.segmentation.models.unet import SegmentationUNet
-from mridc.collections.segmentation.models.unet3d import Segmentation3DUNet
-from mridc.collections.segmentation.models.unetr import SegmentationUNetR
-from mridc.collections.segmentation.models.vnet import SegmentationVNet
 from mridc.core.conf.hydra_runner import hydra_runner
 from mridc.utils import logging
 from mridc.utils.exp_manager import exp_manager
+from mridc.utils.model_registry import MODELS_ENTRY_POINT_GROUP, ModelRegistry
+
+# models are imported on use, so that launching a model does not import the whole model zoo
+MODELS = ModelRegistry(
+    {
+        "CASCADENET": "mridc.collections.reconstruction.models.ccnn:CascadeNet",
+        "CIRIM": "mridc.collections.reconstruction.models.cirim:CIRIM",
+        "CRNNET": "mridc.collections.reconstruction.models.crnn:CRNNet",
+        "DUNET": "mridc.collections.reconstruction.models.dunet:DUNet",
+        "DYNUNET": "mridc.collections.segmentation.models.dynunet:DYNUNet",
+        "E2EVN": "mridc.collections.reconstruction.models.vn:VarNet",
+        "VN": "mridc.collections.reconstruction.models.vn:VarNet",
+        "IDSLR": "mridc.collections.segmentation.models.idslr:IDSLR",
+        "IDSLRUNET": "mridc.collections.segmentation.models.idslr_unet:IDSLRUNET",
+        "JOINTICNET": "mridc.collections.reconstruction.models.jointicnet:JointICNet",
+        "JRSCIRIM": "mridc.collections.segmentation.models.jrscirim:JRSCIRIM",
+        "KIKINET": "mridc.collections.reconstruction.models.kikinet:KIKINet",
+        "LPDNET": "mridc.collections.reconstruction.models.lpd:LPDNet",
+        "MULTIDOMAINNET": "mridc.collections.reconstruction.models.multidomainnet:MultiDomainNet",
+        "PICS": "mridc.collections.reconstruction.models.pics:PICS",
+        "QCIRIM": "mridc.collections.quantitative.models.qcirim:qCIRIM",
+        "QVN": "mridc.collections.quantitative.models.qvn:qVarNet",
+        "RECSEGNET": "mridc.collections.segmentation.models.recseg_unet:RecSegUNet",
+        "RVN": "mridc.collections.reconstruction.models.rvn:RecurrentVarNet",
+        "SEGMENTATIONATTENTIONUNET": "mridc.collections.segmentation.models.attention_unet:SegmentationAttentionUNet",
+        "SEGMENTATIONLAMBDAUNET": "mridc.collections.segmentation.models.lambda_unet:SegmentationLambdaUNet",
+        "SEGMENTATIONUNET": "mridc.collections.segmentation.models.unet:SegmentationUNet",
+        "SEGMENTATIONUNETR": "mridc.collections.segmentation.models.unetr:SegmentationUNetR",
+        "SEGMENTATION3DUNET": "mridc.collections.segmentation.models.unet3d:Segmentation3DUNet",
+        "SEGMENTATIONVNET": "mridc.collections.segmentation.models.vnet:SegmentationVNet",
+        "SEGNET": "mridc.collections.segmentation.models.segnet:SegNet",
+        "SERANET": "mridc.collections.segmentation.models.seranet:SERANet",
+        "UNET": "mridc.collections.reconstruction.models.unet:UNet",
+        "VSNET": "mridc.collections.reconstruction.models.vsnet:VSNet",
+        "XPDNET": "mridc.collections.reconstruction.models.xpdnet:XPDNet",
+        "ZF": "mridc.collections.reconstruction.models.zf:ZF",
+    },
+    entry_point_group=MODELS_ENTRY_POINT_GROUP,
+)
 
 
 @hydra_runner(config_path=".", config_name="config")
@@ -57,74 +66,7 @@ def main(cfg: DictConfig) -> None:
 
     model_name = (cfg.model["model_name"]).upper()
 
-    if model_name == "CASCADENET":
-        model = CascadeNet(cfg.model, trainer=trainer)
-    elif model_name == "CIRIM":
-        model = CIRIM(cfg.model, trainer=trainer)
-    elif model_name == "CRNNET":
-        model = CRNNet(cfg.model, trainer=trainer)
-    elif model_name == "DUNET":
-        model = DUNet(cfg.model, trainer=trainer)
-    elif model_name == "DYNUNET":
-        model = DYNUNet(cfg.model, trainer=trainer)
-    elif model_name in ("E2EVN", "VN"):
-        model = VarNet(cfg.model, trainer=trainer)
-    elif model_name == "IDSLR":
-        model = IDSLR(cfg.model, trainer=trainer)
-    elif model_name == "IDSLRUNET":
-        model = IDSLRUNET(cfg.model, trainer=trainer)
-    elif model_name == "JOINTICNET":
-        model = JointICNet(cfg.model, trainer=trainer)
-    elif model_name == "JRSCIRIM":
-        model = JRSCIRIM(cfg.model, trainer=trainer)
-    elif model_name == "KIKINET":
-        model = KIKINet(cfg.model, trainer=trainer)
-    elif model_name == "LPDNET":
-        model = LPDNet(cfg.model, trainer=trainer)
-    elif model_name == "MULTIDOMAINNET":
-        model = MultiDomainNet(cfg.model, trainer=trainer)
-    elif model_name == "PICS":
-        model = PICS(cfg.model, trainer=trainer)
-    elif model_name == "QCIRIM":
-        model = qCIRIM(cfg.model, trainer=trainer)
-    elif model_name == "QVN":
-        model = qVarNet(cfg.model, trainer=trainer)
-    elif model_name == "RECSEGNET":
-        model = RecSegUNet(cfg.model, trainer=trainer)
-    elif model_name == "RVN":
-        model = RecurrentVarNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONATTENTIONUNET":
-        model = SegmentationAttentionUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONLAMBDAUNET":
-        model = SegmentationLambdaUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONUNET":
-        model = SegmentationUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONUNETR":
-        model = SegmentationUNetR(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATION3DUNET":
-        model = Segmentation3DUNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGMENTATIONVNET":
-        model = SegmentationVNet(cfg.model, trainer=trainer)
-    elif model_name == "SEGNET":
-        model = SegNet(cfg.model, trainer=trainer)
-    elif model_name == "SERANET":
-        model = SERANet(cfg.model, trainer=trainer)
-    elif model_name == "UNET":
-        model = UNet(cfg.model, trainer=trainer)
-    elif model_name == "VSNET":
-        model = VSNet(cfg.model, trainer=trainer)
-    elif model_name == "XPDNET":
-        model = XPDNet(cfg.model, trainer=trainer)
-    elif model_name == "ZF":
-        model = ZF(cfg.model, trainer=trainer)
-    else:
-        raise NotImplementedError(
-            f"{model_name} is not implemented in MRIDC. You can use one of the following methods: "
-            "CASCADENET, CIRIM, CRNNET, DUNET, E2EVN, IDSLR, JOINTICNET, JRSCIRIM, KIKINET, LPDNET, MULTIDOMAINNET, "
-            "PICS, qCIRIM, qVN, RECSEGNET, RVN, SEGMENTATIONATTENTIONUNET, SEGMENTATIONLAMBDAUNET, SEGMENTATIONUNET, "
-            "SEGMENTATION3DUNET, SEGMENTATIONVNET, SEGNET, UNET, VSNET, XPDNET, or Zero-Filled. /n"
-            "If you implemented a new model, please consider adding it through a PR on GitHub."
-        )
+    model = MODELS.get(model_name)(cfg.model, trainer=trainer)
 
     if cfg.get("pretrained", None):
         checkpoint = cfg.get("checkpoint", None)
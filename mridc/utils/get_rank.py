@@ -3,8 +3,6 @@ __author__ = "Dimitrios Karkalousos"
 
 # Taken and adapted from: https://github.com/NVIDIA/NeMo/blob/main/nemo/utils/get_rank.py
 
-import torch
-
 from mridc.utils.env_var_parsing import get_envint
 
 
@@ -29,4 +27,9 @@ def is_global_rank_zero():
 
 def get_rank():
     """Helper function that returns torch.distributed.get_rank() if DDP has been initialized otherwise returns 0."""
-    return 0 if is_global_rank_zero() else torch.distributed.get_rank()
+    if is_global_rank_zero():
+        return 0
+    # imported here, so that the logger does not import torch
+    import torch
+
+    return torch.distributed.get_rank()
@@ -0,0 +1,61 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import importlib
+import sys
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+__all__ = ["attach"]
+
+
+def attach(
+    package_name: str,
+    submodules: Optional[Sequence[str]] = None,
+    submodule_attributes: Optional[Dict[str, Sequence[str]]] = None,
+) -> Tuple[Callable, Callable, List[str]]:
+    """
+    Lazily load the submodules and the attributes of the submodules of a package, on first access (PEP 562), so that
+    importing a package, or a module of it, does not import every module of the package, with their dependencies.
+
+    Parameters
+    ----------
+    package_name : str
+        Name of the package, i.e. ``__name__`` in its ``__init__``.
+    submodules : Sequence[str], optional
+        Names of the submodules to load on access, relative to the package. Default is ``None``.
+    submodule_attributes : Dict[str, Sequence[str]], optional
+        Names of the submodules, relative to the package, and of the attributes to load from them on access. The
+        submodules are loaded on access too. Default is ``None``.
+
+    Returns
+    -------
+    Tuple[Callable, Callable, List[str]]
+        ``__getattr__``, ``__dir__`` and ``__all__`` of the package.
+
+    Examples
+    --------
+    In the ``__init__`` of a package:
+
+    >>> __getattr__, __dir__, __all__ = attach(__name__, submodules=["data"], submodule_attributes={"fft": ["fft2"]})
+    """
+    # the submodules of the attributes are loadable too, as when the package imported the attributes eagerly
+    submodules = set(submodules or []) | set(submodule_attributes or {})
+    attributes = {
+        attribute: submodule for submodule, names in (submodule_attributes or {}).items() for attribute in names
+    }
+    names = sorted(submodules | set(attributes))
+
+    def __getattr__(name: str):
+        if name in attributes:
+            value = getattr(importlib.import_module(f"{package_name}.{attributes[name]}"), name)
+            # cache the attribute in the package, so that __getattr__ is called once per attribute
+            setattr(sys.modules[package_name], name, value)
+            return value
+        if name in submodules:
+            return importlib.import_module(f"{package_name}.{name}")
+        raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package_name])) | set(names))
+
+    return __getattr__, __dir__, names
@@ -0,0 +1,114 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import importlib
+from importlib import metadata
+from typing import Dict, List, Optional
+
+from mridc.utils import logging
+
+__all__ = ["ModelRegistry", "MODELS_ENTRY_POINT_GROUP"]
+
+MODELS_ENTRY_POINT_GROUP = "mridc.models"
+
+
+class ModelRegistry:
+    """
+    Lazy registry of models, mapping the names of the models to the import paths of their classes. A model class is
+    imported only when it is requested by name, so that launching a model does not import the whole model zoo, with
+    the optional dependencies of every collection.
+
+    Models of other packages can be registered as plugins, through entry points of the ``mridc.models`` group, e.g. in
+    the ``setup.py`` of the package:
+
+        entry_points={"mridc.models": ["MYNET = my_package.models.mynet:MyNet"]}
+
+    Names are case-insensitive. Built-in models take precedence over plugins with the same name.
+
+    Parameters
+    ----------
+    models : Dict[str, str]
+        Names of the models and import paths of their classes, as ``package.module:ClassName``.
+    entry_point_group : str, optional
+        Entry point group of the plugin models. Default is ``None``, for no plugins.
+
+    Examples
+    --------
+    >>> registry = ModelRegistry({"ORDEREDDICT": "collections:OrderedDict"})
+    >>> registry.get("OrderedDict")
+    <class 'collections.OrderedDict'>
+    """
+
+    def __init__(self, models: Dict[str, str], entry_point_group: Optional[str] = None):
+        self.models = {name.upper(): path for name, path in models.items()}
+        self.entry_point_group = entry_point_group
+        self._plugins: Optional[Dict[str, metadata.EntryPoint]] = None
+
+    def register(self, name: str, path: str):
+        """
+        Register a model, given the import path of its class.
+
+        Parameters
+        ----------
+        name : str
+            Name of the model.
+        path : str
+            Import path of the model class, as ``package.module:ClassName``.
+        """
+        if name.upper() in self.models:
+            raise ValueError(f"Cannot override pre-existing models. Conflicting model name = {name}")
+        self.models[name.upper()] = path
+
+    def plugins(self) -> Dict[str, metadata.EntryPoint]:
+        """Entry points of the plugin models, found once."""
+        if self._plugins is None:
+            self._plugins = {}
+            if self.entry_point_group is not None:
+                entry_points = metadata.entry_points()
+                if hasattr(entry_points, "select"):
+                    entry_points = entry_points.select(group=self.entry_point_group)  # type: ignore
+                else:
+                    # python < 3.10
+                    entry_points = entry_points.get(self.entry_point_group, [])  # type: ignore
+                for entry_point in entry_points:
+                    name = entry_point.name.upper()
+                    if name in self.models or name in self._plugins:
+                        logging.warning(
+                            f"Ignoring model {entry_point.name} of {entry_point.value}, already registered."
+                        )
+                        continue
+                    self._plugins[name] = entry_point
+        return self._plugins
+
+    def names(self) -> List[str]:
+        """Names of the registered and the plugin models."""
+        return sorted(set(self.models) | set(self.plugins()))
+
+    def __contains__(self, name: str) -> bool:
+        return name.upper() in self.models or name.upper() in self.plugins()
+
+    def get(self, name: str) -> type:
+        """
+        Import and return the class of a model.
+
+        Parameters
+        ----------
+        name : str
+            Name of the model.
+
+        Returns
+        -------
+        type
+            Model class.
+        """
+        name = name.upper()
+        if name in self.models:
+            module_name, class_name = self.models[name].split(":")
+            return getattr(importlib.import_module(module_name), class_name)
+        if name in self.plugins():
+            return self.plugins()[name].load()
+        raise NotImplementedError(
+            f"{name} is not implemented in MRIDC. You can use one of the following methods: "
+            f"{', '.join(self.names())}. \n"
+            "If you are interested in another model, please consider opening an issue on GitHub."
+        )
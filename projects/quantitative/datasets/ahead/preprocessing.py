@@ -5,16 +5,18 @@ import argparse
 import glob
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
+from typing import List
 
 import h5py
 import numpy as np
 import SimpleITK as sitk
-import torch
 from skimage.restoration import unwrap_phase
 from tqdm import tqdm
 
-from mridc.collections.quantitative.parts.transforms import LeastSquares
+PLANES = ["sagittal", "coronal", "axial"]
 
 
 def _dataloder(subjectID: str, datapath: str):
@@ -40,7 +42,7 @@ def _dataloder(subjectID: str, datapath: str):
     sense_complex = False
     coilimgs = False
     brain_mask = False
-    if folders := glob.glob(f"{datapath}Subcortex_{subjectID.zfill(4)}*_R02"):
+    if folders := glob.glob(os.path.join(datapath, f"Subcortex_{subjectID.zfill(4)}*_R02")):
         filename_sense = glob.glob(
             os.path.join(
                 folders[0],
@@ -95,45 +97,25 @@ def B0mapping(coilimgs, sense, mask_brain):
         B0 map.
     """
     TEnotused = 3
+    TEs = np.array([3.0, 11.5, 20.0, 28.5])
+    n_diffs = coilimgs.shape[0] - TEnotused
 
-    imgs = np.sum(coilimgs * sense.conj(), -1)
-
-    phases = np.angle(imgs)
-    phase_unwrapped = np.zeros(phases.shape)
-    for i in range(phases.shape[0]):
-        phase_unwrapped[i] = unwrap_phase(np.ma.array(phases[i], mask=np.zeros(phases[i].shape)))
-
-    TEs = (3.0, 11.5, 20.0, 28.5)
-    phase_diff_set = []
-    TE_diff = []
-    # obtain phase differences and TE differences
-    for i in range(phase_unwrapped.shape[0] - TEnotused):
-        phase_diff_set.append((phase_unwrapped[i + 1] - phase_unwrapped[i]).flatten())
-        phase_diff_set[i] = (
-            phase_diff_set[i]
-            - np.round(np.sum(phase_diff_set[i] * mask_brain.flatten()) / np.sum(mask_brain.flatten()) / 2 / np.pi)
-            * 2
-            * np.pi
-        )
-        TE_diff.append(TEs[i + 1] - TEs[i])
+    # only the echoes entering the phase differences need to be unwrapped
+    imgs = np.sum(coilimgs[: n_diffs + 1] * sense.conj(), -1)
+    phase_unwrapped = np.stack([unwrap_phase(np.angle(img)) for img in imgs], 0)
 
-    phase_diff_set = np.stack(phase_diff_set, 0)
-    TE_diff = np.stack(TE_diff, 0)
+    # obtain phase differences and TE differences, removing the 2pi wraps of the mean phase difference in the brain
+    phase_diff_set = phase_unwrapped[1:] - phase_unwrapped[:-1]
+    mean_phase_diff = np.sum(phase_diff_set * mask_brain, axis=(1, 2, 3)) / np.sum(mask_brain)
+    phase_diff_set = phase_diff_set - np.round(mean_phase_diff / 2 / np.pi).reshape(-1, 1, 1, 1) * 2 * np.pi
 
-    # least squares fitting to obtain phase map
+    # least squares fitting to obtain phase map, in closed form for a single unknown per voxel
     scaling = 1e-3
-    ls = LeastSquares()
-    B0_map_tmp = ls.lstq_pinv(
-        torch.from_numpy(np.transpose(np.expand_dims(phase_diff_set, 2), (1, 0, 2))),
-        torch.from_numpy(np.expand_dims(TE_diff, 1) * scaling),
-    )
-    B0_map = B0_map_tmp.reshape(phase_unwrapped.shape[1:4])
-    B0_map = B0_map.numpy()
+    TE_diff = ((TEs[1 : n_diffs + 1] - TEs[:n_diffs]) * scaling).reshape(-1, 1, 1, 1)
+    return np.sum(TE_diff * phase_diff_set, 0) / np.sum(TE_diff**2)
 
-    return B0_map
 
-
-def generate_2dksp(images3d, dim2keep):
+def generate_2dksp(images3d, dim2keep, slices=None):
     """
     Generate 2D k-space.
 
@@ -143,6 +125,8 @@ def generate_2dksp(images3d, dim2keep):
         3D images.
     dim2keep : int
         Dimension to keep.
+    slices : slice, optional
+        Slices of the dimension to keep to transform. If None, all slices are transformed.
 
     Returns
     -------
@@ -150,57 +134,189 @@ def generate_2dksp(images3d, dim2keep):
         2D k-space.
     """
     axes = [[2, 3], [1, 3], [1, 2]]
+    if slices is not None:
+        # the 2D FFT does not run along the kept dimension, so only the slices to be saved need to be transformed
+        images3d = np.take(images3d, np.arange(images3d.shape[dim2keep + 1])[slices], axis=dim2keep + 1)
     return np.fft.fftshift(np.fft.fft2(images3d, axes=axes[dim2keep], norm="ortho"), axes=axes[dim2keep])
 
 
+def _input_files(subjectID: int, datapath: str) -> List[str]:
+    """
+    Get the input files of a subject, i.e. the sensitivity maps, the coil images, and the brain mask.
+
+    Parameters
+    ----------
+    subjectID : int
+        Subject ID.
+    datapath : str
+        Path to the data.
+
+    Returns
+    -------
+    files : list of str
+        Input files of the subject. Empty if the subject does not exist.
+    """
+    folders = glob.glob(os.path.join(datapath, f"Subcortex_{str(subjectID).zfill(4)}*_R02"))
+    if not folders:
+        return []
+    files = glob.glob(os.path.join(folders[0], f"Subcortex_{str(subjectID).zfill(4)}*_R02_inv2_*"))
+    return sorted(files) + [os.path.join(folders[0], "nii", "mask_inv2_te2_m_corr.nii")]
+
+
+def _output_files(subjectID: int, savepath: str) -> List[str]:
+    """
+    Get the output files of a subject, i.e. one volume file per plane.
+
+    Parameters
+    ----------
+    subjectID : int
+        Subject ID.
+    savepath : str
+        Path to save the converted files.
+
+    Returns
+    -------
+    files : list of str
+        Output files of the subject, in the order of PLANES.
+    """
+    folder_subject = f"Subcortex_{str(subjectID).zfill(4)}_R02_inv2"
+    return [
+        os.path.join(savepath, folder_subject, f"Subcortex_{str(subjectID).zfill(4)}_{plane}.h5") for plane in PLANES
+    ]
+
+
+def _is_up_to_date(output_files: List[str], input_files: List[str], settings: str) -> bool:
+    """
+    Check whether all output files exist, were written with the same settings, and are newer than the input files.
+
+    Parameters
+    ----------
+    output_files : list of str
+        Output files of a subject.
+    input_files : list of str
+        Input files of a subject.
+    settings : str
+        Preprocessing settings the output files must have been written with.
+
+    Returns
+    -------
+    up_to_date : bool
+        True if the subject does not need to be preprocessed again.
+    """
+    if not all(os.path.isfile(f) for f in output_files):
+        return False
+    inputs_mtime = max(os.path.getmtime(f) for f in input_files if os.path.exists(f))
+    for f in output_files:
+        if os.path.getmtime(f) < inputs_mtime:
+            return False
+        with h5py.File(f, "r") as data:
+            if data.attrs.get("preprocessing_settings", None) != settings:
+                return False
+    return True
+
+
+def preprocess_subject(
+    subjectID: int, datapath: str, savepath: str, applymask: bool, centerslices: bool, overwrite: bool = False
+) -> str:
+    """
+    Preprocess one subject and save one volume file per plane, chunked per slice.
+
+    Parameters
+    ----------
+    subjectID : int
+        Subject ID.
+    datapath : str
+        Path to the data.
+    savepath : str
+        Path to save the converted files.
+    applymask : bool
+        Apply brain mask.
+    centerslices : bool
+        Save the 50 center slices instead of the 100 center slices of each plane.
+    overwrite : bool
+        Preprocess the subject even if its output files are up to date.
+
+    Returns
+    -------
+    status : str
+        One of "processed", "skipped" (up to date), or "missing" (no input data).
+    """
+    input_files = _input_files(subjectID, datapath)
+    if not input_files:
+        return "missing"
+
+    output_files = _output_files(subjectID, savepath)
+    settings = f"applymask={applymask},centerslices={centerslices}"
+    if not overwrite and _is_up_to_date(output_files, input_files, settings):
+        return "skipped"
+
+    coilimgs, sense, brain_mask = _dataloder(str(subjectID), datapath)
+    if coilimgs is False:
+        return "missing"
+
+    coilimgs = np.stack(coilimgs, axis=0)
+    if applymask:
+        coilimgs = coilimgs * brain_mask[..., np.newaxis]
+        sense = sense * brain_mask[..., np.newaxis]
+    B0map = B0mapping(coilimgs, sense, brain_mask)
+
+    half_nr_of_slices = 25 if centerslices else 50
+    Path(output_files[0]).parent.mkdir(parents=True, exist_ok=True)
+    for dim, filename_save in enumerate(output_files):
+        size_dim = coilimgs.shape[dim + 1]
+        slices = slice(max(round(size_dim / 2) - half_nr_of_slices, 0), round(size_dim / 2) + half_nr_of_slices)
+
+        ksp_dim = np.swapaxes(np.swapaxes(generate_2dksp(coilimgs, dim, slices), 1, dim + 1), 0, 1)
+        sense_dim = np.swapaxes(sense, 0, dim)[slices]
+        B0map_dim = np.swapaxes(B0map, 0, dim)[slices]
+        brain_mask_dim = np.swapaxes(brain_mask, 0, dim)[slices]
+
+        # write to a temporary file first, so that interrupted runs never leave partial files that look up to date
+        filename_tmp = f"{filename_save}.tmp"
+        with h5py.File(filename_tmp, "w") as data:
+            for key, value in (
+                ("ksp", ksp_dim),
+                ("sense", sense_dim),
+                ("B0map", B0map_dim),
+                ("mask_brain", brain_mask_dim),
+            ):
+                data.create_dataset(key, data=value, chunks=(1, *value.shape[1:]))
+            data.create_dataset("slice_idx", data=np.arange(size_dim)[slices])
+            data.attrs["preprocessing_settings"] = settings
+        os.replace(filename_tmp, filename_save)
+
+    return "processed"
+
+
 def main(args):
-    # loop over all subjects
-    # process data for one subject:
+    # process subjects in parallel, one subject per worker:
     # 1. load one subject: coil images, sensitivity maps.
     # 2. create 3D B0 map: a. obtain 3D phase; b. unwrap phase; c. compute B0 map (use first 2 echoes).
     # 3. create 2D kspaces. a. sagittal; b. axial; c. coronal.
     # 4. load brain mask.
-    # 5. save as .h5 for each slice in each plane of the 3 orientations.
-    # loop over all orientations.
-    # loop over all slices in one orientation.
-
-    datapath = args.datapath
-    applymask = args.applymask
-    if not applymask:
-        centerslices = args.centerslices
-        half_nr_of_slices = 25 if centerslices else 50
-    savepath = args.savepath
-    for subjectID in tqdm(range(1, 119)):
-        coilimgs, sense, brain_mask = _dataloder(subjectID, datapath)
-        if coilimgs is not False:
-            coilimgs = np.stack(coilimgs, axis=0)
-            if applymask:
-                coilimgs = coilimgs * np.repeat(brain_mask[..., np.newaxis], coilimgs.shape[-1], axis=3)
-                sense = sense * np.repeat(brain_mask[..., np.newaxis], sense.shape[-1], axis=3)
-            B0map = B0mapping(coilimgs, sense, brain_mask)
-            planes = ["sagittal", "coronal", "axial"]
-            folder_subject = f"Subcortex_{str(subjectID).zfill(4)}_R02_inv2"
-            for dim in range(3):
-                ksp = generate_2dksp(coilimgs, dim)
-                ksp_dim = np.swapaxes(ksp, 1, dim + 1)
-                sense_dim = np.swapaxes(sense, 0, dim)
-                B0map_dim = np.swapaxes(B0map, 0, dim)
-                brain_mask_dim = np.swapaxes(brain_mask, 0, dim)
-                size_dim = coilimgs.shape[dim + 1]
-                Path(os.path.join(savepath, folder_subject, planes[dim])).mkdir(parents=True, exist_ok=True)
-                for itr_dim in range(round(size_dim / 2) - half_nr_of_slices, round(size_dim / 2) + half_nr_of_slices):
-                    filename_save = os.path.join(
-                        savepath,
-                        folder_subject,
-                        planes[dim],
-                        f"Subcortex_{str(subjectID).zfill(4)}_{planes[dim]}_{str(itr_dim)}.h5",
-                    )
-
-                    with h5py.File(filename_save, "w") as data:
-                        data.create_dataset("ksp", data=ksp_dim[:, itr_dim, ...].squeeze())
-                        data.create_dataset("sense", data=sense_dim[itr_dim, ...].squeeze())
-                        data.create_dataset("B0map", data=B0map_dim[itr_dim, ...].squeeze())
-                        data.create_dataset("mask_brain", data=brain_mask_dim[itr_dim, ...].squeeze())
+    # 5. save as .h5 volume for each plane of the 3 orientations, chunked per slice.
+    # subjects whose outputs are up to date are skipped, so interrupted runs can be resumed.
+    worker = partial(
+        preprocess_subject,
+        datapath=args.datapath,
+        savepath=args.savepath,
+        applymask=args.applymask,
+        centerslices=args.centerslices,
+        overwrite=args.overwrite,
+    )
+    subjectIDs = list(range(1, 119))
+
+    if args.num_workers <= 1:
+        statuses = [worker(subjectID) for subjectID in tqdm(subjectIDs)]
+    else:
+        with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+            futures = [executor.submit(worker, subjectID) for subjectID in subjectIDs]
+            statuses = [future.result() for future in tqdm(as_completed(futures), total=len(futures))]
+
+    print(
+        f"Processed {statuses.count('processed')} subjects, skipped {statuses.count('skipped')} up to date subjects, "
+        f"{statuses.count('missing')} subjects are missing."
+    )
 
 
 # noinspection PyTypeChecker
@@ -210,6 +326,13 @@ def create_arg_parser():
     parser.add_argument("savepath", type=str, help="Path to save the converted files.")
     parser.add_argument("--applymask", action="store_true", help="Apply brain mask.")
     parser.add_argument("--centerslices", action="store_true", help="Save center slices.")
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="Number of subjects to preprocess in parallel. Each worker holds a full subject in memory.",
+    )
+    parser.add_argument("--overwrite", action="store_true", help="Preprocess subjects that are already up to date.")
     return parser
 
 
@@ -3,6 +3,7 @@ __author__ = "Dimitrios Karkalousos"
 
 import argparse
 import glob
+import re
 import sys
 from pathlib import Path
 
@@ -37,58 +38,134 @@ def iterate_qmap(qmap, name):
     return qmap_recons, qmap_inits, qmap_targets, accs
 
 
+def slice_key(name):
+    """
+    Get the subject, plane, and slice number of a file name.
+
+    Parameters
+    ----------
+    name : str
+        Name of the file, e.g. ``Subcortex_0001_axial_10.h5`` or ``Subcortex_0001_axial.h5`` for a volume.
+
+    Returns
+    -------
+    key : tuple
+        Subject index, plane, and slice number (None for a volume).
+    """
+    match = re.search(r"Subcortex_(\d+)_(sagittal|coronal|axial)(?:_(\d+))?", name)
+    if match is None:
+        raise ValueError(f"Cannot find the subject and plane in {name}.")
+    return int(match.group(1)), match.group(2), None if match.group(3) is None else int(match.group(3))
+
+
+def expand_slices(files):
+    """
+    Expand files into one entry per slice.
+
+    Per-plane volumes, as saved by preprocessing.py, have a ``slice_idx`` dataset with the original slice numbers and
+    are expanded into one entry per slice. Per-slice files are kept as they are.
+
+    Parameters
+    ----------
+    files : list of Path
+        Files to expand.
+
+    Returns
+    -------
+    slices : dict
+        Name of the slice, file, and position of the slice in the file (None for per-slice files), by subject index,
+        plane, and slice number.
+    """
+    slices = {}
+    for _file in sorted(files):
+        fname = _file.name.split(".")[0]
+        subject_idx, plane, slice_idx = slice_key(_file.name)
+        with h5py.File(_file, "r") as data:
+            if "slice_idx" in data:
+                for position, slice_idx in enumerate(data["slice_idx"][()]):
+                    slices[(subject_idx, plane, int(slice_idx))] = (f"{fname}_{slice_idx}", _file, position)
+            else:
+                slices[(subject_idx, plane, slice_idx)] = (fname, _file, None)
+    return slices
+
+
+def read_slice(_file, position):
+    """
+    Read all datasets of a slice.
+
+    Parameters
+    ----------
+    _file : Path
+        File to read.
+    position : int or None
+        Position of the slice in a volume. If None, the file holds a single slice and is read as a whole.
+
+    Returns
+    -------
+    slice_data : dict
+        Datasets of the slice.
+    """
+    with h5py.File(_file, "r") as data:
+        if position is None:
+            return {key: data[key][()] for key in data.keys()}
+        num_slices = data["slice_idx"].shape[0]
+        return {
+            key: data[key][position] if data[key].ndim > 0 and data[key].shape[0] == num_slices else data[key][()]
+            for key in data.keys()
+            if key != "slice_idx"
+        }
+
+
 def main(args):
     out_dir_data = Path(str(args.out_path) + "/multicoil_" + str(args.set) + "/")
     out_dir_data.mkdir(parents=True, exist_ok=True)
 
-    files = list(Path(args.file_path).iterdir())
-    files = [files[i] for i in range(len(files)) if "Subcortex" in str(files[i])]
-    files = [glob.glob(str(plane) + "/" + "*.h5") for i in range(len(files)) for plane in list(files[i].iterdir())]
+    subjects = [subject for subject in Path(args.file_path).iterdir() if "Subcortex" in subject.name]
+    # volumes are saved in the subject folder, per-slice files in the per-plane folders of the subject folder
+    files = [
+        Path(_file)
+        for subject in subjects
+        for _file in glob.glob(str(subject) + "/*.h5") + glob.glob(str(subject) + "/*/*.h5")
+    ]
 
     maps = []
     data = []
     kspace_masks = []
     cs = []
     for _file in files:
-        for _file_ in _file:
-            if "cs" in _file_:
-                cs.append(Path(_file_))
-            elif "kspmask" in _file_:
-                kspace_masks.append(Path(_file_))
-            elif "maps" in _file_:
-                maps.append(Path(_file_))
-            else:
-                data.append(Path(_file_))
+        if "cs" in _file.name:
+            cs.append(_file)
+        elif "kspmask" in _file.name:
+            kspace_masks.append(_file)
+        elif "maps" in _file.name:
+            maps.append(_file)
+        else:
+            data.append(_file)
 
-    maps = sorted(maps)
-    data = sorted(data)
-    kspace_masks = sorted(kspace_masks)
+    if not data:
+        raise FileNotFoundError(f"No data files found in the Subcortex subject folders of {args.file_path}.")
+
+    maps = expand_slices(maps)
+    data = expand_slices(data)
 
     data_dict = {}
-    if args.set == "test":
-        for _data in data:
-            fname = str(_data).split("/")[-1].split(".")[0]
-
-            data_dict[fname] = {
-                "subject_idx": int(fname.split("_")[-3]),
-                "plane": fname.split("_")[-2],
-                "slice_idx": int(fname.split("_")[-1]),
-                "data": _data,
-            }
-    else:
-        for _maps, _data in zip(maps, data):
-            fname = str(_data).split("/")[-1].split(".")[0]
-
-            for _kspmask in kspace_masks:
-                kspace_mask = _kspmask if fname in str(_kspmask) else None
-            data_dict[fname] = {
-                "subject_idx": int(fname.split("_")[-3]),
-                "plane": fname.split("_")[-2],
-                "slice_idx": int(fname.split("_")[-1]),
-                "maps": _maps,
-                "data": _data,
-                "kspace_mask": kspace_mask,
-            }
+    for (subject_idx, plane, slice_idx), (fname, _data, position) in data.items():
+        data_dict[fname] = {
+            "subject_idx": subject_idx,
+            "plane": plane,
+            "slice_idx": slice_idx,
+            "data": (_data, position),
+        }
+        if args.set != "test":
+            if (subject_idx, plane, slice_idx) not in maps:
+                print(f"No maps found for {fname}, skipping it.")
+                del data_dict[fname]
+                continue
+            _, _maps, maps_position = maps[(subject_idx, plane, slice_idx)]
+            data_dict[fname]["maps"] = (_maps, maps_position)
+            data_dict[fname]["kspace_mask"] = next(
+                (_kspmask for _kspmask in kspace_masks if _data.stem in str(_kspmask)), None
+            )
 
     for fname in tqdm(data_dict):
         B0_maps = []
@@ -105,47 +182,47 @@ def main(args):
         seeds = []
 
         if args.set != "test":
-            maps = h5py.File(data_dict[fname]["maps"], "r")
-            for key in maps.keys():
+            maps = read_slice(*data_dict[fname]["maps"])
+            for key in maps:
                 if "B0_map" in key:
-                    B0_maps.append([key, maps[key][()]])
+                    B0_maps.append([key, maps[key]])
                 elif "R2star_map" in key:
-                    R2star_maps.append([key, maps[key][()]])
+                    R2star_maps.append([key, maps[key]])
                 elif "S0_map" in key:
-                    S0_maps.append([key, maps[key][()]])
+                    S0_maps.append([key, maps[key]])
                 elif "phi_map" in key:
-                    phi_maps.append([key, maps[key][()]])
+                    phi_maps.append([key, maps[key]])
                 elif "ksp" in key and kspace is None:
-                    kspace = maps[key][()]
+                    kspace = maps[key]
                 elif "mask_brain" in key and mask_brain is None:
-                    mask_brain = maps[key][()]
+                    mask_brain = maps[key]
                 elif "mask_head" in key and mask_head is None:
-                    mask_head = maps[key][()]
+                    mask_head = maps[key]
                 elif "subsampling_mask" in key:
-                    masks.append([key, maps[key][()]])
+                    masks.append([key, maps[key]])
                 elif "seed" in key:
-                    seeds.append([key, maps[key][()]])
+                    seeds.append([key, maps[key]])
 
-        data = h5py.File(data_dict[fname]["data"], "r")
-        for key in data.keys():
+        data = read_slice(*data_dict[fname]["data"])
+        for key in data:
             if "sense" in key and sense is None:  # and idx_plane not in sense_maps_idxs:
-                sense = data[key][()]
+                sense = data[key]
             elif "B0_map" in key:
-                B0_maps.append([key, data[key][()]])
+                B0_maps.append([key, data[key]])
             elif "R2star_map" in key:
-                R2star_maps.append([key, data[key][()]])
+                R2star_maps.append([key, data[key]])
             elif "S0_map" in key:
-                S0_maps.append([key, data[key][()]])
+                S0_maps.append([key, data[key]])
             elif "phi_map" in key:
-                phi_maps.append([key, data[key][()]])
+                phi_maps.append([key, data[key]])
             elif "ksp" in key and kspace is None:
-                kspace = data[key][()]
+                kspace = data[key]
             elif "mask_brain" in key and mask_brain is None:
-                mask_brain = data[key][()]
+                mask_brain = data[key]
             elif "mask_head" in key and mask_head is None:
-                mask_head = data[key][()]
+                mask_head = data[key]
             elif "subsampling_mask" in key:
-                masks.append([key, data[key][()]])
+                masks.append([key, data[key]])
 
         R2_star_recons, R2_star_inits, R2_star_targets, R2_star_accs = iterate_qmap(R2star_maps, "R2star_map")
 
@@ -0,0 +1,134 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import h5py
+import numpy as np
+import pytest
+import torch
+
+from mridc.collections.quantitative.data import qmri_data
+from mridc.collections.quantitative.data.qmri_data import (
+    cache_quantitative_maps,
+    is_qmaps_cache_up_to_date,
+    qMRISliceDataset,
+)
+from mridc.collections.quantitative.parts.transforms import qMRIDataTransforms
+from mridc.collections.reconstruction.data.subsample import create_mask_for_mask_type
+
+
+def create_dataset(root, mask_types, qmaps_cache_root=None):
+    """Create a per-slice multi-echo dataset computing the quantitative maps with the given mask types."""
+    transform = qMRIDataTransforms(
+        TEs=[3.0, 11.5, 20.0, 28.5],
+        precompute_quantitative_maps=True,
+        mask_func=[create_mask_for_mask_type(mask_type, [0.08], [acc]) for mask_type, acc in zip(mask_types, [4, 10])],
+        spatial_dims=[-2, -1],
+        coil_dim=2,
+        use_seed=True,
+    )
+    return qMRISliceDataset(
+        root,
+        transform=transform,
+        sequence="MEGRE",
+        data_saved_per_slice=True,
+        kspace_scaling_factor=1,
+        qmaps_cache_root=qmaps_cache_root,
+    )
+
+
+@pytest.fixture
+def qmri_data_root(tmp_path):
+    """Write three single-slice multi-echo files."""
+    rng = np.random.default_rng(0)
+    n_echoes, n_coils, n_x, n_y = 4, 3, 32, 30
+    data_root = tmp_path / "data"
+    data_root.mkdir()
+    for fname in ("subject1_0.h5", "subject1_1.h5", "subject2_0.h5"):
+        with h5py.File(data_root / fname, "w") as hf:
+            shape = (n_echoes, n_coils, n_x, n_y)
+            hf["kspace"] = (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)).astype(np.complex64)
+            shape = (n_coils, n_x, n_y)
+            hf["sensitivity_map"] = (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)).astype(np.complex64)
+            hf["mask_brain"] = np.ones((n_x, n_y), dtype=np.float32)
+    return data_root
+
+
+def test_cache_quantitative_maps(qmri_data_root, tmp_path):
+    """Test that the cached quantitative maps are loaded and match the maps computed on the fly."""
+    dataset = create_dataset(qmri_data_root, ["equispaced1d", "random1d"])
+    cache_files = cache_quantitative_maps(dataset, tmp_path / "qmaps_cache")
+
+    if sorted(f.name for f in cache_files) != ["subject1_0.h5", "subject1_1.h5", "subject2_0.h5"]:
+        raise AssertionError
+    with h5py.File(cache_files[0], "r") as cf:
+        if list(cf.keys())[:3] != ["R2star_map_init_4x", "R2star_map_init_10x", "R2star_map_target"]:
+            raise AssertionError
+        if cf.attrs["qmaps_cache_key"] != dataset.transform.qmaps_cache_key:
+            raise AssertionError
+
+    cached_dataset = create_dataset(qmri_data_root, ["equispaced1d", "random1d"], tmp_path / "qmaps_cache")
+    for i in range(len(dataset)):
+        computed, cached = dataset[i], cached_dataset[i]
+        for computed_map, cached_map in zip(computed[:8], cached[:8]):
+            computed_map = computed_map if isinstance(computed_map, list) else [computed_map]
+            cached_map = cached_map if isinstance(cached_map, list) else [cached_map]
+            if len(computed_map) != len(cached_map):
+                raise AssertionError
+            for x, y in zip(computed_map, cached_map):
+                if not torch.allclose(x, y):
+                    raise AssertionError
+
+
+def test_cache_quantitative_maps_unseeded_masks(qmri_data_root, tmp_path):
+    """Test that maps are not cached for masks that are not reproducible from the seed."""
+    dataset = create_dataset(qmri_data_root, ["gaussian2d", "gaussian2d"])
+    if dataset.transform.qmaps_cache_key is not None:
+        raise AssertionError
+    with pytest.raises(ValueError):
+        cache_quantitative_maps(dataset, tmp_path / "qmaps_cache")
+
+
+def test_cache_quantitative_maps_invalidation(qmri_data_root, tmp_path, monkeypatch):
+    """Test that cached maps are keyed by the settings and the data directory, and invalidated by a changed file."""
+    dataset = create_dataset(qmri_data_root, ["equispaced1d", "random1d"])
+    cache_files = cache_quantitative_maps(dataset, tmp_path / "qmaps_cache")
+
+    # a split with files of the same names is cached next to the first one
+    other_root = tmp_path / "other"
+    other_root.mkdir()
+    for fname in qmri_data_root.iterdir():
+        (other_root / fname.name).write_bytes(fname.read_bytes())
+    other_cache_files = cache_quantitative_maps(
+        create_dataset(other_root, ["equispaced1d", "random1d"]), tmp_path / "qmaps_cache"
+    )
+    if set(cache_files) & set(other_cache_files):
+        raise AssertionError
+
+    # maps computed with other settings are cached next to the first ones and are not loaded
+    other_settings_cache_files = cache_quantitative_maps(
+        create_dataset(qmri_data_root, ["equispaced1d", "equispaced1d"]), tmp_path / "qmaps_cache"
+    )
+    if set(cache_files) & set(other_settings_cache_files):
+        raise AssertionError
+
+    # every file is checked once per dataset
+    checked = []
+    monkeypatch.setattr(
+        qmri_data, "is_qmaps_cache_up_to_date", lambda *args: checked.append(args) or is_qmaps_cache_up_to_date(*args)
+    )
+    cached_dataset = create_dataset(qmri_data_root, ["equispaced1d", "random1d"], tmp_path / "qmaps_cache")
+    fname = cached_dataset.examples[0][0]
+    with h5py.File(fname, "r") as hf:
+        for _ in range(2):
+            if cached_dataset.get_qmaps_cache_file(hf, fname) not in cache_files:
+                raise AssertionError
+    if len(checked) != 1:
+        raise AssertionError
+
+    # a changed data file invalidates its cached maps
+    with h5py.File(fname, "a") as hf:
+        hf.attrs["changed"] = True
+    cached_dataset = create_dataset(qmri_data_root, ["equispaced1d", "random1d"], tmp_path / "qmaps_cache")
+    with h5py.File(fname, "r") as hf:
+        if cached_dataset.get_qmaps_cache_file(hf, fname) is not None:
+            raise AssertionError
@@ -0,0 +1,46 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import pytest
+import torch
+
+from mridc.collections.quantitative.nn.base import SignalForwardModel
+
+
+@pytest.mark.parametrize("use_torchscript", [False, True])
+def test_megre_signal_forward_model(use_torchscript):
+    """Test the broadcast MEGRE signal forward model against the per-echo signal equation."""
+    torch.manual_seed(0)
+    R2star_map, S0_map, B0_map, phi_map = (torch.rand(2, 16, 12, dtype=torch.float64) * s for s in (50, 1, 100, 1))
+    TEs = [3.0, 11.5, 20.0, 28.5]
+
+    pred = SignalForwardModel(sequence="MEGRE", use_torchscript=use_torchscript)(
+        R2star_map, S0_map, B0_map, phi_map, TEs
+    )
+
+    expected = torch.stack(
+        [
+            torch.view_as_real(
+                (S0_map + 1j * phi_map) * torch.exp(-TE * 1e-3 * R2star_map) * torch.exp(-1j * TE * 1e-3 * B0_map)
+            )
+            for TE in TEs
+        ],
+        1,
+    )
+    if pred.shape != (2, len(TEs), 16, 12, 2):
+        raise AssertionError
+    if not torch.allclose(pred, expected):
+        raise AssertionError
+
+
+def test_megre_no_phase_signal_forward_model():
+    """Test the broadcast MEGRE no phase signal forward model against the per-echo signal equation."""
+    torch.manual_seed(0)
+    R2star_map, S0_map = torch.rand(2, 16, 12) * 50, torch.rand(2, 16, 12)
+    TEs = [3.0, 11.5, 20.0, 28.5]
+
+    pred = SignalForwardModel(sequence="MEGRE_no_phase")(R2star_map, S0_map, None, None, TEs)
+
+    expected = torch.stack([S0_map * torch.exp(-TE * 1e-3 * R2star_map) for TE in TEs], 1)
+    if not torch.allclose(pred, torch.stack((expected, expected), -1)):
+        raise AssertionError
@@ -0,0 +1,71 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import numpy as np
+import pytest
+import torch
+
+from mridc.collections.quantitative.parts.transforms import (
+    R2star_B0_real_S0_complex_mapping,
+    R2star_B0_S0_phi_mapping,
+    R2star_S0_mapping,
+)
+
+
+@pytest.mark.parametrize(
+    "shape, TEs", [([4, 8, 9, 2], [3.0, 11.5, 20.0, 28.5]), ([2, 6, 5, 7, 2], [2, 4, 6, 8, 10, 12])]
+)
+def test_R2star_S0_mapping(shape, TEs):
+    """Test that the closed-form weighted fit of R2* matches the per-pixel np.polyfit fit."""
+    torch.manual_seed(0)
+    prediction = torch.randn(shape)
+    R2star = R2star_S0_mapping(prediction, TEs)
+
+    signal = np.abs(torch.view_as_complex(prediction).numpy()) + 1e-8
+    signal = signal.reshape(-1, len(TEs), *shape[-3:-1]) if len(shape) == 5 else signal[None]
+    for batch_idx, sample in enumerate(signal):
+        sample = sample.reshape(len(TEs), -1)
+        expected = np.array(
+            [
+                -np.polyfit(np.array(TEs) * 1e-3, np.log(sample[:, i]), 1, w=np.sqrt(sample[:, i]))[0]
+                for i in range(sample.shape[1])
+            ]
+        ).reshape(shape[-3:-1])
+        result = R2star[batch_idx] if len(shape) == 5 else R2star
+        if not np.allclose(result.numpy(), expected, rtol=1e-4, atol=1e-2):
+            raise AssertionError
+
+
+@pytest.mark.parametrize("shift", [False, True])
+def test_R2star_B0_S0_phi_mapping(shift):
+    """Test that the batched mapping matches the per-sample mapping and leaves the prediction untouched."""
+    torch.manual_seed(0)
+    batch_size, n_echoes, n_x, n_y = 2, 4, 32, 30
+    TEs = [3.0, 11.5, 20.0, 28.5]
+    grid_x, grid_y = torch.meshgrid(torch.linspace(-1, 1, n_x), torch.linspace(-1, 1, n_y), indexing="ij")
+    head_mask = ((grid_x**2 + grid_y**2) < 0.8).float().expand(batch_size, n_x, n_y)
+    brain_mask = ((grid_x**2 + grid_y**2) < 0.5).float().expand(batch_size, n_x, n_y)
+    R2star = 20 + 10 * torch.rand(batch_size, 1, 1, 1)
+    B0 = 50 * grid_x * torch.rand(batch_size, 1, 1, 1)
+    decay = torch.exp(-torch.tensor(TEs).reshape(1, -1, 1, 1) * 1e-3 * (R2star + 1j * B0))
+    prediction = torch.view_as_real((1 + grid_x) * decay * head_mask.unsqueeze(1)).float()
+    prediction_copy = prediction.clone()
+
+    maps = R2star_B0_S0_phi_mapping(prediction, TEs, brain_mask, head_mask, shift=shift, spatial_dims=[-2, -1])
+
+    if not torch.equal(prediction, prediction_copy):
+        raise AssertionError
+    for batch_idx in range(batch_size):
+        sample_maps = R2star_B0_real_S0_complex_mapping(
+            prediction[batch_idx],
+            TEs,
+            brain_mask[batch_idx],
+            head_mask[batch_idx],
+            shift=shift,
+            spatial_dims=[-2, -1],
+        )
+        for batch_map, sample_map in zip(maps, sample_maps):
+            if batch_map.shape != (batch_size, n_x, n_y):
+                raise AssertionError
+            if not torch.allclose(batch_map[batch_idx], sample_map, rtol=1e-4, atol=1e-4):
+                raise AssertionError
@@ -0,0 +1,53 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import pytest
+import pytorch_lightning as pl
+import torch
+from omegaconf import OmegaConf
+
+from mridc.collections.common.parts import fft
+from mridc.collections.reconstruction.nn.cs import CS
+
+
+@pytest.mark.parametrize("cs_type, tol", [("l1_wavelet", 1e-3), ("total_variation", 5e-3)])
+def test_cs_batched_backend(cs_type, tol):
+    """Test that the batched PyTorch CS reconstruction matches the sigpy reconstruction."""
+    torch.manual_seed(0)
+    batch_size, n_coils, n_x, n_y = 3, 4, 32, 30
+    grid_x, grid_y = torch.meshgrid(torch.linspace(-1, 1, n_x), torch.linspace(-1, 1, n_y), indexing="ij")
+    image = ((grid_x**2 + grid_y**2) < 0.6).to(torch.complex64) * torch.rand(batch_size, 1, 1).add(0.5)
+    sensitivity_maps = torch.stack(
+        [torch.exp(-((grid_x - cx) ** 2 + (grid_y - cy) ** 2) / 2) for cx in (-1, 1) for cy in (-1, 1)]
+    ).to(torch.complex64)
+    sensitivity_maps = sensitivity_maps.unsqueeze(0).repeat(batch_size, 1, 1, 1)
+    mask = (torch.rand(batch_size, 1, 1, n_y) < 0.4).float().expand(batch_size, 1, n_x, n_y).clone()
+    mask[..., n_y // 2 - 3 : n_y // 2 + 3] = 1
+    y = torch.view_as_complex(fft.fft2(sensitivity_maps * image.unsqueeze(1), True, "ortho")) * mask
+
+    cfg = {
+        "cs_type": cs_type,
+        "reg_wt": 0.005,
+        "num_iters": 30,
+        "center_kspace": False,
+        "center_sensitivity_maps": False,
+        "center_mask": False,
+        "center_reconstruction": False,
+        "spatial_dims": [-2, -1],
+        "use_sens_net": False,
+        "fft_centered": True,
+        "fft_normalization": "ortho",
+        "coil_dim": 1,
+    }
+    trainer = pl.Trainer(accelerator="cpu", num_nodes=1, enable_checkpointing=False, logger=False)
+
+    predictions = []
+    for cs_backend in ("sigpy", "torch"):
+        cs = CS(OmegaConf.create({**cfg, "cs_backend": cs_backend}), trainer=trainer)
+        prediction = cs(torch.view_as_real(y), torch.view_as_real(sensitivity_maps), mask.unsqueeze(-1), None, None)
+        predictions.append(prediction.detach())
+
+    if predictions[1].shape != (batch_size, n_x, n_y):
+        raise AssertionError
+    if torch.linalg.norm(predictions[0] - predictions[1]) / torch.linalg.norm(predictions[0]) > tol:
+        raise AssertionError
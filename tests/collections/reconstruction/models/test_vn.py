@@ -202,3 +202,76 @@ def test_vn(shape, cfg, center_fractions, accelerations, dimensionality, trainer
 
     if y.shape[1:] != x.shape[2:4]:
         raise AssertionError
+
+
+@pytest.mark.parametrize("activation_checkpointing_interval", [1, 2])
+def test_vn_activation_checkpointing(activation_checkpointing_interval):
+    """
+    Test that activation checkpointing of the VN cascades, including dropout, does not change the outputs and the
+    gradients
+
+    Args:
+        activation_checkpointing_interval: checkpoint every n-th cascade
+
+    Returns:
+        None
+    """
+    from mridc.collections.reconstruction.nn.vn import VarNet as NNVarNet
+
+    torch.manual_seed(0)
+    mask_func = RandomMaskFunc([0.08], [4])
+    output, mask, _ = utils.apply_mask(torch.randn(1, 3, 32, 16, 2), mask_func, seed=123)
+    sensitivity_maps = torch.randn(1, 3, 32, 16, 2)
+    sensitivity_maps = sensitivity_maps / utils.rss_complex(sensitivity_maps, dim=1).unsqueeze(1).unsqueeze(-1)
+    target = torch.randn(1, 32, 16)
+
+    cfg = {
+        "num_cascades": 4,
+        "channels": 4,
+        "no_dc": False,
+        "pooling_layers": 2,
+        "padding_size": 11,
+        "normalize": True,
+        "use_sens_net": False,
+        "fft_centered": True,
+        "fft_normalization": "ortho",
+        "spatial_dims": [-2, -1],
+        "coil_dim": 1,
+    }
+
+    trainer = pl.Trainer(accelerator="cpu", num_nodes=1, enable_checkpointing=False, logger=False)
+
+    vn = NNVarNet(OmegaConf.create(cfg), trainer=trainer)
+    vn_checkpointed = NNVarNet(
+        OmegaConf.create(
+            {
+                **cfg,
+                "use_activation_checkpointing": True,
+                "activation_checkpointing_interval": activation_checkpointing_interval,
+            }
+        ),
+        trainer=trainer,
+    )
+    vn_checkpointed.load_state_dict(vn.state_dict())
+
+    predictions, grads = [], []
+    for model in (vn, vn_checkpointed):
+        # dropout after every cascade, to check that the recomputed cascades draw the same masks
+        for cascade in model.cascades:
+            cascade.register_forward_hook(
+                lambda module, inputs, prediction: torch.nn.functional.dropout(prediction, p=0.2, training=True)
+            )
+        model.train()
+        torch.manual_seed(0)
+        prediction = model(output, sensitivity_maps, mask, output, target)
+        prediction.abs().mean().backward()
+        predictions.append(prediction.detach())
+        grads.append([p.grad.clone() for p in model.parameters() if p.grad is not None])
+
+    if not torch.allclose(predictions[0], predictions[1]):
+        raise AssertionError
+    if len(grads[0]) != len(grads[1]) or len(grads[0]) == 0:
+        raise AssertionError
+    for grad, grad_checkpointed in zip(*grads):
+        if not torch.allclose(grad, grad_checkpointed, atol=1e-6):
+            raise AssertionError
@@ -0,0 +1,95 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import pytest
+import torch
+
+from mridc.collections.reconstruction.nn.resnet_base.resnet_block import ConjugateGradient as ResNetConjugateGradient
+from mridc.collections.reconstruction.nn.sigmanet.dc_layers import ConjugateGradient
+
+
+@pytest.mark.parametrize("shape, tol", [([3, 1, 8, 8, 2], 1e-6), ([4, 1, 6, 10, 2], 1e-10)])
+def test_batched_conjugate_gradient(shape, tol):
+    """Test that the batched Conjugate Gradient solves every sample as if it was solved on its own."""
+    torch.manual_seed(0)
+    x0 = torch.randn(shape)
+    # badly conditioned samples converge at different iterations
+    scales = torch.logspace(0, 2, shape[0]).reshape(shape[0], 1, 1, 1, 1)
+    diagonal = torch.rand(shape[:-1] + [1]) * scales + 0.1
+
+    x = ConjugateGradient.solve(x0, lambda p: diagonal * p, tol, 100)
+    x_per_sample = torch.cat(
+        [
+            ConjugateGradient.solve(x0[i : i + 1], lambda p, i=i: diagonal[i : i + 1] * p, tol, 100)
+            for i in range(shape[0])
+        ]
+    )
+
+    if not torch.allclose(x, x_per_sample):
+        raise AssertionError
+    residual = (diagonal * x - x0).pow(2).flatten(1).sum(-1) / x0.pow(2).flatten(1).sum(-1)
+    if not torch.all(residual <= tol):
+        raise AssertionError
+
+
+class SENSEConjugateGradient(ResNetConjugateGradient):
+    """Conjugate Gradient with a SENSE normal operator on complex tensors, with orthonormal uncentered FFTs."""
+
+    def EhE_Op(self, prediction, sens_maps, mask, mu=None):
+        if mu is None:
+            mu = self.mu
+        kspace = torch.fft.fft2(prediction.unsqueeze(1) * sens_maps, norm="ortho") * mask
+        return torch.sum(torch.conj(sens_maps) * torch.fft.ifft2(kspace, norm="ortho"), 1) + mu * prediction
+
+
+def create_sense_problem(batch_size=3, n_coils=4, n_x=8, n_y=6):
+    """Create a SENSE problem whose samples are undersampled differently, so that they converge differently."""
+    torch.manual_seed(0)
+    rhs = torch.randn(batch_size, n_x, n_y, 2, dtype=torch.float64)
+    sens_maps = torch.randn(batch_size, n_coils, n_x, n_y, 2, dtype=torch.float64)
+    mask = torch.stack(
+        [(torch.rand(1, n_x, n_y) < fraction).to(torch.float64) for fraction in torch.linspace(0.2, 0.8, batch_size)]
+    )
+    return rhs, sens_maps, mask
+
+
+def test_batched_resnet_conjugate_gradient():
+    """Test that the batched Conjugate Gradient of the ResNet solves every sample as if it was solved on its own."""
+    rhs, sens_maps, mask = create_sense_problem()
+    rhs, sens_maps = torch.view_as_complex(rhs), torch.view_as_complex(sens_maps)
+    cg = SENSEConjugateGradient(CG_Iter=100, mu=torch.tensor([0.05], dtype=torch.float64), tol=1e-10)
+
+    batch_dot = cg.batch_dot(rhs, sens_maps[:, 0])
+    if batch_dot.shape != (rhs.shape[0], 1, 1):
+        raise AssertionError
+    for i in range(rhs.shape[0]):
+        if not torch.allclose(batch_dot[i].squeeze(), torch.vdot(rhs[i].flatten(), sens_maps[i, 0].flatten())):
+            raise AssertionError
+
+    x = cg.solve(rhs, sens_maps, mask)
+    x_per_sample = torch.cat(
+        [cg.solve(rhs[i : i + 1], sens_maps[i : i + 1], mask[i : i + 1]) for i in range(rhs.shape[0])]
+    )
+    if not torch.allclose(x, x_per_sample, atol=1e-12):
+        raise AssertionError
+    residual = torch.linalg.vector_norm((cg.EhE_Op(x, sens_maps, mask) - rhs).flatten(1), dim=1)
+    if not torch.all(residual <= 1e-10 * torch.linalg.vector_norm(rhs.flatten(1), dim=1)):
+        raise AssertionError
+
+
+def test_implicit_conjugate_gradient_backward():
+    """Test that the implicit gradients of the Conjugate Gradient match the gradients through its iterations."""
+    rhs, sens_maps, mask = create_sense_problem()
+    weights = torch.randn(rhs.shape, dtype=torch.float64)
+
+    grads = []
+    for implicit_backward in (False, True):
+        _rhs, _sens_maps = rhs.clone().requires_grad_(), sens_maps.clone().requires_grad_()
+        mu = torch.nn.Parameter(torch.tensor([0.05], dtype=torch.float64))
+        cg = SENSEConjugateGradient(CG_Iter=100, mu=mu, tol=1e-13, implicit_backward=implicit_backward)
+        torch.sum(weights * cg(_rhs, _sens_maps, mask)).backward()
+        grads.append([_rhs.grad, _sens_maps.grad, mu.grad])
+
+    for unrolled_grad, implicit_grad in zip(*grads):
+        if not torch.allclose(unrolled_grad, implicit_grad, rtol=1e-8, atol=1e-10):
+            raise AssertionError
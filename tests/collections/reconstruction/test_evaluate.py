@@ -0,0 +1,151 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import csv
+import json
+
+import h5py
+import numpy as np
+import pytest
+
+from mridc.collections.reconstruction.metrics import evaluate as evaluate_module
+from mridc.collections.reconstruction.metrics import reconstruction_metrics
+from mridc.collections.reconstruction.metrics.evaluate import (
+    EvaluationOptions,
+    evaluate,
+    evaluate_volume,
+    materialize_targets,
+)
+
+
+@pytest.fixture
+def volumes(tmp_path):
+    """Write targets, with different target datasets, and noisy complex reconstructions of three volumes."""
+    rng = np.random.default_rng(0)
+    targets_dir, reconstructions_dir = tmp_path / "targets", tmp_path / "reconstructions"
+    targets_dir.mkdir()
+    reconstructions_dir.mkdir()
+    for idx, key in enumerate(["reconstruction_sense", "reconstruction_rss", "target"]):
+        target = rng.random((3 + idx, 32, 24)) + 0.5
+        reconstruction = (target + 0.05 * rng.standard_normal(target.shape)) * np.exp(1j * rng.random(target.shape))
+        with h5py.File(targets_dir / f"volume_{idx}.h5", "w") as hf:
+            hf.create_dataset(key, data=target)
+        with h5py.File(reconstructions_dir / f"volume_{idx}.h5", "w") as hf:
+            hf.create_dataset("reconstruction", data=reconstruction[:, np.newaxis])
+    return targets_dir, reconstructions_dir
+
+
+def test_evaluate_volume(volumes):
+    """Test the volume metrics against the per volume numpy metrics of the normalized magnitude images."""
+    targets_dir, reconstructions_dir = volumes
+    for target_file in sorted(targets_dir.iterdir()):
+        _, slice_rows, volume_row = evaluate_volume(
+            target_file, reconstructions_dir / target_file.name, EvaluationOptions(clip=True)
+        )
+        with h5py.File(target_file, "r") as hf:
+            target = np.abs(hf[list(hf.keys())[0]][()])
+        with h5py.File(reconstructions_dir / target_file.name, "r") as hf:
+            reconstruction = np.abs(hf["reconstruction"][()]).squeeze(1)
+        target = np.clip(target / target.max(), 0, 1)
+        reconstruction = np.clip(reconstruction / reconstruction.max(), 0, 1)
+
+        if len(slice_rows) != target.shape[0] or volume_row["num_slices"] != target.shape[0]:
+            raise AssertionError
+        for name, func in reconstruction_metrics.METRIC_FUNCS.items():
+            if not np.isclose(volume_row[name], func(target, reconstruction), rtol=1e-6):
+                raise AssertionError
+        if not np.isclose(np.mean([row["SSIM"] for row in slice_rows]), volume_row["SSIM"]):
+            raise AssertionError
+
+
+@pytest.mark.parametrize("output_format", ["csv", "json"])
+def test_evaluate_resume(tmp_path, volumes, output_format):
+    """Test that parallel, serial and resumed runs give the same metrics, evaluating every volume once."""
+    targets_dir, reconstructions_dir = volumes
+    options = EvaluationOptions(crop_size=(16, 100), metrics=["SSIM", "PSNR"])
+    extension = "csv" if output_format == "csv" else "jsonl"
+
+    expected = evaluate(targets_dir, reconstructions_dir, tmp_path / "serial", options, output_format=output_format)
+    parallel = evaluate(
+        targets_dir, reconstructions_dir, tmp_path / "parallel", options, num_workers=2, output_format=output_format
+    )
+
+    # an interrupted run, with one volume done and the slices of another one written
+    resumed_dir = tmp_path / "resumed"
+    evaluate([targets_dir / "volume_1.h5"], reconstructions_dir, resumed_dir, options, output_format=output_format)
+    with open(resumed_dir / f"slices.{extension}", "a") as f:
+        f.write("volume_2.h5,0,0.5,20.0\n" if output_format == "csv" else '{"fname": "volume_2.h5", "slice": 0}\n')
+    resumed = evaluate(targets_dir, reconstructions_dir, resumed_dir, options, output_format=output_format)
+
+    for summary in (parallel, resumed):
+        if sorted(summary) != ["PSNR", "SSIM"]:
+            raise AssertionError
+        for name, value in summary.items():
+            if not np.allclose([value["mean"], value["std"]], [expected[name]["mean"], expected[name]["std"]]):
+                raise AssertionError
+
+    with open(resumed_dir / f"slices.{extension}", "r") as f:
+        slices = list(csv.DictReader(f)) if output_format == "csv" else [json.loads(line) for line in f]
+    if sorted((row["fname"], int(row["slice"])) for row in slices) != [
+        (f"volume_{idx}.h5", slice_num) for idx in range(3) for slice_num in range(3 + idx)
+    ]:
+        raise AssertionError
+    with open(resumed_dir / "summary.json", "r") as f:
+        if json.load(f)["num_volumes"] != 3:
+            raise AssertionError
+
+
+def test_materialize_targets(tmp_path, volumes, monkeypatch):
+    """Test that evaluating with the materialized targets matches preparing them, and does not read the targets."""
+    targets_dir, reconstructions_dir = volumes
+    options = EvaluationOptions(crop_size=(16, 100), clip=True)
+    expected = evaluate(targets_dir, reconstructions_dir, tmp_path / "expected", options)
+
+    cache_dir = materialize_targets(targets_dir, tmp_path / "cache", options, num_workers=2)
+    if sorted(f.name for f in cache_dir.iterdir()) != sorted(f.name for f in targets_dir.iterdir()):
+        raise AssertionError
+    if materialize_targets(targets_dir, tmp_path / "cache", EvaluationOptions(crop_size=(16, 100))) == cache_dir:
+        raise AssertionError
+
+    def load_target(*args):
+        raise AssertionError("The targets should be read from the cache.")
+
+    with monkeypatch.context() as m:
+        m.setattr(evaluate_module, "load_target", load_target)
+        cached = evaluate(
+            targets_dir, reconstructions_dir, tmp_path / "cached", options, targets_cache_root=tmp_path / "cache"
+        )
+    for name, value in expected.items():
+        if not np.allclose([value["mean"], value["std"]], [cached[name]["mean"], cached[name]["std"]], rtol=1e-5):
+            raise AssertionError
+
+    # a new version of a target file invalidates its cached targets
+    with h5py.File(targets_dir / "volume_0.h5", "a") as hf:
+        hf.attrs["version"] = 2
+    with h5py.File(cache_dir / "volume_0.h5", "r") as cf:
+        cached_target = cf["target"][()]
+    if (
+        evaluate_module._load_cached_target(cache_dir, targets_dir / "volume_0.h5", options, cached_target.shape)
+        is not None
+    ):
+        raise AssertionError
+
+
+def test_evaluate_resume_options(tmp_path, volumes):
+    """Test that a run with other options evaluates all volumes again, and that targets without a reconstruction
+    are skipped."""
+    targets_dir, reconstructions_dir = volumes
+    evaluate(targets_dir, reconstructions_dir, tmp_path / "metrics", EvaluationOptions(metrics=["MSE"]))
+
+    options = EvaluationOptions(metrics=["MSE", "SSIM"], crop_size=(16, 16))
+    expected = evaluate(targets_dir, reconstructions_dir, tmp_path / "expected", options)
+    rerun = evaluate(targets_dir, reconstructions_dir, tmp_path / "metrics", options)
+    for name, value in expected.items():
+        if not np.allclose([value["mean"], value["std"]], [rerun[name]["mean"], rerun[name]["std"]]):
+            raise AssertionError
+
+    (reconstructions_dir / "volume_1.h5").unlink()
+    evaluate(targets_dir, reconstructions_dir, tmp_path / "missing", options, num_workers=2)
+    with open(tmp_path / "missing" / "summary.json", "r") as f:
+        if json.load(f)["num_volumes"] != 2:
+            raise AssertionError
@@ -0,0 +1,76 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from mridc.collections.common.parts.image_logger import ImageLogger
+
+
+@pytest.mark.parametrize("asynchronous", [True, False])
+def test_image_logger(asynchronous):
+    """Test the per epoch sampling, downsampling and packing of the images, written from a background thread."""
+    written = []
+    image_logger = ImageLogger(
+        lambda name, image, step: written.append((name, image, step, threading.current_thread().name)),
+        max_volumes=2,
+        slice_interval=2,
+        downsample=2,
+        asynchronous=asynchronous,
+    )
+
+    image = torch.arange(4 * 2 * 6 * 4, dtype=torch.float64).reshape(4, 2, 6, 4)
+    for epoch in range(2):
+        image_logger.reset()
+        for fname in ["c.h5", "a.h5", "b.h5"][epoch:]:
+            for slice_num in range(5):
+                # every block of a step asks again, and gets the same answer
+                if image_logger.should_log(fname, slice_num) and image_logger.should_log(fname, slice_num):
+                    image_logger.log(f"{fname}_{slice_num}", image, step=epoch)
+        image_logger.flush()
+
+    expected = [
+        (f"{f}_{s}", e)
+        for e, fnames in enumerate([["c.h5", "a.h5"], ["a.h5", "b.h5"]])
+        for f in fnames
+        for s in (0, 2, 4)
+    ]
+    if [(name, step) for name, _, step, _ in written] != expected:
+        raise AssertionError
+    downsampled = image[0, 0].reshape(3, 2, 2, 2).mean((1, 3)).unsqueeze(0).numpy()
+    for _, logged, _, thread_name in written:
+        if logged.dtype != np.float32 or not np.allclose(logged, downsampled, rtol=1e-3):
+            raise AssertionError
+        if (thread_name == "ImageLogger") != asynchronous:
+            raise AssertionError
+    image_logger.close()
+
+
+def test_image_logger_drops_and_errors():
+    """Test that images are dropped when the queue is full, and that writing errors are raised in the caller."""
+    release = threading.Event()
+
+    def write(name, image, step):
+        release.wait()
+        if name == "error":
+            raise ValueError(name)
+
+    image_logger = ImageLogger(write, max_queued_images=2)
+    start = time.time()
+    for idx in range(10):
+        image_logger.log(str(idx), torch.rand(1, 4, 4), step=0)
+    if time.time() - start > 5 or image_logger.dropped < 7:
+        raise AssertionError
+    release.set()
+    image_logger.flush()
+    if image_logger.dropped != 0:
+        raise AssertionError
+
+    image_logger.log("error", torch.rand(1, 4, 4), step=0)
+    with pytest.raises(RuntimeError):
+        image_logger.flush()
+    image_logger.close()
@@ -0,0 +1,131 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import types
+
+import numpy as np
+import piq
+import pytest
+import torch
+from skimage.metrics import structural_similarity
+
+from mridc.collections.common.metrics.volume_metrics import VolumeMetricsAccumulator
+from mridc.collections.common.nn.base import BaseMRIModel
+from mridc.collections.reconstruction.metrics import reconstruction_metrics
+
+
+@pytest.mark.parametrize(
+    "ssim_kwargs",
+    [{}, {"win_size": 5}, {"gaussian_weights": True, "use_sample_covariance": False}],
+)
+def test_batched_ssim(ssim_kwargs):
+    """Test the batched SSIM against the per slice scikit-image SSIM."""
+    rng = np.random.default_rng(0)
+    x = rng.random((3, 2, 32, 24))
+    y = np.clip(x + 0.1 * rng.standard_normal(x.shape), 0, None)
+    maxval = y.reshape(3, -1).max(1) - y.reshape(3, -1).min(1)
+
+    ssim = reconstruction_metrics.batched_ssim(
+        torch.from_numpy(x), torch.from_numpy(y), maxval=torch.from_numpy(maxval), **ssim_kwargs
+    )
+
+    expected = [
+        np.mean([structural_similarity(x[b, s], y[b, s], data_range=maxval[b], **ssim_kwargs) for s in range(2)])
+        for b in range(3)
+    ]
+    if not np.allclose(ssim.numpy(), expected):
+        raise AssertionError
+
+
+def test_batched_metrics():
+    """Test the batched metrics against the per element numpy metrics."""
+    rng = np.random.default_rng(0)
+    x = rng.random((3, 2, 32, 24)).astype(np.float32)
+    y = np.clip(x + 0.1 * rng.standard_normal(x.shape), 0, None).astype(np.float32)
+
+    mse, nmse, ssim, psnr = reconstruction_metrics.batched_metrics(torch.from_numpy(x), torch.from_numpy(y))
+
+    for b in range(3):
+        maxval = y[b].max() - y[b].min()
+        if not np.isclose(mse[b].item(), reconstruction_metrics.mse(x[b], y[b]), rtol=1e-4):
+            raise AssertionError
+        if not np.isclose(nmse[b].item(), reconstruction_metrics.nmse(x[b], y[b]), rtol=1e-4):
+            raise AssertionError
+        if not np.isclose(ssim[b].item(), reconstruction_metrics.ssim(x[b], y[b], maxval=maxval), rtol=1e-4):
+            raise AssertionError
+        if not np.isclose(psnr[b].item(), reconstruction_metrics.psnr(x[b], y[b], maxval=maxval), rtol=1e-4):
+            raise AssertionError
+
+
+def test_volume_metrics_accumulator():
+    """Test that the accumulator sums the per volume means of the metrics, as the per slice dictionaries did."""
+    rng = np.random.default_rng(0)
+    fnames = [f"volume_{idx}.h5" for idx in rng.integers(0, 10, 50)]
+    values = {"MSE": torch.from_numpy(rng.random(50)), "DICE": torch.from_numpy(rng.random((50, 3)))}
+
+    accumulator = VolumeMetricsAccumulator(["MSE", "DICE"], capacity=2)
+    for start in range(0, 50, 4):
+        accumulator.update(fnames[start : start + 4], **{k: v[start : start + 4] for k, v in values.items()})
+    metrics, num_volumes = accumulator.compute()
+
+    expected = {
+        name: sum(value[[idx for idx, f in enumerate(fnames) if f == fname]].mean().item() for fname in set(fnames))
+        for name, value in values.items()
+    }
+    if num_volumes.item() != len(set(fnames)):
+        raise AssertionError
+    for name, value in metrics.items():
+        if not np.isclose(value.item(), expected[name], rtol=1e-5):
+            raise AssertionError
+
+    accumulator.reset()
+    metrics, num_volumes = accumulator.compute()
+    if num_volumes.item() != 0 or any(value.item() != 0 for value in metrics.values()):
+        raise AssertionError
+
+
+def test_log_volume_metrics():
+    """Test that the reduced volume metrics are logged without syncing them again, and not at all without volumes."""
+    logged = []
+    model = types.SimpleNamespace(
+        volume_metrics=VolumeMetricsAccumulator(["MSE"]),
+        device=torch.device("cpu"),
+        log=lambda name, value, **kwargs: logged.append((name, value.item(), kwargs)),
+    )
+
+    BaseMRIModel.log_volume_metrics(model)
+    if logged:
+        raise AssertionError
+
+    model.volume_metrics.update(["volume_0.h5", "volume_0.h5", "volume_1.h5"], MSE=torch.tensor([1.0, 3.0, 4.0]))
+    BaseMRIModel.log_volume_metrics(model)
+    if logged != [("MSE", 3.0, {"sync_dist": False})]:
+        raise AssertionError
+
+
+@pytest.mark.parametrize("metric", ["haarpsi", "vsi"])
+@pytest.mark.parametrize("chunk_size, num_threads", [(0, 0), (3, 0), (2, 2)])
+def test_batched_perceptual_metrics(metric, chunk_size, num_threads):
+    """Test the chunked HaarPSI and VSI against the per slice piq metrics."""
+    torch.manual_seed(0)
+    x = torch.rand(3, 2, 32, 24)
+    y = torch.clamp(x + 0.1 * torch.randn_like(x), 0, None)
+    maxval = x.reshape(3, -1).amax(1)
+
+    values = getattr(reconstruction_metrics, f"batched_{metric}")(
+        x, y, maxval=maxval, chunk_size=chunk_size, num_threads=num_threads
+    )
+
+    expected = [
+        np.mean(
+            [
+                getattr(piq, metric)(
+                    x[b, s][None, None], torch.clamp(y[b, s], max=maxval[b])[None, None], data_range=maxval[b].item()
+                ).item()
+                for s in range(2)
+            ]
+        )
+        for b in range(3)
+    ]
+    if not np.allclose(values.numpy(), expected, atol=1e-5):
+        raise AssertionError
@@ -6,6 +6,7 @@ import pytest
 import torch
 
 from mridc.collections.common.parts.utils import (
+    apply_per_coil,
     center_crop,
     center_crop_to_smallest,
     complex_center_crop,
@@ -101,3 +102,26 @@ def test_center_crop_to_smallest(x, y):
     x, y = center_crop_to_smallest(x, y)
     if x.shape != y.shape:
         raise AssertionError
+
+
+@pytest.mark.parametrize("shape, coil_dim, chunk_size", [([2, 5, 8, 6, 2], 1, None), ([2, 3, 5, 8, 6], 2, 4)])
+def test_apply_per_coil(shape, coil_dim, chunk_size):
+    """
+    Test if applying a model with the coils folded into the batch dimension matches a loop over the coils.
+
+    Args:
+        shape: The input shape.
+        coil_dim: The coil dimension.
+        chunk_size: Maximum number of coil images per forward pass.
+
+    Returns:
+        None
+    """
+    x = torch.randn(shape)
+    model = torch.nn.Linear(shape[-1], 3)
+    expected = torch.stack([model(x.select(coil_dim, idx)) for idx in range(x.shape[coil_dim])], dim=coil_dim)
+    output = apply_per_coil(model, x, coil_dim, chunk_size=chunk_size)
+    if output.shape != expected.shape:
+        raise AssertionError
+    if not torch.allclose(output, expected, atol=1e-6):
+        raise AssertionError
@@ -0,0 +1,64 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+from types import SimpleNamespace
+
+import h5py
+import numpy as np
+import pytest
+import torch
+
+from mridc.collections.common.data.samplers import DistributedVolumeSampler
+from mridc.collections.common.parts.writers import VolumeWriter
+
+
+@pytest.mark.parametrize("num_replicas", [1, 2, 3])
+def test_volume_writer(tmp_path, num_replicas):
+    """Test that every process writes whole volumes, in slice order, as the per volume stacked predictions."""
+    rng = np.random.default_rng(0)
+    num_slices = {"subject1.h5": 4, "subject2.h5": 3, "subject3.h5": 5}
+    predictions = {fname: rng.standard_normal((n, 1, 8, 6)).astype(np.float32) for fname, n in num_slices.items()}
+    dataset = SimpleNamespace(examples=[(f"/data/{f}", s, {}) for f, n in num_slices.items() for s in range(n)])
+
+    written = []
+    for rank in range(num_replicas):
+        dataloader = SimpleNamespace(
+            dataset=dataset, sampler=DistributedVolumeSampler(dataset, num_replicas=num_replicas, rank=rank)
+        )
+        writer = VolumeWriter(tmp_path, VolumeWriter.slices_per_volume([dataloader]), compression="gzip")
+        # predictions may arrive in any order
+        for idx in reversed(list(dataloader.sampler)):
+            fname, slice_num, _ = dataset.examples[idx]
+            fname = fname.split("/")[-1]
+            writer.write(fname, slice_num, {"reconstruction": predictions[fname][slice_num]})
+            if fname in writer.written:
+                written.append(fname)
+        writer.close()
+
+    if sorted(written) != sorted(num_slices):
+        raise AssertionError
+    for fname, prediction in predictions.items():
+        with h5py.File(tmp_path / fname, "r") as hf:
+            if hf["reconstruction"].chunks != (1, 1, 8, 6):
+                raise AssertionError
+            if not np.array_equal(hf["reconstruction"][()], prediction):
+                raise AssertionError
+
+
+def test_volume_writer_tensor_slice_numbers(tmp_path):
+    """Test that collated tensor slice numbers stream whole volumes, as int slice numbers do."""
+    rng = np.random.default_rng(0)
+    predictions = rng.standard_normal((3, 1, 8, 6)).astype(np.float32)
+    dataset = SimpleNamespace(examples=[("/data/subject1.h5", s, {}) for s in range(3)])
+    dataloader = SimpleNamespace(dataset=dataset, sampler=None)
+
+    writer = VolumeWriter(tmp_path, VolumeWriter.slices_per_volume([dataloader]))
+    for slice_num in range(3):
+        writer.write("subject1.h5", torch.tensor([slice_num]), {"reconstruction": predictions[slice_num]})
+    if "subject1.h5" not in writer.written:
+        raise AssertionError
+    writer.close()
+
+    with h5py.File(tmp_path / "subject1.h5", "r") as hf:
+        if not np.array_equal(hf["reconstruction"][()], predictions):
+            raise AssertionError
@@ -285,3 +285,47 @@ def test_unet(shape, cfg, center_fractions, accelerations, dimensionality, segme
         output = torch.view_as_complex(torch.stack([output for _ in range(segmentation_classes)], 1).sum(coil_dim + 1))
         if pred_segmentation.shape != output.shape:
             raise AssertionError
+
+
+def test_unet_cross_entropy_loss_gradient():
+    """Test that the cross entropy segmentation loss is computed on the prediction's device and backpropagates."""
+    cfg = OmegaConf.create(
+        {
+            "use_reconstruction_module": False,
+            "segmentation_module": "UNet",
+            "segmentation_module_input_channels": 1,
+            "segmentation_module_output_channels": 4,
+            "segmentation_module_channels": 8,
+            "segmentation_module_pooling_layers": 2,
+            "segmentation_module_dropout": 0.0,
+            "segmentation_loss_fn": "cross_entropy+dice",
+            "cross_entropy_loss_weight": [0.1, 0.2, 0.3, 0.4],
+            "cross_entropy_loss_num_samples": 1,
+            "consecutive_slices": 1,
+            "coil_combination_method": "SENSE",
+            "magnitude_input": True,
+            "use_sens_net": False,
+            "fft_centered": False,
+            "fft_normalization": "backward",
+            "spatial_dims": [-2, -1],
+            "coil_dim": 1,
+        }
+    )
+    trainer = pl.Trainer(accelerator="cpu", num_nodes=1, enable_checkpointing=False, logger=False)
+    segmentation_unet = SegmentationUNet(cfg, trainer=trainer)
+
+    torch.manual_seed(0)
+    target = torch.nn.functional.one_hot(torch.randint(0, 4, (2, 16, 16)), 4).permute(0, 3, 1, 2).float()
+    prediction = torch.randn(2, 4, 16, 16, requires_grad=True)
+
+    cross_entropy_loss = segmentation_unet.process_segmentation_loss(target, prediction)["cross_entropy_loss"]
+    if cross_entropy_loss.device != prediction.device:
+        raise AssertionError
+    cross_entropy_loss.backward()
+    expected = torch.nn.functional.cross_entropy(
+        prediction.detach(), target.argmax(1), weight=torch.tensor([0.1, 0.2, 0.3, 0.4]), reduction="none"
+    ).mean()
+    if not torch.allclose(cross_entropy_loss.detach(), expected):
+        raise AssertionError
+    if prediction.grad is None or not prediction.grad.abs().sum() > 0:
+        raise AssertionError
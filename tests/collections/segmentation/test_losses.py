@@ -0,0 +1,77 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import pytest
+import torch
+
+from mridc.collections.segmentation.losses.cross_entropy import MC_CrossEntropyLoss
+
+
+@pytest.fixture
+def segmentation_logits():
+    """Create logits with a log variance and a target segmentation."""
+    torch.manual_seed(0)
+    batch_size, n_classes, n_x, n_y = 2, 4, 16, 16
+    logits = torch.randn(batch_size, n_classes, n_x, n_y)
+    pred_log_var = torch.randn(batch_size, n_classes, n_x, n_y) * 0.1 - 1
+    target = torch.randint(0, n_classes, (batch_size, n_x, n_y))
+    return logits, pred_log_var, target
+
+
+def test_mc_cross_entropy_loss(segmentation_logits):
+    """Test the Monte Carlo cross entropy loss against the mean cross entropy over the same noisy samples."""
+    logits, pred_log_var, target = segmentation_logits
+    num_samples = 6
+
+    torch.manual_seed(1)
+    loss = MC_CrossEntropyLoss(num_samples=num_samples)(target, logits, pred_log_var)
+    torch.manual_seed(1)
+    noise = torch.randn(num_samples, *logits.shape)
+    expected = torch.stack(
+        [
+            torch.nn.functional.cross_entropy(logits + torch.exp(0.5 * pred_log_var) * noise[i], target)
+            for i in range(num_samples)
+        ]
+    ).mean()
+    if not torch.allclose(loss, expected):
+        raise AssertionError
+
+
+@pytest.mark.parametrize("antithetic", [False, True])
+def test_mc_cross_entropy_loss_chunked(segmentation_logits, antithetic):
+    """Test that the chunked loss recomputes each chunk with the same noise on the backward pass."""
+    logits, pred_log_var, target = segmentation_logits
+    num_samples, num_samples_per_chunk = 7, 3
+    loss_fn = MC_CrossEntropyLoss(
+        num_samples=num_samples, num_samples_per_chunk=num_samples_per_chunk, antithetic=antithetic
+    )
+
+    losses, grads = [], []
+    for chunked in (True, False):
+        logits.grad = None
+        logits.requires_grad_(True)
+        torch.manual_seed(1)
+        if chunked:
+            loss = loss_fn(target, logits, pred_log_var)
+        else:
+            pred_std = torch.exp(0.5 * pred_log_var)
+            loss = sum(loss_fn.mc_chunk_loss(target, logits, pred_std, n) for n in (3, 3, 1)) / num_samples
+        loss.backward()
+        losses.append(loss.detach())
+        grads.append(logits.grad)
+
+    if not torch.allclose(losses[0], losses[1]):
+        raise AssertionError
+    if not torch.allclose(grads[0], grads[1]):
+        raise AssertionError
+
+
+def test_mc_cross_entropy_loss_antithetic_variance(segmentation_logits):
+    """Test that antithetic sampling reduces the variance of the Monte Carlo estimate."""
+    logits, pred_log_var, target = segmentation_logits
+    variances = []
+    for antithetic in (False, True):
+        loss_fn = MC_CrossEntropyLoss(num_samples=4, antithetic=antithetic)
+        variances.append(torch.stack([loss_fn(target, logits, pred_log_var) for _ in range(100)]).var())
+    if not variances[1] < variances[0]:
+        raise AssertionError
@@ -0,0 +1,104 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import numpy as np
+import pytest
+import torch
+from scipy.ndimage import binary_erosion, generate_binary_structure
+from scipy.spatial.distance import cdist
+
+from mridc.collections.segmentation.metrics.segmentation_metrics import (
+    asd,
+    hausdorff_distance_95_metric,
+    hausdorff_distance_metric,
+    surface_distance_metrics,
+)
+
+
+def create_segmentation(batch_size, nr_classes, shape):
+    """Create one-hot segmentations of random spheres, one sphere per foreground class."""
+    grid = torch.stack(torch.meshgrid(*[torch.arange(n).float() for n in shape], indexing="ij"))
+    segmentation = torch.zeros(batch_size, *shape, dtype=torch.long)
+    for batch_idx in range(batch_size):
+        for class_idx in range(1, nr_classes):
+            center = (torch.rand(len(shape)) * torch.tensor(shape)).view(-1, *[1] * len(shape))
+            radius = (torch.rand(1) * 0.25 + 0.1) * min(shape)
+            segmentation[batch_idx][((grid - center) ** 2).sum(0) < radius**2] = class_idx
+    return torch.nn.functional.one_hot(segmentation, nr_classes).movedim(-1, 1).float()
+
+
+def brute_force_surface_distance_metrics(x, y, voxelspacing):
+    """Compute the surface distance metrics of binary arrays from all pairwise distances of the border voxels."""
+    footprint = generate_binary_structure(x.ndim, 1)
+    x_border = np.argwhere(x ^ binary_erosion(x, footprint)) * voxelspacing
+    y_border = np.argwhere(y ^ binary_erosion(y, footprint)) * voxelspacing
+    distances = cdist(x_border, y_border)
+    x_to_y, y_to_x = distances.min(1), distances.min(0)
+    return [
+        max(x_to_y.max(), y_to_x.max()),
+        max(np.percentile(x_to_y, 95), np.percentile(y_to_x, 95)),
+        (x_to_y.mean() + y_to_x.mean()) / 2,
+    ]
+
+
+@pytest.mark.parametrize(
+    "shape, voxelspacing, backend, num_workers",
+    [
+        ((40, 36), None, "scipy", 1),
+        ((40, 36), (0.7, 1.3), "scipy", 2),
+        ((16, 18, 14), (2.0, 1.0, 1.0), "scipy", 1),
+        ((40, 36), (0.7, 1.3), "torch", 1),
+        ((16, 18, 14), (2.0, 1.0, 1.0), "torch", 1),
+    ],
+)
+def test_surface_distance_metrics(shape, voxelspacing, backend, num_workers):
+    """Test the batched surface distance metrics against the pairwise distances of the border voxels."""
+    torch.manual_seed(0)
+    batch_size, nr_classes = 3, 3
+    x = create_segmentation(batch_size, nr_classes, shape)
+    y = create_segmentation(batch_size, nr_classes, shape)
+
+    scores = surface_distance_metrics(x, y, voxelspacing, backend=backend, num_workers=num_workers)
+
+    spacing = np.ones(len(shape)) if voxelspacing is None else np.array(voxelspacing)
+    for batch_idx in range(batch_size):
+        for class_idx in range(1, nr_classes):
+            x_class, y_class = x[batch_idx, class_idx].bool().numpy(), y[batch_idx, class_idx].bool().numpy()
+            result = [
+                scores[k][batch_idx, class_idx - 1] for k in ("hausdorff_distance", "hausdorff_distance_95", "asd")
+            ]
+            if not x_class.any() or not y_class.any():
+                if not np.isnan(result).all():
+                    raise AssertionError
+                continue
+            if not np.allclose(result, brute_force_surface_distance_metrics(x_class, y_class, spacing)):
+                raise AssertionError
+
+
+def test_hausdorff_distance_metric_empty_class():
+    """Test that classes missing from a segmentation are excluded from the average."""
+    x = torch.zeros(1, 3, 16, 16)
+    x[:, 0] = 1
+    x[:, 0, 4:8, 4:8], x[:, 1, 4:8, 4:8] = 0, 1
+    y = x.clone()
+    y[:, 1, 4:8, 8:9], y[:, 0, 4:8, 8:9] = 1, 0
+    if hausdorff_distance_metric(x, y) != 1.0:
+        raise AssertionError
+    if not np.isnan(hausdorff_distance_metric(x[:, [0, 2]], y[:, [0, 2]])):
+        raise AssertionError
+
+
+@pytest.mark.parametrize("connectivity", [1, 2])
+def test_surface_distance_metrics_connectivity(connectivity):
+    """Test that the surface distance metrics forward the connectivity of the surfaces."""
+    torch.manual_seed(0)
+    x = torch.nn.functional.one_hot(torch.randint(0, 3, (2, 16, 16)), 3).permute(0, 3, 1, 2)
+    y = torch.nn.functional.one_hot(torch.randint(0, 3, (2, 16, 16)), 3).permute(0, 3, 1, 2)
+    scores = surface_distance_metrics(x, y, connectivity=connectivity)
+    for metric, key in (
+        (hausdorff_distance_metric, "hausdorff_distance"),
+        (hausdorff_distance_95_metric, "hausdorff_distance_95"),
+        (asd, "asd"),
+    ):
+        if not np.isclose(metric(x, y, connectivity=connectivity), scores[key][np.isfinite(scores[key])].mean()):
+            raise AssertionError
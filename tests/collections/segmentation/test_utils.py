@@ -0,0 +1,101 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import h5py
+import numpy as np
+import pytest
+
+from mridc.collections.segmentation.parts.utils import SegmentationLabelsMixin, SegmentationLabelsRemapping
+
+
+@pytest.mark.parametrize(
+    "to_remove, to_combine, to_separate, expected_classes",
+    [
+        (None, None, None, [[0], [1], [2], [3]]),
+        ([0], None, None, [[1], [2], [3]]),
+        ([0], [1, 2], None, [[1, 2], [3]]),
+        (None, [1, 2], None, [[0], [1, 2], [3]]),
+    ],
+)
+def test_segmentation_labels_remapping(to_remove, to_combine, to_separate, expected_classes):
+    """Test that removing and combining classes sums the expected source classes."""
+    rng = np.random.default_rng(0)
+    segmentation_labels = rng.random((3, 16, 12, 4)).astype(np.float32)
+
+    remapped = SegmentationLabelsRemapping(to_remove, to_combine, to_separate)(segmentation_labels)
+
+    expected = np.stack([segmentation_labels[..., c].sum(-1) for c in expected_classes], -1)
+    if remapped.shape != expected.shape:
+        raise AssertionError
+    if not np.allclose(remapped, expected):
+        raise AssertionError
+
+
+def test_segmentation_labels_remapping_separate_and_thresholds():
+    """Test that separated classes zero the other classes and that thresholds apply per remapped class."""
+    rng = np.random.default_rng(0)
+    segmentation_labels = rng.random((16, 12, 4)).astype(np.float32)
+    segmentation_labels[..., 3] = segmentation_labels[..., 3] > 0.7
+
+    remapped = SegmentationLabelsRemapping([0], [1, 2], [3], [1.0, None])(segmentation_labels)
+
+    pathology = segmentation_labels[..., 3] > 0
+    combined = segmentation_labels[..., 1] + segmentation_labels[..., 2]
+    if not np.array_equal(remapped[..., 1], segmentation_labels[..., 3]):
+        raise AssertionError
+    if not np.array_equal(remapped[..., 0], np.where(pathology, 0, combined > 1.0)):
+        raise AssertionError
+
+
+def test_segmentation_labels_remapping_separate_with_background():
+    """Test that a kept background is not duplicated, so that the class to separate is remapped to its own class."""
+    rng = np.random.default_rng(0)
+    segmentation_labels = rng.random((16, 12, 4)).astype(np.float32)
+    segmentation_labels[..., 3] = segmentation_labels[..., 3] > 0.7
+
+    remapped = SegmentationLabelsRemapping(None, [1, 2], [3])(segmentation_labels)
+
+    pathology = segmentation_labels[..., 3] > 0
+    if remapped.shape[-1] != 3:
+        raise AssertionError
+    if not np.array_equal(remapped[..., 2], segmentation_labels[..., 3]):
+        raise AssertionError
+    if not np.array_equal(remapped[..., 0], np.where(pathology, 0, segmentation_labels[..., 0])):
+        raise AssertionError
+
+
+class _SegmentationLabelsDataset(SegmentationLabelsMixin):
+    """A minimal dataset loading the segmentation labels of single slices."""
+
+    def __init__(self, cache_segmentation_labels):
+        self.segmentations_root = None
+        self.process_calls = 0
+        self.init_segmentation_labels(cache_segmentation_labels=cache_segmentation_labels)
+
+    @staticmethod
+    def get_consecutive_slices(data, key, dataslice):
+        return data[key][dataslice]
+
+    def process_segmentation_labels(self, segmentation_labels):
+        self.process_calls += 1
+        return self.segmentation_labels_remapping(segmentation_labels)
+
+
+@pytest.mark.parametrize("cache_segmentation_labels", [False, True])
+def test_segmentation_labels_cache(tmp_path, cache_segmentation_labels):
+    """Test that cached segmentation labels are processed once and returned as copies."""
+    fname = tmp_path / "file.h5"
+    segmentation = np.random.default_rng(0).random((2, 8, 8, 3)).astype(np.float32)
+    with h5py.File(fname, "w") as hf:
+        hf.create_dataset("segmentation", data=segmentation)
+
+    dataset = _SegmentationLabelsDataset(cache_segmentation_labels)
+    with h5py.File(fname, "r") as hf:
+        first = dataset.get_segmentation_labels(hf, fname, 1)
+        first[:] = 0
+        second = dataset.get_segmentation_labels(hf, fname, 1)
+
+    if not np.array_equal(second, segmentation[1]):
+        raise AssertionError
+    if dataset.process_calls != (1 if cache_segmentation_labels else 2):
+        raise AssertionError
@@ -0,0 +1,106 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import importlib
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import mridc
+
+LAZY_PACKAGES = [
+    "mridc.core",
+    "mridc.core.optim",
+    "mridc.collections.common",
+    "mridc.collections.common.callbacks",
+    "mridc.collections.common.losses",
+    "mridc.collections.common.metrics",
+    "mridc.collections.common.parts",
+    "mridc.collections.quantitative",
+    "mridc.collections.quantitative.data",
+    "mridc.collections.quantitative.models",
+    "mridc.collections.quantitative.parts",
+    "mridc.collections.reconstruction",
+    "mridc.collections.reconstruction.data",
+    "mridc.collections.reconstruction.losses",
+    "mridc.collections.reconstruction.models",
+    "mridc.collections.reconstruction.parts",
+    "mridc.collections.segmentation",
+    "mridc.collections.segmentation.data",
+    "mridc.collections.segmentation.losses",
+    "mridc.collections.segmentation.models",
+    "mridc.collections.segmentation.parts",
+]
+
+
+def import_time(module: str):
+    """Import a module in a fresh process, returning its cumulative import time in seconds and the imported modules."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(mridc.__file__).parents[1],
+    ).stderr
+    times = {
+        match.group(2): int(match.group(1)) / 1e6
+        for match in re.finditer(r"^import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", stderr, re.M)
+    }
+    return times[module], set(times)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "module, max_import_time, forbidden",
+    [
+        ("mridc.collections.common", 0.5, ["torch", "pytorch_lightning", "mridc.collections.common.parts"]),
+        ("mridc.core", 0.5, ["torch", "hydra", "mridc.core.optim"]),
+        ("mridc.collections.common.parts.fft", None, ["pytorch_lightning", "mridc.collections.reconstruction"]),
+        ("mridc.collections.reconstruction.data.subsample", None, ["pytorch_lightning", "piq"]),
+        ("mridc.collections.reconstruction.metrics.reconstruction_metrics", None, ["pytorch_lightning", "piq"]),
+    ],
+)
+def test_import_time(module, max_import_time, forbidden):
+    """Test that importing a module does not import the heavy modules it does not need."""
+    cumulative, modules = import_time(module)
+    if max_import_time is not None and cumulative > max_import_time:
+        raise AssertionError(f"Importing {module} took {cumulative:.3f} s.")
+    imported = [name for name in forbidden if name in modules]
+    if imported:
+        raise AssertionError(f"Importing {module} imported {imported}.")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("package", LAZY_PACKAGES)
+def test_lazy_attributes(package):
+    """Test that the lazily loaded attributes of the packages resolve."""
+    package = importlib.import_module(package)
+    for name in package.__all__:
+        if getattr(package, name) is None or name not in dir(package):
+            raise AssertionError(f"{package.__name__}.{name}")
+    with pytest.raises(AttributeError):
+        getattr(package, "not_an_attribute")
+
+
+@pytest.mark.unit
+def test_lazy_submodules():
+    """Test that the submodules of the lazily loaded attributes resolve before they are imported."""
+    subprocess.run(
+        [sys.executable, "-c", "import mridc.collections.common.losses as losses; losses.ssim.SSIMLoss"],
+        check=True,
+        cwd=Path(mridc.__file__).parents[1],
+    )
+
+
+@pytest.mark.unit
+def test_lazy_parts_utils():
+    """Test that the parts package exposes every name of its utils, which it used to import with a star import."""
+    from mridc.collections.common import parts
+    from mridc.collections.common.parts import utils
+
+    missing = set(utils.__all__) - set(parts.__all__)
+    if missing:
+        raise AssertionError(f"mridc.collections.common.parts does not expose {sorted(missing)}.")
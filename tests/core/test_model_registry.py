@@ -0,0 +1,89 @@
+# coding=utf-8
+__author__ = "Dimitrios Karkalousos"
+
+import ast
+import importlib.util
+import subprocess
+import sys
+from importlib import metadata
+from pathlib import Path
+
+import pytest
+
+import mridc
+from mridc.utils import model_registry
+from mridc.utils.model_registry import MODELS_ENTRY_POINT_GROUP, ModelRegistry
+
+IMPORTED_COLLECTIONS = """
+import contextlib, io, sys
+import {launcher}
+import mridc.cli
+
+sys.argv = ["mridc", "--help"]
+with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):
+    mridc.cli.main()
+print(sorted(m for m in sys.modules if m.startswith("mridc.collections")))
+"""
+
+
+@pytest.mark.unit
+def test_model_registry(monkeypatch):
+    """Test that models are resolved by name, case-insensitively, from the registry and from the plugins."""
+    plugin = metadata.EntryPoint(name="mynet", value="collections:Counter", group=MODELS_ENTRY_POINT_GROUP)
+    shadowed = metadata.EntryPoint(name="ORDEREDDICT", value="collections:ChainMap", group=MODELS_ENTRY_POINT_GROUP)
+    monkeypatch.setattr(
+        model_registry.metadata, "entry_points", lambda: {MODELS_ENTRY_POINT_GROUP: [plugin, shadowed]}
+    )
+
+    registry = ModelRegistry({"OrderedDict": "collections:OrderedDict"}, entry_point_group=MODELS_ENTRY_POINT_GROUP)
+    registry.register("deque", "collections:deque")
+    with pytest.raises(ValueError):
+        registry.register("DEQUE", "collections:UserList")
+
+    if registry.names() != ["DEQUE", "MYNET", "ORDEREDDICT"] or "MyNet" not in registry:
+        raise AssertionError
+    if [registry.get(name).__name__ for name in ("orderedDict", "DEQUE", "MYNET")] != [
+        "OrderedDict",
+        "deque",
+        "Counter",
+    ]:
+        raise AssertionError
+    with pytest.raises(NotImplementedError):
+        registry.get("CIRIM")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("launcher", ["launch.py", "cli/launch.py"])
+def test_launcher_models(launcher):
+    """Test that the models of the launchers exist, without importing them."""
+    with open(Path(mridc.__file__).parent / launcher, "r") as f:
+        tree = ast.parse(f.read())
+    registry = next(
+        node.value
+        for node in tree.body
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "MODELS"
+    )
+    paths = ast.literal_eval(registry.args[0]).values()  # type: ignore
+    if len(paths) < 30:
+        raise AssertionError
+    for path in paths:
+        module_name, class_name = path.split(":")
+        with open(importlib.util.find_spec(module_name).origin, "r") as f:  # type: ignore
+            classes = {node.name for node in ast.parse(f.read()).body if isinstance(node, ast.ClassDef)}
+        if class_name not in classes:
+            raise AssertionError(path)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("launcher", ["mridc.launch", "mridc.cli.launch"])
+def test_launcher_imports_no_models(launcher):
+    """Test that importing the launcher, and registering the commands of the cli, does not import the models."""
+    collections = subprocess.run(
+        [sys.executable, "-c", IMPORTED_COLLECTIONS.format(launcher=launcher)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(mridc.__file__).parents[1],
+    ).stdout
+    if collections.strip() != "[]":
+        raise AssertionError(collections)